@@ -0,0 +1,122 @@
+"""
+Totais acumulados do estoque para o Sistema de Gerenciamento de Estoque
+
+Mantém o valor total em estoque, a quantidade de itens e os totais por categoria,
+atualizados a cada alteração de produto em vez de recalculados no relatório.
+
+Os valores usam Decimal (aritmética decimal exata): somar e subtrair contribuições
+várias vezes nunca acumula erro de arredondamento, então os totais continuam
+exatamente iguais a um recálculo completo.
+"""
+
+from decimal import Decimal
+
+# Quando True, toda consulta aos totais recalcula tudo e confere se bate com os acumulados
+MODO_VERIFICACAO = False
+
+# Contribuição de cada produto aos totais: ID -> (categoria, quantidade, valor)
+# Guardar a contribuição antiga permite desfazê-la sem saber o estado anterior do produto.
+contribuicoes = {}
+
+totais = {
+    'valor_total': Decimal('0'),
+    'quantidade_itens': 0,     # soma das quantidades em estoque
+    'quantidade_produtos': 0,  # número de produtos cadastrados
+}
+
+# Totais por categoria: categoria -> {'valor': Decimal, 'quantidade_itens': int, 'quantidade_produtos': int}
+totais_por_categoria = {}
+
+def valor_decimal(preco):
+    """Converte o preço (float) para Decimal pelo texto, ex.: 19.9 -> Decimal('19.9')"""
+    return Decimal(repr(preco))
+
+def calcular_contribuicao(produto_dict):
+    """Retorna (categoria, quantidade, valor) de um produto"""
+    quantidade = produto_dict['quantidade']
+    return (produto_dict['categoria'], quantidade, valor_decimal(produto_dict['preco']) * quantidade)
+
+def somar_contribuicao(contribuicao, sinal):
+    """Soma (sinal=1) ou subtrai (sinal=-1) uma contribuição dos totais"""
+    categoria, quantidade, valor = contribuicao
+    totais['valor_total'] += sinal * valor
+    totais['quantidade_itens'] += sinal * quantidade
+    totais['quantidade_produtos'] += sinal
+    
+    totais_categoria = totais_por_categoria.get(categoria)
+    if totais_categoria is None:
+        totais_categoria = {'valor': Decimal('0'), 'quantidade_itens': 0, 'quantidade_produtos': 0}
+        totais_por_categoria[categoria] = totais_categoria
+    totais_categoria['valor'] += sinal * valor
+    totais_categoria['quantidade_itens'] += sinal * quantidade
+    totais_categoria['quantidade_produtos'] += sinal
+    if totais_categoria['quantidade_produtos'] == 0:
+        del totais_por_categoria[categoria] # Categoria sem produtos deixa de aparecer
+
+def atualizar_produto(produto_dict):
+    """Troca a contribuição antiga do produto (se houver) pela atual"""
+    antiga = contribuicoes.get(produto_dict['id'])
+    nova = calcular_contribuicao(produto_dict)
+    if antiga == nova:
+        return
+    if antiga is not None:
+        somar_contribuicao(antiga, -1)
+    somar_contribuicao(nova, 1)
+    contribuicoes[produto_dict['id']] = nova
+
+def remover_produto(id_produto):
+    """Desfaz a contribuição de um produto removido"""
+    antiga = contribuicoes.pop(id_produto, None)
+    if antiga is not None:
+        somar_contribuicao(antiga, -1)
+
+def reconstruir(produtos):
+    """Recalcula todos os totais a partir do dicionário de produtos"""
+    contribuicoes.clear()
+    totais_por_categoria.clear()
+    totais['valor_total'] = Decimal('0')
+    totais['quantidade_itens'] = 0
+    totais['quantidade_produtos'] = 0
+    for produto_dict in produtos.values():
+        atualizar_produto(produto_dict)
+
+def calcular_do_zero(produtos):
+    """Recálculo completo (sem usar os acumulados), usado pela verificação"""
+    valor_total = Decimal('0')
+    quantidade_itens = 0
+    por_categoria = {}
+    for produto_dict in produtos.values():
+        categoria, quantidade, valor = calcular_contribuicao(produto_dict)
+        valor_total += valor
+        quantidade_itens += quantidade
+        totais_categoria = por_categoria.setdefault(
+            categoria, {'valor': Decimal('0'), 'quantidade_itens': 0, 'quantidade_produtos': 0})
+        totais_categoria['valor'] += valor
+        totais_categoria['quantidade_itens'] += quantidade
+        totais_categoria['quantidade_produtos'] += 1
+    esperado = {'valor_total': valor_total, 'quantidade_itens': quantidade_itens,
+                'quantidade_produtos': len(produtos)}
+    return esperado, por_categoria
+
+def verificar(produtos):
+    """Lança AssertionError se os totais acumulados forem diferentes de um recálculo completo"""
+    esperado, por_categoria = calcular_do_zero(produtos)
+    if esperado != totais:
+        raise AssertionError(f"Totais acumulados divergem do recálculo: {totais} != {esperado}")
+    if por_categoria != totais_por_categoria:
+        raise AssertionError("Totais por categoria divergem do recálculo")
+
+def obter_totais(produtos=None):
+    """
+    Retorna uma cópia dos totais gerais - O(1).
+    Em MODO_VERIFICACAO, confere os totais contra 'produtos' antes de retornar.
+    """
+    if MODO_VERIFICACAO and produtos is not None:
+        verificar(produtos)
+    return dict(totais)
+
+def obter_totais_por_categoria(produtos=None):
+    """Retorna uma cópia dos totais de cada categoria - O(número de categorias)"""
+    if MODO_VERIFICACAO and produtos is not None:
+        verificar(produtos)
+    return {categoria: dict(valores) for categoria, valores in totais_por_categoria.items()}
@@ -0,0 +1,325 @@
+"""
+Análises em colunas (NumPy) para o Sistema de Gerenciamento de Estoque
+
+Guarda quantidade, preço, estoque mínimo e categoria de todos os produtos em arrays NumPy
+(uma "coluna" por campo, uma linha por produto). As colunas são montadas na primeira análise
+(o carregamento não fica mais lento) e, a partir daí, atualizadas a cada alteração como os outros índices.
+As análises viram operações sobre arrays inteiros em vez de um laço Python por produto:
+    valor_total()                    soma de quantidade x preço
+    baixo_estoque()                  [(id, falta)] dos produtos abaixo do mínimo, do maior para o menor déficit
+    totais_por_categoria()           valor, itens e produtos de cada categoria
+    maiores_valores(n)               [(id, valor)] dos N produtos com mais valor em estoque
+
+Os resultados são exatamente iguais aos dos relatórios (agregados_estoque.py e baixo_estoque.py):
+o preço é guardado em centavos inteiros e as somas são feitas com inteiros, sem erro de arredondamento;
+o número de casas decimais de cada preço também é guardado, para que o Decimal final tenha a mesma
+forma ('59.7' e não '59.70'). Preços com mais de duas casas decimais (raros) são somados à parte com Decimal.
+
+O NumPy é opcional: sem ele (ou com ATIVO = False) as mesmas funções percorrem o dicionário
+de produtos em Python (funções *_python), com os mesmos resultados.
+"""
+
+import gc
+import heapq
+import operator
+from decimal import Decimal
+
+from produto import Produto
+
+try:
+    import numpy
+except ImportError: # NumPy não instalado: só o caminho em Python
+    numpy = None
+
+ATIVO = numpy is not None
+CAPACIDADE_INICIAL = 1024
+LIMITE_PRECO_CENTAVOS = 10 ** 13 # Acima disso o float não distingue todos os centavos
+
+def valor_decimal(preco):
+    """Mesma conversão de agregados_estoque: 19.9 -> Decimal('19.9')"""
+    return Decimal(repr(preco))
+
+# Colunas: a linha de cada produto é posicao_por_id[id]; só as 'tamanho' primeiras linhas estão em uso
+posicao_por_id = {}
+id_por_posicao = []
+colunas = {}
+tamanho = 0
+montadas = False # False até a primeira análise (ou depois de reconstruir)
+categorias = [] # código -> categoria
+codigo_por_categoria = {}
+
+def criar_colunas(capacidade):
+    return {
+        'id': numpy.zeros(capacidade, dtype=numpy.int64),
+        'quantidade': numpy.zeros(capacidade, dtype=numpy.int64),
+        'centavos': numpy.zeros(capacidade, dtype=numpy.int64), # Preço x 100 (0 se o preço não couber em centavos)
+        'preco_exato': numpy.ones(capacidade, dtype=bool), # False: preço com mais de 2 casas (somado com Decimal)
+        'casas': numpy.zeros(capacidade, dtype=numpy.int8), # Casas decimais de repr(preço): 19.9 -> 1, 10.0 -> 1, 10 -> 0
+        'estoque_minimo': numpy.zeros(capacidade, dtype=numpy.int64),
+        'categoria': numpy.zeros(capacidade, dtype=numpy.int32),
+    }
+
+def preco_em_centavos(preco):
+    """Retorna (centavos, exato, casas decimais): exato=False se o preço tem mais de duas casas decimais"""
+    centavos = round(preco * 100)
+    if abs(centavos) < LIMITE_PRECO_CENTAVOS and centavos / 100 == preco:
+        texto = repr(preco) # Nesta faixa, sem notação científica
+        ponto = texto.find('.')
+        return centavos, True, 0 if ponto < 0 else len(texto) - ponto - 1
+    return 0, False, 0
+
+def centavos_para_decimal(centavos, casas):
+    """Decimal com 'casas' casas decimais, como a soma de Decimal(repr(preço)) x quantidade daria"""
+    return Decimal(int(centavos)).scaleb(-2).quantize(Decimal(1).scaleb(-int(casas)))
+
+def codigo_da_categoria(categoria):
+    codigo = codigo_por_categoria.get(categoria)
+    if codigo is None:
+        codigo = codigo_por_categoria[categoria] = len(categorias)
+        categorias.append(categoria)
+    return codigo
+
+def limpar():
+    global colunas, tamanho, montadas
+    montadas = False
+    posicao_por_id.clear()
+    id_por_posicao.clear()
+    categorias.clear()
+    codigo_por_categoria.clear()
+    colunas = criar_colunas(CAPACIDADE_INICIAL) if ATIVO else {}
+    tamanho = 0
+
+def reconstruir(produtos):
+    """Descarta as colunas (usado ao carregar); elas são montadas de novo na próxima análise"""
+    limpar()
+
+def montar(produtos):
+    """Monta as colunas a partir do dicionário de produtos"""
+    global colunas, tamanho, montadas
+    limpar()
+    montadas = True
+    # Um milhão de tuplas novas (e nenhum ciclo entre elas) disparariam o coletor de ciclos várias vezes à toa
+    coletor_ligado = gc.isenabled()
+    gc.disable()
+    try:
+        montar_colunas(list(produtos.values()))
+    finally:
+        if coletor_ligado:
+            gc.enable()
+
+def montar_colunas(lista):
+    global colunas, tamanho
+    quantidade_produtos = len(lista)
+    colunas = criar_colunas(max(CAPACIDADE_INICIAL, quantidade_produtos))
+    if not quantidade_produtos:
+        return
+    # Uma passada pelos produtos; attrgetter/itemgetter leem os campos em C (o Produto também é lido como atributo)
+    campos = ('id', 'quantidade', 'preco', 'estoque_minimo', 'categoria')
+    extrair = operator.attrgetter(*campos) if all(type(produto_dict) is Produto for produto_dict in lista) \
+        else operator.itemgetter(*campos)
+    ids, quantidades, precos, minimos, categorias_produtos = zip(*map(extrair, lista))
+
+    linhas = slice(0, quantidade_produtos)
+    colunas['id'][linhas] = ids
+    colunas['quantidade'][linhas] = quantidades
+    colunas['estoque_minimo'][linhas] = minimos
+    for categoria in set(categorias_produtos):
+        codigo_da_categoria(categoria)
+    colunas['categoria'][linhas] = list(map(codigo_por_categoria.__getitem__, categorias_produtos))
+
+    # Mesma conta de preco_em_centavos(), para todos os preços de uma vez
+    valores = numpy.array(precos, dtype=numpy.float64)
+    centavos = numpy.rint(valores * 100)
+    exato = (numpy.abs(centavos) < LIMITE_PRECO_CENTAVOS) & (centavos / 100 == valores)
+    centavos = numpy.where(exato, centavos, 0).astype(numpy.int64)
+    # Casas de repr(preço): float com centavos 0 -> '10.0' (1 casa); múltiplo de 10 -> '19.9'; senão 2; int -> 0
+    casas = numpy.where(centavos % 10 != 0, 2, 1).astype(numpy.int8)
+    inteiros = numpy.fromiter((type(preco) is int for preco in precos), bool, quantidade_produtos)
+    casas[inteiros | ~exato] = 0
+    colunas['centavos'][linhas] = centavos
+    colunas['preco_exato'][linhas] = exato
+    colunas['casas'][linhas] = casas
+
+    id_por_posicao.extend(ids)
+    posicao_por_id.update(zip(ids, range(quantidade_produtos)))
+    tamanho = quantidade_produtos
+
+def atualizar_produto(produto_dict):
+    """Grava os valores atuais do produto na sua linha (acrescenta uma linha se ele é novo)"""
+    global colunas, tamanho
+    if not montadas:
+        return
+    id_produto = produto_dict['id']
+    posicao = posicao_por_id.get(id_produto)
+    if posicao is None:
+        if tamanho == len(colunas['id']):
+            # Sem espaço: dobra a capacidade (custo amortizado constante por produto novo)
+            novas = criar_colunas(2 * tamanho)
+            for nome, coluna in colunas.items():
+                novas[nome][:tamanho] = coluna
+            colunas = novas
+        posicao = posicao_por_id[id_produto] = tamanho
+        id_por_posicao.append(id_produto)
+        tamanho += 1
+        colunas['id'][posicao] = id_produto
+    centavos, exato, casas = preco_em_centavos(produto_dict['preco'])
+    colunas['quantidade'][posicao] = produto_dict['quantidade']
+    colunas['centavos'][posicao] = centavos
+    colunas['preco_exato'][posicao] = exato
+    colunas['casas'][posicao] = casas
+    colunas['estoque_minimo'][posicao] = produto_dict['estoque_minimo']
+    colunas['categoria'][posicao] = codigo_da_categoria(produto_dict['categoria'])
+
+def remover_produto(id_produto):
+    """Retira a linha do produto (a última linha passa para o lugar dela)"""
+    global tamanho
+    if not montadas:
+        return
+    posicao = posicao_por_id.pop(id_produto, None)
+    if posicao is None:
+        return
+    ultima = tamanho - 1
+    if posicao != ultima:
+        for coluna in colunas.values():
+            coluna[posicao] = coluna[ultima]
+        id_movido = id_por_posicao[ultima]
+        id_por_posicao[posicao] = id_movido
+        posicao_por_id[id_movido] = posicao
+    id_por_posicao.pop()
+    tamanho = ultima
+
+def usando_colunas(produtos):
+    """True se a análise pode usar as colunas (montando-as na primeira vez); False = caminho em Python"""
+    if not ATIVO:
+        return False
+    if not montadas:
+        montar(produtos)
+    return tamanho == len(produtos)
+
+def em_uso(nome):
+    return colunas[nome][:tamanho]
+
+def valores_em_centavos():
+    """Quantidade x centavos de cada linha (0 nas linhas com preço inexato)"""
+    quantidade = em_uso('quantidade')
+    centavos = em_uso('centavos')
+    # Proteção contra estouro do int64 (na multiplicação ou na soma): com valores gigantes, usa inteiros do Python
+    if tamanho and float(numpy.abs(quantidade).max()) * float(numpy.abs(centavos).max()) * tamanho >= 2 ** 62:
+        return numpy.array([q * c for q, c in zip(quantidade.tolist(), centavos.tolist())], dtype=object)
+    return quantidade * centavos
+
+def valores_inexatos(produtos):
+    """
+    [(posição, valor Decimal)] das linhas com preço de mais de duas casas decimais
+    (esses preços não cabem na coluna de centavos: o valor é calculado a partir do dicionário de produtos)
+    """
+    resultado = []
+    for posicao in numpy.flatnonzero(~em_uso('preco_exato')).tolist():
+        produto_dict = produtos[id_por_posicao[posicao]]
+        resultado.append((posicao, valor_decimal(produto_dict['preco']) * produto_dict['quantidade']))
+    return resultado
+
+# Consultas com NumPy
+def valor_total_colunar(produtos):
+    total = centavos_para_decimal(valores_em_centavos().sum(), em_uso('casas').max(initial=0))
+    return total + sum((valor for _, valor in valores_inexatos(produtos)), Decimal('0'))
+
+def baixo_estoque_colunar():
+    falta = em_uso('estoque_minimo') - em_uso('quantidade')
+    posicoes = numpy.flatnonzero(falta > 0)
+    ids = em_uso('id')[posicoes]
+    ordem = numpy.lexsort((ids, -falta[posicoes])) # Maior falta primeiro; empate: menor ID
+    return list(zip(ids[ordem].tolist(), falta[posicoes][ordem].tolist()))
+
+def totais_por_categoria_colunar(produtos):
+    codigos = em_uso('categoria')
+    quantidade_categorias = len(categorias)
+    valores_centavos = valores_em_centavos()
+    valores = numpy.zeros(quantidade_categorias, dtype=valores_centavos.dtype)
+    numpy.add.at(valores, codigos, valores_centavos) # Soma por grupo (inteiros: exata)
+    quantidades = numpy.zeros(quantidade_categorias, dtype=numpy.int64)
+    numpy.add.at(quantidades, codigos, em_uso('quantidade'))
+    produtos_por_categoria = numpy.bincount(codigos, minlength=quantidade_categorias)
+    casas = numpy.zeros(quantidade_categorias, dtype=numpy.int8)
+    numpy.maximum.at(casas, codigos, em_uso('casas'))
+    valores_decimais = [centavos_para_decimal(valor, casas_categoria)
+                        for valor, casas_categoria in zip(valores.tolist(), casas.tolist())]
+    for posicao, valor in valores_inexatos(produtos):
+        valores_decimais[codigos[posicao]] += valor
+    resultado = {}
+    for codigo, categoria in enumerate(categorias):
+        if produtos_por_categoria[codigo]: # Categorias sem produtos não aparecem (como em agregados_estoque)
+            resultado[categoria] = {'valor': valores_decimais[codigo], 'quantidade_itens': int(quantidades[codigo]),
+                                    'quantidade_produtos': int(produtos_por_categoria[codigo])}
+    return resultado
+
+def maiores_valores_colunar(produtos, n):
+    valores = valores_em_centavos()
+    ids = em_uso('id')
+    if valores.dtype == object or n >= tamanho:
+        candidatas = range(tamanho)
+    else:
+        # Valor do N-ésimo maior; todas as linhas com valor >= ele entram (inclusive os empates no limite)
+        limite = numpy.partition(valores, tamanho - n)[tamanho - n]
+        candidatas = numpy.flatnonzero(valores >= limite).tolist()
+    # As linhas com preço inexato têm 0 na coluna de valores: entram à parte, com o valor em Decimal
+    inexatos = valores_inexatos(produtos)
+    posicoes_inexatas = {posicao for posicao, _ in inexatos}
+    ordenaveis = [(-int(valores[posicao]), int(ids[posicao])) for posicao in candidatas if posicao not in posicoes_inexatas]
+    ordenaveis = [(Decimal(valor).scaleb(-2), id_produto) for valor, id_produto in heapq.nsmallest(n, ordenaveis)]
+    ordenaveis += [(-valor, int(ids[posicao])) for posicao, valor in inexatos]
+    # Só os N escolhidos são convertidos, com a mesma conta dos relatórios
+    return [(id_produto, valor_decimal(produtos[id_produto]['preco']) * produtos[id_produto]['quantidade'])
+            for _, id_produto in heapq.nsmallest(n, ordenaveis)]
+
+# Mesmas consultas em Python puro (sem NumPy, ou para comparação)
+def valor_total_python(produtos):
+    return sum((valor_decimal(produto_dict['preco']) * produto_dict['quantidade'] for produto_dict in produtos.values()),
+               Decimal('0'))
+
+def baixo_estoque_python(produtos):
+    abaixo = [(produto_dict['id'], produto_dict['estoque_minimo'] - produto_dict['quantidade'])
+              for produto_dict in produtos.values() if produto_dict['quantidade'] < produto_dict['estoque_minimo']]
+    return sorted(abaixo, key=lambda item: (-item[1], item[0]))
+
+def totais_por_categoria_python(produtos):
+    resultado = {}
+    for produto_dict in produtos.values():
+        totais = resultado.setdefault(produto_dict['categoria'],
+                                      {'valor': Decimal('0'), 'quantidade_itens': 0, 'quantidade_produtos': 0})
+        totais['valor'] += valor_decimal(produto_dict['preco']) * produto_dict['quantidade']
+        totais['quantidade_itens'] += produto_dict['quantidade']
+        totais['quantidade_produtos'] += 1
+    return resultado
+
+def maiores_valores_python(produtos, n):
+    maiores = heapq.nsmallest(n, ((-valor_decimal(produto_dict['preco']) * produto_dict['quantidade'], produto_dict['id'])
+                                  for produto_dict in produtos.values()))
+    return [(id_produto, -valor_negativo) for valor_negativo, id_produto in maiores]
+
+# Consultas usadas pelo sistema: colunas quando disponíveis, senão Python
+def valor_total(produtos):
+    """Soma de quantidade x preço de todos os produtos (Decimal)"""
+    if usando_colunas(produtos):
+        return valor_total_colunar(produtos)
+    return valor_total_python(produtos)
+
+def baixo_estoque(produtos):
+    """[(id, falta)] dos produtos abaixo do mínimo, da maior para a menor falta (empate: menor ID)"""
+    if usando_colunas(produtos):
+        return baixo_estoque_colunar()
+    return baixo_estoque_python(produtos)
+
+def totais_por_categoria(produtos):
+    """{categoria: {'valor': Decimal, 'quantidade_itens': int, 'quantidade_produtos': int}}"""
+    if usando_colunas(produtos):
+        return totais_por_categoria_colunar(produtos)
+    return totais_por_categoria_python(produtos)
+
+def maiores_valores(produtos, n=10):
+    """[(id, valor)] dos N produtos com maior valor em estoque (empate: menor ID)"""
+    if usando_colunas(produtos):
+        return maiores_valores_colunar(produtos, n)
+    return maiores_valores_python(produtos, n)
+
+limpar()
@@ -0,0 +1,376 @@
+"""
+Armazenamento em SQLite para o Sistema de Gerenciamento de Estoque
+
+Alternativa ao produtos.json: cada produto é uma linha da tabela 'produtos'.
+- Só as linhas usadas são lidas (carregamento sob demanda), então a inicialização não depende do tamanho do catálogo.
+- Cada salvamento é uma transação: um erro no meio da gravação não deixa o banco pela metade.
+- Modo WAL (write-ahead log) do SQLite: leituras não bloqueiam gravações.
+- Índice na condição de baixo estoque.
+- Tabela meta com o próximo ID livre, gravada em cada salvamento: remover o produto de maior ID
+  não faz o ID voltar a ser usado (como o produtos.meta.json dos outros modos).
+- Colunas nome_busca e categoria_busca com o texto já normalizado para a busca (indice_busca.normalizar),
+  gravadas junto com o produto: as buscas não normalizam a tabela a cada consulta.
+- Índice de trigramas (FTS5, tabela produtos_busca) sobre essas colunas, mantido por gatilhos:
+  "nome contém X" consulta só os produtos candidatos, como o índice em memória (indice_busca.py).
+  Sem FTS5 no SQLite instalado, a busca percorre as colunas normalizadas.
+
+Migração do catálogo atual (o snapshot mais recente, produtos.json ou produtos.bin, com o journal e o próximo ID):
+    python armazenamento_sqlite.py migrar [produtos.json] [produtos.db]
+"""
+
+import json
+import os
+import sqlite3
+import sys
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from decimal import Decimal
+
+import indice_busca
+
+COLUNAS = ('id', 'nome', 'categoria', 'quantidade', 'preco', 'estoque_minimo')
+COLUNAS_BUSCA = {'nome': 'nome_busca', 'categoria': 'categoria_busca'} # campo -> coluna com o texto normalizado
+# Insere ou atualiza o produto. ON CONFLICT em vez de INSERT OR REPLACE: o REPLACE apaga a linha antiga
+# sem disparar o gatilho de remoção, e o índice de trigramas ficaria com o texto antigo
+SALVAR = ("INSERT INTO produtos (id, nome, categoria, quantidade, preco, estoque_minimo, nome_busca, categoria_busca) "
+          "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET "
+          "nome = excluded.nome, categoria = excluded.categoria, quantidade = excluded.quantidade, "
+          "preco = excluded.preco, estoque_minimo = excluded.estoque_minimo, "
+          "nome_busca = excluded.nome_busca, categoria_busca = excluded.categoria_busca")
+TAMANHO_CACHE = 10000 # Produtos lidos guardados em ProdutosSQLite (os usados há mais tempo saem primeiro)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS produtos (
+    id INTEGER PRIMARY KEY,
+    nome TEXT NOT NULL,
+    categoria TEXT NOT NULL,
+    quantidade INTEGER NOT NULL CHECK (quantidade >= 0),
+    preco REAL NOT NULL CHECK (preco >= 0),
+    estoque_minimo INTEGER NOT NULL CHECK (estoque_minimo >= 0),
+    nome_busca TEXT,
+    categoria_busca TEXT
+);
+-- Valores do banco que não são produtos (chave 'proximo_id': próximo ID livre)
+CREATE TABLE IF NOT EXISTS meta (
+    chave TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL
+);
+-- Índice parcial: só contém os produtos abaixo do mínimo, ordenados pelo déficit
+CREATE INDEX IF NOT EXISTS idx_produtos_baixo_estoque
+    ON produtos (estoque_minimo - quantidade) WHERE quantidade < estoque_minimo;
+-- Sem uso desde o índice de trigramas (bancos antigos)
+DROP INDEX IF EXISTS idx_produtos_nome;
+DROP INDEX IF EXISTS idx_produtos_categoria;
+"""
+
+# Índice de trigramas sobre os textos normalizados. A tabela FTS5 não guarda uma cópia dos textos
+# (content='produtos'): os gatilhos só atualizam o índice, e só quando o nome ou a categoria mudam
+ESQUEMA_BUSCA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS produtos_busca USING fts5(
+    nome_busca, categoria_busca, content='produtos', content_rowid='id', tokenize='trigram case_sensitive 1');
+CREATE TRIGGER IF NOT EXISTS produtos_busca_inserir AFTER INSERT ON produtos BEGIN
+    INSERT INTO produtos_busca (rowid, nome_busca, categoria_busca) VALUES (new.id, new.nome_busca, new.categoria_busca);
+END;
+CREATE TRIGGER IF NOT EXISTS produtos_busca_remover AFTER DELETE ON produtos BEGIN
+    INSERT INTO produtos_busca (produtos_busca, rowid, nome_busca, categoria_busca)
+        VALUES ('delete', old.id, old.nome_busca, old.categoria_busca);
+END;
+CREATE TRIGGER IF NOT EXISTS produtos_busca_alterar AFTER UPDATE ON produtos
+WHEN old.nome_busca IS NOT new.nome_busca OR old.categoria_busca IS NOT new.categoria_busca BEGIN
+    INSERT INTO produtos_busca (produtos_busca, rowid, nome_busca, categoria_busca)
+        VALUES ('delete', old.id, old.nome_busca, old.categoria_busca);
+    INSERT INTO produtos_busca (rowid, nome_busca, categoria_busca) VALUES (new.id, new.nome_busca, new.categoria_busca);
+END;
+"""
+busca_por_trigramas = False # True se o índice produtos_busca existe (SQLite com FTS5 e o tokenizador trigram)
+
+class SomaDecimal:
+    """Agregação SQL que soma quantidade * preco com Decimal (mesmo resultado de agregados_estoque.py)"""
+    def __init__(self):
+        self.total = Decimal('0')
+
+    def step(self, quantidade, preco):
+        self.total += Decimal(repr(preco)) * quantidade
+
+    def finalize(self):
+        return str(self.total) # Texto, para não perder a exatidão ao voltar para o Python
+
+def abrir_banco(caminho):
+    """Abre (ou cria) o banco, ativa o modo WAL e garante que a tabela e os índices existem"""
+    conexao = sqlite3.connect(caminho, check_same_thread=False)
+    conexao.row_factory = sqlite3.Row
+    conexao.execute("PRAGMA journal_mode=WAL")
+    conexao.execute("PRAGMA synchronous=NORMAL") # Em WAL, continua seguro contra quedas do programa
+    # Mesmas regras de texto da busca em Python (o lower() do SQLite não entende acentos)
+    conexao.create_function('normalizar_busca', 1, indice_busca.normalizar, deterministic=True)
+    conexao.create_aggregate('soma_decimal', 2, SomaDecimal)
+    conexao.executescript(ESQUEMA)
+    migrar_colunas_busca(conexao)
+    criar_indice_busca(conexao)
+    conexao.commit()
+    return conexao
+
+def migrar_colunas_busca(conexao):
+    """Bancos criados antes das colunas de busca: cria as colunas e preenche (uma vez só)"""
+    existentes = {linha['name'] for linha in conexao.execute("PRAGMA table_info(produtos)")}
+    faltando = [coluna for coluna in COLUNAS_BUSCA.values() if coluna not in existentes]
+    if not faltando:
+        return
+    for coluna in faltando:
+        conexao.execute(f"ALTER TABLE produtos ADD COLUMN {coluna} TEXT")
+    conexao.execute("UPDATE produtos SET nome_busca = normalizar_busca(nome), categoria_busca = normalizar_busca(categoria)")
+
+def criar_indice_busca(conexao):
+    """Cria o índice de trigramas e os gatilhos; num banco que já tem produtos, monta o índice (uma vez só)"""
+    global busca_por_trigramas
+    existia = conexao.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'produtos_busca'").fetchone() is not None
+    try:
+        conexao.executescript(ESQUEMA_BUSCA)
+    except sqlite3.OperationalError: # SQLite sem FTS5 ou anterior ao tokenizador trigram (3.34)
+        busca_por_trigramas = False
+        return
+    if not existia:
+        conexao.execute("INSERT INTO produtos_busca (produtos_busca) VALUES ('rebuild')")
+    busca_por_trigramas = True
+
+def valores_da_linha(produto_dict):
+    """Valores na ordem de SALVAR: as colunas do produto e os textos normalizados para a busca"""
+    valores = [produto_dict[coluna] for coluna in COLUNAS]
+    valores.append(indice_busca.normalizar(produto_dict['nome']))
+    valores.append(indice_busca.normalizar(produto_dict['categoria']))
+    return valores
+
+def linha_para_dict(linha):
+    """Converte uma linha do banco no dicionário de produto usado pelo sistema"""
+    return {coluna: linha[coluna] for coluna in COLUNAS}
+
+# --- Operações (mesmas do sistema, recebendo a conexão) ---
+# Nenhuma delas faz commit: quem chama decide quando a transação termina (ver salvar_dados).
+
+def buscar_produto_por_id(conexao, id_produto):
+    """Retorna o dicionário do produto ou None"""
+    linha = conexao.execute("SELECT * FROM produtos WHERE id = ?", (id_produto,)).fetchone()
+    return linha_para_dict(linha) if linha is not None else None
+
+def salvar_produto(conexao, produto_dict):
+    """Insere ou atualiza o produto (usado no cadastro e em qualquer alteração)"""
+    conexao.execute(SALVAR, valores_da_linha(produto_dict))
+
+def salvar_produtos(conexao, lista_produtos):
+    """salvar_produto() para vários produtos, num único executemany (importações em lote)"""
+    conexao.executemany(SALVAR, (valores_da_linha(produto_dict) for produto_dict in lista_produtos))
+
+def remover_produto(conexao, id_produto):
+    """Remove o produto. Retorna True se ele existia"""
+    return conexao.execute("DELETE FROM produtos WHERE id = ?", (id_produto,)).rowcount > 0
+
+# --- Consultas que substituem as estruturas em memória ---
+
+def obter_maior_id(conexao):
+    """Maior ID cadastrado (0 se vazio) - usa a chave primária, sem percorrer a tabela"""
+    return conexao.execute("SELECT COALESCE(MAX(id), 0) FROM produtos").fetchone()[0]
+
+def ler_proximo_id(conexao):
+    """Próximo ID livre: o gravado na tabela meta, ou o maior ID + 1 se for maior (bancos antigos, sem meta)"""
+    return conexao.execute(
+        "SELECT MAX(COALESCE((SELECT valor FROM meta WHERE chave = 'proximo_id'), 1), "
+        "(SELECT COALESCE(MAX(id), 0) + 1 FROM produtos))").fetchone()[0]
+
+def gravar_proximo_id(conexao, proximo_id):
+    """Grava o próximo ID livre na tabela meta, na transação aberta (o valor gravado nunca diminui)"""
+    conexao.execute(
+        "INSERT INTO meta (chave, valor) VALUES ('proximo_id', ?) "
+        "ON CONFLICT (chave) DO UPDATE SET valor = MAX(valor, excluded.valor)", (proximo_id,))
+
+def buscar_ids_por_texto(conexao, campo, consulta):
+    """IDs (em ordem crescente) cujo campo ('nome' ou 'categoria') contém a consulta, sem diferenciar maiúsculas e acentos"""
+    if campo not in COLUNAS_BUSCA:
+        raise ValueError(f"Campo de busca inválido: {campo}")
+    consulta = indice_busca.normalizar(consulta)
+    coluna = COLUNAS_BUSCA[campo]
+    if busca_por_trigramas and len(consulta) >= 3:
+        # Candidatos pelo índice de trigramas (a consulta entre aspas: sequência exata), conferidos com instr
+        cursor = conexao.execute(
+            f"SELECT produtos.id FROM produtos_busca JOIN produtos ON produtos.id = produtos_busca.rowid "
+            f"WHERE produtos_busca.{coluna} MATCH ? AND instr(produtos.{coluna}, ?) > 0 ORDER BY produtos.id",
+            ('"' + consulta.replace('"', '""') + '"', consulta))
+    else:
+        # Consultas curtas não formam trigramas: confere todos os textos já normalizados
+        cursor = conexao.execute(f"SELECT id FROM produtos WHERE instr({coluna}, ?) > 0 ORDER BY id", (consulta,))
+    return [linha[0] for linha in cursor]
+
+def candidatos_aproximados(conexao, campo, trigramas):
+    """
+    Pares (id, texto normalizado) dos candidatos da busca aproximada: os mesmos que o índice em memória escolhe
+    (indice_busca.contar_candidatos), olhando só os produtos com algum trigrama da consulta
+    """
+    if campo not in COLUNAS_BUSCA:
+        raise ValueError(f"Campo de busca inválido: {campo}")
+    coluna = COLUNAS_BUSCA[campo]
+    if busca_por_trigramas:
+        # Cada trigrama entre aspas (um termo só, mesmo com espaços ou aspas), ligados por OR
+        termos = ' OR '.join('"' + trigrama.replace('"', '""') + '"' for trigrama in trigramas)
+        linhas = conexao.execute(
+            f"SELECT produtos.id, produtos.{coluna} FROM produtos_busca JOIN produtos ON produtos.id = produtos_busca.rowid "
+            f"WHERE produtos_busca.{coluna} MATCH ?", (termos,))
+    else:
+        linhas = conexao.execute(f"SELECT id, {coluna} FROM produtos")
+    return [(id_produto, texto) for _, id_produto, texto in indice_busca.contar_candidatos(trigramas, linhas)]
+
+def chaves_naturais(conexao):
+    """(nome, categoria) normalizados -> ID, direto das colunas de busca"""
+    return {(nome, categoria): id_produto for id_produto, nome, categoria in
+            conexao.execute("SELECT id, nome_busca, categoria_busca FROM produtos")}
+
+def listar_ids_baixo_estoque(conexao):
+    """IDs abaixo do mínimo, do maior para o menor déficit (usa o índice parcial)"""
+    cursor = conexao.execute(
+        "SELECT id FROM produtos WHERE quantidade < estoque_minimo "
+        "ORDER BY estoque_minimo - quantidade DESC, id")
+    return [linha[0] for linha in cursor]
+
+def produto_abaixo_do_minimo(conexao, id_produto):
+    """Retorna True se o produto está abaixo do estoque mínimo"""
+    return conexao.execute(
+        "SELECT 1 FROM produtos WHERE id = ? AND quantidade < estoque_minimo", (id_produto,)).fetchone() is not None
+
+def obter_totais(conexao):
+    """Totais gerais no mesmo formato de agregados_estoque.obter_totais()"""
+    linha = conexao.execute(
+        "SELECT soma_decimal(quantidade, preco), COALESCE(SUM(quantidade), 0), COUNT(*) FROM produtos").fetchone()
+    return {'valor_total': Decimal(linha[0]), 'quantidade_itens': linha[1], 'quantidade_produtos': linha[2]}
+
+# --- Dicionário "preguiçoso" sobre a tabela ---
+
+class ProdutosSQLite(MutableMapping):
+    """
+    Se comporta como o dicionário 'produtos' (produtos.get(1), produtos[1], del produtos[1], produtos.values()),
+    mas só lê do banco as linhas que forem usadas.
+    Os últimos TAMANHO_CACHE produtos lidos ficam em cache (consultas repetidas não voltam ao banco).
+    Alterar um produto lido (ex.: produto['quantidade'] -= 1) não grava nada: quem altera chama
+    salvar_produto() com o mesmo objeto (no serviço, registrar_alteracao). As leituras de values()
+    não entram no cache: percorrer a tabela não a traz inteira para a memória.
+    """
+    def __init__(self, conexao):
+        self.conexao = conexao
+        self.cache = OrderedDict()
+
+    def guardar_no_cache(self, id_produto, produto_dict):
+        self.cache[id_produto] = produto_dict
+        if len(self.cache) > TAMANHO_CACHE:
+            self.cache.popitem(last=False) # O usado há mais tempo
+
+    def __getitem__(self, id_produto):
+        produto_dict = self.cache.get(id_produto)
+        if produto_dict is not None:
+            self.cache.move_to_end(id_produto)
+            return produto_dict
+        produto_dict = buscar_produto_por_id(self.conexao, id_produto)
+        if produto_dict is None:
+            raise KeyError(id_produto)
+        self.guardar_no_cache(id_produto, produto_dict)
+        return produto_dict
+
+    def __setitem__(self, id_produto, produto_dict):
+        salvar_produto(self.conexao, produto_dict)
+        self.guardar_no_cache(id_produto, produto_dict)
+
+    def __delitem__(self, id_produto):
+        self.cache.pop(id_produto, None)
+        if not remover_produto(self.conexao, id_produto):
+            raise KeyError(id_produto)
+
+    def __iter__(self):
+        for linha in self.conexao.execute("SELECT id FROM produtos ORDER BY id"):
+            yield linha[0]
+
+    def __len__(self):
+        return self.conexao.execute("SELECT COUNT(*) FROM produtos").fetchone()[0]
+
+    def __contains__(self, id_produto):
+        if id_produto in self.cache:
+            return True
+        return self.conexao.execute("SELECT 1 FROM produtos WHERE id = ?", (id_produto,)).fetchone() is not None
+
+    def values(self):
+        """Percorre os produtos em ordem de ID lendo a tabela em sequência (uma consulta só)"""
+        for linha in self.conexao.execute("SELECT * FROM produtos ORDER BY id"):
+            # Se o produto já está em cache, usa o objeto do cache (pode ter alterações ainda não gravadas)
+            yield self.cache.get(linha['id']) or linha_para_dict(linha)
+
+    def items(self):
+        for produto_dict in self.values():
+            yield produto_dict['id'], produto_dict
+
+# --- Migração ---
+
+def importar_json(conexao, caminho_json, caminho_journal=None):
+    """
+    Importa o produtos.json (e o journal de alterações, se informado) para o banco,
+    em uma única transação. Retorna o número de produtos no banco ao final.
+    """
+    with open(caminho_json, 'r', encoding='utf-8') as arquivo:
+        produtos_carregados = json.load(arquivo)
+    with conexao: # Transação: ou importa tudo, ou nada
+        conexao.executemany(SALVAR,
+                            (valores_da_linha(produto_dict) for produto_dict in produtos_carregados.values()))
+
+        caminhos_journal = []
+        if caminho_journal is not None:
+            caminhos_journal = [caminho_journal + '.compactando', caminho_journal]
+        for caminho in caminhos_journal:
+            if not os.path.exists(caminho):
+                continue
+            with open(caminho, 'r', encoding='utf-8') as arquivo:
+                for linha in arquivo:
+                    try:
+                        registro = json.loads(linha)
+                    except json.JSONDecodeError:
+                        break # Linha incompleta no fim do journal
+                    # Um registro 'lote' contém as alterações de um salvamento inteiro
+                    for item in registro['registros'] if registro['op'] == 'lote' else [registro]:
+                        if item['op'] == 'upsert':
+                            salvar_produto(conexao, item['produto'])
+                        elif item['op'] == 'remover':
+                            remover_produto(conexao, item['id'])
+    return len(ProdutosSQLite(conexao))
+
+def importar_produtos(conexao, produtos, proximo_id):
+    """
+    Importa um catálogo já carregado (dicionário ID -> produto) e o próximo ID livre para o banco,
+    em uma única transação. Retorna o número de produtos no banco ao final.
+    """
+    with conexao: # Transação: ou importa tudo, ou nada
+        salvar_produtos(conexao, produtos.values())
+        gravar_proximo_id(conexao, proximo_id)
+    return len(ProdutosSQLite(conexao))
+
+def main():
+    """Linha de comando: python armazenamento_sqlite.py migrar [produtos.json] [produtos.db]"""
+    argumentos = sys.argv[1:]
+    if not argumentos or argumentos[0] != 'migrar':
+        print(__doc__)
+        return
+    caminho_json = argumentos[1] if len(argumentos) > 1 else 'produtos.json'
+    caminho_banco = argumentos[2] if len(argumentos) > 2 else 'produtos.db'
+
+    conexao = abrir_banco(caminho_banco)
+    try:
+        import servico_estoque as servico # Lê o catálogo atual (snapshot + journal) como o sistema faz
+        base = os.path.splitext(caminho_json)[0]
+        servico.ARQUIVO_DADOS = caminho_json
+        servico.ARQUIVO_JOURNAL = base + '.journal'
+        servico.ARQUIVO_META = base + '.meta.json'
+        servico.ARQUIVO_BINARIO = base + '.bin'
+        if not servico.carregar_produtos_dos_arquivos():
+            raise FileNotFoundError(f"Nenhum catálogo encontrado em '{caminho_json}' (nem .bin ou .journal).")
+        total = importar_produtos(conexao, servico.produtos, servico.proximo_id_disponivel)
+        print(f"Migração concluída: {total} produtos em '{caminho_banco}'.")
+    except Exception as e:
+        print(f"Erro na migração: {str(e)}")
+    finally:
+        conexao.close()
+
+if __name__ == "__main__":
+    main()
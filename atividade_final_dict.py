@@ -11,54 +11,64 @@ Este sistema permite:
 IMPORTANTE: O princípio de clareza do Python ("Explicit is better than implicit") - de Guido van Rossum.
 """
 
-# Importa biblioteca para manipulação de arquivos JSON
-import json 
+import sys
 
-# Funções para persistência
+# Camada de serviço: estado do sistema, persistência e operações sem input()/print().
+# As funções deste arquivo só cuidam da conversa com o usuário e chamam o serviço.
+import servico_estoque as servico
+import relatorios # Formatação dos relatórios em páginas e em blocos (ver mostrar_em_paginas)
+
+TAMANHO_PAGINA = 50 # Linhas por página nos relatórios do menu
+
+# Funções para persistência (mostram o resultado para o usuário)
 def salvar_dados():
-    """Salva os dados do dicionário em arquivo JSON"""
+    """
+    Pede o salvamento dos dados (arquivo JSON, journal ou banco, conforme servico.MODO_PERSISTENCIA).
+    A gravação é agrupada em segundo plano (servico.INTERVALO_AGRUPAMENTO); descarregar_dados() grava o restante ao sair.
+    """
     try:
-        with open('produtos.json', 'w', encoding='utf-8') as arquivo:
-            json.dump(produtos, arquivo, indent=4, ensure_ascii=False)
+        servico.agendar_salvamento()
         print("\nDados salvos com sucesso!")
     except Exception as e:
         print(f"\nErro ao salvar dados: {str(e)}")
 
-def carregar_dados():
-    """Carrega os dados do arquivo JSON para o dicionário"""
-    global produtos, proximo_id_disponivel
+def descarregar_dados():
+    """Grava imediatamente tudo o que ainda não foi salvo (usado ao sair)"""
     try:
-        with open('produtos.json', 'r', encoding='utf-8') as arquivo:
-            produtos_carregados = json.load(arquivo) # 1. Carrega do JSON
-            # Converte as chaves do dicionário de string para inteiro
-            produtos = {int(k): v for k, v in produtos_carregados.items()} # Dictionary comprehension -> converte tipos
-            # é equivalente a (sem list comprehension):
-            '''
-            novo_dicionario = {}
-            for chave, valor in produtos_carregados.items():
-                novo_dicionario[int(chave)] = valor
-            '''
-        # Atualiza o próximo ID disponível
-        proximo_id_disponivel = max(produtos.keys(), default=0) + 1
+        servico.descarregar_salvamentos()
+    except Exception as e:
+        print(f"\nErro ao salvar dados: {str(e)}")
+
+def mostrar_resultado_carga(arquivo_encontrado, erro=None):
+    """Mensagem ao terminar de carregar os dados"""
+    if erro is not None:
+        print(f"\nErro ao carregar dados: {str(erro)}")
+    elif arquivo_encontrado:
         print("\nDados carregados com sucesso!")
-    except FileNotFoundError:
-        produtos = {}
-        proximo_id_disponivel = 1
+    else:
         print("\nNenhum arquivo de dados encontrado. Iniciando com dicionário vazio.")
+
+def carregar_dados():
+    """Carrega os dados salvos para o dicionário de produtos"""
+    try:
+        # Com servico.CARREGAMENTO_EM_SEGUNDO_PLANO = True o menu aparece na hora
+        # e a mensagem é mostrada quando a carga terminar
+        arquivo_encontrado = servico.carregar_dados(ao_concluir=mostrar_resultado_carga)
+        if arquivo_encontrado is None:
+            print("\nCarregando dados em segundo plano...")
+        else:
+            mostrar_resultado_carga(arquivo_encontrado)
+    except servico.CatalogoNaoDividido as e:
+        mostrar_resultado_carga(False, e)
+        sys.exit(1) # Começar vazio esconderia o catálogo que ainda não foi dividido
     except Exception as e:
-        print(f"\nErro ao carregar dados: {str(e)}")
+        mostrar_resultado_carga(False, e)
 
-# Estrutura principal: dicionário de produtos
+# Estrutura principal: dicionário de produtos (servico.produtos)
 # - Chave externa: ID do produto (inteiro)
 # - Valor: dicionário com dados do produto
-# Exemplo de acesso: produtos.get(1) retorna o produto com ID 1
-produtos = {}
-
-# Inicialização do contador de IDs
-if not produtos: 
-    proximo_id_disponivel = 1  # Começa do 1 se dicionário estiver vazio
-else: 
-    proximo_id_disponivel = max(produtos.keys()) + 1  # Próximo ID após o maior existente
+# Exemplo de acesso: servico.produtos.get(1) retorna o produto com ID 1
+# Importante: use sempre "servico.produtos" (carregar_dados() troca o dicionário inteiro)
 
 
 # Funções para manipulação dos "produtos"
@@ -74,17 +84,16 @@ def exibir_menu():
     print("7. Gerar relatório de estoque")
     print("8. Gerar relatório de produtos com baixo estoque")
     print("9. Listar todos os produtos")
+    print("10. Importar movimentações em lote (CSV/JSONL)")
+    print("11. Importar catálogo de fornecedor (CSV/JSONL)")
+    print("12. Planejamento de reposição (consumo e quantidade a pedir)")
     print("0. Sair")
     return input("Escolha uma opção: ")
 
 def cadastrar_produto():
     """Cadastra um novo produto no sistema"""
-    global proximo_id_disponivel # Indicar que vamos modificar a variável global
-
     print("\n==== CADASTRAR NOVO PRODUTO ====")
     
-    novo_id = proximo_id_disponivel # Usa o ID global (externo) para o novo ID (interno) do produto a ser cadastrado
-    
     nome = input("Nome do produto: ")
     categoria = input("Categoria: ")
     
@@ -121,22 +130,20 @@ def cadastrar_produto():
         except ValueError:
             print("Por favor, digite um número válido.")
     
-    # Cria um dicionário para o novo produto
-    novo_produto_dados = {
-        'id': novo_id, # Armazena o mesmo ID também dentro do dicionário do produto, ou seja, internamente
-        'nome': nome,
-        'categoria': categoria,
-        'quantidade': quantidade,
-        'preco': preco,
-        'estoque_minimo': estoque_minimo
-    }
-    
-    # Adiciona ao dicionário principal usando o ID (novo_id) como chave externa
-    produtos[novo_id] = novo_produto_dados 
-    # Incrementa o ID global para o próximo produto
-    proximo_id_disponivel += 1
+    # Estoque particionado por depósito: o produto fica no depósito escolhido
+    deposito = None
+    if servico.MODO_PERSISTENCIA == 'particionado' and servico.produtos.criterio == 'deposito':
+        while True:
+            deposito = input(f"Depósito ({', '.join(servico.produtos.nomes)}): ").strip()
+            if deposito in servico.produtos.nomes:
+                break
+            print("Depósito desconhecido.")
+
+    # O serviço cria o dicionário do produto com o próximo ID disponível,
+    # adiciona ao dicionário principal e anota para o próximo salvamento
+    novo_produto_dados = servico.cadastrar_produto(nome, categoria, quantidade, preco, estoque_minimo, deposito)
 
-    print(f"\nProduto '{nome}' cadastrado com sucesso! ID: {novo_id}")
+    print(f"\nProduto '{nome}' cadastrado com sucesso! ID: {novo_produto_dados['id']}")
 
 # --- FUNÇÃO AUXILIAR ---
 def buscar_produto_por_id(id_produto_procurado):
@@ -144,10 +151,10 @@ def buscar_produto_por_id(id_produto_procurado):
     [AUXILIAR] Busca um produto pelo ID e retorna o dicionário do produto ou None.
     Esta função é chamada por outras funções para localizar um produto específico.
     """
-    # O método .get() do dicionário é ideal aqui, pois:
+    # O serviço usa o método .get() do dicionário, que é ideal aqui, pois:
     # retorna o valor para a chave se ela existir, caso contrário retorna None (ou um valor padrão se especificado);
     # isso evita um KeyError se o ID não for encontrado.
-    return produtos.get(id_produto_procurado)
+    return servico.buscar_produto_por_id(id_produto_procurado)
 
 def remover_produto():
     """Remove um produto do sistema"""
@@ -165,7 +172,7 @@ def remover_produto():
         confirmacao = input(f"Tem certeza que deseja remover '{nome_produto}' (ID: {produto_id_remover})? (s/n): ")
         
         if confirmacao.lower() == 's':
-            del produtos[produto_id_remover] # Remove o item do dicionário usando sua chave (ID)
+            servico.remover_produto(produto_id_remover) # Remove o item do dicionário usando sua chave (ID)
             print(f"Produto '{nome_produto}' removido com sucesso!")
         else:
             print("Operação cancelada.")
@@ -254,14 +261,11 @@ def editar_produto():
             except ValueError:
                 print("Por favor, digite um número válido.")
         
-        # Atualiza o dicionário do produto.
+        # Atualiza o dicionário do produto (nome/categoria vazios mantêm o valor atual).
         # Como 'produto_original' é uma referência ao dicionário dentro de 'produtos',
-        # modificar 'produto_original' modifica o item em 'produtos'.
-        produto_original['nome'] = nome_novo if nome_novo else produto_original['nome']
-        produto_original['categoria'] = categoria_nova if categoria_nova else produto_original['categoria']
-        produto_original['quantidade'] = quantidade_nova
-        produto_original['preco'] = preco_novo
-        produto_original['estoque_minimo'] = estoque_minimo_novo
+        # a alteração feita pelo serviço aparece em 'produto_original'.
+        servico.editar_produto(produto_id_editar, nome=nome_novo, categoria=categoria_nova,
+                               quantidade=quantidade_nova, preco=preco_novo, estoque_minimo=estoque_minimo_novo)
         
         print(f"\nProduto ID {produto_id_editar} editado com sucesso!")
     else:
@@ -292,7 +296,7 @@ def registrar_entrada():
             except ValueError: # Se input não for número
                 print("Por favor, digite um número válido.")
         
-        produto_encontrado['quantidade'] += quantidade_adicionar # Modifica diretamente
+        servico.registrar_entrada(produto_id_entrada, quantidade_adicionar) # Modifica o próprio dicionário do produto
         nova_quantidade = produto_encontrado['quantidade']
         
         print(f"\nEntrada registrada com sucesso!")
@@ -328,7 +332,7 @@ def registrar_saida():
             except ValueError:
                 print("Por favor, digite um número válido.")
         
-        produto_encontrado['quantidade'] -= quantidade_retirar # Modifica diretamente
+        servico.registrar_saida(produto_id_saida, quantidade_retirar) # Modifica o próprio dicionário do produto
         nova_quantidade = produto_encontrado['quantidade']
         
         print(f"\nSaída registrada com sucesso!")
@@ -336,12 +340,85 @@ def registrar_saida():
         
         # Verificar se está abaixo do estoque mínimo e emitir alerta
         # se a nova quantidade for menor que o estoque mínimo.
-        if nova_quantidade < produto_encontrado['estoque_minimo']:
+        # (o serviço já atualizou o conjunto de produtos abaixo do mínimo ou o banco)
+        if servico.produto_abaixo_do_minimo(produto_id_saida):
             print(f"\nALERTA: O produto '{produto_encontrado['nome']}' está abaixo do estoque mínimo!")
             print(f"Estoque atual: {nova_quantidade}, Mínimo recomendado: {produto_encontrado['estoque_minimo']}")
+        
+        # Com o consumo médio das saídas, avisa também antes de chegar ao mínimo (ver planejamento_reposicao.py);
+        # sem aviso enquanto o planejamento não foi montado (ele não é montado aqui, no meio da saída)
+        plano = servico.previsao_reposicao(produto_id_saida, somente_montado=True)
+        if plano is not None and plano['quantidade_sugerida'] > 0:
+            print(f"\nREPOSIÇÃO: peça {plano['quantidade_sugerida']} unidade(s) de '{produto_encontrado['nome']}'.")
+            if plano['dias_cobertura'] is not None:
+                print(f"No consumo atual ({plano['consumo_diario']:.1f} por dia), o estoque dura cerca de "
+                      f"{plano['dias_cobertura']:.1f} dias.")
     else:
         print(f"Produto com ID {produto_id_saida} não encontrado.")
 
+def importar_movimentacoes_lote():
+    """Importa entradas e saídas de um arquivo CSV ou JSONL"""
+    print("\n==== IMPORTAR MOVIMENTAÇÕES EM LOTE ====")
+    print("Formato: CSV com cabeçalho 'id,delta' ou JSONL com {\"id\": 1, \"delta\": -3}")
+    print("(delta positivo = entrada, negativo = saída)")
+    caminho = input("Caminho do arquivo: ").strip()
+    atomico = input("Cancelar o lote inteiro se alguma linha for inválida? (s/n): ").lower() == 's'
+    
+    try:
+        resumo = servico.aplicar_movimentacoes_lote(caminho, atomico)
+    except FileNotFoundError:
+        print(f"Arquivo '{caminho}' não encontrado.")
+        return
+    except ValueError as e:
+        print(f"Arquivo inválido: {str(e)}")
+        return
+    
+    print(f"\nLinhas lidas: {resumo['linhas']}")
+    print(f"Movimentações aplicadas: {resumo['aplicadas']}")
+    print(f"Linhas rejeitadas: {len(resumo['rejeitadas'])}")
+    if resumo['rejeitadas'] and atomico:
+        print("Lote cancelado: nenhuma movimentação foi aplicada.")
+    for numero_linha, motivo in resumo['rejeitadas'][:20]: # Mostra só as primeiras para não inundar a tela
+        print(f"  Linha {numero_linha}: {motivo}")
+    if len(resumo['rejeitadas']) > 20:
+        print(f"  ... e mais {len(resumo['rejeitadas']) - 20} linhas rejeitadas.")
+    
+    # Mesmo alerta de registrar_saida(), para cada produto que ficou abaixo do mínimo
+    for id_produto in resumo['alertas']:
+        produto_dict = servico.produtos[id_produto]
+        print(f"\nALERTA: O produto '{produto_dict['nome']}' está abaixo do estoque mínimo!")
+        print(f"Estoque atual: {produto_dict['quantidade']}, Mínimo recomendado: {produto_dict['estoque_minimo']}")
+
+def importar_catalogo():
+    """Cadastra ou atualiza vários produtos de uma vez a partir do catálogo de um fornecedor"""
+    print("\n==== IMPORTAR CATÁLOGO DE FORNECEDOR ====")
+    print("Formato: CSV com cabeçalho 'nome,categoria,quantidade,preco,estoque_minimo' ou JSONL com as mesmas chaves")
+    print("(produto com o mesmo nome e categoria é atualizado; os demais são cadastrados)")
+    caminho = input("Caminho do arquivo: ").strip()
+    atomico = input("Cancelar a importação se alguma linha for inválida? (s/n): ").lower() == 's'
+    
+    try:
+        resumo = servico.importar_catalogo(caminho, atomico)
+    except FileNotFoundError:
+        print(f"Arquivo '{caminho}' não encontrado.")
+        return
+    except ValueError as e:
+        print(f"Arquivo inválido: {str(e)}")
+        return
+    
+    print(f"\nLinhas lidas: {resumo['linhas']} ({resumo['linhas_por_segundo']:,.0f} linhas/s)")
+    print(f"Produtos cadastrados: {resumo['cadastrados']}")
+    print(f"Produtos atualizados: {resumo['atualizados']} (sem mudança: {resumo['inalterados']})")
+    if resumo['repetidas']:
+        print(f"Linhas repetidas (vale a última com o mesmo nome e categoria): {resumo['repetidas']}")
+    print(f"Linhas rejeitadas: {len(resumo['rejeitadas'])}")
+    if resumo['rejeitadas'] and atomico:
+        print("Importação cancelada: nenhum produto foi alterado.")
+    for numero_linha, motivo in resumo['rejeitadas'][:20]: # Mostra só as primeiras para não inundar a tela
+        print(f"  Linha {numero_linha}: {motivo}")
+    if len(resumo['rejeitadas']) > 20:
+        print(f"  ... e mais {len(resumo['rejeitadas']) - 20} linhas rejeitadas.")
+
 def consultar_produto():
     """Consulta detalhes de um produto por ID, nome ou categoria"""
     print("\n==== CONSULTAR PRODUTO ====")
@@ -363,11 +440,12 @@ def consultar_produto():
             print("ID inválido. Digite um número.")
     
     elif opcao == '2':
-        nome_consultar = input("Digite o nome do produto (ou parte dele): ").lower()
-        # Itera sobre os VALORES do dicionário 'produtos' (que são os dicionários de cada produto)
-        # Usando list comprehension para filtrar produtos
-        encontrados = [item for item in produtos.values() if nome_consultar in item['nome'].lower()] 
-        ''' Forma Tradicional (sem list comprehension)
+        nome_consultar = input("Digite o nome do produto (ou parte dele): ")
+        # Usa o índice de trigramas para achar só os produtos candidatos,
+        # em vez de testar o nome de todos os produtos a cada consulta.
+        # Maiúsculas e acentos não fazem diferença: "cafe" encontra "Café"
+        encontrados = servico.buscar_por_nome(nome_consultar)
+        ''' Forma Tradicional (busca linear, sem índice) - retorna o mesmo resultado
         
         encontrados = [] # Cria lista vazia
         for item in produtos.values(): # Itera sobre valores do dicionário
@@ -390,10 +468,11 @@ def consultar_produto():
                 print("-" * 40) # Separador visual
         else:
             print(f"Nenhum produto com o nome contendo '{nome_consultar}' foi encontrado.")
+            exibir_sugestoes('nome', nome_consultar)
     
     elif opcao == '3':
-        categoria_consultar = input("Digite a categoria: ").lower()
-        encontrados = [item for item in produtos.values() if categoria_consultar in item['categoria'].lower()]
+        categoria_consultar = input("Digite a categoria: ")
+        encontrados = servico.buscar_por_categoria(categoria_consultar)
         
         if encontrados:
             print(f"\nForam encontrados {len(encontrados)} produtos na categoria '{categoria_consultar}':")
@@ -402,11 +481,23 @@ def consultar_produto():
                 print("-" * 40) # Separador visual
         else:
             print(f"Nenhum produto na categoria '{categoria_consultar}' foi encontrado.")
+            exibir_sugestoes('categoria', categoria_consultar)
     
     else:
         print("Opção inválida.")
 
 # --- FUNÇÃO AUXILIAR ---
+def exibir_sugestoes(campo, texto):
+    """
+    [AUXILIAR] Busca aproximada depois de uma busca sem resultados: mostra os produtos
+    com nome (ou categoria) mais parecido, para o caso de erro de digitação.
+    """
+    sugestoes = servico.buscar_aproximado(campo, texto, limite=5)
+    if sugestoes:
+        print("Você quis dizer:")
+        for produto_dict, semelhanca in sugestoes:
+            print(f"  ID {produto_dict['id']}: {produto_dict['nome']} ({produto_dict['categoria']}) - {semelhanca:.0%} parecido")
+
 def exibir_detalhes_produto(produto_dict):
     """
     [AUXILIAR] Exibe detalhes formatados de um produto (recebe o dicionário do produto).
@@ -432,27 +523,46 @@ def gerar_relatorio_estoque():
     """Gera um relatório de todos os produtos em estoque"""
     print("\n==== RELATÓRIO DE ESTOQUE ====")
     
-    if not produtos: # Verifica se o dicionário está vazio
+    ordem = input("Ordenar por (id, nome, categoria, quantidade, preco ou valor; Enter = id): ").strip().lower() or None
+    if ordem is not None and ordem not in relatorios.COLUNAS['estoque']:
+        print("Ordenação inválida; usando a ordem por ID.")
+        ordem = None
+    decrescente = ordem is not None and input("Do maior para o menor? (s/n): ").lower() == 's'
+    
+    # O valor de cada item (quantidade × preço) é calculado na montagem de cada linha da página
+    if mostrar_em_paginas('estoque', ordem, decrescente) == 0:
         print("Não há produtos cadastrados no sistema.")
         return
     
-    valor_total_geral = 0
-    print(f"{'ID':<5} {'Nome':<25} {'Categoria':<15} {'Qtd':<8} {'Preço':<12} {'Total':<12}")
-    print("-" * 80)
-    
-    # Itera sobre os VALORES de cada produto no dicionário, 
-    # calcula valor total por item (quantidade × preço),
-    # e acumula no total geral
-    for produto_dict in produtos.values():
-        valor_item_total = produto_dict['quantidade'] * produto_dict['preco']
-        valor_total_geral += valor_item_total
-        # Exibe um cabeçalho formatado
-        print(f"{produto_dict['id']:<5} {produto_dict['nome'][:25]:<25} {produto_dict['categoria'][:15]:<15} "
-              f"{produto_dict['quantidade']:<8} R$ {produto_dict['preco']:<8.2f} R$ {valor_item_total:<8.2f}")
-    
     print("-" * 80)
-    print(f"Valor total em estoque: R$ {valor_total_geral:.2f}")
-    print(f"Total de {len(produtos)} produtos cadastrados.") # len() em um dicionário retorna o número de chaves
+    # O total geral vem dos acumulados (atualizados a cada alteração), não de uma nova soma
+    totais = servico.obter_totais()
+    print(f"Valor total em estoque: R$ {totais['valor_total']:.2f}")
+    print(f"Total de {totais['quantidade_produtos']} produtos cadastrados.")
+
+# --- FUNÇÃO AUXILIAR ---
+def mostrar_em_paginas(relatorio, ordem=None, decrescente=False):
+    """
+    [AUXILIAR] Mostra um relatório de TAMANHO_PAGINA em TAMANHO_PAGINA linhas (ver relatorios.py).
+    Cada página é escrita de uma vez; entre as páginas o usuário escolhe continuar ou parar,
+    em vez de a tela ser inundada pelo catálogo inteiro. Retorna a quantidade de linhas mostradas.
+    """
+    cursor = None
+    numero_pagina = 1
+    mostradas = 0
+    while True:
+        # O cursor aponta para depois da última linha mostrada: cadastros e remoções feitos
+        # enquanto o usuário lê não repetem nem pulam produtos na página seguinte
+        linhas, cursor = servico.pagina_relatorio(relatorio, ordem, decrescente, TAMANHO_PAGINA, cursor)
+        if not linhas:
+            return mostradas
+        mostradas += relatorios.escrever(relatorio, linhas, sys.stdout, 'texto')
+        if cursor is None:
+            return mostradas
+        resposta = input(f"-- Página {numero_pagina} ({mostradas} linhas). Enter para continuar, 'q' para parar: ")
+        if resposta.strip().lower() == 'q':
+            return mostradas
+        numero_pagina += 1
 
 """
 GUIA DE FORMATAÇÃO DE STRINGS NO PYTHON
@@ -485,46 +595,53 @@ def gerar_relatorio_baixo_estoque():
     """Gera um relatório de produtos com estoque abaixo do mínimo"""
     print("\n==== RELATÓRIO DE PRODUTOS COM BAIXO ESTOQUE ====")
     
-    # List comprehension para filtrar produtos com baixo estoque, iterando sobre os valores
-    produtos_baixo_estoque = [item for item in produtos.values() if item['quantidade'] < item['estoque_minimo']]
+    # Usa o conjunto mantido a cada alteração, do maior para o menor déficit,
+    # em vez de percorrer todo o catálogo testando quantidade < estoque_minimo
+    quantidade = mostrar_em_paginas('baixo-estoque')
     
-    if not produtos_baixo_estoque:
+    if quantidade == 0:
         print("Não há produtos com estoque abaixo do mínimo.")
         return
     
-    # Exibe cabeçalho formatado
-    print(f"{'ID':<5} {'Nome':<25} {'Atual':<8} {'Mínimo':<8} {'Necessário':<10}")
     print("-" * 65)
+    # O total vem do conjunto inteiro, mesmo que o usuário tenha parado antes da última página
+    quantidade = len(servico.listar_ids_baixo_estoque())
+    print(f"Total de {quantidade} produto{'s' if quantidade > 1 else ''} abaixo do estoque mínimo.")
+
+def planejar_reposicao():
+    """Mostra os produtos que precisam de pedido, dos que acabam antes para os que acabam depois"""
+    print("\n==== PLANEJAMENTO DE REPOSIÇÃO ====")
+    print("(consumo diário estimado pelas saídas registradas; pedido cobre o prazo de entrega e o próximo ciclo)")
     
-    # Itera sobre os produtos filtrados e exibe detalhes formatados
-    for produto_dict in produtos_baixo_estoque:
-        necessario_repor = produto_dict['estoque_minimo'] - produto_dict['quantidade']
-        print(f"{produto_dict['id']:<5} {produto_dict['nome'][:25]:<25} {produto_dict['quantidade']:<8} "
-              f"{produto_dict['estoque_minimo']:<8} {necessario_repor:<10}")
+    planos = servico.planejar_reposicao()
+    if not planos:
+        print("Nenhum produto precisa de reposição agora.")
+        return
     
-    print("-" * 65)
-    quantidade = len(produtos_baixo_estoque)
-    print(f"Total de {quantidade} produto{'s' if quantidade > 1 else ''} abaixo do estoque mínimo.")
+    print(f"{'ID':<5} {'Nome':<20} {'Qtd':>6} {'Consumo/dia':>12} {'Dias':>7} {'Pedir':>7}")
+    print("-" * 62)
+    for produto_dict, plano in planos[:20]: # Os mais urgentes; o total vem logo abaixo
+        dias = '-' if plano['dias_cobertura'] is None else f"{plano['dias_cobertura']:.1f}"
+        print(f"{produto_dict['id']:<5} {produto_dict['nome'][:20]:<20} {produto_dict['quantidade']:>6} "
+              f"{plano['consumo_diario']:>12.2f} {dias:>7} {plano['quantidade_sugerida']:>7}")
+    print("-" * 62)
+    if len(planos) > 20:
+        print(f"... e mais {len(planos) - 20} produtos.")
+    print(f"Total de {len(planos)} produto{'s' if len(planos) > 1 else ''} a pedir "
+          f"({sum(plano['quantidade_sugerida'] for _, plano in planos)} unidades).")
 
 def listar_todos_produtos():
     """Lista todos os produtos cadastrados de forma resumida"""
     print("\n==== LISTA DE PRODUTOS ====")
     
-    if not produtos:
+    if mostrar_em_paginas('produtos') == 0:
         print("Não há produtos cadastrados no sistema.")
-        return
-    
-    # Exibe cabeçalho formatado com as chaves do dicionário de produtos
-    print(f"{'ID':<5} {'Nome':<30} {'Categoria':<15} {'Quantidade':<10}")
-    print("-" * 65)
-    
-    # Itera sobre os VALORES do dicionário 'produtos'
-    for produto_dict in produtos.values():
-        print(f"{produto_dict['id']:<5} {produto_dict['nome'][:30]:<30} {produto_dict['categoria'][:15]:<15} {produto_dict['quantidade']:<10}")
 
 # Função principal
 def main():
     """Função principal que executa o programa"""
+    if servico.INSTRUMENTAR:
+        servico.ativar_instrumentacao(servico.ARQUIVO_METRICAS) # Métricas gravadas ao sair
     # Carrega os dados do arquivo JSON ao iniciar o programa
     carregar_dados()
 
@@ -554,7 +671,16 @@ def main():
             gerar_relatorio_baixo_estoque()
         elif opcao == '9':
             listar_todos_produtos()
+        elif opcao == '10':
+            importar_movimentacoes_lote()
+            salvar_dados() # Uma única gravação para o lote inteiro
+        elif opcao == '11':
+            importar_catalogo()
+            salvar_dados() # Uma única gravação para o catálogo inteiro
+        elif opcao == '12':
+            planejar_reposicao()
         elif opcao == '0':
+            descarregar_dados() # Grava as alterações que ainda estão esperando o salvamento agrupado
             print("\nObrigado por utilizar o Sistema de Gerenciamento de Estoque!")
             break # Sai do loop principal e encerra o programa
         else:
@@ -563,5 +689,11 @@ def main():
         input("\nPressione Enter para continuar...") # Pausa para o usuário ler a saída e melhorar a experiência
 
 # Iniciar o programa
+# - Sem argumentos: abre o menu interativo
+# - Com argumentos: executa um comando da linha de comando (ver cli_estoque.py)
+#   Exemplo: python atividade_final_dict.py saida --id 1 --quantidade 3
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        import cli_estoque
+        sys.exit(cli_estoque.main(sys.argv[1:]))
     main()
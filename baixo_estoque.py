@@ -0,0 +1,39 @@
+"""
+Conjunto de produtos abaixo do estoque mínimo para o Sistema de Gerenciamento de Estoque
+
+Em vez de percorrer todo o catálogo testando quantidade < estoque_minimo a cada relatório,
+guarda apenas os produtos que estão abaixo do mínimo junto com quanto falta para repor.
+Cada alteração de quantidade ou de estoque mínimo atualiza o conjunto em O(1).
+"""
+
+# Produtos abaixo do mínimo: ID -> falta (estoque_minimo - quantidade), sempre maior que zero
+produtos_abaixo_minimo = {}
+
+def atualizar_produto(produto_dict):
+    """Inclui ou retira o produto do conjunto conforme a quantidade atual"""
+    falta = produto_dict['estoque_minimo'] - produto_dict['quantidade']
+    if falta > 0: # Mesmo teste de antes: quantidade < estoque_minimo
+        produtos_abaixo_minimo[produto_dict['id']] = falta
+    else:
+        produtos_abaixo_minimo.pop(produto_dict['id'], None)
+
+def remover_produto(id_produto):
+    """Retira do conjunto um produto que foi removido do sistema"""
+    produtos_abaixo_minimo.pop(id_produto, None)
+
+def reconstruir(produtos):
+    """Monta o conjunto do zero a partir do dicionário de produtos"""
+    produtos_abaixo_minimo.clear()
+    for produto_dict in produtos.values():
+        atualizar_produto(produto_dict)
+
+def esta_abaixo_do_minimo(id_produto):
+    """Retorna True se o produto está abaixo do estoque mínimo"""
+    return id_produto in produtos_abaixo_minimo
+
+def listar_por_falta():
+    """
+    Retorna os IDs abaixo do mínimo, do que mais falta para o que menos falta
+    (empate: menor ID primeiro). O custo depende só dos produtos sinalizados, não do catálogo.
+    """
+    return sorted(produtos_abaixo_minimo, key=lambda id_produto: (-produtos_abaixo_minimo[id_produto], id_produto))
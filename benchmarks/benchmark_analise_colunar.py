@@ -0,0 +1,126 @@
+"""
+Benchmark: análises do catálogo com laços Python vs. colunas NumPy (analise_colunar.py).
+
+Para cada tamanho de catálogo mede valor total, baixo estoque (com a falta), totais por categoria
+e os 10 maiores valores nos dois caminhos, e confere que os resultados são idênticos entre si
+e aos dos relatórios atuais (agregados_estoque.py e baixo_estoque.py) - inclusive na forma do Decimal.
+1% dos preços tem três casas decimais, para exercitar o caminho à parte desses preços.
+Depois aplica alterações, cadastros e remoções aleatórios pelas funções de atualização e confere de novo.
+
+Uso:
+    python benchmarks/benchmark_analise_colunar.py [tamanhos...]   (padrão: 100000 1000000)
+"""
+
+import random
+import sys
+import time
+
+from comum import gerar_produtos
+
+import agregados_estoque
+import analise_colunar
+import baixo_estoque
+from produto import Produto
+
+REPETICOES = 3
+
+def gerar_produtos_com_precos_variados(quantidade_produtos):
+    aleatorio = random.Random(5)
+    produtos = {}
+    for produto_dict in gerar_produtos(quantidade_produtos):
+        if aleatorio.random() < 0.01:
+            produto_dict['preco'] = round(aleatorio.uniform(1, 100), 3) # Preço que não cabe em centavos
+        produtos[produto_dict['id']] = Produto.de_dict(produto_dict)
+    return produtos
+
+def melhor_tempo(funcao, *args):
+    """Menor tempo de REPETICOES execuções; retorna (resultado, segundos)"""
+    melhor = None
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        resultado = funcao(*args)
+        duracao = time.perf_counter() - inicio
+        melhor = duracao if melhor is None else min(melhor, duracao)
+    return resultado, melhor
+
+def consultas(produtos):
+    """(nome, função em Python, função com colunas, resultado dos relatórios atuais ou None)"""
+    return [
+        ('valor total', lambda: analise_colunar.valor_total_python(produtos),
+         lambda: analise_colunar.valor_total_colunar(produtos), agregados_estoque.obter_totais()['valor_total']),
+        ('baixo estoque', lambda: analise_colunar.baixo_estoque_python(produtos),
+         analise_colunar.baixo_estoque_colunar,
+         [(id_produto, baixo_estoque.produtos_abaixo_minimo[id_produto]) for id_produto in baixo_estoque.listar_por_falta()]),
+        ('totais por categoria', lambda: analise_colunar.totais_por_categoria_python(produtos),
+         lambda: analise_colunar.totais_por_categoria_colunar(produtos), agregados_estoque.obter_totais_por_categoria()),
+        ('10 maiores valores', lambda: analise_colunar.maiores_valores_python(produtos, 10),
+         lambda: analise_colunar.maiores_valores_colunar(produtos, 10), None),
+    ]
+
+def como_texto(resultado):
+    """Texto para comparar resultados: str() garante a mesma forma dos Decimal; categorias em ordem alfabética"""
+    if isinstance(resultado, dict):
+        resultado = sorted(resultado.items())
+    return str(resultado)
+
+def conferir(produtos):
+    """Compara os dois caminhos e os relatórios atuais"""
+    for nome, em_python, com_colunas, relatorio in consultas(produtos):
+        esperado = como_texto(em_python())
+        assert esperado == como_texto(com_colunas()), f"{nome}: colunas diferem do laço em Python"
+        if relatorio is not None:
+            assert esperado == como_texto(relatorio), f"{nome}: diferente do relatório atual"
+
+def alterar_aleatoriamente(produtos, quantidade_alteracoes):
+    """Alterações, cadastros e remoções, mantendo as três estruturas em dia (como o serviço faz)"""
+    aleatorio = random.Random(9)
+    proximo_id = max(produtos) + 1
+    for _ in range(quantidade_alteracoes):
+        sorteio = aleatorio.random()
+        if sorteio < 0.1:
+            produto_dict = Produto(proximo_id, f"novo {proximo_id}", 'categoria nova', aleatorio.randint(0, 50),
+                                   aleatorio.choice([9.99, 0.125, 100.0, 7]), aleatorio.randint(0, 60))
+            produtos[proximo_id] = produto_dict
+            proximo_id += 1
+        elif sorteio < 0.2:
+            id_produto = aleatorio.randint(1, proximo_id - 1)
+            if produtos.pop(id_produto, None) is not None:
+                for modulo in (agregados_estoque, baixo_estoque, analise_colunar):
+                    modulo.remover_produto(id_produto)
+            continue
+        else:
+            produto_dict = produtos.get(aleatorio.randint(1, proximo_id - 1))
+            if produto_dict is None:
+                continue
+            produto_dict['quantidade'] = aleatorio.randint(0, 500)
+            if aleatorio.random() < 0.2:
+                produto_dict['preco'] = aleatorio.choice([19.9, 0.333, 250.0, 3])
+        for modulo in (agregados_estoque, baixo_estoque, analise_colunar):
+            modulo.atualizar_produto(produto_dict)
+
+def main():
+    if analise_colunar.numpy is None:
+        print("NumPy não está instalado: só o caminho em Python está disponível (pip install numpy).")
+        return
+    tamanhos = [int(argumento) for argumento in sys.argv[1:]] or [100_000, 1_000_000]
+    print(f"{'Produtos':>10} {'Consulta':<22} {'Python (ms)':>12} {'NumPy (ms)':>11} {'Aceleração':>11}")
+    print("-" * 70)
+    for tamanho in tamanhos:
+        produtos = gerar_produtos_com_precos_variados(tamanho)
+        agregados_estoque.reconstruir(produtos)
+        baixo_estoque.reconstruir(produtos)
+        _, segundos_montagem = melhor_tempo(analise_colunar.montar, produtos)
+        conferir(produtos)
+        for nome, em_python, com_colunas, _ in consultas(produtos):
+            _, segundos_python = melhor_tempo(em_python)
+            _, segundos_colunas = melhor_tempo(com_colunas)
+            print(f"{tamanho:>10,} {nome:<22} {segundos_python * 1000:>12.1f} {segundos_colunas * 1000:>11.1f} "
+                  f"{segundos_python / segundos_colunas:>10.1f}x")
+        print(f"{tamanho:>10,} {'(montar as colunas)':<22} {'':>12} {segundos_montagem * 1000:>11.1f}   (uma vez, na 1ª análise)")
+
+        alterar_aleatoriamente(produtos, 20_000)
+        conferir(produtos)
+    print("OK: resultados idênticos aos laços em Python e aos relatórios atuais, também depois das alterações.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: armazenamento em JSON (dicionário em memória + journal) vs. SQLite.
+
+Mede, para cada modo: tempo de inicialização (carregar_dados), busca por ID,
+saída de estoque + salvamento, busca por nome e relatório de baixo estoque.
+
+Uso:
+    python benchmarks/benchmark_backends.py [quantidade_produtos] [quantidade_operacoes]
+"""
+
+import os
+import random
+import sys
+import tempfile
+
+from comum import gerar_catalogo, resumir_latencias, silenciar_saida, cronometrar, usar_pasta
+
+import servico_estoque as estoque
+import armazenamento_sqlite
+
+def preparar_arquivos(catalogo, pasta):
+    """Grava o mesmo catálogo em produtos.json e produtos.db"""
+    caminho_json = os.path.join(pasta, 'produtos.json')
+    caminho_banco = os.path.join(pasta, 'produtos.db')
+    estoque.escrever_snapshot(caminho_json, catalogo)
+    conexao = armazenamento_sqlite.abrir_banco(caminho_banco)
+    armazenamento_sqlite.importar_json(conexao, caminho_json)
+    conexao.close()
+    return caminho_json, caminho_banco
+
+def medir_modo(modo, caminho_json, caminho_banco, quantidade_operacoes, pasta):
+    estoque.MODO_PERSISTENCIA = modo
+    usar_pasta(estoque, pasta) # Mesmos caminhos de preparar_arquivos()
+    estoque.PASTA_HISTORICO = os.path.join(pasta, f'historico_{modo}')
+    estoque.alteracoes_pendentes.clear()
+    resultados = {}
+    
+    with silenciar_saida():
+        _, resultados['inicializacao_s'] = cronometrar(estoque.carregar_dados)
+        maior_id = estoque.proximo_id_disponivel - 1
+        aleatorio = random.Random(11)
+        
+        latencias_busca_id, latencias_saida = [], []
+        for _ in range(quantidade_operacoes):
+            id_produto = aleatorio.randint(1, maior_id)
+            produto, segundos = cronometrar(estoque.buscar_produto_por_id, id_produto)
+            latencias_busca_id.append(segundos)
+            
+            def saida():
+                if produto['quantidade'] > 0:
+                    produto['quantidade'] -= 1
+                    estoque.registrar_alteracao(produto)
+                    estoque.salvar_dados()
+            
+            _, segundos = cronometrar(saida)
+            latencias_saida.append(segundos)
+        
+        latencias_nome = [cronometrar(estoque.buscar_ids_por_texto, 'nome', 'teclado 1')[1] for _ in range(5)]
+        latencias_baixo = [cronometrar(estoque.listar_ids_baixo_estoque)[1] for _ in range(5)]
+        if estoque.thread_compactacao is not None:
+            estoque.thread_compactacao.join()
+        if estoque.conexao_banco is not None:
+            estoque.conexao_banco.close()
+            estoque.conexao_banco = None
+    
+    resultados['busca_id'] = resumir_latencias(latencias_busca_id)
+    resultados['saida_e_salvar'] = resumir_latencias(latencias_saida)
+    resultados['busca_nome'] = resumir_latencias(latencias_nome)
+    resultados['baixo_estoque'] = resumir_latencias(latencias_baixo)
+    return resultados
+
+def main():
+    quantidade_produtos = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    quantidade_operacoes = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    catalogo = gerar_catalogo(quantidade_produtos)
+    
+    print(f"Catálogo: {quantidade_produtos} produtos, {quantidade_operacoes} operações")
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho_json, caminho_banco = preparar_arquivos(catalogo, pasta)
+        for modo in ('journal', 'sqlite'):
+            resultados = medir_modo(modo, caminho_json, caminho_banco, quantidade_operacoes, pasta)
+            print(f"\n== {modo} ==")
+            print(f"Inicialização: {resultados['inicializacao_s']:.3f} s")
+            for nome in ('busca_id', 'saida_e_salvar', 'busca_nome', 'baixo_estoque'):
+                r = resultados[nome]
+                print(f"{nome:<16} média {r['media_ms']:>9.3f} ms   p50 {r['p50_ms']:>9.3f} ms   p99 {r['p99_ms']:>9.3f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Benchmark: busca por nome/categoria com índice de trigramas vs. busca linear.
+
+Uso:
+    python benchmarks/benchmark_busca.py [tamanho1 tamanho2 ...]   (padrão: 10000 100000 1000000)
+"""
+
+import random
+import sys
+
+from comum import gerar_catalogo, resumir_latencias, cronometrar, PALAVRAS, CATEGORIAS_PADRAO
+
+import indice_busca
+
+def busca_linear(produtos, campo, consulta):
+    """Mesma lógica da busca original de consultar_produto() (com a normalização atual: sem maiúsculas e acentos)"""
+    consulta = indice_busca.normalizar(consulta)
+    return [item['id'] for item in produtos.values() if consulta in indice_busca.normalizar(item[campo])]
+
+def main():
+    tamanhos = [int(t) for t in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    aleatorio = random.Random(3)
+    
+    print(f"{'Produtos':>10} {'Índice (s)':>11} {'Consulta':<14} {'Linear p50 (ms)':>16} {'Índice p50 (ms)':>16}")
+    print("-" * 72)
+    for tamanho in tamanhos:
+        produtos = gerar_catalogo(tamanho)
+        _, segundos_indice = cronometrar(indice_busca.reconstruir_indice, produtos)
+        
+        consultas = [
+            ('nome', 'teclado 12'),                     # seletiva
+            ('nome', aleatorio.choice(PALAVRAS)),       # palavra comum
+            ('nome', 'xyz'),                            # sem resultados
+            ('categoria', aleatorio.choice(CATEGORIAS_PADRAO)[:5]),
+        ]
+        for campo, consulta in consultas:
+            latencias_linear, latencias_indice = [], []
+            for _ in range(5):
+                esperado, segundos = cronometrar(busca_linear, produtos, campo, consulta)
+                latencias_linear.append(segundos)
+                obtido, segundos = cronometrar(indice_busca.buscar_substring, campo, consulta)
+                latencias_indice.append(segundos)
+                assert obtido == esperado, f"Resultado diferente para {campo}={consulta!r}"
+            linear = resumir_latencias(latencias_linear)
+            indexada = resumir_latencias(latencias_indice)
+            print(f"{tamanho:>10} {segundos_indice:>11.2f} {consulta[:14]:<14} "
+                  f"{linear['p50_ms']:>16.3f} {indexada['p50_ms']:>16.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: busca sem diferenciar maiúsculas e acentos (exata) e busca aproximada (erros de digitação).
+
+O catálogo sintético mistura nomes com e sem acento ("Café", "pao", "AÇÚCAR"). Para cada tamanho mostra:
+- o custo de montar o índice com as chaves normalizadas (uma vez, na carga) contra a versão só com lower();
+- busca exata: normalizar o catálogo a cada consulta (varredura) vs. chaves já normalizadas (varredura)
+  vs. índice de trigramas sobre as chaves normalizadas (os três resultados são conferidos);
+- busca aproximada com consultas com erro de digitação: latência e se a palavra certa aparece entre os 10 primeiros.
+
+Uso:
+    python benchmarks/benchmark_busca_normalizada.py [tamanho1 tamanho2 ...]   (padrão: 10000 100000 1000000)
+"""
+
+import random
+import sys
+
+from comum import CATEGORIAS_PADRAO, cronometrar, resumir_latencias
+
+import indice_busca
+
+# Palavras com acento, escritas de formas diferentes no catálogo (como acontece nos cadastros reais)
+PALAVRAS_ACENTUADAS = ['café', 'pão', 'açúcar', 'feijão', 'maçã', 'limão', 'sabão', 'óleo', 'pêssego', 'música',
+                       'câmera', 'balcão', 'colchão', 'tênis', 'relógio', 'ventilador']
+CONSULTAS_EXATAS = ['cafe', 'ACUCAR', 'pessego 1', 'Colchão', 'xyz']
+# (consulta com erro, palavra que deveria ser encontrada)
+CONSULTAS_APROXIMADAS = [('cafe pilao', 'café'), ('acucra', 'açúcar'), ('feijao preto', 'feijão'),
+                         ('relogo', 'relógio'), ('ventilardor', 'ventilador'), ('camrea', 'câmera')]
+REPETICOES = 5
+
+def gerar_catalogo_acentuado(quantidade, semente=7):
+    """Produtos com nomes acentuados, em maiúsculas, minúsculas ou sem acento"""
+    aleatorio = random.Random(semente)
+    formas = (str.lower, str.upper, str.capitalize, indice_busca.normalizar) # normalizar = sem acento
+    produtos = {}
+    for id_produto in range(1, quantidade + 1):
+        palavras = [aleatorio.choice(formas)(aleatorio.choice(PALAVRAS_ACENTUADAS)) for _ in range(2)]
+        produtos[id_produto] = {'id': id_produto, 'nome': " ".join(palavras + [str(id_produto)]),
+                                'categoria': aleatorio.choice(CATEGORIAS_PADRAO), 'quantidade': 1,
+                                'preco': 1.0, 'estoque_minimo': 0}
+    return produtos
+
+def busca_normalizando_catalogo(produtos, consulta):
+    """Sem chaves guardadas: normaliza o nome de todos os produtos a cada consulta"""
+    consulta = indice_busca.normalizar(consulta)
+    return [item['id'] for item in produtos.values() if consulta in indice_busca.normalizar(item['nome'])]
+
+def busca_chaves_guardadas(consulta):
+    """Varredura das chaves já normalizadas (guardadas no índice)"""
+    consulta = indice_busca.normalizar(consulta)
+    return [id_produto for id_produto, texto in indice_busca.textos_indexados['nome'].items() if consulta in texto]
+
+def p50(funcao, *args):
+    """(resultado, p50 em ms) de REPETICOES execuções"""
+    latencias = []
+    for _ in range(REPETICOES):
+        resultado, segundos = cronometrar(funcao, *args)
+        latencias.append(segundos)
+    return resultado, resumir_latencias(latencias)['p50_ms']
+
+def main():
+    tamanhos = [int(t) for t in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for tamanho in tamanhos:
+        produtos = gerar_catalogo_acentuado(tamanho)
+        normalizar = indice_busca.normalizar
+        indice_busca.normalizar = str.lower # Índice como era antes (só minúsculas), para comparar a carga
+        _, segundos_lower = cronometrar(indice_busca.reconstruir_indice, produtos)
+        indice_busca.normalizar = normalizar
+        _, segundos_normalizado = cronometrar(indice_busca.reconstruir_indice, produtos)
+        print(f"\n{tamanho:,} produtos - índice com lower(): {segundos_lower:.2f} s, "
+              f"com chaves normalizadas: {segundos_normalizado:.2f} s")
+
+        print(f"  {'Busca exata':<16} {'Normaliza tudo (ms)':>20} {'Chaves (ms)':>12} {'Índice (ms)':>12} {'Achados':>9}")
+        for consulta in CONSULTAS_EXATAS:
+            esperado, ms_catalogo = p50(busca_normalizando_catalogo, produtos, consulta)
+            obtido_chaves, ms_chaves = p50(busca_chaves_guardadas, consulta)
+            obtido_indice, ms_indice = p50(indice_busca.buscar_substring, 'nome', consulta)
+            assert esperado == obtido_chaves == obtido_indice, f"Resultado diferente para {consulta!r}"
+            print(f"  {consulta:<16} {ms_catalogo:>20.3f} {ms_chaves:>12.3f} {ms_indice:>12.3f} {len(esperado):>9,}")
+
+        print(f"  {'Busca aproximada':<16} {'p50 (ms)':>10} {'Resultados':>11}  Palavra certa no topo?")
+        for consulta, palavra in CONSULTAS_APROXIMADAS:
+            resultado, ms_aproximada = p50(indice_busca.buscar_aproximado, 'nome', consulta)
+            palavra = normalizar(palavra)
+            acertou = bool(resultado) and all(palavra in indice_busca.textos_indexados['nome'][id_produto].split()
+                                              for id_produto, _ in resultado)
+            print(f"  {consulta:<16} {ms_aproximada:>10.3f} {len(resultado):>11}  {'sim' if acertou else 'NÃO'}")
+
+if __name__ == "__main__":
+    main()
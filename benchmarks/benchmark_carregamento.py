@@ -0,0 +1,80 @@
+"""
+Benchmark: tempo de inicialização e pico de memória ao carregar o produtos.json.
+
+Compara, para cada tamanho de catálogo:
+- json.load:     json.load() do arquivo inteiro + conversão {int(k): Produto} + max() das chaves (forma anterior)
+- streaming:     servico_estoque.carregar_produtos_dos_arquivos() (leitura em blocos, próximo ID do produtos.meta.json)
+- segundo plano: carregar_dados(em_segundo_plano=True) - tempo até o menu poder ser mostrado
+                 e tempo até a carga completa (incluindo a montagem dos índices)
+
+Cada medição roda em um processo separado, para que o pico de memória (ru_maxrss) de uma não afete a outra.
+
+Uso:
+    python benchmarks/benchmark_carregamento.py [tamanho1 tamanho2 ...]   (padrão: 10000 100000 1000000 5000000)
+"""
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from comum import gravar_catalogo_json
+
+import servico_estoque as servico
+from produto import Produto
+
+def carregar_com_json_load():
+    with open(servico.ARQUIVO_DADOS, 'r', encoding='utf-8') as arquivo:
+        produtos_carregados = json.load(arquivo)
+        servico.produtos = {int(k): Produto.de_dict(v) for k, v in produtos_carregados.items()}
+    servico.proximo_id_disponivel = max(servico.produtos.keys(), default=0) + 1
+
+def medir(modo):
+    """Executado no processo filho (dentro da pasta do catálogo): imprime o resultado em JSON"""
+    resultado = {}
+    inicio = time.perf_counter()
+    if modo == 'json.load':
+        carregar_com_json_load()
+    elif modo == 'streaming':
+        servico.carregar_produtos_dos_arquivos()
+    else:
+        servico.carregar_dados(em_segundo_plano=True)
+        resultado['menu_ms'] = (time.perf_counter() - inicio) * 1000
+        servico.aguardar_carga()
+    resultado['segundos'] = time.perf_counter() - inicio
+    resultado['pico_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # KB no Linux
+    resultado['produtos'] = len(servico.produtos)
+    print(json.dumps(resultado))
+
+def medir_em_processo(modo, pasta):
+    saida = subprocess.run([sys.executable, os.path.abspath(__file__), '--medir', modo],
+                           cwd=pasta, capture_output=True, text=True, check=True).stdout
+    return json.loads(saida)
+
+def main():
+    tamanhos = [int(t) for t in sys.argv[1:]] or [10_000, 100_000, 1_000_000, 5_000_000]
+
+    print(f"{'Produtos':>10} {'json.load (s)':>14} {'pico (MB)':>10} {'streaming (s)':>14} {'pico (MB)':>10}"
+          f" {'2º plano: menu (ms)':>20} {'completo (s)':>13}")
+    print("-" * 98)
+    for tamanho in tamanhos:
+        with tempfile.TemporaryDirectory() as pasta:
+            gravar_catalogo_json(os.path.join(pasta, servico.ARQUIVO_DADOS), tamanho)
+            with open(os.path.join(pasta, servico.ARQUIVO_META), 'w', encoding='utf-8') as arquivo:
+                json.dump({'proximo_id': tamanho + 1}, arquivo)
+
+            antigo = medir_em_processo('json.load', pasta)
+            streaming = medir_em_processo('streaming', pasta)
+            segundo_plano = medir_em_processo('segundo-plano', pasta)
+            assert antigo['produtos'] == streaming['produtos'] == segundo_plano['produtos'] == tamanho
+            print(f"{tamanho:>10} {antigo['segundos']:>14.2f} {antigo['pico_mb']:>10.0f} {streaming['segundos']:>14.2f}"
+                  f" {streaming['pico_mb']:>10.0f} {segundo_plano['menu_ms']:>20.2f} {segundo_plano['segundos']:>13.2f}")
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ['--medir']:
+        medir(sys.argv[2])
+    else:
+        main()
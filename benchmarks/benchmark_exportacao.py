@@ -0,0 +1,158 @@
+"""
+Benchmark: relatórios com um print() por produto vs. geradores com escrita em blocos (relatorios.py).
+
+Mede linhas por segundo na exportação completa do catálogo:
+- como antes: uma f-string e um print() por produto (relatório de estoque do menu);
+- em blocos: texto, CSV e JSONL, um write() a cada relatorios.LINHAS_POR_BLOCO linhas.
+Cada um é medido gravando num arquivo comum e num terminal (pseudoterminal com buffer de linha,
+como o sys.stdout na tela: cada '\\n' de um print() vira uma escrita no terminal).
+
+Depois mede páginas de 50 linhas ordenadas por valor (primeira página e a seguinte pelo cursor)
+e confere que percorrer todas as páginas pelo cursor dá exatamente a exportação ordenada,
+inclusive com cadastros e remoções feitos entre uma página e outra.
+
+Uso:
+    python benchmarks/benchmark_exportacao.py [quantidade_produtos]   (padrão: 1000000)
+"""
+
+import contextlib
+import os
+import pty
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from comum import gerar_produtos
+
+import relatorios
+from produto import Produto
+
+LIMITE_PAGINA = 50
+REPETICOES = 3 # Cada medição fica com o menor tempo
+
+def relatorio_como_antes(lista_produtos):
+    """Laço original de gerar_relatorio_estoque(): um print() por produto"""
+    print(f"{'ID':<5} {'Nome':<25} {'Categoria':<15} {'Qtd':<8} {'Preço':<12} {'Total':<12}")
+    print("-" * 80)
+    for produto_dict in lista_produtos:
+        valor_item_total = produto_dict['quantidade'] * produto_dict['preco']
+        print(f"{produto_dict['id']:<5} {produto_dict['nome'][:25]:<25} {produto_dict['categoria'][:15]:<15} "
+              f"{produto_dict['quantidade']:<8} R$ {produto_dict['preco']:<8.2f} R$ {valor_item_total:<8.2f}")
+
+def medir_no_arquivo(caminho, exportar):
+    """Segundos para exportar num arquivo comum"""
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        comeco = time.perf_counter()
+        exportar(arquivo)
+        return time.perf_counter() - comeco
+
+def descartar_saida(descritor):
+    """Lê (e descarta) tudo o que chega no terminal, como faria a janela do terminal"""
+    try:
+        while os.read(descritor, 1 << 16):
+            pass
+    except OSError:
+        pass # O outro lado do pseudoterminal foi fechado
+
+def medir_no_terminal(exportar):
+    """Segundos para exportar num pseudoterminal, com buffer de linha (como o Python abre o stdout na tela)"""
+    mestre, escravo = pty.openpty()
+    leitor = threading.Thread(target=descartar_saida, args=(mestre,))
+    leitor.start()
+    try:
+        with open(escravo, 'w', encoding='utf-8', buffering=1) as arquivo:
+            comeco = time.perf_counter()
+            exportar(arquivo)
+            arquivo.flush()
+            return time.perf_counter() - comeco
+    finally:
+        leitor.join()
+        os.close(mestre)
+
+def exportar_como_antes(lista_produtos):
+    def exportar(arquivo):
+        with contextlib.redirect_stdout(arquivo):
+            relatorio_como_antes(lista_produtos)
+    return exportar
+
+def exportar_em_blocos(lista_produtos, formato):
+    def exportar(arquivo):
+        relatorios.escrever('estoque', relatorios.todas_as_linhas('estoque', lista_produtos), arquivo, formato)
+    return exportar
+
+def percorrer_paginas(produtos, ordem, decrescente, alterar=None):
+    """IDs de todas as páginas seguindo o cursor; 'alterar' é chamado entre uma página e outra"""
+    ids = []
+    cursor = None
+    while True:
+        linhas, cursor = relatorios.pagina('estoque', list(produtos.values()), ordem, decrescente, LIMITE_PAGINA, cursor)
+        ids.extend(linha[0] for linha in linhas)
+        if cursor is None:
+            return ids
+        if alterar is not None:
+            alterar()
+
+def conferir_cursor(quantidade_produtos):
+    """Percorrer as páginas pelo cursor = exportação ordenada, mesmo com alterações entre as páginas"""
+    produtos = {produto_dict['id']: Produto.de_dict(produto_dict) for produto_dict in gerar_produtos(quantidade_produtos, 3)}
+    for ordem, decrescente in (('valor', True), ('nome', False), ('categoria', True), ('quantidade', False), (None, False)):
+        esperado = [linha[0] for linha in relatorios.todas_as_linhas('estoque', produtos.values(), ordem or 'id', decrescente)]
+        assert percorrer_paginas(produtos, ordem, decrescente) == esperado, f"páginas diferem da exportação ({ordem})"
+
+    # Entre as páginas: cadastra produtos novos e remove outros. Os que ficaram o tempo todo
+    # precisam aparecer exatamente uma vez e na ordem certa.
+    aleatorio = random.Random(1)
+    proximo_id = max(produtos) + 1
+    removidos = set()
+    def alterar():
+        nonlocal proximo_id
+        for _ in range(5):
+            produtos[proximo_id] = Produto(proximo_id, f"novo {proximo_id}", 'games', aleatorio.randint(0, 500),
+                                           round(aleatorio.uniform(1, 5000), 2), 10)
+            proximo_id += 1
+        id_removido = aleatorio.choice(list(produtos))
+        removidos.add(id_removido)
+        del produtos[id_removido]
+    originais = set(produtos)
+    antes = [linha[0] for linha in relatorios.todas_as_linhas('estoque', produtos.values(), 'valor', True)]
+    ids = percorrer_paginas(produtos, 'valor', True, alterar)
+    assert len(ids) == len(set(ids)), "produto repetido entre as páginas"
+    permanentes = [id_produto for id_produto in antes if id_produto not in removidos]
+    # (um produto removido depois de mostrado aparece nas páginas; os comparados são os que nunca mudaram)
+    assert [id_produto for id_produto in ids if id_produto in originais and id_produto not in removidos] == permanentes, \
+        "produtos que não mudaram foram pulados ou saíram fora de ordem"
+
+def main():
+    quantidade_produtos = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    lista_produtos = [Produto.de_dict(produto_dict) for produto_dict in gerar_produtos(quantidade_produtos)]
+    print(f"Exportação do relatório de estoque: {quantidade_produtos:,} produtos")
+    print(f"{'Forma':<26} {'Arquivo (linhas/s)':>19} {'Terminal (linhas/s)':>20}")
+    print("-" * 67)
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'relatorio')
+        formas = [('print() por linha (antes)', exportar_como_antes(lista_produtos))]
+        formas += [(f"blocos, {formato}", exportar_em_blocos(lista_produtos, formato)) for formato in relatorios.FORMATOS]
+        for nome, exportar in formas:
+            segundos_arquivo = min(medir_no_arquivo(caminho, exportar) for _ in range(REPETICOES))
+            segundos_terminal = min(medir_no_terminal(exportar) for _ in range(REPETICOES))
+            print(f"{nome:<26} {quantidade_produtos / segundos_arquivo:>19,.0f} {quantidade_produtos / segundos_terminal:>20,.0f}")
+
+    for descricao, cursor_de in (('primeira página', None), ('página seguinte (cursor)', 'primeira')):
+        cursor = None
+        if cursor_de is not None:
+            _, cursor = relatorios.pagina('estoque', lista_produtos, 'valor', True, LIMITE_PAGINA)
+        comeco = time.perf_counter()
+        relatorios.pagina('estoque', lista_produtos, 'valor', True, LIMITE_PAGINA, cursor)
+        print(f"{LIMITE_PAGINA} linhas por valor (decrescente), {descricao}: {(time.perf_counter() - comeco) * 1000:,.0f} ms")
+    with open(os.devnull, 'w') as descarte:
+        comeco = time.perf_counter()
+        relatorios.escrever('estoque', relatorios.todas_as_linhas('estoque', lista_produtos, 'valor', True), descarte, 'csv')
+    print(f"Exportação completa ordenada por valor (CSV): {quantidade_produtos / (time.perf_counter() - comeco):,.0f} linhas/s")
+
+    conferir_cursor(min(quantidade_produtos, 5000))
+    print("OK: páginas pelo cursor = exportação ordenada, sem repetir nem pular produtos com alterações entre as páginas.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark: histórico de movimentações com dezenas de milhões de registros.
+
+Gera o histórico direto pelo módulo historico_movimentos (movimentos espalhados por DIAS dias,
+gravados a cada SALVAR_A_CADA movimentos, como vários salvamentos) e mede:
+- velocidade de gravação e memória máxima do processo (o segmento ativo tem no máximo LIMITE_SEGMENTO registros);
+- tempo para reabrir o histórico;
+- "movimentos do produto X nos últimos 30 dias" pelos índices vs. varrendo o histórico inteiro
+  (os dois resultados precisam ser iguais);
+- "totais por dia e categoria dos últimos 30 dias" (sem ler nenhum registro).
+
+Uso:
+    python benchmarks/benchmark_historico.py [movimentos] [quantidade_produtos] [dias]   (padrão: 50000000 100000 365)
+"""
+
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+from comum import CATEGORIAS_PADRAO, percentil
+
+import historico_movimentos
+
+SALVAR_A_CADA = 1000
+CONSULTAS = 200
+
+def memoria_maxima_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # ru_maxrss em KB no Linux
+
+def gerar_historico(total, quantidade_produtos, inicio, fim):
+    """Registra 'total' movimentos aleatórios entre os momentos inicio e fim"""
+    aleatorio = random.Random(7)
+    saldos = [100] * (quantidade_produtos + 1)
+    passo = (fim - inicio) / total
+    for numero in range(total):
+        id_produto = aleatorio.randint(1, quantidade_produtos)
+        delta = aleatorio.randint(-5, 10)
+        if delta <= 0 and saldos[id_produto] + delta < 0:
+            delta = -delta
+        saldos[id_produto] += delta
+        historico_movimentos.registrar(id_produto, delta, 'entrada' if delta >= 0 else 'saida', saldos[id_produto],
+                                       CATEGORIAS_PADRAO[id_produto % len(CATEGORIAS_PADRAO)],
+                                       momento=inicio + numero * passo)
+        if numero % SALVAR_A_CADA == SALVAR_A_CADA - 1:
+            historico_movimentos.gravar_pendentes()
+    historico_movimentos.gravar_pendentes()
+
+def varrer_produto(id_produto, inicio, fim):
+    """Consulta sem índice: lê todos os registros de todos os segmentos"""
+    resultado = []
+    # Segmentos em ordem de número; o ativo (se existir) é o mais recente
+    nomes = sorted(nome for nome in os.listdir(historico_movimentos.PASTA_HISTORICO) if nome.startswith('segmento_')
+                   and nome.endswith('.bin'))
+    if os.path.exists(historico_movimentos.caminho_ativo()):
+        nomes.append('ativo.bin')
+    for nome in nomes:
+        with open(os.path.join(historico_movimentos.PASTA_HISTORICO, nome), 'rb') as arquivo:
+            for registro in historico_movimentos.REGISTRO.iter_unpack(arquivo.read()):
+                if registro[1] == id_produto and inicio <= registro[0] <= fim:
+                    resultado.append(historico_movimentos.registro_para_dict(registro))
+    return resultado
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000_000
+    quantidade_produtos = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    dias = int(sys.argv[3]) if len(sys.argv) > 3 else 365
+    fim = time.time()
+    inicio = fim - dias * historico_movimentos.SEGUNDOS_POR_DIA
+    inicio_consulta = fim - 30 * historico_movimentos.SEGUNDOS_POR_DIA
+
+    with tempfile.TemporaryDirectory() as pasta:
+        historico_movimentos.abrir(os.path.join(pasta, 'historico'))
+        print(f"Histórico: {total:,} movimentos, {quantidade_produtos:,} produtos, {dias} dias, "
+              f"segmentos de {historico_movimentos.LIMITE_SEGMENTO:,}")
+
+        comeco = time.perf_counter()
+        gerar_historico(total, quantidade_produtos, inicio, fim)
+        duracao = time.perf_counter() - comeco
+        tamanho = sum(os.path.getsize(os.path.join(historico_movimentos.PASTA_HISTORICO, nome))
+                      for nome in os.listdir(historico_movimentos.PASTA_HISTORICO))
+        print(f"Gravação:  {duracao:8.1f} s  ({total / duracao:,.0f} movimentos/s), "
+              f"{len(historico_movimentos.segmentos)} segmentos, {tamanho / 1024 ** 2:,.0f} MB no disco")
+        print(f"Memória máxima do processo: {memoria_maxima_mb():,.0f} MB")
+
+        comeco = time.perf_counter()
+        historico_movimentos.abrir()
+        print(f"Reabrir:   {(time.perf_counter() - comeco) * 1000:8.1f} ms  "
+              f"({historico_movimentos.quantidade_movimentos():,} movimentos)")
+
+        # Movimentos de um produto nos últimos 30 dias: só os segmentos do período, busca binária no .idx
+        aleatorio = random.Random(3)
+        tempos = []
+        encontrados = 0
+        for _ in range(CONSULTAS):
+            id_produto = aleatorio.randint(1, quantidade_produtos)
+            comeco = time.perf_counter()
+            encontrados += len(historico_movimentos.movimentos_do_produto(id_produto, inicio_consulta, fim))
+            tempos.append(time.perf_counter() - comeco)
+        tempos.sort()
+        print(f"Produto X, últimos 30 dias (índices): mediana {percentil(tempos, 50) * 1000:.2f} ms, "
+              f"p99 {percentil(tempos, 99) * 1000:.2f} ms, {encontrados / CONSULTAS:.1f} movimentos por consulta")
+
+        comeco = time.perf_counter()
+        esperado = varrer_produto(id_produto, inicio_consulta, fim)
+        duracao_varredura = time.perf_counter() - comeco
+        assert esperado == historico_movimentos.movimentos_do_produto(id_produto, inicio_consulta, fim), \
+            "consulta pelos índices difere da varredura"
+        print(f"Produto X, últimos 30 dias (varredura completa): {duracao_varredura * 1000:,.0f} ms "
+              f"(resultado igual ao dos índices)")
+
+        comeco = time.perf_counter()
+        totais = historico_movimentos.totais_diarios_por_categoria(inicio_consulta, fim)
+        duracao = time.perf_counter() - comeco
+        movimentos_periodo = sum(valores['movimentos'] for por_categoria in totais.values() for valores in por_categoria.values())
+        print(f"Totais por dia e categoria, últimos 30 dias: {duracao * 1000:.2f} ms "
+              f"({len(totais)} dias, {movimentos_periodo:,} movimentos)")
+
+        comeco = time.perf_counter()
+        uma_hora = sum(1 for _ in historico_movimentos.movimentos_no_periodo(fim - 3600 * 24, fim - 3600 * 23))
+        print(f"Todos os movimentos de uma hora (ontem): {(time.perf_counter() - comeco) * 1000:.2f} ms "
+              f"({uma_hora:,} movimentos)")
+        print(f"Memória máxima do processo: {memoria_maxima_mb():,.0f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark: importação do catálogo de um fornecedor (servico_estoque.importar_catalogo) vs. um produto por vez.
+
+Parte de um catálogo sintético no modo 'journal' e gera um arquivo CSV de fornecedor em que metade das linhas
+atualiza produtos existentes (mesmo nome + categoria), a outra metade são produtos novos e 1% das linhas é inválida.
+- um por vez: cadastrar_produto/editar_produto seguido de salvar_dados() a cada linha, como no menu
+  (medido numa amostra de AMOSTRA_UM_POR_VEZ linhas; a vazão é a mesma para o arquivo inteiro);
+- importação em lote: validação em blocos (com 1 processo e com os núcleos da máquina), IDs reservados
+  de uma vez, índices atualizados em lote e um único salvar_dados().
+Depois confere que o lote e o um por vez deixam o catálogo igual.
+
+Uso:
+    python benchmarks/benchmark_importacao_catalogo.py [produtos_no_catalogo] [linhas_no_arquivo]   (padrão: 100000 50000)
+"""
+
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+from comum import gerar_catalogo, usar_pasta
+
+import catalogo_lote
+import gravacao_atomica
+import pool_processos
+import servico_estoque as servico
+
+AMOSTRA_UM_POR_VEZ = 1000
+
+def gerar_arquivo_fornecedor(caminho, catalogo, linhas, semente=11):
+    """CSV com metade de atualizações, metade de produtos novos e 1% de linhas inválidas"""
+    aleatorio = random.Random(semente)
+    existentes = list(catalogo.values())
+    with open(caminho, 'w', encoding='utf-8', newline='') as arquivo:
+        escritor = csv.writer(arquivo)
+        escritor.writerow(catalogo_lote.CAMPOS_OBRIGATORIOS)
+        for numero in range(linhas):
+            if aleatorio.random() < 0.5:
+                produto_dict = aleatorio.choice(existentes)
+                nome, categoria = produto_dict['nome'], produto_dict['categoria']
+            else:
+                nome, categoria = f"produto fornecedor {numero}", aleatorio.choice(['alimentos', 'bebidas', 'limpeza'])
+            quantidade = aleatorio.randint(0, 500) if aleatorio.random() >= 0.01 else -1 # 1% inválidas
+            escritor.writerow([nome, categoria, quantidade, round(aleatorio.uniform(1, 500), 2), aleatorio.randint(0, 50)])
+
+def preparar(pasta, prefixo, catalogo):
+    usar_pasta(servico, pasta, prefixo)
+    servico.escrever_snapshot(servico.ARQUIVO_DADOS, catalogo)
+    servico.carregar_dados()
+
+def importar_um_por_vez(caminho, limite):
+    """Como o menu faria: procura pelo nome + categoria, cadastra ou edita e salva a cada linha; retorna as linhas lidas"""
+    linhas = 0
+    for numero_linha, valores in catalogo_lote.ler_linhas(caminho):
+        if linhas == limite:
+            break
+        linhas += 1
+        nome, categoria, quantidade, preco, estoque_minimo, _ = valores
+        try:
+            quantidade, preco, estoque_minimo = int(quantidade), float(preco), int(estoque_minimo)
+            existentes = [produto_dict for produto_dict in servico.buscar_por_nome(nome)
+                          if produto_dict['nome'] == nome and produto_dict['categoria'] == categoria]
+            if existentes:
+                servico.editar_produto(existentes[0]['id'], quantidade=quantidade, preco=preco, estoque_minimo=estoque_minimo)
+            else:
+                servico.cadastrar_produto(nome, categoria, quantidade, preco, estoque_minimo)
+        except servico.ErroEstoque:
+            continue
+        servico.salvar_dados()
+    return linhas
+
+def estado_do_catalogo():
+    return sorted((produto_dict['nome'], produto_dict['categoria'], produto_dict['quantidade'], produto_dict['preco'],
+                   produto_dict['estoque_minimo']) for produto_dict in servico.produtos.values())
+
+def main():
+    quantidade_produtos = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    linhas = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+    gravacao_atomica.SINCRONIZAR_DISCO = False # Sem fsync: compara o processamento, não o disco desta máquina
+    servico.MODO_PERSISTENCIA = 'journal'
+    servico.LIMITE_JOURNAL_BYTES = 1 << 40 # Sem compactação em segundo plano no meio das medições
+    catalogo = gerar_catalogo(quantidade_produtos)
+    print(f"Importação de {linhas:,} linhas sobre um catálogo de {quantidade_produtos:,} produtos "
+          f"(núcleos nesta máquina: {os.cpu_count()})")
+    print(f"{'Forma':<36} {'Segundos':>10} {'Linhas/s':>12}")
+    print("-" * 60)
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'fornecedor.csv')
+        gerar_arquivo_fornecedor(caminho, catalogo, linhas)
+
+        preparar(pasta, 'um_por_vez', catalogo)
+        inicio = time.perf_counter()
+        amostra = importar_um_por_vez(caminho, AMOSTRA_UM_POR_VEZ)
+        segundos = time.perf_counter() - inicio
+        print(f"{f'um por vez (amostra de {amostra:,})':<36} {segundos * linhas / amostra:>10.2f} {amostra / segundos:>12,.0f}"
+              "   (segundos estimados para o arquivo inteiro)")
+
+        estados = []
+        for processos in sorted({1, os.cpu_count() or 1}):
+            catalogo_lote.PROCESSOS = processos
+            preparar(pasta, f'lote_{processos}', catalogo)
+            inicio = time.perf_counter()
+            resumo = servico.importar_catalogo(caminho)
+            servico.salvar_dados()
+            segundos = time.perf_counter() - inicio
+            print(f"{f'em lote, {processos} processo(s) + 1 salvamento':<36} {segundos:>10.2f} {linhas / segundos:>12,.0f}")
+            estados.append(estado_do_catalogo())
+        pool_processos.encerrar('catalogo_lote')
+        print(f"\nCadastrados: {resumo['cadastrados']:,}, atualizados: {resumo['atualizados']:,}, "
+              f"sem mudança: {resumo['inalterados']:,}, repetidas: {resumo['repetidas']:,}, "
+              f"rejeitadas: {len(resumo['rejeitadas']):,}")
+
+        # O lote deixa o catálogo como o um por vez deixaria (conferido com o arquivo inteiro num catálogo pequeno)
+        pequeno = dict(list(catalogo.items())[:2000])
+        caminho_pequeno = os.path.join(pasta, 'fornecedor_pequeno.csv')
+        gerar_arquivo_fornecedor(caminho_pequeno, pequeno, 1000)
+        preparar(pasta, 'conferencia_um', pequeno)
+        importar_um_por_vez(caminho_pequeno, None)
+        esperado = estado_do_catalogo()
+        preparar(pasta, 'conferencia_lote', pequeno)
+        servico.importar_catalogo(caminho_pequeno)
+        servico.salvar_dados()
+        assert estado_do_catalogo() == esperado, "A importação em lote difere da importação um por vez"
+        assert all(estado == estados[0] for estado in estados), "O resultado muda com o número de processos"
+    print("OK: mesmo catálogo final que a importação um por vez, com qualquer número de processos.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Benchmark: custo da instrumentação (instrumentacao.py) sobre uma carga de trabalho típica.
+
+Cada rodada faz, no modo 'journal', a mistura de operações de um dia de uso: consultas por ID,
+entradas e saídas (com algumas saídas recusadas por falta de estoque), buscas por nome e categoria,
+um salvamento a cada SALVAR_A_CADA movimentos e os relatórios de estoque, baixo estoque e uma página por valor.
+
+A rodada é dividida em trechos curtos (TAMANHO_TRECHO consultas, SALVAR_A_CADA movimentos com o salvamento,
+cada busca, cada relatório). Cada trecho roda REPETICOES vezes sem e REPETICOES vezes com instrumentação,
+alternando, e vale o mais rápido de cada lado (como no timeit: as execuções mais lentas foram atrapalhadas
+pela máquina). O coletor de lixo fica desligado durante a rodada (também como no timeit): uma coleta
+do catálogo inteiro levaria dezenas de milissegundos e cairia em um dos lados ao acaso.
+
+Quase todas as chamadas medidas estão nos trechos leves (consultas e movimentos). Cada busca e cada relatório
+faz uma chamada medida só, e o tempo deles varia de uma execução para outra (até ~20% numa máquina virtual)
+milhares de vezes mais que o custo de uma medição: a diferença medida neles é só ruído. Por isso o custo é
+a diferença medida nos trechos leves, dividida pelas chamadas medidas deles (o custo real de uma medição,
+sobre as operações de verdade), vezes as chamadas medidas da rodada inteira, sobre o tempo da rodada inteira.
+O resultado é a mediana das rodadas. Também mostra a diferença medida na rodada inteira, a estimativa
+pelo custo de medir uma função vazia (as duas só informativas) e as métricas coletadas.
+
+Uso:
+    python benchmarks/benchmark_instrumentacao.py [quantidade_produtos] [rodadas]   (padrão: 100000 7)
+"""
+
+import functools
+import gc
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from comum import gerar_catalogo, usar_pasta
+
+import gravacao_atomica
+import instrumentacao
+import servico_estoque as servico
+
+CONSULTAS_POR_RODADA = 2000
+MOVIMENTOS_POR_RODADA = 1000
+BUSCAS_POR_RODADA = 20
+SALVAR_A_CADA = 50
+TAMANHO_TRECHO = 50 # Consultas por trecho
+REPETICOES = 5 # Execuções de cada trecho em cada lado (vale a mais rápida)
+OPERACOES_LEVES = ('consulta_id', 'entrada', 'saida', 'salvar') # Operações medidas nos trechos leves
+LIMITE_CUSTO = 2.0 # % aceitável sobre a carga de trabalho
+
+# As funções do serviço são procuradas no módulo a cada chamada: com a instrumentação ligada, vem a versão medida
+def chamar(nome_funcao, *argumentos):
+    """Chama a função do serviço pelo nome"""
+    return getattr(servico, nome_funcao)(*argumentos)
+
+def consultar(ids):
+    """Trecho de consultas por ID"""
+    for id_produto in ids:
+        servico.buscar_produto_por_id(id_produto)
+
+def movimentar(movimentos):
+    """Trecho de movimentos [(entrada?, id, quantidade), ...] seguido do salvamento"""
+    for entrada, id_produto, quantidade in movimentos:
+        if entrada:
+            servico.registrar_entrada(id_produto, quantidade)
+        else:
+            try:
+                servico.registrar_saida(id_produto, quantidade)
+            except servico.EstoqueInsuficiente:
+                pass
+    servico.salvar_dados()
+
+def trechos(ids, semente):
+    """Os trechos de uma rodada da carga de trabalho, na ordem: pares (leve?, função sem argumentos)"""
+    aleatorio = random.Random(semente)
+    lista = []
+    for _ in range(CONSULTAS_POR_RODADA // TAMANHO_TRECHO):
+        lista.append((True, functools.partial(consultar, [aleatorio.choice(ids) for _ in range(TAMANHO_TRECHO)])))
+    for _ in range(MOVIMENTOS_POR_RODADA // SALVAR_A_CADA):
+        movimentos = [(aleatorio.random() < 0.5, aleatorio.choice(ids), aleatorio.randint(1, 20))
+                      for _ in range(SALVAR_A_CADA)]
+        lista.append((True, functools.partial(movimentar, movimentos)))
+    for _ in range(BUSCAS_POR_RODADA // 2):
+        nome = aleatorio.choice(['cabo', 'mouse 1', 'teclado', 'fone 99'])
+        categoria = aleatorio.choice(['games', 'livros', 'moveis'])
+        lista.append((False, functools.partial(chamar, 'buscar_por_nome', nome)))
+        lista.append((False, functools.partial(chamar, 'buscar_por_categoria', categoria)))
+    lista.append((False, functools.partial(chamar, 'obter_totais')))
+    lista.append((False, functools.partial(chamar, 'relatorio_baixo_estoque')))
+    lista.append((False, functools.partial(chamar, 'pagina_relatorio', 'estoque', 'valor', True, 50)))
+    return lista
+
+def rodada(ids, semente):
+    """
+    Uma rodada da carga de trabalho. Retorna as somas dos melhores tempos de cada trecho:
+    {(leve?, instrumentação ligada?): segundos}
+    """
+    somas = {(leve, ligada): 0.0 for leve in (True, False) for ligada in (False, True)}
+    gc.collect()
+    gc.disable()
+    try:
+        for posicao, (leve, trecho) in enumerate(trechos(ids, semente)):
+            melhores = {False: float('inf'), True: float('inf')}
+            for repeticao in range(REPETICOES):
+                # Alterna quem vai primeiro
+                for ligada in ((False, True) if (posicao + repeticao) % 2 == 0 else (True, False)):
+                    if ligada:
+                        servico.ativar_instrumentacao()
+                    inicio = time.perf_counter()
+                    trecho()
+                    melhores[ligada] = min(melhores[ligada], time.perf_counter() - inicio)
+                    instrumentacao.desativar()
+            for ligada, melhor in melhores.items():
+                somas[(leve, ligada)] += melhor
+    finally:
+        gc.enable()
+    return somas
+
+def custo_por_chamada(repeticoes=200_000):
+    """Nanossegundos que a medição acrescenta a uma chamada (função vazia medida vs. não medida)"""
+    def vazia():
+        return None
+    medida = instrumentacao.medida(vazia, 'benchmark_vazia')
+    tempos = []
+    for funcao in (vazia, medida):
+        inicio = time.perf_counter_ns()
+        for _ in range(repeticoes):
+            funcao()
+        tempos.append((time.perf_counter_ns() - inicio) / repeticoes)
+    del instrumentacao.estatisticas['benchmark_vazia']
+    return tempos[1] - tempos[0]
+
+def main():
+    quantidade_produtos = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rodadas = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+    gravacao_atomica.SINCRONIZAR_DISCO = False # Sem fsync: o custo medido fica sobre o processamento, o caso mais difícil
+    servico.MODO_PERSISTENCIA = 'journal'
+    servico.REGISTRAR_HISTORICO = False
+    servico.LIMITE_JOURNAL_BYTES = 1 << 40 # Sem compactação em segundo plano no meio das medições
+    with tempfile.TemporaryDirectory() as pasta:
+        usar_pasta(servico, pasta)
+        servico.escrever_snapshot(servico.ARQUIVO_DADOS, gerar_catalogo(quantidade_produtos))
+        servico.carregar_dados()
+        ids = list(servico.produtos)
+        rodada(ids, -1) # Aquece (caches, índices, páginas do arquivo)
+        instrumentacao.limpar()
+
+        somas = [rodada(ids, numero) for numero in range(rodadas)]
+        # Com a instrumentação ligada, cada trecho roda REPETICOES vezes por rodada
+        metricas = instrumentacao.resumo()
+        chamadas_por_rodada = sum(valores['chamadas'] for valores in metricas.values()) / rodadas / REPETICOES
+        chamadas_leves = sum(metricas[operacao]['chamadas'] for operacao in OPERACOES_LEVES) / rodadas / REPETICOES
+
+        sem = [soma[(True, False)] + soma[(False, False)] for soma in somas]
+        com = [soma[(True, True)] + soma[(False, True)] for soma in somas]
+        medido_por_chamada = [(soma[(True, True)] - soma[(True, False)]) / chamadas_leves for soma in somas]
+        custo = statistics.median(por_chamada * chamadas_por_rodada / tempo_sem * 100
+                                  for por_chamada, tempo_sem in zip(medido_por_chamada, sem))
+        diferenca_total = statistics.median((tempo_com - tempo_sem) / tempo_sem * 100
+                                            for tempo_sem, tempo_com in zip(sem, com))
+        nanossegundos_por_chamada = custo_por_chamada()
+        estimado = chamadas_por_rodada * nanossegundos_por_chamada / 1e9 / statistics.median(sem) * 100
+
+        print(f"Carga de trabalho ({quantidade_produtos:,} produtos, {rodadas} rodadas, "
+              f"melhor de {REPETICOES} execuções por trecho):")
+        print(f"  sem instrumentação: {statistics.median(sem) * 1000:,.1f} ms (rodada mediana)")
+        print(f"  com instrumentação: {statistics.median(com) * 1000:,.1f} ms (rodada mediana)")
+        print(f"  custo medido: {chamadas_por_rodada:,.0f} chamadas medidas por rodada x "
+              f"{statistics.median(medido_por_chamada) * 1e9:,.0f} ns por medição "
+              f"(medido nas {chamadas_leves:,.0f} chamadas dos trechos leves) = {custo:+.2f}% (limite {LIMITE_CUSTO}%)")
+        print(f"  diferença na rodada inteira (com o ruído das buscas e relatórios): {diferenca_total:+.2f}%")
+        print(f"  estimativa pela função vazia: {nanossegundos_por_chamada:,.0f} ns por medição = {estimado:.2f}%")
+        print()
+        print(f"{'Operação':<24} {'Chamadas':>9} {'Erros':>6} {'Média (ms)':>11} {'p50':>9} {'p95':>9} {'p99':>9} {'Máx':>9}")
+        print("-" * 92)
+        for operacao, valores in instrumentacao.resumo().items():
+            print(f"{operacao:<24} {valores['chamadas']:>9,} {valores['erros']:>6,} {valores['media_ms']:>11.4f} "
+                  f"{valores['p50_ms']:>9.4f} {valores['p95_ms']:>9.4f} {valores['p99_ms']:>9.4f} {valores['max_ms']:>9.4f}")
+    print()
+    print("OK: custo dentro do limite." if custo <= LIMITE_CUSTO else "ATENÇÃO: custo acima do limite.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark: memória ocupada por produto - dicionários (formato antigo) vs. registro Produto com __slots__.
+
+Grava um catálogo sintético em JSON, carrega de duas formas e mede com tracemalloc
+quanto fica alocado depois da carga (só o dicionário 'produtos', sem os índices):
+- dicionários: {int(id): dicionário lido do JSON}  (como carregar_dados() fazia antes)
+- Produto:     {int(id): Produto.de_dict(...)}      (como carregar_dados() faz agora)
+
+Uso:
+    python benchmarks/benchmark_memoria.py [tamanho1 tamanho2 ...]   (padrão: 100000 1000000)
+"""
+
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from comum import gerar_catalogo
+
+from produto import Produto
+
+def carregar_como_dicionarios(caminho):
+    with open(caminho, 'r', encoding='utf-8') as arquivo:
+        return {int(k): v for k, v in json.load(arquivo).items()}
+
+def carregar_como_produtos(caminho):
+    with open(caminho, 'r', encoding='utf-8') as arquivo:
+        return {int(k): Produto.de_dict(v) for k, v in json.load(arquivo).items()}
+
+def medir(carregar, caminho):
+    """Retorna (bytes retidos, pico de bytes, segundos) da carga"""
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    produtos = carregar(caminho)
+    segundos = time.perf_counter() - inicio
+    gc.collect()
+    retidos, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del produtos
+    return retidos, pico, segundos
+
+def main():
+    tamanhos = [int(t) for t in sys.argv[1:]] or [100_000, 1_000_000]
+
+    print(f"{'Produtos':>10} {'Formato':<12} {'Bytes/produto':>14} {'Retido (MB)':>12} {'Pico (MB)':>10} {'Carga (s)':>10}")
+    print("-" * 73)
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'produtos.json')
+        for tamanho in tamanhos:
+            with open(caminho, 'w', encoding='utf-8') as arquivo:
+                json.dump(gerar_catalogo(tamanho), arquivo, ensure_ascii=False)
+
+            resultados = {}
+            for formato, carregar in (('dicionarios', carregar_como_dicionarios), ('Produto', carregar_como_produtos)):
+                retidos, pico, segundos = medir(carregar, caminho)
+                resultados[formato] = retidos
+                print(f"{tamanho:>10} {formato:<12} {retidos / tamanho:>14.0f} {retidos / 2**20:>12.1f} "
+                      f"{pico / 2**20:>10.1f} {segundos:>10.2f}")
+            print(f"{'':>10} redução de {1 - resultados['Produto'] / resultados['dicionarios']:.0%} na memória retida")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark: importação de movimentações em lote (CSV e JSONL).
+
+Uso:
+    python benchmarks/benchmark_movimentos_lote.py [quantidade_produtos] [quantidade_movimentos]
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+
+from comum import gerar_catalogo, silenciar_saida, cronometrar, usar_pasta
+
+import servico_estoque as estoque
+
+def gerar_arquivos(quantidade_produtos, quantidade_movimentos, pasta):
+    """Gera o mesmo lote de movimentações em CSV e em JSONL"""
+    aleatorio = random.Random(5)
+    movimentos = [(aleatorio.randint(1, quantidade_produtos), aleatorio.choice((-1, 1)) * aleatorio.randint(1, 20))
+                  for _ in range(quantidade_movimentos)]
+    caminho_csv = os.path.join(pasta, 'movimentos.csv')
+    caminho_jsonl = os.path.join(pasta, 'movimentos.jsonl')
+    with open(caminho_csv, 'w', encoding='utf-8') as arquivo:
+        arquivo.write("id,delta\n")
+        arquivo.writelines(f"{id_produto},{delta}\n" for id_produto, delta in movimentos)
+    with open(caminho_jsonl, 'w', encoding='utf-8') as arquivo:
+        arquivo.writelines(json.dumps({'id': id_produto, 'delta': delta}) + "\n" for id_produto, delta in movimentos)
+    return caminho_csv, caminho_jsonl
+
+def main():
+    quantidade_produtos = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    quantidade_movimentos = int(sys.argv[2]) if len(sys.argv) > 2 else 500_000
+    catalogo = gerar_catalogo(quantidade_produtos)
+    
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho_csv, caminho_jsonl = gerar_arquivos(quantidade_produtos, quantidade_movimentos, pasta)
+        estoque.MODO_PERSISTENCIA = 'journal'
+        usar_pasta(estoque, pasta)
+        estoque.abrir_historico()
+        
+        print(f"Catálogo: {quantidade_produtos} produtos, lote de {quantidade_movimentos} movimentações")
+        print(f"{'Arquivo':<8} {'Modo':<10} {'Aplicadas':>10} {'Rejeitadas':>11} {'Alertas':>8} {'Mov/s':>12}")
+        print("-" * 64)
+        for caminho in (caminho_csv, caminho_jsonl):
+            for atomico in (False, True):
+                estoque.produtos = {id_produto: dict(produto) for id_produto, produto in catalogo.items()}
+                estoque.reconstruir_estruturas_auxiliares()
+                estoque.alteracoes_pendentes.clear()
+                
+                def importar():
+                    resumo = estoque.aplicar_movimentacoes_lote(caminho, atomico)
+                    estoque.salvar_dados()
+                    return resumo
+                
+                with silenciar_saida():
+                    resumo, segundos = cronometrar(importar)
+                formato = os.path.splitext(caminho)[1][1:]
+                modo = 'atômico' if atomico else 'por linha'
+                print(f"{formato:<8} {modo:<10} {resumo['aplicadas']:>10} {len(resumo['rejeitadas']):>11} "
+                      f"{len(resumo['alertas']):>8} {resumo['linhas'] / segundos:>12,.0f}")
+
+if __name__ == "__main__":
+    main()
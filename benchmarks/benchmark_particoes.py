@@ -0,0 +1,103 @@
+"""
+Benchmark: relatórios do estoque particionado (estoque_particionado.py) com 1, 2, 4 e 8 processos.
+
+Divide um catálogo sintético em partições numa pasta temporária e mede, para cada número de processos,
+o relatório de valor em estoque (com os totais por categoria), o de baixo estoque e a busca por categoria
+(melhor de REPETICOES, com o pool já aquecido). A primeira linha é a varredura do dicionário único,
+num processo só, como referência. Os resultados de todas as medições são conferidos contra essa varredura.
+
+O ganho depende dos núcleos da máquina (os.cpu_count() aparece no início): com um núcleo só,
+os processos se revezam e o tempo não cai; com mais núcleos, cai até o menor entre núcleos e partições.
+
+Uso:
+    python benchmarks/benchmark_particoes.py [quantidade_produtos] [quantidade_particoes]   (padrão: 1000000 8)
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from comum import gerar_produtos
+
+import agregados_estoque
+import estoque_particionado
+import pool_processos
+from produto import Produto
+
+PROCESSOS = (1, 2, 4, 8)
+REPETICOES = 3
+CATEGORIA_BUSCADA = 'games'
+
+def melhor_tempo(funcao):
+    """Menor tempo de REPETICOES execuções; retorna (resultado, segundos)"""
+    melhor = None
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        duracao = time.perf_counter() - inicio
+        melhor = duracao if melhor is None else min(melhor, duracao)
+    return resultado, melhor
+
+def relatorios_particionados(produtos):
+    """(nome, função) de cada relatório sobre as partições"""
+    return [
+        ('valor em estoque', lambda: estoque_particionado.obter_totais(produtos, por_categoria=True)),
+        ('baixo estoque', lambda: estoque_particionado.listar_ids_baixo_estoque(produtos)),
+        ('busca por categoria', lambda: estoque_particionado.buscar_ids_por_texto(produtos, 'categoria', CATEGORIA_BUSCADA)),
+    ]
+
+def relatorios_dicionario_unico(produtos):
+    """Os mesmos relatórios varrendo o dicionário único, num processo só"""
+    def baixo_estoque():
+        abaixo = sorted((produto_dict['quantidade'] - produto_dict['estoque_minimo'], id_produto)
+                        for id_produto, produto_dict in produtos.items()
+                        if produto_dict['quantidade'] < produto_dict['estoque_minimo'])
+        return [id_produto for _, id_produto in abaixo]
+    return [
+        ('valor em estoque', lambda: agregados_estoque.calcular_do_zero(produtos)),
+        ('baixo estoque', baixo_estoque),
+        ('busca por categoria', lambda: [id_produto for id_produto, produto_dict in produtos.items()
+                                         if CATEGORIA_BUSCADA in produto_dict['categoria'].lower()]),
+    ]
+
+def main():
+    quantidade_produtos = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    quantidade_particoes = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    produtos = {produto_dict['id']: Produto.de_dict(produto_dict) for produto_dict in gerar_produtos(quantidade_produtos)}
+    print(f"Estoque particionado: {quantidade_produtos:,} produtos em {quantidade_particoes} partições "
+          f"(núcleos nesta máquina: {os.cpu_count()})")
+    nomes = [nome for nome, _ in relatorios_dicionario_unico(produtos)]
+    print(f"{'Processos':<24}" + "".join(f"{nome + ' (ms)':>26}" for nome in nomes))
+    print("-" * (24 + 26 * len(nomes)))
+
+    esperados = []
+    tempos = []
+    for _, funcao in relatorios_dicionario_unico(produtos):
+        resultado, segundos = melhor_tempo(funcao)
+        esperados.append(resultado)
+        tempos.append(segundos)
+    print(f"{'dicionário único':<24}" + "".join(f"{segundos * 1000:>26,.0f}" for segundos in tempos))
+
+    with tempfile.TemporaryDirectory() as pasta:
+        estoque_particionado.criar(pasta, quantidade_particoes, produtos=produtos)
+        del produtos
+        particionados = estoque_particionado.ProdutosParticionados(pasta)
+        referencia = None
+        for processos in PROCESSOS:
+            estoque_particionado.PROCESSOS = processos
+            relatorios = relatorios_particionados(particionados)
+            relatorios[0][1]() # Aquece o pool (os processos são criados na primeira chamada)
+            tempos = []
+            for (nome, funcao), esperado in zip(relatorios, esperados):
+                resultado, segundos = melhor_tempo(funcao)
+                assert resultado == esperado, f"{nome} com {processos} processo(s) difere do dicionário único"
+                tempos.append(segundos)
+            referencia = referencia or tempos
+            print(f"{processos:<24}" + "".join(f"{segundos * 1000:>17,.0f} ({base / segundos:>4.1f}x)"
+                                               for segundos, base in zip(tempos, referencia)))
+        pool_processos.encerrar('particoes')
+    print("OK: resultados iguais aos da varredura do dicionário único com qualquer número de processos.")
+
+if __name__ == "__main__":
+    main()
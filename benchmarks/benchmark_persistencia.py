@@ -0,0 +1,58 @@
+"""
+Benchmark: latência por operação de estoque com reescrita completa vs. journal.
+
+Uso:
+    python benchmarks/benchmark_persistencia.py [quantidade_produtos] [quantidade_operacoes]
+"""
+
+import random
+import sys
+import tempfile
+
+from comum import gerar_catalogo, resumir_latencias, silenciar_saida, cronometrar, usar_pasta
+
+import servico_estoque as estoque
+
+def medir_modo(modo, catalogo, quantidade_operacoes, pasta):
+    """Simula entradas/saídas seguidas de salvar_dados() e mede cada operação"""
+    estoque.MODO_PERSISTENCIA = modo
+    usar_pasta(estoque, pasta, f'produtos_{modo}')
+    estoque.produtos = {id_produto: dict(produto) for id_produto, produto in catalogo.items()}
+    estoque.abrir_historico()
+    estoque.alteracoes_pendentes.clear()
+    with silenciar_saida():
+        estoque.escrever_snapshot(estoque.ARQUIVO_DADOS, estoque.produtos)
+    
+    aleatorio = random.Random(7)
+    ids = list(estoque.produtos.keys())
+    latencias = []
+    with silenciar_saida():
+        for _ in range(quantidade_operacoes):
+            produto = estoque.produtos[aleatorio.choice(ids)]
+            
+            def operacao():
+                produto['quantidade'] += aleatorio.randint(1, 10)
+                estoque.registrar_alteracao(produto)
+                estoque.salvar_dados()
+            
+            _, segundos = cronometrar(operacao)
+            latencias.append(segundos)
+        if estoque.thread_compactacao is not None:
+            estoque.thread_compactacao.join()
+    return resumir_latencias(latencias)
+
+def main():
+    quantidade_produtos = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    quantidade_operacoes = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    catalogo = gerar_catalogo(quantidade_produtos)
+    
+    print(f"Catálogo: {quantidade_produtos} produtos, {quantidade_operacoes} operações por modo")
+    print(f"{'Modo':<10} {'Média (ms)':>12} {'p50 (ms)':>12} {'p99 (ms)':>12}")
+    print("-" * 50)
+    with tempfile.TemporaryDirectory() as pasta:
+        for modo in ('completo', 'journal'):
+            resultado = medir_modo(modo, catalogo, quantidade_operacoes, pasta)
+            print(f"{modo:<10} {resultado['media_ms']:>12.3f} {resultado['p50_ms']:>12.3f} {resultado['p99_ms']:>12.3f}")
+
+if __name__ == "__main__":
+    main()
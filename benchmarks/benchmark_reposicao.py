@@ -0,0 +1,127 @@
+"""
+Benchmark: planejamento de reposição (planejamento_reposicao.py) sobre um catálogo grande.
+
+Gera um catálogo sintético e um histórico de saídas dos últimos dias (alguns produtos vendem muito mais que
+outros) e mede:
+- a montagem: catálogo + leitura das saídas do histórico (feita uma vez, na primeira consulta);
+- o plano de todos os produtos (consumo diário, dias de cobertura, quantidade sugerida) com NumPy e em Python;
+- recalcular do zero a cada consulta (montagem + plano), como seria sem as atualizações incrementais;
+- o custo de cada saída nova para o planejamento (o que registrar_saida faz a mais), em microssegundos.
+Confere que o plano com NumPy é idêntico ao em Python e que o estado atualizado saída a saída
+é idêntico ao montado do zero a partir do histórico.
+
+Uso:
+    python benchmarks/benchmark_reposicao.py [produtos] [saidas_no_historico] [dias]   (padrão: 1000000 2000000 60)
+"""
+
+import random
+import sys
+import tempfile
+import time
+
+from comum import gerar_produtos
+
+import gravacao_atomica
+import historico_movimentos
+import planejamento_reposicao
+from produto import Produto
+
+SAIDAS_INCREMENTAIS = 100_000
+REPETICOES = 3
+
+def melhor_tempo(funcao, *args):
+    """Menor tempo de REPETICOES execuções; retorna (resultado, segundos)"""
+    melhor = None
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        resultado = funcao(*args)
+        duracao = time.perf_counter() - inicio
+        melhor = duracao if melhor is None else min(melhor, duracao)
+    return resultado, melhor
+
+def sortear_id(aleatorio, quantidade_produtos):
+    """IDs concentrados nos primeiros produtos (poucos produtos respondem pela maior parte das saídas)"""
+    return int(quantidade_produtos * aleatorio.random() ** 3) + 1
+
+def gerar_historico(produtos, saidas, dias, agora):
+    """Saídas espalhadas pelos últimos 'dias' dias, em ordem de tempo, gravadas no histórico aberto"""
+    aleatorio = random.Random(3)
+    por_dia = saidas // dias
+    for dia in range(dias, 0, -1):
+        inicio_dia = agora - dia * historico_movimentos.SEGUNDOS_POR_DIA
+        for numero in range(por_dia):
+            id_produto = sortear_id(aleatorio, len(produtos))
+            historico_movimentos.registrar(id_produto, -aleatorio.randint(1, 5), 'saida', 0,
+                                           produtos[id_produto]['categoria'], inicio_dia + numero * 86400 / por_dia)
+        historico_movimentos.gravar_pendentes()
+
+def estado():
+    """Linhas do planejamento por ID (taxa, dia e consumo do dia, quantidade, mínimo)"""
+    colunas = planejamento_reposicao.colunas
+    return {id_produto: tuple(colunas[nome][posicao].item() if hasattr(colunas[nome][posicao], 'item')
+                              else colunas[nome][posicao]
+                              for nome in ('taxa', 'periodo', 'consumo', 'quantidade', 'estoque_minimo'))
+            for posicao, id_produto in enumerate(planejamento_reposicao.id_por_posicao)}
+
+def saidas_incrementais(produtos, quantidade):
+    """Saídas como o serviço faz: altera o produto, histórico + atualizar_produto + registrar_movimento"""
+    aleatorio = random.Random(8)
+    sorteadas = [(sortear_id(aleatorio, len(produtos)), aleatorio.randint(1, 5)) for _ in range(quantidade)]
+    segundos_planejamento = 0.0
+    for id_produto, retirar in sorteadas:
+        produto_dict = produtos[id_produto]
+        retirar = min(retirar, produto_dict['quantidade']) or 1
+        produto_dict['quantidade'] = max(0, produto_dict['quantidade'] - retirar)
+        momento = historico_movimentos.registrar(id_produto, -retirar, 'saida', produto_dict['quantidade'],
+                                                 produto_dict['categoria'])
+        inicio = time.perf_counter()
+        planejamento_reposicao.atualizar_produto(produto_dict)
+        planejamento_reposicao.registrar_movimento(id_produto, 'saida', -retirar, momento)
+        segundos_planejamento += time.perf_counter() - inicio
+    return segundos_planejamento / quantidade
+
+def main():
+    quantidade_produtos = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    saidas = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000_000
+    dias = int(sys.argv[3]) if len(sys.argv) > 3 else 60
+    gravacao_atomica.SINCRONIZAR_DISCO = False
+    if planejamento_reposicao.numpy is None:
+        print("NumPy não está instalado: só o caminho em Python será medido (pip install numpy).")
+    produtos = {produto_dict['id']: Produto.de_dict(produto_dict) for produto_dict in gerar_produtos(quantidade_produtos)}
+    agora = time.time()
+    with tempfile.TemporaryDirectory() as pasta:
+        historico_movimentos.abrir(pasta)
+        gerar_historico(produtos, saidas, dias, agora)
+        print(f"{quantidade_produtos:,} produtos, {historico_movimentos.quantidade_movimentos():,} saídas "
+              f"em {dias} dias no histórico")
+        print(f"{'Etapa':<46} {'Tempo':>12}")
+        print("-" * 60)
+
+        planos = {}
+        for ativo in ([True, False] if planejamento_reposicao.numpy is not None else [False]):
+            planejamento_reposicao.ATIVO = ativo
+            caminho = 'NumPy' if ativo else 'Python'
+            _, segundos_montagem = melhor_tempo(planejamento_reposicao.montar, produtos, agora)
+            planos[ativo], segundos_plano = melhor_tempo(planejamento_reposicao.planejar, produtos, agora)
+            print(f"{f'montagem: catálogo + histórico ({caminho})':<46} {segundos_montagem:>10.2f} s")
+            print(f"{f'plano de todos os produtos ({caminho})':<46} {segundos_plano * 1000:>9.1f} ms")
+            print(f"{f'recalcular do zero a cada consulta ({caminho})':<46} "
+                  f"{segundos_montagem + segundos_plano:>10.2f} s")
+        if len(planos) == 2:
+            assert planos[True] == planos[False], "O plano com NumPy difere do plano em Python"
+        plano = planos[planejamento_reposicao.ATIVO]
+        print(f"\nProdutos a pedir: {len(plano):,} (com consumo: {sum(1 for linha in plano if linha[1] > 0):,}); "
+              f"unidades sugeridas: {sum(linha[4] for linha in plano):,}")
+
+        planejamento_reposicao.ATIVO = planejamento_reposicao.numpy is not None
+        planejamento_reposicao.montar(produtos, agora)
+        microssegundos = saidas_incrementais(produtos, SAIDAS_INCREMENTAIS) * 1e6
+        print(f"Custo de cada saída para o planejamento: {microssegundos:.2f} µs "
+              f"({SAIDAS_INCREMENTAIS:,} saídas; o plano seguinte não precisa recalcular nada)")
+        atualizado = estado()
+        planejamento_reposicao.montar(produtos, time.time())
+        assert atualizado == estado(), "O estado atualizado saída a saída difere do montado a partir do histórico"
+    print("OK: NumPy e Python dão o mesmo plano; atualizações incrementais = montagem do zero a partir do histórico.")
+
+if __name__ == "__main__":
+    main()
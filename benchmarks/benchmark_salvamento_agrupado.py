@@ -0,0 +1,100 @@
+"""
+Benchmark: alterações por segundo sustentadas com salvamento a cada alteração vs. salvamento agrupado.
+
+Várias threads fazem entradas de estoque sem parar, cada uma seguida de agendar_salvamento()
+(como o menu faz). Com INTERVALO_AGRUPAMENTO = 0 cada alteração grava (com fsync) na hora;
+com intervalo > 0 as alterações do intervalo viram uma única gravação.
+No final, descarregar_salvamentos() grava o restante e o catálogo recarregado precisa ser igual ao da memória.
+
+Uso:
+    python benchmarks/benchmark_salvamento_agrupado.py [quantidade_produtos] [segundos_por_cenario] [threads]
+    (padrão: 10000 3 4)
+"""
+
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from comum import gerar_catalogo, usar_pasta
+
+import servico_estoque as servico
+
+# (modo de persistência, formato do snapshot, intervalo de agrupamento em segundos)
+CENARIOS = [
+    ('completo', 'json', 0),
+    ('completo', 'binario', 0),
+    ('journal', 'json', 0),
+    ('completo', 'binario', 0.1),
+    ('journal', 'json', 0.001),
+    ('journal', 'json', 0.01),
+    ('journal', 'json', 0.1),
+]
+
+def medir_cenario(modo, formato, intervalo, catalogo, segundos, quantidade_threads, pasta):
+    """Retorna (alterações feitas, segundos, gravações feitas)"""
+    servico.MODO_PERSISTENCIA = modo
+    servico.FORMATO_SNAPSHOT = formato
+    servico.INTERVALO_AGRUPAMENTO = intervalo
+    usar_pasta(servico, pasta)
+    servico.escrever_snapshot(servico.ARQUIVO_DADOS, catalogo)
+    servico.carregar_dados()
+
+    # Conta as gravações trocando salvar_dados por uma versão que conta as chamadas
+    salvar_original = servico.salvar_dados
+    gravacoes = [0]
+    def salvar_contando():
+        gravacoes[0] += 1
+        salvar_original()
+    servico.salvar_dados = salvar_contando
+
+    ids = list(catalogo)
+    fim = time.perf_counter() + segundos
+    alteracoes_por_thread = []
+
+    def trabalhar(semente):
+        aleatorio = random.Random(semente)
+        alteracoes = 0
+        while time.perf_counter() < fim:
+            servico.registrar_entrada(aleatorio.choice(ids), 1)
+            servico.agendar_salvamento()
+            alteracoes += 1
+        alteracoes_por_thread.append(alteracoes)
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=trabalhar, args=(semente,)) for semente in range(quantidade_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    servico.descarregar_salvamentos()
+    duracao = time.perf_counter() - inicio
+    servico.salvar_dados = salvar_original
+    if servico.thread_compactacao is not None:
+        servico.thread_compactacao.join()
+
+    # Tudo o que foi confirmado precisa estar no disco
+    em_memoria = {id_produto: dict(produto) for id_produto, produto in servico.produtos.items()}
+    servico.carregar_dados()
+    assert em_memoria == servico.produtos, "catálogo recarregado difere do que estava na memória"
+    return sum(alteracoes_por_thread), duracao, gravacoes[0]
+
+def main():
+    quantidade_produtos = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    segundos = float(sys.argv[2]) if len(sys.argv) > 2 else 3
+    quantidade_threads = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    catalogo = gerar_catalogo(quantidade_produtos)
+
+    print(f"Catálogo: {quantidade_produtos} produtos, {quantidade_threads} threads, {segundos:g} s por cenário")
+    print(f"{'Modo':<10} {'Formato':<8} {'Intervalo (ms)':>15} {'Alterações/s':>13} {'Gravações':>10} {'Alterações/gravação':>20}")
+    print("-" * 81)
+    for modo, formato, intervalo in CENARIOS:
+        with tempfile.TemporaryDirectory() as pasta:
+            alteracoes, duracao, gravacoes = medir_cenario(modo, formato, intervalo, catalogo, segundos,
+                                                           quantidade_threads, pasta)
+        print(f"{modo:<10} {formato:<8} {intervalo * 1000:>15g} {alteracoes / duracao:>13,.0f} {gravacoes:>10} "
+              f"{alteracoes / max(gravacoes, 1):>20,.1f}")
+
+if __name__ == "__main__":
+    main()
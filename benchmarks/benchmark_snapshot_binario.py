@@ -0,0 +1,124 @@
+"""
+Benchmark e verificação: snapshot JSON (indent=4) vs. snapshot binário (snapshot_binario.py).
+
+Para cada tamanho de catálogo mede o tamanho do arquivo, o tempo de gravação e de carga
+e a latência de uma consulta por ID direto do arquivo mapeado (SnapshotMapeado).
+
+Antes das medições confere a ida e volta entre os formatos:
+JSON -> importar -> binário -> exportar -> JSON deve gerar um arquivo idêntico ao original,
+e o catálogo lido do binário deve ser igual ao original (inclui nomes com acentos, IDs com lacunas etc.).
+O próximo ID livre (produtos.meta.json) também faz a ida e volta: num catálogo com IDs removidos,
+inclusive o maior, ele continua acima do maior ID restante. Qualquer diferença encerra com código 1.
+
+Uso:
+    python benchmarks/benchmark_snapshot_binario.py [tamanho1 tamanho2 ...]   (padrão: 10000 100000 1000000)
+"""
+
+import os
+import random
+import sys
+import tempfile
+
+from comum import gerar_catalogo, cronometrar, resumir_latencias
+
+import servico_estoque as servico
+import snapshot_binario
+import leitor_json
+from produto import Produto
+
+def carregar_json(caminho):
+    return {int(chave): Produto.de_dict(produto_dict) for chave, produto_dict in leitor_json.ler_itens_objeto(caminho)}
+
+def catalogo_de_casos_especiais():
+    """Produtos que costumam quebrar serializações: textos vazios/acentuados/com aspas, IDs esparsos, números grandes"""
+    textos = ['', 'ção ñ ü', 'aspas " e \\ barra', 'emoji 📦', 'linha\nquebrada', 'x' * 5000]
+    catalogo = {}
+    for posicao, texto in enumerate(textos):
+        id_produto = 1 + posicao * 1000
+        catalogo[id_produto] = Produto(id_produto, texto, textos[-1 - posicao], posicao, 0.1 * posicao, posicao * 7)
+    catalogo[2**40] = Produto(2**40, 'grande', 'games', 2**62, 1e300, 2**61)
+    catalogo[7] = Produto(7, 'preço quebrado', 'games', 0, 3999.9, 0)
+    return catalogo
+
+def catalogo_com_removidos():
+    """Catálogo de 5000 produtos com IDs removidos, inclusive os maiores; o próximo ID continua sendo 5001"""
+    catalogo = {id_produto: Produto.de_dict(p) for id_produto, p in gerar_catalogo(5000).items()}
+    for id_produto in (3, 100, 4998, 4999, 5000):
+        del catalogo[id_produto]
+    return catalogo
+
+def verificar_ida_e_volta(pasta, catalogo, proximo_id):
+    """Confere JSON -> binário -> JSON e binário -> catálogo, com o próximo ID no meta; lança AssertionError se algo mudar"""
+    caminho_json = os.path.join(pasta, 'original.json')
+    caminho_binario = os.path.join(pasta, 'produtos.bin')
+    caminho_volta = os.path.join(pasta, 'volta.json')
+    caminho_binario_volta = os.path.join(pasta, 'volta.bin')
+    ordenado = {id_produto: catalogo[id_produto] for id_produto in sorted(catalogo)} # O binário fica em ordem de ID
+
+    servico.escrever_snapshot(snapshot_binario.caminho_meta(caminho_json), {'proximo_id': proximo_id})
+    servico.escrever_snapshot(caminho_json, ordenado)
+    snapshot_binario.importar_json(caminho_json, caminho_binario) # Próximo ID vem do meta
+    produtos, proximo_id_lido = snapshot_binario.carregar(caminho_binario)
+    assert produtos == ordenado, "catálogo lido do binário difere do original"
+    assert list(produtos) == list(ordenado)
+    assert proximo_id_lido == proximo_id, f"próximo ID no binário: {proximo_id_lido}, esperado {proximo_id}"
+
+    with snapshot_binario.SnapshotMapeado(caminho_binario) as snapshot:
+        assert len(snapshot) == len(ordenado)
+        for id_produto in list(ordenado)[:1000]:
+            assert snapshot.buscar(id_produto) == ordenado[id_produto]
+        assert snapshot.buscar(-1) is None and snapshot.buscar(max(ordenado) + 1) is None
+
+    snapshot_binario.exportar_json(caminho_binario, caminho_volta)
+    with open(caminho_json, 'rb') as original, open(caminho_volta, 'rb') as volta:
+        assert original.read() == volta.read(), "JSON exportado difere do original"
+    proximo_id_exportado = snapshot_binario.ler_meta(caminho_volta)
+    assert proximo_id_exportado == proximo_id, f"próximo ID no meta exportado: {proximo_id_exportado}, esperado {proximo_id}"
+
+    snapshot_binario.importar_json(caminho_volta, caminho_binario_volta)
+    _, proximo_id_volta = snapshot_binario.carregar(caminho_binario_volta)
+    assert proximo_id_volta == proximo_id, f"próximo ID após a volta: {proximo_id_volta}, esperado {proximo_id}"
+
+def main():
+    tamanhos = [int(t) for t in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    aleatorio = random.Random(5)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        try:
+            verificar_ida_e_volta(pasta, catalogo_de_casos_especiais(), 2**40 + 1)
+            verificar_ida_e_volta(pasta, {id_produto: Produto.de_dict(p) for id_produto, p in gerar_catalogo(5000).items()}, 5001)
+            verificar_ida_e_volta(pasta, catalogo_com_removidos(), 5001)
+        except AssertionError as e:
+            print(f"Ida e volta JSON <-> binário: FALHOU ({e})")
+            sys.exit(1)
+        print("Ida e volta JSON <-> binário: OK (catálogos e próximo ID idênticos)\n")
+
+        print(f"{'Produtos':>10} {'Formato':<8} {'Arquivo (MB)':>13} {'Gravar (s)':>11} {'Carregar (s)':>13} {'Busca por ID p50 (ms)':>22}")
+        print("-" * 83)
+        for tamanho in tamanhos:
+            catalogo = {id_produto: Produto.de_dict(p) for id_produto, p in gerar_catalogo(tamanho).items()}
+            caminho_json = os.path.join(pasta, 'produtos.json')
+            caminho_binario = os.path.join(pasta, 'produtos.bin')
+
+            _, gravar_json = cronometrar(servico.escrever_snapshot, caminho_json, catalogo)
+            lido_json, carregar_json_s = cronometrar(carregar_json, caminho_json)
+            _, gravar_binario = cronometrar(snapshot_binario.gravar, caminho_binario, catalogo, tamanho + 1)
+            (lido_binario, _), carregar_binario = cronometrar(snapshot_binario.carregar, caminho_binario)
+            assert lido_json == lido_binario == catalogo
+            del lido_json, lido_binario
+
+            latencias = []
+            with snapshot_binario.SnapshotMapeado(caminho_binario) as snapshot:
+                for _ in range(2000):
+                    id_produto = aleatorio.randint(1, tamanho)
+                    produto, segundos = cronometrar(snapshot.buscar, id_produto)
+                    assert produto == catalogo[id_produto]
+                    latencias.append(segundos)
+
+            print(f"{tamanho:>10} {'json':<8} {os.path.getsize(caminho_json) / 2**20:>13.1f} {gravar_json:>11.2f} "
+                  f"{carregar_json_s:>13.2f} {'-':>22}")
+            print(f"{tamanho:>10} {'binario':<8} {os.path.getsize(caminho_binario) / 2**20:>13.1f} {gravar_binario:>11.2f} "
+                  f"{carregar_binario:>13.2f} {resumir_latencias(latencias)['p50_ms']:>22.4f}")
+
+if __name__ == "__main__":
+    main()
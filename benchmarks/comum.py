@@ -0,0 +1,115 @@
+"""
+Funções compartilhadas pelos benchmarks do Sistema de Gerenciamento de Estoque.
+
+Os benchmarks importam a camada de serviço (servico_estoque.py) da pasta de cima
+e trabalham com catálogos sintéticos gerados aqui.
+"""
+
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+
+# Permite "import servico_estoque" ao rodar a partir da pasta benchmarks/
+PASTA_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PASTA_PROJETO not in sys.path:
+    sys.path.insert(0, PASTA_PROJETO)
+
+CATEGORIAS_PADRAO = ['games', 'informatica', 'celulares', 'eletrodomesticos', 'moveis',
+                     'livros', 'brinquedos', 'esporte', 'ferramentas', 'papelaria']
+PALAVRAS = ['console', 'controle', 'cabo', 'fone', 'teclado', 'mouse', 'monitor', 'cadeira',
+            'mesa', 'livro', 'caneta', 'bola', 'chave', 'furadeira', 'carregador', 'capa']
+
+def nomes_de_categorias(quantidade_categorias):
+    """As CATEGORIAS_PADRAO e, passando de 10, 'categoria 11', 'categoria 12', ..."""
+    return CATEGORIAS_PADRAO[:quantidade_categorias] + [f"categoria {numero}" for numero in
+                                                        range(len(CATEGORIAS_PADRAO) + 1, quantidade_categorias + 1)]
+
+def gerar_produtos(quantidade_produtos, semente=42, quantidade_categorias=None, palavras_por_nome=(2, 2),
+                   proporcao_baixo_estoque=None):
+    """
+    Gera os produtos um a um (para catálogos grandes demais para ficar na memória).
+    Mesmos argumentos -> mesmo catálogo, em qualquer máquina. Opções (os padrões dão o catálogo de sempre):
+    - quantidade_categorias: quantas categorias diferentes (padrão: as 10 CATEGORIAS_PADRAO)
+    - palavras_por_nome: (mínimo, máximo) de palavras no nome, sorteado para cada produto (mais o ID no final)
+    - proporcao_baixo_estoque: fração dos produtos abaixo do estoque mínimo (padrão: a que sair do sorteio, ~5%)
+    """
+    aleatorio = random.Random(semente) # Gerador próprio: mesma semente -> mesmo catálogo
+    categorias = CATEGORIAS_PADRAO if quantidade_categorias is None else nomes_de_categorias(quantidade_categorias)
+    minimo_palavras, maximo_palavras = palavras_por_nome
+    for id_produto in range(1, quantidade_produtos + 1):
+        quantidade_palavras = minimo_palavras if minimo_palavras == maximo_palavras else \
+            aleatorio.randint(minimo_palavras, maximo_palavras)
+        nome = " ".join([aleatorio.choice(PALAVRAS) for _ in range(quantidade_palavras)] + [str(id_produto)])
+        produto = {
+            'id': id_produto,
+            'nome': nome,
+            'categoria': aleatorio.choice(categorias),
+            'quantidade': aleatorio.randint(0, 500),
+            'preco': round(aleatorio.uniform(1, 5000), 2),
+            'estoque_minimo': aleatorio.randint(0, 50),
+        }
+        if proporcao_baixo_estoque is not None:
+            # Sorteia de que lado do mínimo o produto fica e depois a quantidade dentro desse lado
+            if aleatorio.random() < proporcao_baixo_estoque:
+                produto['estoque_minimo'] = aleatorio.randint(1, 50)
+                produto['quantidade'] = aleatorio.randint(0, produto['estoque_minimo'] - 1)
+            else:
+                produto['quantidade'] = aleatorio.randint(produto['estoque_minimo'], 500)
+        yield produto
+
+def gerar_catalogo(quantidade_produtos, semente=42, **opcoes):
+    """Gera um dicionário de produtos no mesmo formato usado pelo sistema (opções: ver gerar_produtos)"""
+    return {produto['id']: produto for produto in gerar_produtos(quantidade_produtos, semente, **opcoes)}
+
+def gravar_catalogo_json(caminho, quantidade_produtos, semente=42):
+    """Grava um produtos.json sintético sem montar o catálogo na memória (mesmo formato do snapshot)"""
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        arquivo.write('{')
+        separador = '\n'
+        for produto in gerar_produtos(quantidade_produtos, semente):
+            arquivo.write(f'{separador}    "{produto["id"]}": {json.dumps(produto, ensure_ascii=False)}')
+            separador = ',\n'
+        arquivo.write('\n}')
+
+def usar_pasta(servico, pasta, prefixo='produtos'):
+    """Aponta todos os arquivos do serviço (snapshot, journal, meta, binário, banco, histórico, partições) para 'pasta'"""
+    base = os.path.join(pasta, prefixo)
+    servico.ARQUIVO_DADOS = base + '.json'
+    servico.ARQUIVO_JOURNAL = base + '.journal'
+    servico.ARQUIVO_META = base + '.meta.json'
+    servico.ARQUIVO_BINARIO = base + '.bin'
+    servico.ARQUIVO_BANCO = base + '.db'
+    servico.PASTA_HISTORICO = base + '.historico'
+    servico.PASTA_PARTICOES = base + '.particoes'
+
+def percentil(valores_ordenados, p):
+    """Retorna o percentil p (0-100) de uma lista já ordenada"""
+    if not valores_ordenados:
+        return 0.0
+    indice = min(len(valores_ordenados) - 1, int(round(p / 100 * (len(valores_ordenados) - 1))))
+    return valores_ordenados[indice]
+
+def resumir_latencias(latencias):
+    """Resume uma lista de latências (em segundos) em média, p50 e p99 (em milissegundos)"""
+    ordenadas = sorted(latencias)
+    return {
+        'media_ms': sum(ordenadas) / len(ordenadas) * 1000 if ordenadas else 0.0,
+        'p50_ms': percentil(ordenadas, 50) * 1000,
+        'p99_ms': percentil(ordenadas, 99) * 1000,
+    }
+
+@contextlib.contextmanager
+def silenciar_saida():
+    """Descarta os print() do sistema enquanto o benchmark mede"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+def cronometrar(funcao, *args, **kwargs):
+    """Executa a função e retorna (resultado, segundos)"""
+    inicio = time.perf_counter()
+    resultado = funcao(*args, **kwargs)
+    return resultado, time.perf_counter() - inicio
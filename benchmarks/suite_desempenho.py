@@ -0,0 +1,261 @@
+"""
+Suíte de desempenho reproduzível do Sistema de Gerenciamento de Estoque.
+
+Gera um catálogo sintético determinístico (mesmos argumentos -> mesmo catálogo, ver comum.gerar_produtos),
+grava no modo de persistência escolhido e mede os caminhos mais usados:
+    carregar_dados, buscar_produto_por_id, busca por nome e por categoria, relatório de estoque,
+    relatório de baixo estoque, rajadas de entrada/saída e salvar_dados (depois de 1 alteração e depois da rajada).
+Cada medição é repetida e guarda o melhor tempo e a mediana, em segundos por operação.
+
+Os resultados vão para um arquivo JSON (com a configuração e a máquina). Com --comparar, cada medição
+é comparada com a de um arquivo anterior (a base): mais lenta que a base além da --tolerancia é uma
+regressão, e o programa termina com código 1 (útil em scripts de integração contínua).
+
+Uso:
+    python benchmarks/suite_desempenho.py --produtos 100000 --saida base.json
+    python benchmarks/suite_desempenho.py --produtos 100000 --comparar base.json
+    python benchmarks/suite_desempenho.py --produtos 1000000 --categorias 200 --palavras-nome 1-6 --baixo-estoque 0.2
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from comum import gerar_catalogo, usar_pasta
+
+import armazenamento_sqlite
+import estoque_particionado
+import gravacao_atomica
+import servico_estoque as servico
+
+VERSAO_RESULTADOS = 1
+CONSULTAS_POR_ID = 10_000
+MOVIMENTOS_POR_RAJADA = 2_000
+CONSULTAS_TEXTO = ['cabo', 'mouse', 'teclado 1', 'fone 42', 'xyz'] # A última não encontra nada
+# (nome, descrição) na ordem em que são medidas e mostradas
+MEDICOES = [
+    ('carregar_dados', "carregar_dados()"),
+    ('buscar_produto_por_id', f"buscar_produto_por_id() ({CONSULTAS_POR_ID:,} IDs sorteados)"),
+    ('busca_nome', "busca por nome"),
+    ('busca_categoria', "busca por categoria"),
+    ('relatorio_estoque', "relatório de estoque (linhas + totais)"),
+    ('relatorio_baixo_estoque', "relatório de baixo estoque"),
+    ('rajada_entrada_saida', f"rajada de entradas/saídas ({MOVIMENTOS_POR_RAJADA:,})"),
+    ('salvar_dados', "salvar_dados() depois de 1 alteração"),
+    ('salvar_dados_rajada', "salvar_dados() depois da rajada"),
+]
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Suíte de desempenho com catálogo sintético determinístico")
+    parser.add_argument('--produtos', type=int, default=100_000, help="quantidade de produtos (padrão: 100000)")
+    parser.add_argument('--categorias', type=int, default=10, help="categorias diferentes (padrão: 10)")
+    parser.add_argument('--palavras-nome', default='2-2', help="mínimo-máximo de palavras no nome (padrão: 2-2)")
+    parser.add_argument('--baixo-estoque', type=float, help="fração de produtos abaixo do mínimo (padrão: sorteio, ~5%%)")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--modo', choices=('completo', 'journal', 'sqlite', 'particionado'), default='journal')
+    parser.add_argument('--formato', choices=('json', 'binario'), default='json', help="formato do snapshot")
+    parser.add_argument('--repeticoes', type=int, default=5, help="repetições de cada medição (padrão: 5)")
+    parser.add_argument('--saida', default='resultados_desempenho.json', help="arquivo JSON dos resultados")
+    parser.add_argument('--comparar', help="arquivo de resultados usado como base")
+    parser.add_argument('--tolerancia', type=float, default=0.15,
+                        help="quanto mais lento que a base ainda não é regressão (padrão: 0.15 = 15%%)")
+    return parser
+
+def ler_palavras_nome(texto):
+    minimo, _, maximo = texto.partition('-')
+    minimo, maximo = int(minimo), int(maximo or minimo)
+    if not 1 <= minimo <= maximo:
+        raise ValueError("--palavras-nome precisa ser 'mínimo-máximo', com 1 <= mínimo <= máximo.")
+    return minimo, maximo
+
+def configuracao_da_execucao(argumentos):
+    """O que define o catálogo e as medições (duas execuções só são comparáveis se forem iguais)"""
+    return {
+        'produtos': argumentos.produtos, 'categorias': argumentos.categorias,
+        'palavras_nome': list(ler_palavras_nome(argumentos.palavras_nome)),
+        'baixo_estoque': argumentos.baixo_estoque, 'semente': argumentos.semente,
+        'modo': argumentos.modo, 'formato': argumentos.formato,
+        'consultas_por_id': CONSULTAS_POR_ID, 'movimentos_por_rajada': MOVIMENTOS_POR_RAJADA,
+    }
+
+def ambiente():
+    return {'python': platform.python_version(), 'plataforma': platform.platform(),
+            'processador': platform.processor() or platform.machine(), 'nucleos': os.cpu_count()}
+
+def preparar(pasta, configuracao):
+    """Gera o catálogo e grava nos arquivos do modo escolhido (fora das medições)"""
+    usar_pasta(servico, pasta)
+    servico.MODO_PERSISTENCIA = configuracao['modo']
+    servico.FORMATO_SNAPSHOT = configuracao['formato']
+    catalogo = gerar_catalogo(configuracao['produtos'], configuracao['semente'],
+                              quantidade_categorias=configuracao['categorias'],
+                              palavras_por_nome=tuple(configuracao['palavras_nome']),
+                              proporcao_baixo_estoque=configuracao['baixo_estoque'])
+    if configuracao['modo'] == 'sqlite':
+        servico.escrever_snapshot(servico.ARQUIVO_DADOS, catalogo)
+        conexao = armazenamento_sqlite.abrir_banco(servico.ARQUIVO_BANCO)
+        armazenamento_sqlite.importar_json(conexao, servico.ARQUIVO_DADOS)
+        conexao.close()
+    elif configuracao['modo'] == 'particionado':
+        estoque_particionado.criar(servico.PASTA_PARTICOES, servico.NUMERO_PARTICOES, produtos=catalogo)
+    else:
+        servico.gravar_snapshot_produtos(catalogo, len(catalogo) + 1)
+
+def fechar_banco():
+    if servico.conexao_banco is not None:
+        servico.conexao_banco.close()
+        servico.conexao_banco = None
+
+def esperar_compactacao():
+    """A compactação do journal roda em segundo plano: espera terminar para não atrapalhar a próxima medição"""
+    if servico.thread_compactacao is not None:
+        servico.thread_compactacao.join()
+
+def medir(funcao, repeticoes, operacoes=1, preparar_repeticao=None):
+    """Executa funcao() 'repeticoes' vezes; retorna {'segundos': melhor, 'mediana', 'operacoes'} por operação"""
+    tempos = []
+    for numero in range(repeticoes):
+        if preparar_repeticao is not None:
+            preparar_repeticao(numero)
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) / operacoes)
+        esperar_compactacao()
+    return {'segundos': min(tempos), 'mediana': statistics.median(tempos), 'operacoes': operacoes}
+
+def executar_medicoes(configuracao, repeticoes):
+    resultados = {}
+    aleatorio = random.Random(configuracao['semente'])
+    with tempfile.TemporaryDirectory() as pasta, open(os.devnull, 'w', encoding='utf-8') as descarte:
+        preparar(pasta, configuracao)
+
+        def carregar():
+            fechar_banco()
+            servico.alteracoes_pendentes.clear()
+            servico.carregar_dados(em_segundo_plano=False)
+        resultados['carregar_dados'] = medir(carregar, repeticoes)
+
+        ids = list(servico.produtos)
+        def consultar():
+            for id_produto in ids_sorteados:
+                servico.buscar_produto_por_id(id_produto)
+        def sortear_ids(_):
+            nonlocal ids_sorteados
+            ids_sorteados = [aleatorio.choice(ids) for _ in range(CONSULTAS_POR_ID)]
+        ids_sorteados = []
+        resultados['buscar_produto_por_id'] = medir(consultar, repeticoes, CONSULTAS_POR_ID, sortear_ids)
+
+        categorias = sorted({produto_dict['categoria'] for produto_dict in servico.produtos.values()})
+        consultas_categoria = [categoria[:5] for categoria in categorias[:len(CONSULTAS_TEXTO)]]
+        resultados['busca_nome'] = medir(lambda: [servico.buscar_por_nome(texto) for texto in CONSULTAS_TEXTO],
+                                         repeticoes, len(CONSULTAS_TEXTO))
+        resultados['busca_categoria'] = medir(lambda: [servico.buscar_por_categoria(texto) for texto in consultas_categoria],
+                                              repeticoes, len(consultas_categoria))
+
+        def relatorio_estoque():
+            servico.exportar_relatorio('estoque', descarte, 'texto')
+            servico.obter_totais()
+        resultados['relatorio_estoque'] = medir(relatorio_estoque, repeticoes)
+        resultados['relatorio_baixo_estoque'] = medir(
+            lambda: servico.exportar_relatorio('baixo-estoque', descarte, 'texto'), repeticoes)
+
+        def rajada():
+            # Entrada e saída do mesmo produto: a saída nunca é recusada e o estoque volta ao que era
+            for id_produto in ids_sorteados[:MOVIMENTOS_POR_RAJADA // 2]:
+                servico.registrar_entrada(id_produto, 1)
+                servico.registrar_saida(id_produto, 1)
+        def rajada_e_salvar_depois(numero):
+            sortear_ids(numero)
+            servico.salvar_dados() # A rajada começa sem alterações pendentes
+        resultados['rajada_entrada_saida'] = medir(rajada, repeticoes, MOVIMENTOS_POR_RAJADA, rajada_e_salvar_depois)
+
+        def uma_alteracao(_):
+            servico.registrar_entrada(aleatorio.choice(ids), 1)
+        resultados['salvar_dados'] = medir(servico.salvar_dados, repeticoes, preparar_repeticao=uma_alteracao)
+        def depois_da_rajada(numero):
+            sortear_ids(numero)
+            rajada()
+        resultados['salvar_dados_rajada'] = medir(servico.salvar_dados, repeticoes, preparar_repeticao=depois_da_rajada)
+
+        esperar_compactacao()
+        fechar_banco()
+    return resultados
+
+def formatar_tempo(segundos):
+    if segundos >= 1:
+        return f"{segundos:,.2f} s"
+    if segundos >= 1e-3:
+        return f"{segundos * 1e3:,.2f} ms"
+    return f"{segundos * 1e6:,.2f} µs"
+
+def comparar(resultados, base, tolerancia):
+    """Linhas (nome, base, atual, variação, situação) e a lista de regressões"""
+    linhas, regressoes = [], []
+    for nome, _ in MEDICOES:
+        if nome not in resultados or nome not in base:
+            continue
+        antes, agora = base[nome]['segundos'], resultados[nome]['segundos']
+        variacao = (agora - antes) / antes if antes else 0.0
+        if variacao > tolerancia:
+            situacao = 'REGRESSÃO'
+            regressoes.append(nome)
+        elif variacao < -tolerancia:
+            situacao = 'melhorou'
+        else:
+            situacao = 'ok'
+        linhas.append((nome, antes, agora, variacao, situacao))
+    return linhas, regressoes
+
+def main(argv=None):
+    argumentos = criar_parser().parse_args(argv)
+    try:
+        configuracao = configuracao_da_execucao(argumentos)
+    except ValueError as e:
+        print(f"Erro: {str(e)}", file=sys.stderr)
+        return 2
+    base = None
+    if argumentos.comparar:
+        with open(argumentos.comparar, 'r', encoding='utf-8') as arquivo:
+            base = json.load(arquivo)
+
+    print(f"Suíte de desempenho: {configuracao['produtos']:,} produtos, {configuracao['categorias']} categorias, "
+          f"modo {configuracao['modo']} ({configuracao['formato']}), {argumentos.repeticoes} repetições")
+    resultados = executar_medicoes(configuracao, argumentos.repeticoes)
+    descricoes = dict(MEDICOES)
+    print(f"{'Medição':<48} {'Melhor (por operação)':>22} {'Mediana':>14}")
+    print("-" * 86)
+    for nome, valores in resultados.items():
+        print(f"{descricoes[nome]:<48} {formatar_tempo(valores['segundos']):>22} {formatar_tempo(valores['mediana']):>14}")
+
+    with gravacao_atomica.arquivo_atomico(argumentos.saida) as arquivo:
+        json.dump({'versao': VERSAO_RESULTADOS, 'momento': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                   'configuracao': configuracao, 'ambiente': ambiente(), 'resultados': resultados},
+                  arquivo, indent=4, ensure_ascii=False)
+    print(f"\nResultados gravados em {argumentos.saida}")
+
+    if base is None:
+        return 0
+    if base.get('configuracao') != configuracao:
+        print("Atenção: a base foi medida com outra configuração; a comparação pode não fazer sentido.")
+    if base.get('ambiente') != ambiente():
+        print("Atenção: a base foi medida em outra máquina ou versão do Python.")
+    linhas, regressoes = comparar(resultados, base['resultados'], argumentos.tolerancia)
+    print(f"\nComparação com {argumentos.comparar} (tolerância: {argumentos.tolerancia:.0%})")
+    print(f"{'Medição':<48} {'Base':>12} {'Agora':>12} {'Variação':>9}  Situação")
+    print("-" * 92)
+    for nome, antes, agora, variacao, situacao in linhas:
+        print(f"{descricoes[nome]:<48} {formatar_tempo(antes):>12} {formatar_tempo(agora):>12} {variacao:>+8.1%}  {situacao}")
+    if regressoes:
+        print(f"\n{len(regressoes)} regressão(ões): {', '.join(regressoes)}")
+        return 1
+    print("\nNenhuma regressão.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
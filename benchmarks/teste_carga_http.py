@@ -0,0 +1,132 @@
+"""
+Teste de carga do servidor HTTP (servidor_http.py) em localhost.
+
+Abre várias conexões simultâneas (keep-alive) e envia uma mistura de consultas,
+buscas, entradas/saídas e relatórios. Mostra requisições por segundo e latências p50/p99.
+
+Uso:
+    python benchmarks/teste_carga_http.py [--url http://127.0.0.1:8080] [--conexoes 50] [--duracao 10]
+    python benchmarks/teste_carga_http.py --iniciar-servidor --produtos 10000   (sobe um servidor temporário)
+
+Ao final, confere a consistência: nenhum produto com quantidade negativa.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+from comum import gerar_catalogo, resumir_latencias, PASTA_PROJETO
+
+import servico_estoque
+
+async def requisitar(leitor, escritor, metodo, caminho, corpo=None):
+    """Envia uma requisição na conexão aberta e retorna (status, objeto JSON)"""
+    dados = json.dumps(corpo).encode() if corpo is not None else b''
+    escritor.write(f"{metodo} {caminho} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(dados)}\r\n\r\n".encode() + dados)
+    await escritor.drain()
+    linha_status = await leitor.readline()
+    status = int(linha_status.split()[1])
+    tamanho = 0
+    while True:
+        linha = await leitor.readline()
+        if linha in (b'\r\n', b''):
+            break
+        if linha.lower().startswith(b'content-length:'):
+            tamanho = int(linha.split(b':')[1])
+    return status, json.loads(await leitor.readexactly(tamanho))
+
+def sortear_requisicao(aleatorio, maior_id):
+    """Mistura de operações: 50% consulta por ID, 30% saída/entrada, 10% busca, 10% relatórios"""
+    sorteio = aleatorio.random()
+    id_produto = aleatorio.randint(1, maior_id)
+    if sorteio < 0.5:
+        return 'GET', f"/produtos/{id_produto}", None
+    if sorteio < 0.65:
+        return 'POST', f"/produtos/{id_produto}/saida", {'quantidade': aleatorio.randint(1, 5)}
+    if sorteio < 0.8:
+        return 'POST', f"/produtos/{id_produto}/entrada", {'quantidade': aleatorio.randint(1, 5)}
+    if sorteio < 0.9:
+        return 'GET', f"/produtos?nome=teclado%20{aleatorio.randint(1, 99)}", None
+    if sorteio < 0.95:
+        return 'GET', "/relatorios/estoque", None
+    return 'GET', "/relatorios/baixo-estoque", None
+
+async def cliente(host, porta, maior_id, fim, latencias, contagem_status, semente):
+    aleatorio = random.Random(semente)
+    leitor, escritor = await asyncio.open_connection(host, porta)
+    try:
+        while time.perf_counter() < fim:
+            metodo, caminho, corpo = sortear_requisicao(aleatorio, maior_id)
+            inicio = time.perf_counter()
+            status, _ = await requisitar(leitor, escritor, metodo, caminho, corpo)
+            latencias.append(time.perf_counter() - inicio)
+            contagem_status[status] = contagem_status.get(status, 0) + 1
+    finally:
+        escritor.close()
+
+async def executar_carga(url, conexoes, duracao, maior_id):
+    partes = urlsplit(url)
+    latencias, contagem_status = [], {}
+    inicio = time.perf_counter()
+    fim = inicio + duracao
+    await asyncio.gather(*(cliente(partes.hostname, partes.port, maior_id, fim, latencias, contagem_status, semente)
+                           for semente in range(conexoes)))
+    tempo_total = time.perf_counter() - inicio
+
+    # Consistência: as saídas concorrentes nunca podem deixar estoque negativo
+    leitor, escritor = await asyncio.open_connection(partes.hostname, partes.port)
+    negativos = 0
+    for id_produto in range(1, min(maior_id, 2000) + 1):
+        status, produto = await requisitar(leitor, escritor, 'GET', f"/produtos/{id_produto}")
+        if status == 200 and produto['quantidade'] < 0:
+            negativos += 1
+    escritor.close()
+    return latencias, contagem_status, tempo_total, negativos
+
+def iniciar_servidor_temporario(pasta, quantidade_produtos, porta):
+    """Grava um catálogo sintético e sobe servidor_http.py em um subprocesso"""
+    servico_estoque.escrever_snapshot(os.path.join(pasta, 'produtos.json'), gerar_catalogo(quantidade_produtos))
+    processo = subprocess.Popen([sys.executable, os.path.join(PASTA_PROJETO, 'servidor_http.py'), '--porta', str(porta)],
+                                cwd=pasta, stdout=subprocess.PIPE, text=True)
+    processo.stdout.readline() # Espera a mensagem "Servidor de estoque ouvindo em ..."
+    return processo
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do servidor HTTP de estoque")
+    parser.add_argument('--url', default='http://127.0.0.1:8080')
+    parser.add_argument('--conexoes', type=int, default=50)
+    parser.add_argument('--duracao', type=float, default=10.0)
+    parser.add_argument('--maior-id', type=int, default=None, help="maior ID existente no servidor")
+    parser.add_argument('--iniciar-servidor', action='store_true')
+    parser.add_argument('--produtos', type=int, default=10_000, help="tamanho do catálogo do servidor temporário")
+    argumentos = parser.parse_args()
+
+    processo = None
+    with tempfile.TemporaryDirectory() as pasta:
+        if argumentos.iniciar_servidor:
+            processo = iniciar_servidor_temporario(pasta, argumentos.produtos, urlsplit(argumentos.url).port)
+        maior_id = argumentos.maior_id or argumentos.produtos
+        try:
+            latencias, contagem_status, tempo_total, negativos = asyncio.run(
+                executar_carga(argumentos.url, argumentos.conexoes, argumentos.duracao, maior_id))
+        finally:
+            if processo is not None:
+                processo.terminate()
+                processo.wait()
+
+    resumo = resumir_latencias(latencias)
+    print(f"Conexões: {argumentos.conexoes}, duração: {tempo_total:.1f} s")
+    print(f"Requisições: {len(latencias)} ({len(latencias) / tempo_total:,.0f} req/s)")
+    print(f"Latência p50: {resumo['p50_ms']:.2f} ms   p99: {resumo['p99_ms']:.2f} ms")
+    print(f"Status: {dict(sorted(contagem_status.items()))}")
+    print(f"Produtos com quantidade negativa: {negativos}")
+
+if __name__ == "__main__":
+    main()
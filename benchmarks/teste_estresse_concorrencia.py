@@ -0,0 +1,111 @@
+"""
+Teste de estresse: várias threads movimentando o mesmo estoque ao mesmo tempo.
+
+N threads fazem M entradas/saídas cada uma sobre poucos produtos (muita disputa)
+e cadastram produtos novos. Ao final confere que:
+- a quantidade de cada produto é exatamente a inicial + entradas - saídas bem-sucedidas;
+- nenhuma quantidade ficou negativa;
+- nenhum ID foi entregue duas vezes;
+- os totais acumulados batem com um recálculo completo.
+
+Uso:
+    python benchmarks/teste_estresse_concorrencia.py [threads] [movimentos_por_thread] [produtos]
+"""
+
+import random
+import sys
+import tempfile
+import threading
+
+from comum import gerar_catalogo, cronometrar, usar_pasta
+
+import servico_estoque as servico
+import agregados_estoque
+
+def trabalhador(semente, quantidade_movimentos, ids, deltas, ids_cadastrados, barreira):
+    """Faz movimentos aleatórios e guarda o saldo aplicado de cada produto (só os que deram certo)"""
+    aleatorio = random.Random(semente)
+    meus_deltas = {id_produto: 0 for id_produto in ids}
+    barreira.wait() # Todas as threads começam juntas
+    for numero in range(quantidade_movimentos):
+        id_produto = aleatorio.choice(ids)
+        quantidade = aleatorio.randint(1, 20)
+        if aleatorio.random() < 0.5:
+            servico.registrar_entrada(id_produto, quantidade)
+            meus_deltas[id_produto] += quantidade
+        else:
+            try:
+                servico.registrar_saida(id_produto, quantidade)
+                meus_deltas[id_produto] -= quantidade
+            except servico.EstoqueInsuficiente:
+                pass
+        if numero % 100 == 0:
+            ids_cadastrados.append(servico.cadastrar_produto(f"novo {semente}-{numero}", "estresse", 1, 1.0, 0)['id'])
+        if numero % 500 == 0:
+            servico.salvar_dados()
+    deltas.append(meus_deltas)
+
+def main():
+    quantidade_threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    movimentos_por_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+    quantidade_produtos = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    sys.setswitchinterval(1e-6) # Troca de thread o mais frequente possível, para provocar disputas
+
+    with tempfile.TemporaryDirectory() as pasta:
+        servico.MODO_PERSISTENCIA = 'journal'
+        usar_pasta(servico, pasta)
+        servico.escrever_snapshot(servico.ARQUIVO_DADOS, gerar_catalogo(quantidade_produtos))
+        servico.carregar_dados()
+        iniciais = {id_produto: produto['quantidade'] for id_produto, produto in servico.produtos.items()}
+        ids = list(iniciais)
+
+        deltas, ids_cadastrados = [], []
+        barreira = threading.Barrier(quantidade_threads)
+        threads = [threading.Thread(target=trabalhador,
+                                    args=(semente, movimentos_por_thread, ids, deltas, ids_cadastrados, barreira))
+                   for semente in range(quantidade_threads)]
+
+        def executar():
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        _, segundos = cronometrar(executar)
+        servico.salvar_dados()
+
+        erros = []
+        for id_produto in ids:
+            esperado = iniciais[id_produto] + sum(meus_deltas[id_produto] for meus_deltas in deltas)
+            obtido = servico.produtos[id_produto]['quantidade']
+            if obtido != esperado:
+                erros.append(f"Produto {id_produto}: esperado {esperado}, obtido {obtido}")
+            if obtido < 0:
+                erros.append(f"Produto {id_produto} com quantidade negativa: {obtido}")
+        if len(set(ids_cadastrados)) != len(ids_cadastrados):
+            erros.append("IDs duplicados no cadastro concorrente")
+        try:
+            agregados_estoque.verificar(servico.produtos)
+        except AssertionError as e:
+            erros.append(str(e))
+
+        # O que foi salvo também precisa bater com a memória
+        estado_memoria = {id_produto: dict(produto) for id_produto, produto in servico.produtos.items()}
+        servico.carregar_dados()
+        if servico.produtos != estado_memoria:
+            erros.append("Dados recarregados do disco diferentes dos dados em memória")
+        if servico.thread_compactacao is not None:
+            servico.thread_compactacao.join()
+
+    total = quantidade_threads * movimentos_por_thread
+    print(f"{quantidade_threads} threads x {movimentos_por_thread} movimentos ({total} no total) "
+          f"em {segundos:.2f} s ({total / segundos:,.0f} mov/s), {len(ids_cadastrados)} cadastros")
+    if erros:
+        print("FALHOU:")
+        for erro in erros:
+            print(f"  {erro}")
+        sys.exit(1)
+    print("OK: quantidades exatas, nenhuma negativa, IDs únicos, totais consistentes.")
+
+if __name__ == "__main__":
+    main()
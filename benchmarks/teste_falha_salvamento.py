@@ -0,0 +1,150 @@
+"""
+Teste de falha: mata o processo (SIGKILL) no meio dos salvamentos e confere o que ficou no disco.
+
+Em cada rodada um processo filho carrega o estoque e faz lotes de LOTE entradas de +1,
+cada lote seguido de um salvamento; depois de cada salvamento confirmado ele avisa o pai.
+O pai mata o filho num momento aleatório (muitas vezes no meio da gravação) e um processo novo
+recarrega os dados. Depois de cada morte:
+- os dados carregam sem erro (nenhum arquivo ficou pela metade);
+- nada do que foi confirmado se perdeu (total de entradas >= entradas confirmadas);
+- os salvamentos são atômicos: o total de entradas gravadas é múltiplo de LOTE
+  (no cenário com salvamento agrupado, só as duas primeiras verificações valem).
+
+Uso:
+    python benchmarks/teste_falha_salvamento.py [rodadas_por_cenario] [quantidade_produtos]   (padrão: 15 20000)
+"""
+
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from comum import gerar_catalogo
+
+import servico_estoque as servico
+
+LOTE = 10
+# (nome, modo, formato, intervalo de agrupamento, limite do journal em bytes)
+CENARIOS = [
+    ('completo/json', 'completo', 'json', 0, None),
+    ('completo/binario', 'completo', 'binario', 0, None),
+    ('journal', 'journal', 'json', 0, None),
+    ('journal+compactacao', 'journal', 'json', 0, 32 * 1024),
+    ('journal agrupado', 'journal', 'json', 0.005, 32 * 1024),
+]
+
+def configurar(modo, formato, intervalo, limite):
+    servico.MODO_PERSISTENCIA = modo
+    servico.FORMATO_SNAPSHOT = formato
+    servico.INTERVALO_AGRUPAMENTO = float(intervalo)
+    if limite not in (None, 'None'):
+        servico.LIMITE_JOURNAL_BYTES = int(limite)
+
+def total_em_estoque():
+    return sum(produto['quantidade'] for produto in servico.produtos.values())
+
+def executar_filho(configuracao):
+    """Processo filho: faz lotes de entradas e avisa cada salvamento confirmado, até ser morto"""
+    configurar(*configuracao)
+    servico.carregar_dados()
+    print(f"inicio {total_em_estoque()}", flush=True)
+    aleatorio = random.Random(os.getpid())
+    ids = list(servico.produtos)
+    confirmadas = 0
+    while True:
+        for _ in range(LOTE):
+            servico.registrar_entrada(aleatorio.choice(ids), 1)
+            if servico.INTERVALO_AGRUPAMENTO > 0:
+                servico.agendar_salvamento() # Gravação em segundo plano, em grupos de tamanho variável
+        if servico.INTERVALO_AGRUPAMENTO > 0:
+            servico.descarregar_salvamentos() # Confirmação: tudo até aqui está no disco
+        else:
+            servico.salvar_dados()
+        confirmadas += LOTE
+        print(f"ok {confirmadas}", flush=True)
+
+def executar_verificacao(configuracao):
+    """Processo novo que só recarrega os dados e informa o total"""
+    configurar(*configuracao)
+    servico.carregar_dados()
+    print(json.dumps({'total': total_em_estoque(), 'produtos': len(servico.produtos)}))
+
+def rodada(configuracao, pasta, atraso):
+    """Inicia o filho, mata depois de 'atraso' segundos e verifica; retorna (inicio, confirmadas, total, morte_no_meio)"""
+    argumentos = [sys.executable, os.path.abspath(__file__), '--filho', *map(str, configuracao)]
+    filho = subprocess.Popen(argumentos, cwd=pasta, stdout=subprocess.PIPE, text=True)
+    linhas = []
+    leitor = threading.Thread(target=lambda: linhas.extend(filho.stdout))
+    leitor.start()
+    time.sleep(atraso)
+    filho.send_signal(signal.SIGKILL)
+    filho.wait()
+    leitor.join()
+
+    # Sinais de que a morte aconteceu durante uma gravação
+    morte_no_meio = any(nome.endswith('.tmp') for nome in os.listdir(pasta))
+    caminho_journal = os.path.join(pasta, servico.ARQUIVO_JOURNAL)
+    if os.path.exists(caminho_journal) and os.path.getsize(caminho_journal):
+        with open(caminho_journal, 'rb') as arquivo:
+            arquivo.seek(-1, os.SEEK_END)
+            morte_no_meio = morte_no_meio or arquivo.read(1) != b'\n'
+
+    inicio = next((int(linha.split()[1]) for linha in linhas if linha.startswith('inicio')), None)
+    confirmadas = max((int(linha.split()[1]) for linha in linhas if linha.startswith('ok')), default=0)
+    verificacao = subprocess.run([sys.executable, os.path.abspath(__file__), '--verificar', *map(str, configuracao)],
+                                 cwd=pasta, capture_output=True, text=True)
+    if verificacao.returncode != 0:
+        raise AssertionError(f"dados não carregam depois da falha:\n{verificacao.stderr}")
+    return inicio, confirmadas, json.loads(verificacao.stdout)['total'], morte_no_meio
+
+def main():
+    rodadas = int(sys.argv[1]) if len(sys.argv) > 1 else 15
+    quantidade_produtos = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    aleatorio = random.Random(11)
+    catalogo = gerar_catalogo(quantidade_produtos)
+
+    print(f"{'Cenário':<22} {'Rodadas':>8} {'Mortes na gravação':>19} {'Lotes confirmados':>18} {'Resultado':>10}")
+    print("-" * 81)
+    falhas = 0
+    for nome, *configuracao in CENARIOS:
+        with tempfile.TemporaryDirectory() as pasta:
+            servico.escrever_snapshot(os.path.join(pasta, servico.ARQUIVO_DADOS), catalogo)
+            total_anterior = sum(produto['quantidade'] for produto in catalogo.values())
+            mortes_no_meio = lotes = 0
+            erros = []
+            for numero in range(rodadas):
+                try:
+                    inicio, confirmadas, total, morte_no_meio = rodada(configuracao, pasta, aleatorio.uniform(0.3, 1.5))
+                except AssertionError as e:
+                    erros.append(f"rodada {numero + 1}: {e}")
+                    break
+                mortes_no_meio += morte_no_meio
+                lotes += confirmadas // LOTE
+                if inicio is None:
+                    continue # Morreu antes de terminar de carregar: nada foi alterado
+                if inicio != total_anterior:
+                    erros.append(f"rodada {numero + 1}: filho começou com {inicio}, esperado {total_anterior}")
+                gravadas = total - inicio
+                if gravadas < confirmadas:
+                    erros.append(f"rodada {numero + 1}: {confirmadas} entradas confirmadas, só {gravadas} no disco")
+                if configuracao[2] == 0 and gravadas % LOTE:
+                    erros.append(f"rodada {numero + 1}: lote gravado pela metade ({gravadas} entradas)")
+                total_anterior = total
+        falhas += bool(erros)
+        print(f"{nome:<22} {rodadas:>8} {mortes_no_meio:>19} {lotes:>18} {'OK' if not erros else 'FALHOU':>10}")
+        for erro in erros:
+            print(f"    {erro}")
+    sys.exit(1 if falhas else 0)
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ['--filho']:
+        executar_filho(sys.argv[2:])
+    elif sys.argv[1:2] == ['--verificar']:
+        executar_verificacao(sys.argv[2:])
+    else:
+        main()
@@ -0,0 +1,152 @@
+"""
+Importação do catálogo de fornecedores em lote (upsert) para o Sistema de Gerenciamento de Estoque
+
+Lê um arquivo CSV ou JSONL com dezenas de milhares de produtos e valida tudo antes de alterar o estoque.
+Cada linha válida atualiza o produto com a mesma chave natural (nome + categoria, sem diferenciar
+maiúsculas e acentos: ver indice_busca.normalizar) ou cadastra um produto novo (ver servico_estoque.importar_catalogo).
+
+Formato do arquivo (a coluna 'deposito' é opcional: só no modo 'particionado' por depósito):
+- CSV, com cabeçalho:     nome,categoria,quantidade,preco,estoque_minimo
+                          Café Pilão 500g,alimentos,40,18.90,10
+- JSONL, um por linha:    {"nome": "Café Pilão 500g", "categoria": "alimentos", "quantidade": 40, "preco": 18.9,
+                           "estoque_minimo": 10}
+
+O arquivo é lido aos poucos, em blocos de LINHAS_POR_BLOCO linhas. Cada bloco é convertido e validado
+num processo separado (até PROCESSOS processos, com no máximo 2 blocos por processo em andamento),
+com as mesmas regras do cadastro (servico_estoque.validar_inteiro_nao_negativo e validar_preco).
+Se a mesma chave aparece em mais de uma linha, vale a última.
+"""
+
+import csv
+import itertools
+import json
+import os
+from collections import deque
+
+import indice_busca
+import pool_processos
+
+CAMPOS_OBRIGATORIOS = ('nome', 'categoria', 'quantidade', 'preco', 'estoque_minimo')
+CAMPOS_ARQUIVO = CAMPOS_OBRIGATORIOS + ('deposito',)
+LINHAS_POR_BLOCO = 5000
+# Processos da validação (1 = tudo no próprio processo, sem pool; ver pool_processos.py)
+PROCESSOS = os.cpu_count() or 1
+
+def ler_linhas(caminho):
+    """
+    Lê o arquivo aos poucos e gera (número da linha, valores ainda como vieram do arquivo):
+    no CSV, uma tupla na ordem de CAMPOS_ARQUIVO; no JSONL, o texto da linha (convertido no processo da validação).
+    """
+    with open(caminho, 'r', encoding='utf-8', newline='') as arquivo:
+        if caminho.lower().endswith('.jsonl'):
+            for numero_linha, linha in enumerate(arquivo, start=1):
+                if linha.strip(): # Ignora linhas em branco
+                    yield numero_linha, linha
+        else:
+            leitor = csv.reader(arquivo)
+            cabecalho = [coluna.strip().lower() for coluna in next(leitor, [])]
+            faltando = [campo for campo in CAMPOS_OBRIGATORIOS if campo not in cabecalho]
+            if faltando:
+                raise ValueError(f"O CSV precisa de um cabeçalho com as colunas {', '.join(CAMPOS_OBRIGATORIOS)} "
+                                 f"(faltando: {', '.join(faltando)}).")
+            posicoes = [cabecalho.index(campo) if campo in cabecalho else None for campo in CAMPOS_ARQUIVO]
+            for numero_linha, colunas in enumerate(leitor, start=2): # Linha 1 é o cabeçalho
+                if not colunas:
+                    continue
+                yield numero_linha, tuple(colunas[posicao] if posicao is not None and posicao < len(colunas) else None
+                                          for posicao in posicoes)
+
+def ler_blocos(caminho):
+    """Listas de até LINHAS_POR_BLOCO itens de ler_linhas()"""
+    bloco = []
+    for item in ler_linhas(caminho):
+        bloco.append(item)
+        if len(bloco) == LINHAS_POR_BLOCO:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+def converter_numero(valor, tipo, descricao, servico):
+    """Texto do CSV -> int/float; números do JSON passam direto (a validação do serviço confere o tipo)"""
+    if not isinstance(valor, str):
+        return valor
+    try:
+        return tipo(valor.strip())
+    except ValueError:
+        raise servico.ValorInvalido(f"{descricao} deve ser um número{' inteiro' if tipo is int else ''}.")
+
+def validar_bloco(bloco):
+    """
+    Converte e valida um bloco de linhas (roda num processo da validação).
+    Retorna (válidas, rejeitadas):
+        válidas    = [(número da linha, chave, nome, categoria, quantidade, preco, estoque_minimo, deposito), ...]
+        rejeitadas = [(número da linha, motivo), ...]
+    """
+    import servico_estoque as servico # Mesmas regras do cadastro (importado aqui: servico_estoque importa este módulo)
+    validas = []
+    rejeitadas = []
+    for numero_linha, bruto in bloco:
+        try:
+            if isinstance(bruto, str):
+                try:
+                    registro = json.loads(bruto)
+                    bruto = tuple(registro.get(campo) for campo in CAMPOS_ARQUIVO)
+                except (json.JSONDecodeError, AttributeError):
+                    raise servico.ValorInvalido("Linha inválida (JSON).")
+            nome, categoria, quantidade, preco, estoque_minimo, deposito = bruto
+            nome = str(nome).strip() if nome is not None else ''
+            categoria = str(categoria).strip() if categoria is not None else ''
+            if not nome or not categoria:
+                raise servico.ValorInvalido("Nome e categoria são obrigatórios.")
+            quantidade = servico.validar_inteiro_nao_negativo(
+                converter_numero(quantidade, int, "Quantidade", servico), "Quantidade")
+            preco = servico.validar_preco(converter_numero(preco, float, "Preço", servico))
+            estoque_minimo = servico.validar_inteiro_nao_negativo(
+                converter_numero(estoque_minimo, int, "Estoque mínimo", servico), "Estoque mínimo")
+            if deposito is not None:
+                deposito = str(deposito).strip() or None # Coluna vazia = sem depósito
+        except servico.ValorInvalido as e:
+            rejeitadas.append((numero_linha, str(e)))
+            continue
+        chave = (indice_busca.normalizar(nome), indice_busca.normalizar(categoria))
+        validas.append((numero_linha, chave, nome, categoria, quantidade, preco, estoque_minimo, deposito))
+    return validas, rejeitadas
+
+def validar_em_blocos(caminho):
+    """Resultados de validar_bloco() para cada bloco do arquivo, na ordem do arquivo"""
+    blocos = ler_blocos(caminho)
+    primeiro = next(blocos, None)
+    if primeiro is None:
+        return
+    if PROCESSOS <= 1 or len(primeiro) < LINHAS_POR_BLOCO:
+        # Sem pool (ou arquivo de um bloco só, em que iniciar os processos custaria mais que validar)
+        yield validar_bloco(primeiro)
+        for bloco in blocos:
+            yield validar_bloco(bloco)
+        return
+    pool = pool_processos.obter('catalogo_lote', PROCESSOS)
+    em_andamento = deque()
+    for bloco in itertools.chain([primeiro], blocos):
+        em_andamento.append(pool.submit(validar_bloco, bloco))
+        if len(em_andamento) >= 2 * PROCESSOS: # Limita a memória: o arquivo não é lido inteiro antes da validação
+            yield em_andamento.popleft().result()
+    while em_andamento:
+        yield em_andamento.popleft().result()
+
+def validar_arquivo(caminho):
+    """
+    Valida o arquivo inteiro. Retorna:
+        {'linhas': int, 'por_chave': {chave: linha válida (a última com essa chave)},
+         'repetidas': linhas substituídas por outra com a mesma chave, 'rejeitadas': [(número da linha, motivo), ...]}
+    """
+    por_chave = {}
+    rejeitadas = []
+    linhas = 0
+    for validas, rejeitadas_bloco in validar_em_blocos(caminho):
+        linhas += len(validas) + len(rejeitadas_bloco)
+        rejeitadas.extend(rejeitadas_bloco)
+        for linha in validas:
+            por_chave[linha[1]] = linha
+    repetidas = linhas - len(rejeitadas) - len(por_chave)
+    return {'linhas': linhas, 'por_chave': por_chave, 'repetidas': repetidas, 'rejeitadas': rejeitadas}
@@ -0,0 +1,313 @@
+"""
+Linha de comando do Sistema de Gerenciamento de Estoque
+
+Executa uma operação sem o menu interativo, para uso em scripts:
+    python cli_estoque.py cadastrar --nome "ps5" --categoria games --quantidade 10 --preco 3999.90 --estoque-minimo 2
+    python cli_estoque.py entrada --id 1 --quantidade 5
+    python cli_estoque.py saida --id 1 --quantidade 3
+    python cli_estoque.py buscar --nome ps
+    python cli_estoque.py importar-catalogo fornecedor.csv --json   (cadastra ou atualiza pelo nome + categoria)
+    python cli_estoque.py buscar --nome tecaldo --aproximado   (tolera erros de digitação)
+    python cli_estoque.py relatorio-baixo-estoque --json
+    python cli_estoque.py analise --top 5 --json
+    python cli_estoque.py reposicao --prazo 10 --limite 20   (consumo diário, dias de cobertura e quanto pedir)
+    python cli_estoque.py historico --id 1 --dias 30
+    python cli_estoque.py totais-diarios --dias 7
+    python cli_estoque.py exportar estoque --ordenar valor --decrescente --limite 20
+    python cli_estoque.py exportar produtos --formato-saida csv --saida produtos.csv
+    python cli_estoque.py --metricas metricas.prom relatorio-baixo-estoque   (contadores e latências da execução)
+    python cli_estoque.py --perfil analise.prof analise                      (cProfile da operação, resumo na saída de erro)
+    python cli_estoque.py --modo particionado --particoes depositos cadastrar --nome "tv" --categoria eletro \
+        --quantidade 4 --preco 2500 --estoque-minimo 1 --deposito norte
+
+(também funciona como "python atividade_final_dict.py <comando> ...")
+
+Código de saída: 0 = sucesso, 1 = erro de regra de negócio (mensagem na saída de erro), 2 = argumentos inválidos.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import catalogo_lote
+import instrumentacao
+import relatorios
+import servico_estoque as servico
+from produto import para_json
+
+def criar_parser():
+    """Monta os subcomandos e as opções"""
+    # Opções gerais: aceitas antes ou depois do subcomando (SUPPRESS evita que o subcomando apague o valor)
+    opcoes_gerais = argparse.ArgumentParser(add_help=False)
+    opcoes_gerais.add_argument('--modo', choices=('completo', 'journal', 'sqlite', 'particionado'), default=argparse.SUPPRESS,
+                               help="modo de persistência")
+    opcoes_gerais.add_argument('--dados', default=argparse.SUPPRESS,
+                               help="arquivo JSON de produtos; o journal, o .bin e o histórico ficam ao lado (padrão: produtos.json)")
+    opcoes_gerais.add_argument('--banco', default=argparse.SUPPRESS, help="arquivo do banco no modo sqlite (padrão: produtos.db)")
+    opcoes_gerais.add_argument('--particoes', default=argparse.SUPPRESS,
+                               help="pasta das partições no modo particionado (padrão: particoes)")
+    opcoes_gerais.add_argument('--formato', choices=('json', 'binario'), default=argparse.SUPPRESS,
+                               help="formato do snapshot gravado (padrão: json)")
+    opcoes_gerais.add_argument('--metricas', default=argparse.SUPPRESS,
+                               help="mede as operações e grava as métricas no arquivo (.json, ou .prom para o Prometheus)")
+    opcoes_gerais.add_argument('--perfil', default=argparse.SUPPRESS,
+                               help="executa o comando sob o cProfile e grava o perfil no arquivo")
+    opcoes_gerais.add_argument('--json', action='store_true', default=argparse.SUPPRESS, help="imprime o resultado em JSON")
+
+    parser = argparse.ArgumentParser(prog='cli_estoque', description="Sistema de Gerenciamento de Estoque",
+                                     parents=[opcoes_gerais])
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    def novo_comando(nome, ajuda):
+        return subparsers.add_parser(nome, help=ajuda, parents=[opcoes_gerais])
+
+    cadastrar = novo_comando('cadastrar', "cadastra um novo produto")
+    cadastrar.add_argument('--nome', required=True)
+    cadastrar.add_argument('--categoria', required=True)
+    cadastrar.add_argument('--quantidade', type=int, required=True)
+    cadastrar.add_argument('--preco', type=float, required=True)
+    cadastrar.add_argument('--estoque-minimo', type=int, required=True)
+    cadastrar.add_argument('--deposito', help="depósito do produto (modo particionado por depósito)")
+
+    remover = novo_comando('remover', "remove um produto")
+    remover.add_argument('--id', type=int, required=True)
+
+    editar = novo_comando('editar', "edita os campos informados de um produto")
+    editar.add_argument('--id', type=int, required=True)
+    editar.add_argument('--nome')
+    editar.add_argument('--categoria')
+    editar.add_argument('--quantidade', type=int)
+    editar.add_argument('--preco', type=float)
+    editar.add_argument('--estoque-minimo', type=int)
+
+    for nome, ajuda in (('entrada', "registra entrada de produtos"), ('saida', "registra saída de produtos")):
+        movimento = novo_comando(nome, ajuda)
+        movimento.add_argument('--id', type=int, required=True)
+        movimento.add_argument('--quantidade', type=int, required=True)
+
+    lote = novo_comando('lote', "importa movimentações de um arquivo CSV/JSONL")
+    lote.add_argument('arquivo')
+    lote.add_argument('--atomico', action='store_true', help="cancela o lote inteiro se alguma linha for inválida")
+
+    importar = novo_comando('importar-catalogo', "cadastra ou atualiza produtos a partir de um catálogo CSV/JSONL")
+    importar.add_argument('arquivo')
+    importar.add_argument('--atomico', action='store_true', help="cancela a importação se alguma linha for inválida")
+    importar.add_argument('--processos', type=int, help="processos da validação (padrão: núcleos da máquina)")
+
+    buscar = novo_comando('buscar', "consulta produtos por ID, nome ou categoria")
+    criterio = buscar.add_mutually_exclusive_group(required=True)
+    criterio.add_argument('--id', type=int)
+    criterio.add_argument('--nome')
+    criterio.add_argument('--categoria')
+    buscar.add_argument('--aproximado', action='store_true',
+                        help="busca tolerante a erros de digitação, do mais para o menos parecido")
+    buscar.add_argument('--limite', type=int, default=10, help="resultados da busca aproximada (padrão: 10)")
+
+    novo_comando('listar', "lista todos os produtos")
+    novo_comando('relatorio-estoque', "valor total em estoque")
+    novo_comando('relatorio-baixo-estoque', "produtos abaixo do estoque mínimo")
+    analise = novo_comando('analise', "valor por categoria, maiores valores em estoque e falta total")
+    analise.add_argument('--top', type=int, default=10, help="quantidade de produtos em 'maiores valores' (padrão: 10)")
+
+    reposicao = novo_comando('reposicao', "produtos a pedir: consumo diário, dias de cobertura e quantidade sugerida")
+    reposicao.add_argument('--id', type=int, help="previsão de um produto só (mesmo que não seja hora de pedir)")
+    reposicao.add_argument('--prazo', type=float, help="dias até o pedido chegar (padrão: 7)")
+    reposicao.add_argument('--cobertura', type=float, help="dias de consumo que o pedido deve cobrir (padrão: 14)")
+    reposicao.add_argument('--limite', type=int, help="só os N mais urgentes (padrão: todos)")
+
+    historico = novo_comando('historico', "movimentações de um produto")
+    historico.add_argument('--id', type=int, required=True)
+    historico.add_argument('--dias', type=int, help="só os últimos N dias (padrão: todo o histórico)")
+    totais_diarios = novo_comando('totais-diarios', "entradas e saídas por dia e categoria")
+    totais_diarios.add_argument('--dias', type=int, help="só os últimos N dias (padrão: todo o histórico)")
+
+    exportar = novo_comando('exportar', "relatório em páginas ou completo, em texto, CSV ou JSONL")
+    exportar.add_argument('relatorio', choices=tuple(relatorios.COLUNAS))
+    exportar.add_argument('--ordenar', help="coluna da ordenação (ex.: valor, nome, quantidade)")
+    exportar.add_argument('--decrescente', action='store_true', help="do maior para o menor")
+    exportar.add_argument('--limite', type=int, help="linhas por página (padrão: relatório completo)")
+    exportar.add_argument('--pagina', type=int, default=1, help="número da página (com --limite)")
+    exportar.add_argument('--cursor', help="continua depois da página anterior (cursor mostrado ao final dela)")
+    exportar.add_argument('--formato-saida', choices=relatorios.FORMATOS, default='texto')
+    exportar.add_argument('--saida', help="arquivo de saída (padrão: tela)")
+    return parser
+
+def inicio_periodo(dias):
+    """Momento de N dias atrás (None = sem limite)"""
+    return None if dias is None else time.time() - dias * 86400
+
+def arredondar_plano(plano):
+    """Plano de reposição com as estimativas arredondadas para exibição"""
+    dias_cobertura = plano['dias_cobertura']
+    return dict(plano, consumo_diario=round(plano['consumo_diario'], 3), ponto_pedido=round(plano['ponto_pedido'], 2),
+                dias_cobertura=None if dias_cobertura is None else round(dias_cobertura, 1))
+
+def executar(argumentos):
+    """Executa o comando e retorna o resultado (dicionário/lista pronto para JSON)"""
+    comando = argumentos.comando
+    if comando == 'cadastrar':
+        return servico.cadastrar_produto(argumentos.nome, argumentos.categoria, argumentos.quantidade,
+                                         argumentos.preco, argumentos.estoque_minimo, argumentos.deposito)
+    if comando == 'remover':
+        return servico.remover_produto(argumentos.id)
+    if comando == 'editar':
+        return servico.editar_produto(argumentos.id, nome=argumentos.nome, categoria=argumentos.categoria,
+                                      quantidade=argumentos.quantidade, preco=argumentos.preco,
+                                      estoque_minimo=argumentos.estoque_minimo)
+    if comando == 'entrada':
+        return servico.registrar_entrada(argumentos.id, argumentos.quantidade)
+    if comando == 'saida':
+        produto_dict = servico.registrar_saida(argumentos.id, argumentos.quantidade)
+        return dict(produto_dict, abaixo_do_minimo=servico.produto_abaixo_do_minimo(argumentos.id))
+    if comando == 'lote':
+        resumo = servico.aplicar_movimentacoes_lote(argumentos.arquivo, argumentos.atomico)
+        resumo['rejeitadas'] = [{'linha': linha, 'motivo': motivo} for linha, motivo in resumo['rejeitadas']]
+        del resumo['movimentos'] # Um item por linha aplicada: consulte com o comando 'historico'
+        return resumo
+    if comando == 'importar-catalogo':
+        if argumentos.processos is not None:
+            catalogo_lote.PROCESSOS = argumentos.processos
+        resumo = servico.importar_catalogo(argumentos.arquivo, argumentos.atomico)
+        resumo['rejeitadas'] = [{'linha': linha, 'motivo': motivo} for linha, motivo in resumo['rejeitadas']]
+        del resumo['ids_cadastrados'] # Um item por produto novo: consulte com 'buscar'
+        return resumo
+    if comando == 'buscar':
+        if argumentos.id is not None:
+            produto_dict = servico.buscar_produto_por_id(argumentos.id)
+            if produto_dict is None:
+                raise servico.ProdutoNaoEncontrado(argumentos.id)
+            return [produto_dict]
+        campo, texto = ('nome', argumentos.nome) if argumentos.nome is not None else ('categoria', argumentos.categoria)
+        if argumentos.aproximado:
+            return [dict(produto_dict, semelhanca=round(semelhanca, 3))
+                    for produto_dict, semelhanca in servico.buscar_aproximado(campo, texto, argumentos.limite)]
+        return servico.buscar_por_nome(texto) if campo == 'nome' else servico.buscar_por_categoria(texto)
+    if comando == 'listar':
+        return servico.listar_produtos()
+    if comando == 'relatorio-estoque':
+        totais = servico.obter_totais()
+        totais['valor_total'] = str(totais['valor_total']) # Decimal -> texto, sem perder casas decimais
+        return totais
+    if comando == 'relatorio-baixo-estoque':
+        return [dict(produto_dict, necessario_repor=necessario)
+                for produto_dict, necessario in servico.relatorio_baixo_estoque()]
+    if comando == 'analise':
+        analise = servico.analisar_estoque(argumentos.top)
+        # Decimal -> texto, como em relatorio-estoque
+        analise['valor_total'] = str(analise['valor_total'])
+        for totais in analise['por_categoria'].values():
+            totais['valor'] = str(totais['valor'])
+        analise['maiores_valores'] = [dict(produto_dict, valor=str(valor)) for produto_dict, valor in analise['maiores_valores']]
+        return analise
+    if comando == 'reposicao':
+        if argumentos.id is not None:
+            plano = servico.previsao_reposicao(argumentos.id, argumentos.prazo, argumentos.cobertura)
+            return dict(id=argumentos.id, **arredondar_plano(plano))
+        return [dict(produto_dict, **arredondar_plano(plano)) for produto_dict, plano in
+                servico.planejar_reposicao(argumentos.limite, argumentos.prazo, argumentos.cobertura)]
+    if comando == 'historico':
+        movimentos = servico.consultar_movimentos(argumentos.id, inicio_periodo(argumentos.dias))
+        for movimento in movimentos:
+            movimento['momento'] = datetime.fromtimestamp(movimento['momento']).isoformat(sep=' ', timespec='seconds')
+        return movimentos
+    if comando == 'totais-diarios':
+        return [dict(data=data, categoria=categoria, **totais)
+                for data, por_categoria in servico.totais_diarios_por_categoria(inicio_periodo(argumentos.dias)).items()
+                for categoria, totais in por_categoria.items()]
+    if comando == 'exportar':
+        return exportar_relatorio(argumentos)
+    raise ValueError(f"Comando desconhecido: {comando}")
+
+def exportar_relatorio(argumentos):
+    """
+    Grava o relatório (uma página, com --limite/--cursor/--pagina, ou inteiro) direto na saída, em blocos.
+    Retorna o resumo (linhas gravadas e cursor da próxima página), que vai para a saída de erro
+    quando as linhas vão para a tela, para não se misturar ao CSV/JSONL.
+    """
+    if argumentos.limite is None and (argumentos.cursor is not None or argumentos.pagina != 1):
+        raise ValueError("--cursor e --pagina precisam de --limite.")
+    arquivo = sys.stdout if argumentos.saida is None else open(argumentos.saida, 'w', encoding='utf-8', newline='')
+    try:
+        if argumentos.limite is None:
+            linhas = servico.exportar_relatorio(argumentos.relatorio, arquivo, argumentos.formato_saida,
+                                                argumentos.ordenar, argumentos.decrescente)
+            return {'linhas': linhas}
+        pagina, proximo_cursor = servico.pagina_relatorio(argumentos.relatorio, argumentos.ordenar, argumentos.decrescente,
+                                                          argumentos.limite, argumentos.cursor, argumentos.pagina)
+        linhas = relatorios.escrever(argumentos.relatorio, pagina, arquivo, argumentos.formato_saida)
+        return {'linhas': linhas, 'proximo_cursor': proximo_cursor}
+    finally:
+        if arquivo is not sys.stdout:
+            arquivo.close()
+
+COMANDOS_QUE_ALTERAM = ('cadastrar', 'remover', 'editar', 'entrada', 'saida', 'lote', 'importar-catalogo')
+
+def imprimir(resultado, em_json, arquivo=None):
+    """Mostra o resultado em JSON ou em texto simples (uma linha por produto)"""
+    if em_json:
+        print(json.dumps(resultado, ensure_ascii=False, default=para_json), file=arquivo)
+    elif isinstance(resultado, list):
+        for item in resultado:
+            print(" | ".join(f"{chave}: {valor}" for chave, valor in item.items()), file=arquivo)
+    else:
+        for chave, valor in resultado.items():
+            print(f"{chave}: {valor}", file=arquivo)
+
+def main(argv=None):
+    """Ponto de entrada; retorna o código de saída"""
+    argumentos = criar_parser().parse_args(argv)
+    if getattr(argumentos, 'modo', None):
+        servico.MODO_PERSISTENCIA = argumentos.modo
+    if getattr(argumentos, 'dados', None):
+        servico.ARQUIVO_DADOS = argumentos.dados
+        base = os.path.splitext(argumentos.dados)[0] # Só a extensão do arquivo (não um ponto no nome da pasta)
+        servico.ARQUIVO_JOURNAL = base + '.journal'
+        servico.ARQUIVO_META = base + '.meta.json'
+        servico.ARQUIVO_BINARIO = base + '.bin'
+    if getattr(argumentos, 'banco', None):
+        servico.ARQUIVO_BANCO = argumentos.banco
+    if getattr(argumentos, 'particoes', None):
+        servico.PASTA_PARTICOES = argumentos.particoes
+    # O histórico fica ao lado do catálogo informado (produtos.historico/): dois catálogos não dividem o mesmo histórico
+    catalogo = {'sqlite': getattr(argumentos, 'banco', None),
+                'particionado': getattr(argumentos, 'particoes', None)}.get(servico.MODO_PERSISTENCIA,
+                                                                           getattr(argumentos, 'dados', None))
+    if catalogo:
+        servico.PASTA_HISTORICO = os.path.splitext(catalogo.rstrip('/\\'))[0] + '.historico'
+    if getattr(argumentos, 'formato', None):
+        servico.FORMATO_SNAPSHOT = argumentos.formato
+
+    arquivo_metricas = getattr(argumentos, 'metricas', None)
+    if arquivo_metricas:
+        servico.ativar_instrumentacao() # Antes de carregar: a carga também é medida
+
+    try:
+        servico.carregar_dados()
+        if getattr(argumentos, 'perfil', None):
+            resultado, relatorio_perfil = instrumentacao.perfilar(executar, argumentos, caminho=argumentos.perfil)
+            print(relatorio_perfil, file=sys.stderr)
+        else:
+            resultado = executar(argumentos)
+        if argumentos.comando in COMANDOS_QUE_ALTERAM:
+            servico.salvar_dados()
+    except servico.ErroEstoque as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    except (OSError, ValueError) as e:
+        print(f"Erro: {str(e)}", file=sys.stderr)
+        return 1
+    finally:
+        if arquivo_metricas:
+            instrumentacao.exportar(arquivo_metricas) # Também quando o comando falhou (os erros entram nas métricas)
+    if argumentos.comando == 'exportar' and argumentos.saida is None:
+        sys.stdout.flush()
+        imprimir(resultado, True, sys.stderr)
+    else:
+        imprimir(resultado, getattr(argumentos, 'json', False))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
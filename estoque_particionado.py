@@ -0,0 +1,402 @@
+"""
+Estoque particionado para o Sistema de Gerenciamento de Estoque
+
+Com um único dicionário e um único arquivo, o estoque fica preso a um local e a um núcleo do processador.
+Aqui o catálogo é dividido em partições, cada uma com o seu arquivo (snapshot binário, ver snapshot_binario.py):
+- critério 'id': N partições, o produto vai para a partição (id - 1) % N;
+- critério 'deposito': uma partição por depósito (ex.: 'centro', 'norte'), escolhida no cadastro.
+
+IDs: a partição k (de 0 a N-1) entrega os IDs k+1, k+1+N, k+1+2N, ... Cada partição tem o seu próximo ID
+(no lugar do proximo_id_disponivel único) e mesmo assim nenhum ID se repete entre partições;
+o próprio ID diz em que partição o produto está, sem nenhuma tabela de consulta.
+O número de partições é fixado na criação (gravado no manifesto, ARQUIVO_MANIFESTO).
+
+Relatórios: valor em estoque, baixo estoque e busca por categoria (ou nome) rodam em paralelo,
+um processo por partição (ProcessPoolExecutor com até PROCESSOS processos); cada processo lê
+os registros direto do arquivo da partição, sem montar os objetos Produto, e os resultados
+parciais são juntados aqui. Os relatórios não gravam nada: uma partição com alterações ainda não gravadas
+(o serviço grava em salvar_dados) vai para o processo já codificada, direto da memória.
+Cada partição grava também as chaves de busca (textos normalizados, ver snapshot_binario.py):
+as buscas comparam a consulta com elas, sem normalizar o catálogo a cada consulta.
+
+Criar ou dividir um catálogo existente:
+    python estoque_particionado.py criar [pasta] [quantidade_particoes]
+    python estoque_particionado.py criar [pasta] --depositos centro,norte,sul
+    python estoque_particionado.py dividir [produtos.json] [pasta] [quantidade_particoes]
+"""
+
+import heapq
+import itertools
+import json
+import os
+import sys
+from collections.abc import MutableMapping
+from decimal import Decimal
+from operator import attrgetter
+
+import gravacao_atomica
+import indice_busca
+import pool_processos
+import snapshot_binario
+
+ARQUIVO_MANIFESTO = 'particoes.json'
+VERSAO_MANIFESTO = 1
+CRITERIOS = ('id', 'deposito')
+QUANTIDADE_PADRAO = 4
+
+# Processos dos relatórios (1 = tudo no próprio processo, sem pool; ver pool_processos.py)
+PROCESSOS = os.cpu_count() or 1
+
+def caminho_manifesto(pasta):
+    return os.path.join(pasta, ARQUIVO_MANIFESTO)
+
+def caminho_particao(pasta, posicao):
+    return os.path.join(pasta, f"particao_{posicao}.bin")
+
+def primeiro_id_livre(posicao, quantidade_particoes, minimo=1):
+    """Menor ID da partição (posicao + 1, + quantidade_particoes, ...) que seja >= minimo"""
+    primeiro = posicao + 1
+    if minimo <= primeiro:
+        return primeiro
+    return primeiro + -(-(minimo - primeiro) // quantidade_particoes) * quantidade_particoes
+
+# --- Criação ---
+
+def gravar_manifesto(pasta, criterio, nomes):
+    with gravacao_atomica.arquivo_atomico(caminho_manifesto(pasta)) as arquivo:
+        json.dump({'versao': VERSAO_MANIFESTO, 'criterio': criterio, 'particoes': nomes}, arquivo,
+                  indent=4, ensure_ascii=False)
+
+def criar(pasta, quantidade=QUANTIDADE_PADRAO, depositos=None, produtos=None, proximo_id=1):
+    """
+    Cria as partições em 'pasta': 'quantidade' partições por ID ou, com depositos=['centro', ...], uma por depósito.
+    Com 'produtos' (ex.: o catálogo atual), cada produto vai para a partição do seu ID (só no critério 'id').
+    proximo_id: nenhuma partição entrega IDs menores que ele (IDs já usados antes da divisão não voltam).
+    """
+    if depositos:
+        if produtos:
+            raise ValueError("Só o critério 'id' divide um catálogo existente (o ID define a partição).")
+        if len(set(depositos)) != len(depositos):
+            raise ValueError("Nomes de depósito repetidos.")
+        criterio, nomes = 'deposito', list(depositos)
+    else:
+        if quantidade < 1:
+            raise ValueError("A quantidade de partições precisa ser maior que zero.")
+        criterio, nomes = 'id', [str(posicao) for posicao in range(quantidade)]
+    if os.path.exists(caminho_manifesto(pasta)):
+        raise ValueError(f"Já existe um estoque particionado em '{pasta}'.")
+
+    particoes = [{} for _ in nomes]
+    for id_produto, produto_dict in (produtos or {}).items():
+        particoes[(id_produto - 1) % len(nomes)][id_produto] = produto_dict
+    proximo_id = max(proximo_id, max(produtos or (0,)) + 1)
+    os.makedirs(pasta, exist_ok=True)
+    for posicao, particao in enumerate(particoes):
+        snapshot_binario.gravar(caminho_particao(pasta, posicao), particao,
+                                primeiro_id_livre(posicao, len(nomes), proximo_id), indice_busca.normalizar)
+    gravar_manifesto(pasta, criterio, nomes) # Por último: sem manifesto, a pasta não é um estoque particionado
+
+def existe(pasta):
+    return os.path.exists(caminho_manifesto(pasta))
+
+# --- Catálogo particionado ---
+
+class ProdutosParticionados(MutableMapping):
+    """
+    Dicionário de produtos dividido em partições (usado como o dicionário 'produtos' do serviço).
+    Cada alteração marca a partição; salvar() grava só as partições alteradas.
+    """
+    def __init__(self, pasta):
+        with open(caminho_manifesto(pasta), 'r', encoding='utf-8') as arquivo:
+            manifesto = json.load(arquivo)
+        if manifesto.get('versao', 0) > VERSAO_MANIFESTO or manifesto.get('criterio') not in CRITERIOS:
+            raise ValueError(f"Manifesto de partições não reconhecido: {caminho_manifesto(pasta)}")
+        self.pasta = pasta
+        self.criterio = manifesto['criterio']
+        self.nomes = manifesto['particoes']
+        self.quantidade_particoes = len(self.nomes)
+        self.particoes = []
+        self.proximos_ids = []
+        for posicao in range(self.quantidade_particoes):
+            particao, proximo_id = snapshot_binario.carregar(caminho_particao(pasta, posicao))
+            self.particoes.append(particao)
+            # Garante que o próximo ID é desta partição e maior que todos os que ela já tem
+            self.proximos_ids.append(primeiro_id_livre(posicao, self.quantidade_particoes,
+                                                       max(proximo_id, max(particao, default=0) + 1)))
+        self.alteradas = set() # Posições das partições com alterações ainda não gravadas
+        self.chaves_busca = {} # Texto com acentos -> chave de busca (só esses custam a normalizar de novo a cada gravação)
+
+    def posicao_do_id(self, id_produto):
+        return (id_produto - 1) % self.quantidade_particoes
+
+    def particao_do_produto(self, id_produto):
+        """Nome da partição (depósito) do produto"""
+        return self.nomes[self.posicao_do_id(id_produto)]
+
+    # Interface de dicionário (cada ID vai direto para a sua partição)
+    def __getitem__(self, id_produto):
+        return self.particoes[self.posicao_do_id(id_produto)][id_produto]
+
+    def get(self, id_produto, padrao=None):
+        return self.particoes[self.posicao_do_id(id_produto)].get(id_produto, padrao)
+
+    def __contains__(self, id_produto):
+        return id_produto in self.particoes[self.posicao_do_id(id_produto)]
+
+    def __setitem__(self, id_produto, produto_dict):
+        posicao = self.posicao_do_id(id_produto)
+        self.particoes[posicao][id_produto] = produto_dict
+        self.alteradas.add(posicao)
+
+    def __delitem__(self, id_produto):
+        posicao = self.posicao_do_id(id_produto)
+        del self.particoes[posicao][id_produto]
+        self.alteradas.add(posicao)
+
+    def __iter__(self):
+        # Dentro de cada partição os IDs já estão em ordem crescente (os novos são sempre maiores)
+        return heapq.merge(*self.particoes)
+
+    def __len__(self):
+        return sum(len(particao) for particao in self.particoes)
+
+    def values(self):
+        """Produtos de todas as partições em ordem de ID"""
+        return heapq.merge(*(particao.values() for particao in self.particoes), key=attrgetter('id'))
+
+    def items(self):
+        return ((produto_dict['id'], produto_dict) for produto_dict in self.values())
+
+    def marcar_alterado(self, id_produto):
+        """Um produto foi modificado no lugar (ex.: produto['quantidade'] -= 1): a partição precisa ser gravada"""
+        self.alteradas.add(self.posicao_do_id(id_produto))
+
+    def escolher_particao(self, deposito, tamanhos):
+        """
+        Posição da partição de um produto novo: a do depósito informado (critério 'deposito'; padrão: o primeiro)
+        ou a partição com menos produtos segundo 'tamanhos' (critério 'id')
+        """
+        if self.criterio == 'deposito':
+            if deposito is None:
+                return 0
+            if deposito in self.nomes:
+                return self.nomes.index(deposito)
+            raise ValueError(f"Depósito desconhecido: {deposito} (depósitos: {', '.join(self.nomes)}).")
+        if deposito is not None:
+            raise ValueError("Este estoque é particionado por ID: não há depósitos.")
+        return min(range(self.quantidade_particoes), key=tamanhos.__getitem__)
+
+    def alocar_id(self, deposito=None):
+        """Próximo ID da partição escolhida (ver escolher_particao). Chamar com a trava de IDs do serviço."""
+        return self.alocar_ids([deposito])[0]
+
+    def alocar_ids(self, depositos):
+        """
+        IDs novos para vários produtos de uma vez (um depósito por produto, None = escolha automática).
+        Cada ID conta na partição escolhida, como se o produto já estivesse lá: no critério 'id',
+        os produtos de uma importação se espalham pelas partições. Chamar com a trava de IDs do serviço.
+        """
+        tamanhos = [len(particao) for particao in self.particoes]
+        ids = []
+        for deposito in depositos:
+            posicao = self.escolher_particao(deposito, tamanhos)
+            novo_id = self.proximos_ids[posicao]
+            while novo_id in self.particoes[posicao]: # Proteção contra um arquivo de partição desatualizado
+                novo_id += self.quantidade_particoes
+            self.proximos_ids[posicao] = novo_id + self.quantidade_particoes
+            self.alteradas.add(posicao) # O próximo ID fica gravado no arquivo da partição
+            tamanhos[posicao] += 1
+            ids.append(novo_id)
+        return ids
+
+    def chave_de_busca(self, texto):
+        """indice_busca.normalizar(texto), guardando as chaves dos textos fora do ASCII"""
+        if texto.isascii():
+            return texto.lower() # Como em indice_busca.normalizar
+        chave = self.chaves_busca.get(texto)
+        if chave is None:
+            if len(self.chaves_busca) > 2 * len(self): # Textos antigos (produtos editados ou removidos)
+                self.chaves_busca.clear()
+            chave = self.chaves_busca[texto] = indice_busca.normalizar(texto)
+        return chave
+
+    def salvar(self):
+        """Grava (arquivo temporário + fsync + rename) as partições alteradas; retorna quantas foram gravadas"""
+        gravadas = sorted(self.alteradas)
+        for posicao in gravadas:
+            snapshot_binario.gravar(caminho_particao(self.pasta, posicao), self.particoes[posicao], self.proximos_ids[posicao],
+                                    self.chave_de_busca)
+            self.alteradas.discard(posicao)
+        return len(gravadas)
+
+    def origens(self):
+        """
+        O que os processos dos relatórios leem de cada partição: o caminho do arquivo ou, se a partição tem
+        alterações ainda não gravadas, o conteúdo já codificado (bytes), sem gravar nada
+        """
+        return [snapshot_binario.codificar(self.particoes[posicao], self.proximos_ids[posicao], self.chave_de_busca)
+                if posicao in self.alteradas else caminho_particao(self.pasta, posicao)
+                for posicao in range(self.quantidade_particoes)]
+
+# --- Trabalho de cada processo (uma partição por tarefa) ---
+# Funções do módulo (e não métodos) para poderem ser enviadas aos processos do pool.
+
+def ler_registros(origem):
+    """
+    (registros, chaves, textos) da partição, conferindo cabeçalho e CRC (chaves: None na versão 1).
+    origem: o caminho do arquivo ou o conteúdo já codificado (ver ProdutosParticionados.origens)
+    """
+    if isinstance(origem, bytes):
+        return snapshot_binario.ler_areas(origem, "Partição em memória")
+    with open(origem, 'rb') as arquivo:
+        dados = arquivo.read()
+    return snapshot_binario.ler_areas(dados, f"Partição {origem}")
+
+def resumir_estoque_particao(origem):
+    """Totais da partição (mesmo formato de agregados_estoque): (totais, totais por categoria)"""
+    registros, _, textos = ler_registros(origem)
+    # Por categoria (posição do texto na partição): quantidade total de cada preço.
+    # O valor em Decimal é calculado uma vez por preço diferente, não uma vez por produto.
+    quantidades_por_preco = {}
+    produtos_por_categoria = {}
+    for _, quantidade, preco, _, _, _, inicio_categoria, tamanho_categoria in snapshot_binario.REGISTRO.iter_unpack(registros):
+        chave = (inicio_categoria, tamanho_categoria)
+        por_preco = quantidades_por_preco.get(chave)
+        if por_preco is None:
+            por_preco = quantidades_por_preco[chave] = {}
+            produtos_por_categoria[chave] = 0
+        por_preco[preco] = por_preco.get(preco, 0) + quantidade
+        produtos_por_categoria[chave] += 1
+
+    totais = {'valor_total': Decimal('0'), 'quantidade_itens': 0, 'quantidade_produtos': 0}
+    por_categoria = {}
+    for (inicio, tamanho), por_preco in quantidades_por_preco.items():
+        categoria = str(textos[inicio:inicio + tamanho], 'utf-8')
+        # Mesmo cálculo exato dos totais acumulados (agregados_estoque.valor_decimal)
+        valor = sum((Decimal(repr(preco)) * quantidade for preco, quantidade in por_preco.items()), Decimal('0'))
+        itens = sum(por_preco.values())
+        por_categoria[categoria] = {'valor': valor, 'quantidade_itens': itens,
+                                    'quantidade_produtos': produtos_por_categoria[(inicio, tamanho)]}
+        totais['valor_total'] += valor
+        totais['quantidade_itens'] += itens
+        totais['quantidade_produtos'] += produtos_por_categoria[(inicio, tamanho)]
+    return totais, por_categoria
+
+def baixo_estoque_particao(origem):
+    """[(-falta, id)] dos produtos abaixo do mínimo, em ordem (maior falta primeiro, empate pelo menor ID)"""
+    registros, _, _ = ler_registros(origem)
+    return sorted((quantidade - estoque_minimo, id_produto)
+                  for id_produto, quantidade, _, estoque_minimo, _, _, _, _ in snapshot_binario.REGISTRO.iter_unpack(registros)
+                  if quantidade < estoque_minimo)
+
+def chaves_de_busca_particao(registros, chaves, textos, campo):
+    """Pares (id, chave de busca) do campo; cada chave repetida (categorias) é decodificada uma vez só"""
+    decodificadas = {}
+    if chaves is None:
+        # Partição gravada antes das chaves de busca (versão 1): normaliza aqui, até a próxima gravação
+        posicao = 4 if campo == 'nome' else 6 # Início e tamanho do texto no REGISTRO
+        for registro in snapshot_binario.REGISTRO.iter_unpack(registros):
+            inicio = registro[posicao]
+            chave = decodificadas.get(inicio)
+            if chave is None:
+                chave = decodificadas[inicio] = indice_busca.normalizar(
+                    str(textos[inicio:inicio + registro[posicao + 1]], 'utf-8'))
+            yield registro[0], chave
+        return
+    ids = (registro[0] for registro in snapshot_binario.REGISTRO.iter_unpack(registros))
+    if campo == 'nome':
+        for id_produto, (inicio, tamanho, _, _) in zip(ids, snapshot_binario.CHAVES.iter_unpack(chaves)):
+            yield id_produto, str(textos[inicio:inicio + tamanho], 'utf-8')
+        return
+    for id_produto, (_, _, inicio, tamanho) in zip(ids, snapshot_binario.CHAVES.iter_unpack(chaves)):
+        chave = decodificadas.get(inicio)
+        if chave is None:
+            chave = decodificadas[inicio] = str(textos[inicio:inicio + tamanho], 'utf-8')
+        yield id_produto, chave
+
+def buscar_texto_particao(origem, campo, consulta):
+    """IDs (em ordem crescente) cujo 'nome' ou 'categoria' contém a consulta (sem diferenciar maiúsculas e acentos)"""
+    consulta = indice_busca.normalizar(consulta) # Mesma normalização das chaves de busca
+    # Os registros já estão em ordem de ID
+    return [id_produto for id_produto, chave in chaves_de_busca_particao(*ler_registros(origem), campo) if consulta in chave]
+
+def candidatos_aproximados_particao(origem, campo, trigramas):
+    """[(trigramas em comum, id, chave)] dos melhores candidatos da partição para a busca aproximada"""
+    return indice_busca.contar_candidatos(trigramas, chaves_de_busca_particao(*ler_registros(origem), campo))
+
+# --- Relatórios em paralelo ---
+
+def executar_nas_particoes(produtos, funcao, *argumentos):
+    """Executa funcao(origem, *argumentos) em cada partição (ver ProdutosParticionados.origens); retorna os resultados em ordem"""
+    origens = produtos.origens()
+    if PROCESSOS <= 1 or len(origens) == 1:
+        return [funcao(origem, *argumentos) for origem in origens]
+    return list(pool_processos.obter('particoes', PROCESSOS).map(
+        funcao, origens, *([argumento] * len(origens) for argumento in argumentos)))
+
+def obter_totais(produtos, por_categoria=False):
+    """Valor total em estoque, quantidade de itens e de produtos (e, se pedido, o total de cada categoria)"""
+    totais = {'valor_total': Decimal('0'), 'quantidade_itens': 0, 'quantidade_produtos': 0}
+    totais_por_categoria = {}
+    for totais_particao, categorias_particao in executar_nas_particoes(produtos, resumir_estoque_particao):
+        for chave in totais:
+            totais[chave] += totais_particao[chave]
+        for categoria, valores in categorias_particao.items():
+            acumulado = totais_por_categoria.setdefault(categoria, {'valor': Decimal('0'), 'quantidade_itens': 0,
+                                                                    'quantidade_produtos': 0})
+            for chave in acumulado:
+                acumulado[chave] += valores[chave]
+    return (totais, totais_por_categoria) if por_categoria else totais
+
+def listar_ids_baixo_estoque(produtos):
+    """IDs abaixo do estoque mínimo, do maior para o menor déficit (empate: menor ID primeiro)"""
+    return [id_produto for _, id_produto in heapq.merge(*executar_nas_particoes(produtos, baixo_estoque_particao))]
+
+def buscar_ids_por_texto(produtos, campo, consulta):
+    """IDs (em ordem crescente) cujo 'nome' ou 'categoria' contém a consulta"""
+    return list(heapq.merge(*executar_nas_particoes(produtos, buscar_texto_particao, campo, consulta)))
+
+def candidatos_aproximados(produtos, campo, trigramas):
+    """
+    Pares (id, chave) dos candidatos da busca aproximada: os mesmos que o índice em memória escolhe
+    (indice_busca.contar_candidatos), juntando os melhores de cada partição
+    """
+    contados = itertools.chain.from_iterable(
+        executar_nas_particoes(produtos, candidatos_aproximados_particao, campo, trigramas))
+    return [(id_produto, chave) for _, id_produto, chave in indice_busca.melhores_candidatos(contados)]
+
+def main():
+    """Linha de comando: criar partições vazias ou dividir o catálogo atual"""
+    argumentos = sys.argv[1:]
+    if not argumentos or argumentos[0] not in ('criar', 'dividir'):
+        print(__doc__)
+        return
+    try:
+        if argumentos[0] == 'criar':
+            depositos = None
+            if '--depositos' in argumentos:
+                posicao = argumentos.index('--depositos')
+                depositos = [nome.strip() for nome in argumentos[posicao + 1].split(',') if nome.strip()]
+                del argumentos[posicao:posicao + 2]
+            pasta = argumentos[1] if len(argumentos) > 1 else 'particoes'
+            quantidade = int(argumentos[2]) if len(argumentos) > 2 else QUANTIDADE_PADRAO
+            criar(pasta, quantidade, depositos)
+            print(f"Estoque particionado criado em '{pasta}'.")
+        else:
+            import servico_estoque as servico # Lê o catálogo atual (snapshot + journal) como o sistema faz
+            caminho_json = argumentos[1] if len(argumentos) > 1 else 'produtos.json'
+            pasta = argumentos[2] if len(argumentos) > 2 else 'particoes'
+            quantidade = int(argumentos[3]) if len(argumentos) > 3 else QUANTIDADE_PADRAO
+            base = os.path.splitext(caminho_json)[0]
+            servico.ARQUIVO_DADOS = caminho_json
+            servico.ARQUIVO_JOURNAL = base + '.journal'
+            servico.ARQUIVO_META = base + '.meta.json'
+            servico.ARQUIVO_BINARIO = base + '.bin'
+            servico.carregar_produtos_dos_arquivos()
+            criar(pasta, quantidade, produtos=servico.produtos, proximo_id=servico.proximo_id_disponivel)
+            print(f"Divisão concluída: {len(servico.produtos)} produtos em {quantidade} partições em '{pasta}'.")
+    except Exception as e:
+        print(f"Erro: {str(e)}")
+
+if __name__ == "__main__":
+    main()
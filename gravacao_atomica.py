@@ -0,0 +1,54 @@
+"""
+Gravação segura de arquivos para o Sistema de Gerenciamento de Estoque
+
+Abrir o produtos.json em modo 'w' apaga o conteúdo antes de gravar: se o programa parar no meio,
+o catálogo inteiro se perde. Aqui o arquivo novo é gravado ao lado (caminho + '.tmp'),
+enviado ao disco (fsync) e só então troca de lugar com o antigo (os.replace, atômico).
+Em qualquer momento existe no disco o arquivo antigo completo ou o novo completo.
+
+Exemplo:
+    with arquivo_atomico('produtos.json') as arquivo:
+        json.dump(dados, arquivo)
+"""
+
+import contextlib
+import os
+
+# fsync: só considera gravado depois que o sistema operacional confirma que os dados estão no disco.
+# Desligar deixa os salvamentos mais rápidos, mas uma queda de energia pode perder os últimos.
+SINCRONIZAR_DISCO = True
+
+def sincronizar_arquivo(arquivo):
+    """Envia ao disco o que foi escrito no arquivo aberto"""
+    arquivo.flush()
+    if SINCRONIZAR_DISCO:
+        os.fsync(arquivo.fileno())
+
+def sincronizar_diretorio(caminho):
+    """Envia ao disco a pasta do arquivo (necessário para que um rename/criação/remoção sobreviva a uma queda)"""
+    if not SINCRONIZAR_DISCO or os.name != 'posix':
+        return # No Windows não é possível abrir uma pasta para fsync
+    descritor = os.open(os.path.dirname(os.path.abspath(caminho)), os.O_RDONLY)
+    try:
+        os.fsync(descritor)
+    finally:
+        os.close(descritor)
+
+@contextlib.contextmanager
+def arquivo_atomico(caminho, modo='w'):
+    """
+    Bloco 'with' que entrega um arquivo temporário; ao sair sem erro ele substitui 'caminho'.
+    Se der erro no meio, o temporário é apagado e o arquivo original continua intacto.
+    """
+    caminho_temporario = caminho + '.tmp'
+    codificacao = None if 'b' in modo else 'utf-8'
+    try:
+        with open(caminho_temporario, modo, encoding=codificacao) as arquivo:
+            yield arquivo
+            sincronizar_arquivo(arquivo)
+        os.replace(caminho_temporario, caminho) # Troca atômica: o arquivo antigo só some quando o novo está completo
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(caminho_temporario)
+        raise
+    sincronizar_diretorio(caminho)
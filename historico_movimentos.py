@@ -0,0 +1,353 @@
+"""
+Histórico de movimentações de estoque para o Sistema de Gerenciamento de Estoque
+
+registrar_entrada/registrar_saida alteram a quantidade e não guardam o que aconteceu.
+Este módulo mantém um histórico só de acréscimos (nada é alterado ou apagado): cada movimento
+guarda o momento, o ID do produto, a variação (delta), o tipo e o saldo resultante.
+
+Organização em segmentos (a memória usada não cresce com o tamanho do histórico):
+- segmento ativo: os últimos movimentos (até LIMITE_SEGMENTO), na memória e em 'ativo.bin',
+  com os totais por dia e categoria em 'ativo.json' (regravado a cada gravação)
+- segmentos fechados: 'segmento_000001.bin', ... (registros em ordem de tempo), cada um com
+    '.idx'  pares (ID do produto, posição) em ordem de ID -> movimentos de um produto por busca binária
+    '.json' período coberto e totais por dia e categoria -> consultas por período sem ler os registros
+  Da memória só fazem parte o período e os totais diários de cada segmento.
+
+Consultas:
+    movimentos_do_produto(id, inicio, fim)          movimentos de um produto em um período
+    movimentos_no_periodo(inicio, fim)              todos os movimentos de um período
+    registros_no_periodo(inicio, fim)               o mesmo, como tuplas (ver REGISTRO), sem montar dicionários
+    totais_diarios_por_categoria(inicio, fim)       entradas/saídas por dia e categoria
+
+Os dias são contados em UTC; momentos são segundos desde 1970 (time.time()).
+"""
+
+import bisect
+import json
+import mmap
+import os
+import struct
+import time
+from datetime import datetime, timezone
+
+import gravacao_atomica
+
+PASTA_HISTORICO = 'historico'
+LIMITE_SEGMENTO = 100_000 # Movimentos por arquivo de segmento
+SEGUNDOS_POR_DIA = 86400
+
+TIPOS = ('entrada', 'saida', 'ajuste', 'cadastro', 'remocao', 'lote')
+CODIGO_TIPO = {tipo: codigo for codigo, tipo in enumerate(TIPOS)}
+# momento, ID do produto, delta, tipo, saldo resultante
+REGISTRO = struct.Struct('<dqqBq')
+# ID do produto, posição do registro no segmento
+ENTRADA_INDICE = struct.Struct('<qI')
+
+# Segmentos fechados (só os metadados): {'numero', 'inicio', 'fim', 'quantidade'}, em ordem de número (e de tempo)
+segmentos = []
+# Segmento ativo: registros (tuplas como em REGISTRO) e índice por produto (ID -> posições)
+ativo = []
+indice_ativo = {}
+pendentes = [] # Registros ainda não gravados no disco
+# Totais por dia e categoria: (dia, categoria) -> [entradas, saídas, movimentos]
+totais_fechados = {} # Somados de todos os segmentos fechados
+totais_dia_ativo = {} # Só os do segmento ativo (vão para o .json quando ele fechar)
+ultimo_momento = 0.0
+
+def caminho_segmento(numero, extensao):
+    return os.path.join(PASTA_HISTORICO, f'segmento_{numero:06d}{extensao}')
+
+def caminho_ativo():
+    return os.path.join(PASTA_HISTORICO, 'ativo.bin')
+
+def caminho_totais_ativo():
+    return os.path.join(PASTA_HISTORICO, 'ativo.json')
+
+def somar_totais(destino, origem):
+    """Soma um dicionário de totais por dia e categoria em outro"""
+    for chave, valores in origem:
+        existentes = destino.get(chave)
+        if existentes is None:
+            destino[chave] = list(valores)
+        else:
+            for posicao in range(3):
+                existentes[posicao] += valores[posicao]
+
+def limpar():
+    """Esvazia as estruturas em memória"""
+    global ultimo_momento
+    segmentos.clear()
+    ativo.clear()
+    indice_ativo.clear()
+    pendentes.clear()
+    totais_fechados.clear()
+    totais_dia_ativo.clear()
+    ultimo_momento = 0.0
+
+def abrir(pasta=None, categoria_do_produto=None):
+    """
+    Carrega os metadados dos segmentos fechados e o segmento ativo.
+    Os totais diários do segmento ativo vêm do 'ativo.json'; categoria_do_produto(id) só é usada para os
+    movimentos que ele não cobre (histórico gravado antes do 'ativo.json', ou queda entre as duas gravações).
+    """
+    global PASTA_HISTORICO, ultimo_momento
+    if pasta is not None:
+        PASTA_HISTORICO = pasta
+    limpar()
+    os.makedirs(PASTA_HISTORICO, exist_ok=True)
+
+    numeros = sorted(int(nome[9:15]) for nome in os.listdir(PASTA_HISTORICO)
+                     if nome.startswith('segmento_') and nome.endswith('.bin'))
+    for numero in numeros:
+        metadados = ler_metadados(numero)
+        segmentos.append(metadados)
+        somar_totais(totais_fechados, ((tuple(chave), valores) for chave, valores in metadados['totais']))
+        del metadados['totais'] # Já somados; não precisam ficar em memória duas vezes
+        ultimo_momento = max(ultimo_momento, metadados['fim'])
+
+    if os.path.exists(caminho_ativo()):
+        with open(caminho_ativo(), 'rb') as arquivo:
+            dados = arquivo.read()
+        completos = len(dados) // REGISTRO.size * REGISTRO.size # Registro cortado no fim: o programa parou na gravação
+        registros = list(REGISTRO.iter_unpack(dados[:completos]))
+        cobertos = ler_totais_ativo(len(registros))
+        for posicao, registro in enumerate(registros):
+            if posicao < cobertos:
+                acrescentar_ao_ativo(registro, None) # Já somado nos totais do 'ativo.json'
+            else:
+                acrescentar_ao_ativo(registro, categoria_do_produto(registro[1]) if categoria_do_produto else '')
+        if completos != len(dados):
+            with open(caminho_ativo(), 'r+b') as arquivo:
+                arquivo.truncate(completos)
+
+def ler_totais_ativo(quantidade_registros):
+    """
+    Carrega os totais do 'ativo.json' em totais_dia_ativo. Retorna quantos registros do 'ativo.bin' eles cobrem
+    (0 se o arquivo não existe, está inválido ou diz cobrir mais registros do que o 'ativo.bin' tem)
+    """
+    try:
+        with open(caminho_totais_ativo(), 'r', encoding='utf-8') as arquivo:
+            dados = json.load(arquivo)
+        cobertos, totais = dados['quantidade'], dados['totais']
+    except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+        return 0
+    if not isinstance(cobertos, int) or cobertos > quantidade_registros:
+        return 0
+    somar_totais(totais_dia_ativo, ((tuple(chave), valores) for chave, valores in totais))
+    return cobertos
+
+def gravar_totais_ativo():
+    """Grava os totais diários do segmento ativo e quantos registros eles cobrem (depois do 'ativo.bin')"""
+    dados = {'quantidade': len(ativo), 'totais': [[list(chave), valores] for chave, valores in totais_dia_ativo.items()]}
+    with gravacao_atomica.arquivo_atomico(caminho_totais_ativo()) as arquivo:
+        json.dump(dados, arquivo)
+
+def ler_metadados(numero):
+    """Lê o .json de um segmento fechado (ou o refaz a partir do .bin, se faltar)"""
+    try:
+        with open(caminho_segmento(numero, '.json'), 'r', encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (FileNotFoundError, json.JSONDecodeError):
+        # O fechamento grava .idx e .json antes do .bin, então isso só acontece se alguém apagou o arquivo;
+        # os totais por categoria não podem ser refeitos (a categoria não está nos registros)
+        with open(caminho_segmento(numero, '.bin'), 'rb') as arquivo:
+            registros = list(REGISTRO.iter_unpack(arquivo.read()))
+        gravar_indice(numero, registros)
+        metadados = {'numero': numero, 'inicio': registros[0][0] if registros else 0.0,
+                     'fim': registros[-1][0] if registros else 0.0, 'quantidade': len(registros), 'totais': []}
+        with gravacao_atomica.arquivo_atomico(caminho_segmento(numero, '.json')) as arquivo:
+            json.dump(metadados, arquivo)
+        return metadados
+
+def acrescentar_ao_ativo(registro, categoria):
+    """
+    Põe o registro no segmento ativo e atualiza o índice por produto e os totais do dia (chamada a cada movimento).
+    categoria None: os totais já contam o registro (ver abrir)
+    """
+    global ultimo_momento
+    momento, id_produto, delta = registro[0], registro[1], registro[2]
+    posicoes = indice_ativo.get(id_produto)
+    if posicoes is None:
+        indice_ativo[id_produto] = [len(ativo)]
+    else:
+        posicoes.append(len(ativo))
+    ativo.append(registro)
+    ultimo_momento = momento
+    if categoria is None:
+        return
+    chave = (int(momento // SEGUNDOS_POR_DIA), categoria)
+    valores = totais_dia_ativo.get(chave)
+    if valores is None:
+        valores = totais_dia_ativo[chave] = [0, 0, 0]
+    if delta >= 0:
+        valores[0] += delta
+    else:
+        valores[1] -= delta
+    valores[2] += 1
+
+def registrar(id_produto, delta, tipo, saldo, categoria, momento=None):
+    """Acrescenta um movimento ao histórico (gravado no disco em gravar_pendentes); retorna o momento registrado"""
+    if momento is None:
+        momento = time.time()
+    momento = max(momento, ultimo_momento) # Mantém a ordem de tempo mesmo se o relógio do sistema voltar
+    registro = (momento, id_produto, delta, CODIGO_TIPO[tipo], saldo)
+    acrescentar_ao_ativo(registro, categoria)
+    pendentes.append(registro)
+    return momento
+
+def registrar_varios(tipo, movimentos, momento=None):
+    """
+    Acrescenta vários movimentos do mesmo tipo e momento: movimentos = [(id, delta, saldo, categoria), ...].
+    Retorna o momento registrado.
+    """
+    if momento is None:
+        momento = time.time()
+    momento = max(momento, ultimo_momento)
+    codigo_tipo = CODIGO_TIPO[tipo]
+    for id_produto, delta, saldo, categoria in movimentos:
+        registro = (momento, id_produto, delta, codigo_tipo, saldo)
+        acrescentar_ao_ativo(registro, categoria)
+        pendentes.append(registro)
+    return momento
+
+def gravar_pendentes():
+    """
+    Grava os movimentos pendentes em 'ativo.bin' (com fsync) e os totais do segmento ativo em 'ativo.json',
+    ou fecha o segmento se ele encheu. Os totais vão depois dos registros: nunca contam um movimento que não foi gravado
+    """
+    if not pendentes:
+        return
+    with open(caminho_ativo(), 'ab') as arquivo:
+        arquivo.write(b''.join(REGISTRO.pack(*registro) for registro in pendentes))
+        gravacao_atomica.sincronizar_arquivo(arquivo)
+    pendentes.clear()
+    if len(ativo) >= LIMITE_SEGMENTO:
+        fechar_segmento()
+    else:
+        gravar_totais_ativo()
+
+def gravar_indice(numero, registros):
+    """Grava o .idx: pares (ID, posição) em ordem de ID (e de posição, para o mesmo ID)"""
+    pares = sorted((registro[1], posicao) for posicao, registro in enumerate(registros))
+    with gravacao_atomica.arquivo_atomico(caminho_segmento(numero, '.idx'), 'wb') as arquivo:
+        arquivo.write(b''.join(ENTRADA_INDICE.pack(*par) for par in pares))
+
+def fechar_segmento():
+    """Transforma o segmento ativo em um segmento fechado e começa um novo"""
+    numero = segmentos[-1]['numero'] + 1 if segmentos else 1
+    # Ordem pensada para quedas: .idx e .json primeiro, o .bin (que marca o segmento como existente) por último
+    gravar_indice(numero, ativo)
+    metadados = {'numero': numero, 'inicio': ativo[0][0], 'fim': ativo[-1][0], 'quantidade': len(ativo),
+                 'totais': [[list(chave), valores] for chave, valores in totais_dia_ativo.items()]}
+    with gravacao_atomica.arquivo_atomico(caminho_segmento(numero, '.json')) as arquivo:
+        json.dump(metadados, arquivo)
+    # Os totais já estão no .json do segmento. O 'ativo.json' sai antes do .bin mudar de nome:
+    # os totais dele nunca são somados aos registros de um segmento ativo novo
+    if os.path.exists(caminho_totais_ativo()):
+        os.remove(caminho_totais_ativo())
+    os.replace(caminho_ativo(), caminho_segmento(numero, '.bin'))
+    gravacao_atomica.sincronizar_diretorio(caminho_ativo())
+
+    del metadados['totais']
+    segmentos.append(metadados)
+    somar_totais(totais_fechados, totais_dia_ativo.items())
+    ativo.clear()
+    indice_ativo.clear()
+    totais_dia_ativo.clear()
+
+def registro_para_dict(registro):
+    momento, id_produto, delta, codigo_tipo, saldo = registro
+    return {'momento': momento, 'id': id_produto, 'delta': delta, 'tipo': TIPOS[codigo_tipo], 'saldo': saldo}
+
+def segmentos_no_periodo(inicio, fim):
+    """Segmentos fechados cujo período cruza [inicio, fim]"""
+    return [segmento for segmento in segmentos if segmento['fim'] >= inicio and segmento['inicio'] <= fim]
+
+def mapear(numero, extensao):
+    """Abre um arquivo do segmento com mmap (None se estiver vazio)"""
+    with open(caminho_segmento(numero, extensao), 'rb') as arquivo:
+        if os.fstat(arquivo.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+
+def movimentos_do_produto(id_produto, inicio=None, fim=None):
+    """Movimentos de um produto entre os momentos inicio e fim (None = sem limite), em ordem de tempo"""
+    inicio = float('-inf') if inicio is None else inicio
+    fim = float('inf') if fim is None else fim
+    resultado = []
+    for segmento in segmentos_no_periodo(inicio, fim):
+        indice = mapear(segmento['numero'], '.idx')
+        if indice is None:
+            continue
+        registros = mapear(segmento['numero'], '.bin')
+        try:
+            # Busca binária pelo primeiro par com este ID
+            baixo, alto = 0, len(indice) // ENTRADA_INDICE.size
+            while baixo < alto:
+                meio = (baixo + alto) // 2
+                if ENTRADA_INDICE.unpack_from(indice, meio * ENTRADA_INDICE.size)[0] < id_produto:
+                    baixo = meio + 1
+                else:
+                    alto = meio
+            for id_lido, posicao in ENTRADA_INDICE.iter_unpack(indice[baixo * ENTRADA_INDICE.size:]):
+                if id_lido != id_produto:
+                    break
+                registro = REGISTRO.unpack_from(registros, posicao * REGISTRO.size)
+                if inicio <= registro[0] <= fim:
+                    resultado.append(registro_para_dict(registro))
+        finally:
+            indice.close()
+            registros.close()
+    for posicao in indice_ativo.get(id_produto, ()):
+        if inicio <= ativo[posicao][0] <= fim:
+            resultado.append(registro_para_dict(ativo[posicao]))
+    return resultado
+
+def movimentos_no_periodo(inicio, fim):
+    """Gera os movimentos entre inicio e fim, em ordem de tempo, lendo só os segmentos do período"""
+    return map(registro_para_dict, registros_no_periodo(inicio, fim))
+
+def registros_no_periodo(inicio, fim):
+    """Como movimentos_no_periodo(), mas gera as tuplas (momento, id, delta, código do tipo, saldo)"""
+    for segmento in segmentos_no_periodo(inicio, fim):
+        registros = mapear(segmento['numero'], '.bin')
+        if registros is None:
+            continue
+        try:
+            quantidade = len(registros) // REGISTRO.size
+            # Os registros estão em ordem de tempo: busca binária pelo primeiro com momento >= inicio
+            primeiro = bisect.bisect_left(range(quantidade), inicio,
+                                          key=lambda posicao: struct.unpack_from('<d', registros, posicao * REGISTRO.size)[0])
+            for registro in REGISTRO.iter_unpack(registros[primeiro * REGISTRO.size:]):
+                if registro[0] > fim:
+                    break
+                yield registro
+        finally:
+            registros.close()
+    primeiro = bisect.bisect_left(ativo, inicio, key=lambda registro: registro[0])
+    for registro in ativo[primeiro:]:
+        if registro[0] > fim:
+            break
+        yield registro
+
+def data_do_dia(dia):
+    return datetime.fromtimestamp(dia * SEGUNDOS_POR_DIA, timezone.utc).date().isoformat()
+
+def totais_diarios_por_categoria(inicio=None, fim=None):
+    """
+    Entradas, saídas e número de movimentos por dia (UTC) e categoria, sem ler os registros:
+        {'2024-05-01': {'games': {'entradas': 10, 'saidas': 4, 'movimentos': 6}, ...}, ...}
+    """
+    primeiro_dia = float('-inf') if inicio is None else int(inicio // SEGUNDOS_POR_DIA)
+    ultimo_dia = float('inf') if fim is None else int(fim // SEGUNDOS_POR_DIA)
+    totais = dict((chave, list(valores)) for chave, valores in totais_fechados.items())
+    somar_totais(totais, totais_dia_ativo.items()) # O dia atual costuma estar nos dois
+    resultado = {}
+    for (dia, categoria), (entradas, saidas, movimentos) in sorted(totais.items()):
+        if primeiro_dia <= dia <= ultimo_dia:
+            resultado.setdefault(data_do_dia(dia), {})[categoria] = {
+                'entradas': entradas, 'saidas': saidas, 'movimentos': movimentos}
+    return resultado
+
+def quantidade_movimentos():
+    return sum(segmento['quantidade'] for segmento in segmentos) + len(ativo)
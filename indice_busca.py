@@ -0,0 +1,204 @@
+"""
+Índice de busca em memória para o Sistema de Gerenciamento de Estoque
+
+Mantém um índice de trigramas para os campos 'nome' e 'categoria': cada sequência de 3 caracteres
+aponta para os IDs que a contêm. Permite responder "nome contém X" olhando só os produtos candidatos,
+sem percorrer o catálogo.
+
+Os resultados são sempre conferidos com o mesmo teste de substring usado na busca linear,
+por isso são idênticos aos da versão sem índice.
+
+Os textos são guardados normalizados (minúsculas e sem acentos: "Café" -> "cafe"), calculados uma vez
+quando o produto é indexado (cadastro, edição e carga). A consulta é normalizada uma vez por busca;
+o catálogo nunca é normalizado de novo. buscar_aproximado() tolera erros de digitação ("tecaldo" acha "teclado"),
+ordenando pelos produtos mais parecidos.
+"""
+
+import difflib
+import heapq
+import unicodedata
+from collections import Counter
+
+CAMPOS_INDEXADOS = ('nome', 'categoria')
+CORTE_APROXIMADO = 0.75 # Semelhança mínima (0 a 1) para entrar no resultado da busca aproximada
+CANDIDATOS_APROXIMADOS = 500 # Quantos candidatos (os com mais trigramas em comum) são comparados com o difflib
+
+# Estruturas do índice (uma por campo):
+# - indice_trigramas['nome']['con'] -> {1, 7, 12}  (IDs cujo nome contém "con")
+# - textos_indexados['nome'][1] -> "console ps5"      (texto normalizado guardado no índice)
+indice_trigramas = {campo: {} for campo in CAMPOS_INDEXADOS}
+textos_indexados = {campo: {} for campo in CAMPOS_INDEXADOS}
+
+def normalizar(texto):
+    """Chave de busca do texto: minúsculas (casefold) e sem acentos ("Café", "CAFE" e "cafe" -> "cafe")"""
+    if texto.isascii():
+        return texto.lower() # Caso mais comum: em ASCII, lower() == casefold() e não há acentos para tirar
+    # NFKD separa a letra do acento ("é" -> "e" + acento agudo); os acentos (caracteres combinantes) são descartados
+    decomposto = unicodedata.normalize('NFKD', texto.casefold())
+    return ''.join(caractere for caractere in decomposto if not unicodedata.combining(caractere))
+
+def gerar_trigramas(texto):
+    """Retorna o conjunto de trigramas (sequências de 3 caracteres) do texto"""
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+def limpar_indice():
+    """Esvazia todos os índices"""
+    for campo in CAMPOS_INDEXADOS:
+        indice_trigramas[campo].clear()
+        textos_indexados[campo].clear()
+
+def adicionar_ao_indice(indice, chaves, id_produto):
+    """Adiciona o ID na lista de cada trigrama"""
+    for chave in chaves:
+        ids = indice.get(chave)
+        if ids is None:
+            indice[chave] = {id_produto}
+        else:
+            ids.add(id_produto)
+
+def retirar_do_indice(indice, chaves, id_produto):
+    """Retira o ID da lista de cada trigrama, apagando os que ficarem vazios"""
+    for chave in chaves:
+        ids = indice.get(chave)
+        if ids is not None:
+            ids.discard(id_produto)
+            if not ids:
+                del indice[chave]
+
+def indexar_produto(produto_dict):
+    """Adiciona ou atualiza um produto no índice (só reindexa campos que mudaram)"""
+    id_produto = produto_dict['id']
+    for campo in CAMPOS_INDEXADOS:
+        texto_novo = normalizar(produto_dict[campo])
+        texto_antigo = textos_indexados[campo].get(id_produto)
+        if texto_antigo == texto_novo:
+            continue # Nada mudou neste campo (caso comum em entradas/saídas)
+        if texto_antigo is not None:
+            retirar_do_indice(indice_trigramas[campo], gerar_trigramas(texto_antigo), id_produto)
+        adicionar_ao_indice(indice_trigramas[campo], gerar_trigramas(texto_novo), id_produto)
+        textos_indexados[campo][id_produto] = texto_novo
+
+def remover_do_indice(id_produto):
+    """Remove um produto de todos os índices"""
+    for campo in CAMPOS_INDEXADOS:
+        texto_antigo = textos_indexados[campo].pop(id_produto, None)
+        if texto_antigo is not None:
+            retirar_do_indice(indice_trigramas[campo], gerar_trigramas(texto_antigo), id_produto)
+
+def reconstruir_indice(produtos):
+    """Reconstrói o índice do zero a partir do dicionário de produtos"""
+    limpar_indice()
+    for produto_dict in produtos.values():
+        indexar_produto(produto_dict)
+
+def buscar_substring(campo, consulta):
+    """
+    Retorna os IDs (em ordem crescente) cujo campo contém a consulta.
+    Equivalente a: [id for id, p in produtos.items() if normalizar(consulta) in normalizar(p[campo])]
+    """
+    consulta = normalizar(consulta)
+    textos = textos_indexados[campo]
+    
+    if len(consulta) < 3:
+        # Consultas curtas não formam trigramas: confere todos os textos já normalizados
+        return sorted(id_produto for id_produto, texto in textos.items() if consulta in texto)
+    
+    # Intersecção das listas de IDs de cada trigrama, começando pela menor
+    indice = indice_trigramas[campo]
+    listas = []
+    for trigrama in gerar_trigramas(consulta):
+        ids = indice.get(trigrama)
+        if not ids:
+            return [] # Algum trigrama não aparece em nenhum produto
+        listas.append(ids)
+    listas.sort(key=len)
+    candidatos = set(listas[0])
+    for ids in listas[1:]:
+        candidatos &= ids
+        if not candidatos:
+            return []
+    
+    # Conter todos os trigramas não garante conter a sequência completa (ex.: "abcab" x "cabc"),
+    # então cada candidato é conferido com o teste de substring
+    return sorted(id_produto for id_produto in candidatos if consulta in textos[id_produto])
+
+# --- Busca aproximada (tolerante a erros de digitação) ---
+
+def comparadores_da_consulta(consulta):
+    """
+    Para cada palavra da consulta: (SequenceMatcher, semelhanças já calculadas).
+    O difflib prepara a segunda sequência (a palavra da consulta) uma vez e compara com várias;
+    as semelhanças ficam guardadas por palavra do texto, porque as mesmas palavras se repetem em muitos nomes.
+    """
+    return [(difflib.SequenceMatcher(None, '', palavra, autojunk=False), {}) for palavra in consulta.split()]
+
+def semelhanca(consulta, texto, comparadores=None):
+    """
+    Semelhança de 0 a 1 entre a consulta e o texto (ambos já normalizados): 1 se o texto contém a consulta;
+    senão, a média, para cada palavra da consulta, da palavra mais parecida do texto (difflib)
+    """
+    if consulta in texto:
+        return 1.0
+    if comparadores is None:
+        comparadores = comparadores_da_consulta(consulta)
+    palavras_texto = texto.split()
+    if not palavras_texto or not comparadores:
+        return 0.0
+    total = 0.0
+    for comparador, calculadas in comparadores:
+        melhor = 0.0
+        for palavra in palavras_texto:
+            razao = calculadas.get(palavra)
+            if razao is None:
+                comparador.set_seq1(palavra)
+                razao = calculadas[palavra] = comparador.ratio()
+            if razao > melhor:
+                melhor = razao
+        total += melhor
+    return total / len(comparadores)
+
+def ordenar_por_semelhanca(consulta, textos, limite=10, corte=CORTE_APROXIMADO):
+    """[(id, semelhança)] dos 'limite' textos mais parecidos com a consulta normalizada; textos = pares (id, texto normalizado)"""
+    comparadores = comparadores_da_consulta(consulta)
+    pontuados = []
+    for id_produto, texto in textos:
+        pontuacao = semelhanca(consulta, texto, comparadores)
+        if pontuacao >= corte:
+            pontuados.append((pontuacao, id_produto))
+    # Mais parecidos primeiro; empate pelo menor ID
+    return [(id_produto, pontuacao) for pontuacao, id_produto in
+            heapq.nsmallest(limite, pontuados, key=lambda item: (-item[0], item[1]))]
+
+def melhores_candidatos(contados):
+    """Os CANDIDATOS_APROXIMADOS itens (trigramas em comum, id, ...) com mais trigramas em comum (empate: menor ID)"""
+    return heapq.nlargest(CANDIDATOS_APROXIMADOS, contados, key=lambda item: (item[0], -item[1]))
+
+def contar_candidatos(trigramas, textos):
+    """
+    melhores_candidatos() de pares (id, texto normalizado), contando os trigramas texto a texto:
+    para quem não tem o índice em memória (modos 'sqlite' e 'particionado'); retorna [(em comum, id, texto)]
+    """
+    contados = ((len(trigramas.intersection(gerar_trigramas(texto))), id_produto, texto) for id_produto, texto in textos)
+    return melhores_candidatos(item for item in contados if item[0]) # Sem trigrama em comum: nem no índice estaria
+
+def buscar_aproximado(campo, consulta, limite=10, corte=CORTE_APROXIMADO):
+    """
+    [(id, semelhança)] dos produtos cujo campo mais se parece com a consulta, do mais para o menos parecido.
+    Os candidatos são os CANDIDATOS_APROXIMADOS produtos com mais trigramas em comum com a consulta
+    (uma palavra com erro de digitação ainda tem trigramas certos); só eles são comparados com o difflib.
+    """
+    consulta = normalizar(consulta)
+    trigramas = gerar_trigramas(consulta)
+    if not trigramas:
+        # Consulta curta demais para comparar: vale a busca exata
+        return [(id_produto, 1.0) for id_produto in buscar_substring(campo, consulta)[:limite]]
+    indice = indice_trigramas[campo]
+    contagem = Counter()
+    for trigrama in trigramas:
+        ids = indice.get(trigrama)
+        if ids:
+            contagem.update(ids)
+    candidatos = melhores_candidatos((em_comum, id_produto) for id_produto, em_comum in contagem.items())
+    textos = textos_indexados[campo]
+    return ordenar_por_semelhanca(consulta, ((id_produto, textos[id_produto]) for _, id_produto in candidatos),
+                                  limite, corte)
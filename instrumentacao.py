@@ -0,0 +1,232 @@
+"""
+Instrumentação do Sistema de Gerenciamento de Estoque: contadores e histogramas de latência por operação
+
+Desligada, não custa nada: ativar() troca as funções da tabela de operações (ex.: servico_estoque.OPERACOES_MEDIDAS)
+por versões que medem cada chamada, e desativar() devolve as originais. Quem chama servico.salvar_dados()
+passa pela versão medida sem precisar mudar nada.
+
+Cada operação guarda chamadas, erros (exceções), tempo total, maior tempo e um histograma
+com faixas logarítmicas: SUBDIVISOES faixas entre cada potência de 2 (em nanossegundos), ou seja,
+erro de no máximo 1/SUBDIVISOES (~6%) nos percentis, com memória fixa e registro em tempo constante.
+Cada chamada medida só anota a duração numa fila (deque: append seguro entre threads, sem trava);
+a fila é somada ao histograma a cada LIMITE_PENDENTES chamadas e antes de qualquer leitura.
+
+Exportação (arquivo local, gravação atômica):
+    resumo()                       {operacao: {'chamadas', 'erros', 'total_ms', 'media_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'}}
+    exportar('metricas.json')      JSON com o resumo
+    exportar('metricas.prom')      texto no formato do Prometheus (histograma em segundos)
+
+Perfil (cProfile) de uma única execução de qualquer operação:
+    resultado, relatorio = perfilar(servico.salvar_dados, caminho='salvar.prof')
+"""
+
+import cProfile
+import collections
+import functools
+import io
+import json
+import pstats
+import threading
+import time
+
+import gravacao_atomica
+
+BITS_SUBDIVISAO = 4
+SUBDIVISOES = 1 << BITS_SUBDIVISAO # Faixas entre uma potência de 2 e a seguinte
+QUANTIDADE_FAIXAS = 64 * SUBDIVISOES # Cobre qualquer duração que caiba em 64 bits de nanossegundos
+PERCENTIS = (50, 95, 99)
+# Limites do histograma no formato do Prometheus: potências de 4 em nanossegundos, de ~1 µs a ~69 s
+# (sempre coincidem com o limite de uma faixa, então as contagens são exatas)
+LIMITES_PROMETHEUS_NS = tuple(1 << expoente for expoente in range(10, 37, 2))
+PREFIXO_PROMETHEUS = 'estoque_operacao'
+LIMITE_PENDENTES = 4096 # Durações anotadas antes de somar ao histograma (limita a memória da fila)
+
+def faixa_da_duracao(nanossegundos):
+    """Índice da faixa do histograma (abaixo de 2*SUBDIVISOES ns, uma faixa por nanossegundo)"""
+    deslocamento = nanossegundos.bit_length() - BITS_SUBDIVISAO - 1
+    if deslocamento <= 0:
+        return nanossegundos
+    return deslocamento * SUBDIVISOES + (nanossegundos >> deslocamento)
+
+def limites_da_faixa(faixa):
+    """(início, fim) em nanossegundos da faixa; o fim não faz parte dela"""
+    deslocamento = max(0, faixa // SUBDIVISOES - 1)
+    base = faixa - deslocamento * SUBDIVISOES
+    return base << deslocamento, (base + 1) << deslocamento
+
+class EstatisticaOperacao:
+    """Contadores e histograma de uma operação"""
+    __slots__ = ('chamadas', 'erros', 'total_ns', 'maximo_ns', 'faixas', 'pendentes', 'trava')
+
+    def __init__(self):
+        self.chamadas = 0
+        self.erros = 0
+        self.total_ns = 0
+        self.maximo_ns = 0
+        self.faixas = [0] * QUANTIDADE_FAIXAS
+        self.pendentes = collections.deque() # Durações (ns) ainda não somadas
+        self.trava = threading.Lock() # As operações do serviço são chamadas de várias threads
+
+    def descarregar(self):
+        """Soma as durações pendentes aos contadores e ao histograma (chamar com a trava)"""
+        pendentes = self.pendentes
+        # Só as que já estavam na fila: outra thread pode anotar enquanto isso (fica para a próxima vez)
+        duracoes = [pendentes.popleft() for _ in range(len(pendentes))]
+        if not duracoes:
+            return
+        self.chamadas += len(duracoes)
+        self.total_ns += sum(duracoes)
+        self.maximo_ns = max(self.maximo_ns, max(duracoes))
+        faixas = self.faixas
+        for duracao in duracoes: # faixa_da_duracao() sem uma chamada de função por duração
+            deslocamento = duracao.bit_length() - BITS_SUBDIVISAO - 1
+            if deslocamento <= 0:
+                faixas[duracao] += 1
+            else:
+                faixas[deslocamento * SUBDIVISOES + (duracao >> deslocamento)] += 1
+
+    def percentil(self, p):
+        """Duração (ns) abaixo da qual estão p% das chamadas (meio da faixa, limitado ao maior tempo medido)"""
+        if not self.chamadas:
+            return 0
+        alvo = max(1, -(-self.chamadas * p // 100))
+        acumulado = 0
+        for faixa, contagem in enumerate(self.faixas):
+            acumulado += contagem
+            if acumulado >= alvo:
+                inicio, fim = limites_da_faixa(faixa)
+                return min((inicio + fim - 1) // 2, self.maximo_ns)
+        return self.maximo_ns
+
+    def acumulado_ate(self, limite_ns):
+        """Chamadas com duração < limite_ns (o limite precisa coincidir com o início de uma faixa)"""
+        return sum(self.faixas[:faixa_da_duracao(limite_ns)])
+
+estatisticas = {} # operacao -> EstatisticaOperacao
+originais = {} # (módulo, nome da função) -> função original, enquanto a instrumentação está ativa
+
+def estatistica(operacao):
+    """Estatística da operação (criada na primeira vez)"""
+    encontrada = estatisticas.get(operacao)
+    if encontrada is None:
+        encontrada = estatisticas.setdefault(operacao, EstatisticaOperacao())
+    return encontrada
+
+def medida(funcao, operacao):
+    """Versão de 'funcao' que registra cada chamada em 'operacao'"""
+    dados = estatistica(operacao)
+    relogio = time.perf_counter_ns
+    pendentes = dados.pendentes
+    anotar = pendentes.append
+    trava = dados.trava
+
+    @functools.wraps(funcao)
+    def funcao_medida(*args, **kwargs):
+        inicio = relogio()
+        try:
+            resultado = funcao(*args, **kwargs)
+        except BaseException:
+            anotar(relogio() - inicio)
+            with trava: # Só nas chamadas com erro
+                dados.erros += 1
+            raise
+        # Caminho de toda operação medida: só anota a duração (sem trava nem cálculo da faixa)
+        anotar(relogio() - inicio)
+        if len(pendentes) >= LIMITE_PENDENTES:
+            with trava:
+                dados.descarregar()
+        return resultado
+    funcao_medida.operacao_medida = operacao
+    return funcao_medida
+
+def ativar(modulo, operacoes):
+    """Passa a medir as funções do módulo: operacoes = {nome da função: nome da operação}"""
+    for nome_funcao, operacao in operacoes.items():
+        if (modulo, nome_funcao) in originais:
+            continue # Já está sendo medida
+        funcao = getattr(modulo, nome_funcao)
+        originais[(modulo, nome_funcao)] = funcao
+        setattr(modulo, nome_funcao, medida(funcao, operacao))
+
+def desativar():
+    """Devolve as funções originais (as estatísticas continuam disponíveis até limpar())"""
+    for (modulo, nome_funcao), funcao in originais.items():
+        setattr(modulo, nome_funcao, funcao)
+    originais.clear()
+
+def ativa():
+    return bool(originais)
+
+def limpar():
+    """Zera todas as estatísticas (no lugar: as funções medidas continuam usando os mesmos objetos)"""
+    for dados in estatisticas.values():
+        with dados.trava:
+            dados.descarregar()
+            dados.chamadas = dados.erros = dados.total_ns = dados.maximo_ns = 0
+            dados.faixas[:] = [0] * QUANTIDADE_FAIXAS
+
+def resumo():
+    """Contadores e percentis (em milissegundos) de cada operação já chamada, em ordem alfabética"""
+    resultado = {}
+    for operacao in sorted(estatisticas):
+        dados = estatisticas[operacao]
+        with dados.trava:
+            dados.descarregar()
+            if not dados.chamadas:
+                continue
+            valores = {'chamadas': dados.chamadas, 'erros': dados.erros, 'total_ms': dados.total_ns / 1e6,
+                       'media_ms': dados.total_ns / dados.chamadas / 1e6}
+            for p in PERCENTIS:
+                valores[f'p{p}_ms'] = dados.percentil(p) / 1e6
+            valores['max_ms'] = dados.maximo_ns / 1e6
+        resultado[operacao] = valores
+    return resultado
+
+def texto_prometheus():
+    """Métricas no formato de texto do Prometheus"""
+    linhas = [f"# HELP {PREFIXO_PROMETHEUS}_segundos Duração das operações do estoque.",
+              f"# TYPE {PREFIXO_PROMETHEUS}_segundos histogram"]
+    erros = [f"# HELP {PREFIXO_PROMETHEUS}_erros_total Operações que terminaram com exceção.",
+             f"# TYPE {PREFIXO_PROMETHEUS}_erros_total counter"]
+    for operacao in sorted(estatisticas):
+        dados = estatisticas[operacao]
+        rotulo = operacao.replace('\\', '\\\\').replace('"', '\\"')
+        with dados.trava:
+            dados.descarregar()
+            if not dados.chamadas:
+                continue # Como no resumo(): só as operações que já foram chamadas
+            for limite in LIMITES_PROMETHEUS_NS:
+                linhas.append(f'{PREFIXO_PROMETHEUS}_segundos_bucket{{operacao="{rotulo}",le="{limite / 1e9:g}"}} '
+                              f'{dados.acumulado_ate(limite)}')
+            linhas.append(f'{PREFIXO_PROMETHEUS}_segundos_bucket{{operacao="{rotulo}",le="+Inf"}} {dados.chamadas}')
+            linhas.append(f'{PREFIXO_PROMETHEUS}_segundos_sum{{operacao="{rotulo}"}} {dados.total_ns / 1e9:.9f}')
+            linhas.append(f'{PREFIXO_PROMETHEUS}_segundos_count{{operacao="{rotulo}"}} {dados.chamadas}')
+            erros.append(f'{PREFIXO_PROMETHEUS}_erros_total{{operacao="{rotulo}"}} {dados.erros}')
+    return "\n".join(linhas + erros) + "\n"
+
+def exportar(caminho, formato=None):
+    """Grava as métricas em 'caminho': formato 'json' ou 'prometheus' (padrão: pela extensão, .prom = prometheus)"""
+    if formato is None:
+        formato = 'prometheus' if caminho.endswith(('.prom', '.txt')) else 'json'
+    if formato not in ('json', 'prometheus'):
+        raise ValueError(f"Formato de métricas desconhecido: {formato}")
+    with gravacao_atomica.arquivo_atomico(caminho) as arquivo:
+        if formato == 'json':
+            json.dump(resumo(), arquivo, indent=4, ensure_ascii=False)
+        else:
+            arquivo.write(texto_prometheus())
+
+def perfilar(funcao, *args, caminho=None, linhas=20, **kwargs):
+    """
+    Executa funcao(*args, **kwargs) uma vez sob o cProfile. Retorna (resultado, relatório em texto
+    com as 'linhas' funções de maior tempo acumulado); com 'caminho', grava o perfil para o pstats/snakeviz.
+    """
+    perfil = cProfile.Profile()
+    try:
+        resultado = perfil.runcall(funcao, *args, **kwargs)
+    finally:
+        if caminho is not None:
+            perfil.dump_stats(caminho)
+    saida = io.StringIO()
+    pstats.Stats(perfil, stream=saida).sort_stats('cumulative').print_stats(linhas)
+    return resultado, saida.getvalue()
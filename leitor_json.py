@@ -0,0 +1,107 @@
+"""
+Leitura em streaming do produtos.json para o Sistema de Gerenciamento de Estoque
+
+json.load() lê o arquivo inteiro, monta todos os dicionários e só então devolve o resultado;
+com um catálogo grande isso dobra o pico de memória (dicionário lido + dicionário convertido).
+Aqui o arquivo é lido em blocos e cada par "chave": {produto} do objeto principal é
+devolvido assim que termina de ser lido, então quem chama monta a estrutura final numa única passada.
+
+Exemplo:
+    for chave, produto_dict in ler_itens_objeto('produtos.json'):
+        produtos[int(chave)] = Produto.de_dict(produto_dict)
+"""
+
+import json
+import re
+
+TAMANHO_BLOCO = 1024 * 1024 # Caracteres lidos por vez
+
+decodificador = json.JSONDecoder()
+# Expressões para andar pelo objeto principal sem percorrer caractere por caractere em Python
+PADRAO_ESPACOS = re.compile(r'[ \t\n\r]*')
+PADRAO_CHAVE = re.compile(r'[ \t\n\r]*"([^"\\]*)"[ \t\n\r]*:') # Caso comum: chave sem escapes, ex. "123":
+PADRAO_SEPARADOR = re.compile(r'[ \t\n\r]*([,}])')
+
+class LeitorEmBlocos:
+    """Mantém um trecho do arquivo em memória e decodifica valores JSON a partir da posição atual"""
+    def __init__(self, arquivo, tamanho_bloco):
+        self.arquivo = arquivo
+        self.tamanho_bloco = tamanho_bloco
+        self.texto = ''
+        self.posicao = 0
+
+    def ler_mais(self, tamanho=None):
+        """Acrescenta o próximo bloco (descartando o que já foi lido); retorna False no fim do arquivo"""
+        bloco = self.arquivo.read(tamanho or self.tamanho_bloco)
+        if not bloco:
+            return False
+        self.texto = self.texto[self.posicao:] + bloco
+        self.posicao = 0
+        return True
+
+    def proximo_caractere(self):
+        """Pula os espaços e retorna o próximo caractere (sem consumir), ou '' no fim do arquivo"""
+        while True:
+            self.posicao = PADRAO_ESPACOS.match(self.texto, self.posicao).end()
+            if self.posicao < len(self.texto):
+                return self.texto[self.posicao]
+            if not self.ler_mais():
+                return ''
+
+    def consumir(self, esperado):
+        """Consome um caractere de pontuação ({ } : ,) e retorna qual foi"""
+        caractere = self.proximo_caractere()
+        if not caractere or caractere not in esperado: # '' in '{' é True: fim do arquivo (ou arquivo vazio) não passa
+            raise ValueError(f"JSON inválido: esperado um de {esperado!r}, encontrado {caractere or 'fim do arquivo'!r}")
+        self.posicao += 1
+        return caractere
+
+    def decodificar(self):
+        """Decodifica o valor JSON na posição atual, lendo mais blocos se ele estiver incompleto"""
+        while True:
+            self.posicao = PADRAO_ESPACOS.match(self.texto, self.posicao).end()
+            try:
+                # scan_once é o decodificador em C usado por json.loads (StopIteration = nenhum valor na posição)
+                valor, self.posicao = decodificador.scan_once(self.texto, self.posicao)
+                return valor
+            except (json.JSONDecodeError, StopIteration) as erro:
+                # O valor pode só estar cortado no fim do bloco: lê mais e tenta de novo.
+                # A leitura dobra o texto pendente a cada tentativa, então um arquivo inválido
+                # no meio não faz reler o mesmo trecho muitas vezes; o erro só vale no fim do arquivo.
+                if not self.ler_mais(max(self.tamanho_bloco, len(self.texto) - self.posicao)):
+                    raise ValueError(f"JSON inválido: {getattr(erro, 'msg', 'valor esperado')}") from erro
+
+def ler_itens_objeto(caminho, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Gera os pares (chave, valor) do objeto JSON principal do arquivo, na ordem do arquivo,
+    sem carregar o arquivo inteiro. Lança ValueError se o conteúdo não for um objeto JSON válido.
+    """
+    with open(caminho, 'r', encoding='utf-8') as arquivo:
+        leitor = LeitorEmBlocos(arquivo, tamanho_bloco)
+        leitor.consumir('{')
+        if leitor.proximo_caractere() == '}':
+            leitor.posicao += 1
+            return # Objeto vazio
+        while True:
+            encontrado = PADRAO_CHAVE.match(leitor.texto, leitor.posicao)
+            if encontrado:
+                chave = encontrado.group(1)
+                leitor.posicao = encontrado.end()
+            else:
+                # Chave com escapes ou cortada no fim do bloco: caminho geral
+                chave = leitor.decodificar()
+                if not isinstance(chave, str):
+                    raise ValueError("JSON inválido: as chaves do objeto devem ser textos.")
+                leitor.consumir(':')
+            yield chave, leitor.decodificar()
+
+            encontrado = PADRAO_SEPARADOR.match(leitor.texto, leitor.posicao)
+            if encontrado:
+                separador = encontrado.group(1)
+                leitor.posicao = encontrado.end()
+            else:
+                separador = leitor.consumir(',}')
+            if separador == '}':
+                break
+        if leitor.proximo_caractere() != '':
+            raise ValueError("JSON inválido: conteúdo extra depois do objeto principal.")
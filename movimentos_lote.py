@@ -0,0 +1,133 @@
+"""
+Movimentações de estoque em lote para o Sistema de Gerenciamento de Estoque
+
+Lê um arquivo CSV ou JSONL com várias movimentações (ID do produto e quantidade)
+e aplica todas de uma vez, com as mesmas regras de registrar_entrada/registrar_saida.
+
+Formato do arquivo (quantidade positiva = entrada, negativa = saída):
+- CSV, com cabeçalho:     id,delta
+                          1,10
+                          2,-3
+- JSONL, um por linha:    {"id": 1, "delta": 10}
+
+Modos:
+- por linha: linhas inválidas são rejeitadas e as demais são aplicadas
+- atômico:   se qualquer linha for rejeitada, nenhuma é aplicada
+"""
+
+import csv
+import json
+
+def ler_movimentos(caminho):
+    """
+    Lê o arquivo aos poucos (sem carregar tudo na memória) e gera tuplas
+    (número da linha, id, delta) com os valores ainda como vieram do arquivo.
+    """
+    with open(caminho, 'r', encoding='utf-8', newline='') as arquivo:
+        if caminho.lower().endswith('.jsonl'):
+            for numero_linha, linha in enumerate(arquivo, start=1):
+                if not linha.strip():
+                    continue # Ignora linhas em branco
+                try:
+                    registro = json.loads(linha)
+                    yield numero_linha, registro.get('id'), registro.get('delta')
+                except (json.JSONDecodeError, AttributeError):
+                    yield numero_linha, None, None # Será rejeitada na validação
+        else:
+            leitor = csv.reader(arquivo)
+            cabecalho = [coluna.strip().lower() for coluna in next(leitor, [])]
+            if 'id' not in cabecalho or 'delta' not in cabecalho:
+                raise ValueError("O CSV precisa de um cabeçalho com as colunas 'id' e 'delta'.")
+            coluna_id = cabecalho.index('id')
+            coluna_delta = cabecalho.index('delta')
+            for numero_linha, colunas in enumerate(leitor, start=2): # Linha 1 é o cabeçalho
+                if not colunas:
+                    continue
+                try:
+                    yield numero_linha, colunas[coluna_id], colunas[coluna_delta]
+                except IndexError:
+                    yield numero_linha, None, None
+
+def converter_inteiro(valor):
+    """
+    Texto do CSV -> int; números do JSON só se forem inteiros (mesma regra de validar_inteiro_nao_negativo:
+    2.9 não vira 2, e true/false não viram 1/0). Retorna None se o valor não for um inteiro.
+    """
+    if isinstance(valor, str):
+        try:
+            return int(valor)
+        except ValueError:
+            return None
+    if isinstance(valor, bool) or not isinstance(valor, int):
+        return None
+    return valor
+
+def aplicar_movimentos(produtos, movimentos, atomico=False):
+    """
+    Valida e aplica as movimentações sobre o dicionário de produtos.
+    Retorna um resumo:
+        {'linhas': int, 'aplicadas': int,
+         'rejeitadas': [(numero_linha, motivo), ...],
+         'ids_alterados': [...], 'produtos_alterados': [os dicionários alterados, na mesma ordem],
+         'alertas': [ids abaixo do mínimo após saídas],
+         'movimentos': [(id, delta, saldo resultante) de cada linha aplicada, em ordem]}
+    Os produtos só são modificados no final (e, no modo atômico, só se nada for rejeitado).
+    """
+    # Quantidades já considerando as linhas válidas anteriores: ID -> quantidade
+    quantidades = {}
+    lidos = {} # ID -> dicionário do produto, lido uma vez só e alterado no final
+    ids_com_saida = set()
+    rejeitadas = []
+    movimentos_aplicados = []
+    linhas = 0
+    aplicadas = 0
+
+    for numero_linha, id_bruto, delta_bruto in movimentos:
+        linhas += 1
+        id_produto = converter_inteiro(id_bruto)
+        if id_produto is None:
+            rejeitadas.append((numero_linha, "ID inválido."))
+            continue
+        delta = converter_inteiro(delta_bruto)
+        if delta is None:
+            rejeitadas.append((numero_linha, "Quantidade inválida."))
+            continue
+        if delta == 0:
+            rejeitadas.append((numero_linha, "Quantidade deve ser diferente de zero."))
+            continue
+
+        quantidade_atual = quantidades.get(id_produto)
+        if quantidade_atual is None:
+            produto_dict = produtos.get(id_produto)
+            if produto_dict is None:
+                rejeitadas.append((numero_linha, f"Produto com ID {id_produto} não encontrado."))
+                continue
+            lidos[id_produto] = produto_dict
+            quantidade_atual = produto_dict['quantidade']
+
+        if delta < 0:
+            # Mesma regra de registrar_saida(): não retira mais do que existe
+            if -delta > quantidade_atual:
+                rejeitadas.append((numero_linha, f"Quantidade insuficiente em estoque. Disponível: {quantidade_atual}"))
+                continue
+            ids_com_saida.add(id_produto)
+
+        quantidades[id_produto] = quantidade_atual + delta
+        movimentos_aplicados.append((id_produto, delta, quantidade_atual + delta))
+        aplicadas += 1
+
+    if atomico and rejeitadas:
+        # Tudo ou nada: nenhuma alteração é aplicada
+        return {'linhas': linhas, 'aplicadas': 0, 'rejeitadas': rejeitadas, 'ids_alterados': [],
+                'produtos_alterados': [], 'alertas': [], 'movimentos': []}
+
+    alertas = []
+    for id_produto, nova_quantidade in quantidades.items():
+        produto_dict = lidos[id_produto]
+        produto_dict['quantidade'] = nova_quantidade
+        if id_produto in ids_com_saida and nova_quantidade < produto_dict['estoque_minimo']:
+            alertas.append(id_produto)
+
+    return {'linhas': linhas, 'aplicadas': aplicadas, 'rejeitadas': rejeitadas,
+            'ids_alterados': list(quantidades), 'produtos_alterados': list(lidos.values()), 'alertas': alertas,
+            'movimentos': movimentos_aplicados}
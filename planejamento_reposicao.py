@@ -0,0 +1,277 @@
+"""
+Planejamento de reposição para o Sistema de Gerenciamento de Estoque
+
+O relatório de baixo estoque mostra só quanto falta para o estoque mínimo agora. Este módulo estima
+o consumo diário de cada produto a partir das saídas registradas e sugere quando e quanto pedir:
+    consumo diário        suavização exponencial das saídas de cada dia (UTC): ao fechar um dia,
+                          taxa = ALFA x saídas do dia + (1 - ALFA) x taxa; dias sem saída contam como zero
+                          (o dia atual, ainda incompleto, só entra quando fechar)
+    dias de cobertura     quantidade / consumo diário (sem consumo: infinito)
+    ponto de pedido       estoque_minimo + consumo diário x PRAZO_ENTREGA_DIAS
+    quantidade sugerida   para os produtos abaixo do ponto de pedido, o que falta para
+                          estoque_minimo + consumo diário x (PRAZO_ENTREGA_DIAS + DIAS_ENTRE_PEDIDOS), arredondado para cima
+Sem saídas registradas, o ponto de pedido é o estoque mínimo e a sugestão é a falta do relatório de baixo estoque.
+
+Cada produto tem uma linha em colunas (como em analise_colunar.py): a taxa suavizada até o último dia com saída,
+esse dia, o total de saídas nele, a quantidade e o estoque mínimo. As colunas são montadas por montar() (o serviço
+a chama ao carregar os dados; nos modos 'sqlite' e 'particionado', na primeira consulta), a partir do catálogo
+e dos últimos PERIODOS_HISTORICO dias do histórico de movimentações (uma saída mais antiga pesaria
+(1 - ALFA) ** dias: nada), e a partir daí cada alteração e cada saída atualizam só a linha do produto.
+O plano é uma passada sobre as colunas inteiras: os dias sem saída desde o último registro de cada produto
+são descontados com uma potência, sem laço por dia nem por produto.
+
+O NumPy é opcional: sem ele (ou com ATIVO = False) as colunas são listas e o plano é um laço em Python,
+com os mesmos resultados.
+"""
+
+import gc
+import math
+import operator
+
+import historico_movimentos
+from produto import Produto
+
+try:
+    import numpy
+except ImportError: # NumPy não instalado: só o caminho em Python
+    numpy = None
+
+ATIVO = numpy is not None
+ALFA = 0.3 # Peso do dia que fecha na média (maior = reage mais rápido a mudanças no consumo)
+SEGUNDOS_POR_PERIODO = historico_movimentos.SEGUNDOS_POR_DIA
+PERIODOS_HISTORICO = 120 # Dias do histórico lidos ao montar (0.7 ** 120 ~ 1e-19)
+PRAZO_ENTREGA_DIAS = 7 # Dias entre fazer o pedido e a mercadoria chegar
+DIAS_ENTRE_PEDIDOS = 14 # Dias de consumo que cada pedido deve cobrir (além do prazo de entrega)
+TIPOS_CONSUMO = ('saida', 'lote') # Movimentos destes tipos com delta negativo são consumo
+FOLGA = 1e-9 # Erro de ponto flutuante: 3.0000000000004 unidades não viram um pedido de 4
+CAPACIDADE_INICIAL = 1024
+TIPOS_COLUNAS = {'id': 'int64', 'taxa': 'float64', 'periodo': 'int64', 'consumo': 'int64',
+                 'quantidade': 'int64', 'estoque_minimo': 'int64'}
+
+# Colunas: a linha de cada produto é posicao_por_id[id]; só as 'tamanho' primeiras linhas estão em uso
+posicao_por_id = {}
+id_por_posicao = []
+colunas = {}
+tamanho = 0
+montado = False # False até montar() (ou depois de reconstruir)
+
+# Tabela (1 - ALFA) ** k do plano colunar, reaproveitada entre planos; refeita se ALFA mudar
+fatores_decaimento = None
+alfa_dos_fatores = None
+
+def criar_colunas(capacidade):
+    if ATIVO:
+        return {nome: numpy.zeros(capacidade, dtype=tipo) for nome, tipo in TIPOS_COLUNAS.items()}
+    return {nome: [0.0 if tipo == 'float64' else 0] * capacidade for nome, tipo in TIPOS_COLUNAS.items()}
+
+def limpar():
+    global colunas, tamanho, montado
+    montado = False
+    posicao_por_id.clear()
+    id_por_posicao.clear()
+    colunas = {}
+    tamanho = 0
+
+def reconstruir():
+    """Descarta as colunas (usado ao carregar); elas são montadas de novo por montar() ou na próxima consulta"""
+    limpar()
+
+def periodo_do_momento(momento):
+    return int(momento // SEGUNDOS_POR_PERIODO)
+
+def taxa_fechada(taxa, consumo, dias):
+    """Taxa depois de fechar o dia com 'consumo' saídas e passar mais dias - 1 dias sem saída"""
+    return (ALFA * consumo + (1 - ALFA) * taxa) * (1 - ALFA) ** (dias - 1)
+
+def consumir(posicao, quantidade, periodo):
+    """Soma uma saída à linha; se o dia mudou, fecha o dia anterior antes"""
+    ultimo = int(colunas['periodo'][posicao])
+    if periodo > ultimo:
+        # Contas com float/int do Python também nas colunas NumPy: mesmo resultado da montagem, bit a bit
+        colunas['taxa'][posicao] = taxa_fechada(float(colunas['taxa'][posicao]), int(colunas['consumo'][posicao]),
+                                                periodo - ultimo)
+        colunas['periodo'][posicao] = periodo
+        colunas['consumo'][posicao] = quantidade
+    else: # Mesmo dia (o histórico nunca volta no tempo)
+        colunas['consumo'][posicao] += quantidade
+
+def montar(produtos, agora):
+    """Monta as colunas a partir do catálogo e das saídas dos últimos PERIODOS_HISTORICO dias do histórico"""
+    global colunas, tamanho, montado
+    limpar()
+    # Um milhão de listas e números novos (e nenhum ciclo entre eles) disparariam o coletor de ciclos à toa
+    coletor_ligado = gc.isenabled()
+    gc.disable()
+    try:
+        lista = list(produtos.values())
+        campos = ('id', 'quantidade', 'estoque_minimo')
+        extrair = operator.attrgetter(*campos) if all(type(produto_dict) is Produto for produto_dict in lista) \
+            else operator.itemgetter(*campos)
+        ids, quantidades, minimos = zip(*map(extrair, lista)) if lista else ((), (), ())
+        capacidade = max(CAPACIDADE_INICIAL, len(lista))
+        sobra = [0] * (capacidade - len(lista))
+        # Montadas como listas (as mesmas contas de consumir() nas atualizações) e convertidas para NumPy no fim
+        colunas = {'id': list(ids) + sobra, 'taxa': [0.0] * capacidade, 'periodo': [0] * capacidade,
+                   'consumo': [0] * capacidade, 'quantidade': list(quantidades) + sobra,
+                   'estoque_minimo': list(minimos) + sobra}
+        id_por_posicao.extend(ids)
+        posicao_por_id.update(zip(ids, range(len(ids))))
+        tamanho = len(ids)
+
+        codigos_consumo = {historico_movimentos.CODIGO_TIPO[tipo] for tipo in TIPOS_CONSUMO}
+        inicio = (periodo_do_momento(agora) - PERIODOS_HISTORICO) * SEGUNDOS_POR_PERIODO
+        for momento, id_produto, delta, codigo_tipo, _ in historico_movimentos.registros_no_periodo(inicio, float('inf')):
+            if delta < 0 and codigo_tipo in codigos_consumo:
+                posicao = posicao_por_id.get(id_produto)
+                if posicao is not None: # Produtos já removidos ficam de fora
+                    consumir(posicao, -delta, periodo_do_momento(momento))
+        if ATIVO:
+            colunas = {nome: numpy.array(coluna, dtype=TIPOS_COLUNAS[nome]) for nome, coluna in colunas.items()}
+    finally:
+        if coletor_ligado:
+            gc.enable()
+    montado = True
+
+def atualizar_produto(produto_dict):
+    """Grava a quantidade e o estoque mínimo atuais na linha do produto (acrescenta uma linha se ele é novo)"""
+    global colunas, tamanho
+    if not montado:
+        return
+    id_produto = produto_dict['id']
+    posicao = posicao_por_id.get(id_produto)
+    if posicao is None:
+        if tamanho == len(colunas['id']):
+            # Sem espaço: dobra a capacidade (custo amortizado constante por produto novo)
+            novas = criar_colunas(2 * tamanho)
+            for nome, coluna in colunas.items():
+                novas[nome][:tamanho] = coluna[:tamanho]
+            colunas = novas
+        posicao = posicao_por_id[id_produto] = tamanho
+        id_por_posicao.append(id_produto)
+        tamanho += 1
+        colunas['id'][posicao] = id_produto
+        colunas['taxa'][posicao] = 0.0
+        colunas['periodo'][posicao] = 0
+        colunas['consumo'][posicao] = 0
+    colunas['quantidade'][posicao] = produto_dict['quantidade']
+    colunas['estoque_minimo'][posicao] = produto_dict['estoque_minimo']
+
+def remover_produto(id_produto):
+    """Retira a linha do produto (a última linha passa para o lugar dela)"""
+    global tamanho
+    if not montado:
+        return
+    posicao = posicao_por_id.pop(id_produto, None)
+    if posicao is None:
+        return
+    ultima = tamanho - 1
+    if posicao != ultima:
+        for coluna in colunas.values():
+            coluna[posicao] = coluna[ultima]
+        id_movido = id_por_posicao[ultima]
+        id_por_posicao[posicao] = id_movido
+        posicao_por_id[id_movido] = posicao
+    id_por_posicao.pop()
+    tamanho = ultima
+
+def registrar_movimento(id_produto, tipo, delta, momento):
+    """Soma uma saída ao consumo do produto - O(1). Chamada a cada movimento, com o mesmo momento do histórico"""
+    if not montado or delta >= 0 or tipo not in TIPOS_CONSUMO:
+        return
+    posicao = posicao_por_id.get(id_produto)
+    if posicao is not None:
+        consumir(posicao, -delta, periodo_do_momento(momento))
+
+def registrar_movimentos(tipo, movimentos, momento):
+    """registrar_movimento() para vários movimentos do mesmo tipo e momento: movimentos = [(id, delta, ...), ...]"""
+    if not montado or tipo not in TIPOS_CONSUMO:
+        return
+    for movimento in movimentos:
+        registrar_movimento(movimento[0], tipo, movimento[1], momento)
+
+def em_uso(nome):
+    return colunas[nome][:tamanho]
+
+def parametros(prazo_entrega, dias_entre_pedidos):
+    return (PRAZO_ENTREGA_DIAS if prazo_entrega is None else prazo_entrega,
+            DIAS_ENTRE_PEDIDOS if dias_entre_pedidos is None else dias_entre_pedidos)
+
+def fatores_ate(quantidade):
+    """
+    Tabela com pelo menos 'quantidade' fatores (1 - ALFA) ** k, calculados pelo Python: a potência do NumPy
+    pode diferir no último dígito, e o plano deve ser igual ao do caminho em Python (inclusive nos empates
+    da ordem). Cresce dobrando de tamanho, então cada fator é calculado uma única vez.
+    """
+    global fatores_decaimento, alfa_dos_fatores
+    if alfa_dos_fatores != ALFA:
+        fatores_decaimento, alfa_dos_fatores = numpy.empty(0), ALFA
+    inicio = len(fatores_decaimento)
+    if inicio < quantidade:
+        fim = max(quantidade, 2 * inicio, PERIODOS_HISTORICO)
+        novos = numpy.array([(1 - ALFA) ** expoente for expoente in range(inicio, fim)])
+        fatores_decaimento = numpy.concatenate((fatores_decaimento, novos))
+    return fatores_decaimento
+
+# Plano com NumPy: uma passada sobre as colunas inteiras
+def planejar_colunar(periodo_atual, prazo, ciclo):
+    taxa = em_uso('taxa')
+    dias = periodo_atual - em_uso('periodo')
+    fatores = fatores_ate(int(dias.max(initial=1))) # (1 - ALFA) ** (dias - 1)
+    fechada = (ALFA * em_uso('consumo') + (1 - ALFA) * taxa) * fatores[numpy.maximum(dias, 1) - 1]
+    taxa = numpy.where(dias > 0, fechada, taxa)
+    quantidade = em_uso('quantidade')
+    minimo = em_uso('estoque_minimo')
+    ponto = minimo + taxa * prazo
+    posicoes = numpy.flatnonzero(quantidade + FOLGA < ponto)
+    taxa, quantidade, minimo, ponto = taxa[posicoes], quantidade[posicoes], minimo[posicoes], ponto[posicoes]
+    ids = em_uso('id')[posicoes]
+    sugerida = numpy.ceil(minimo + taxa * (prazo + ciclo) - quantidade - FOLGA).astype(numpy.int64)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        cobertura = numpy.where(taxa > 0, quantidade / taxa, numpy.inf)
+    ordem = numpy.lexsort((ids, cobertura)) # Menos dias de cobertura primeiro; empate: menor ID
+    return list(zip(ids[ordem].tolist(), taxa[ordem].tolist(), cobertura[ordem].tolist(),
+                    ponto[ordem].tolist(), sugerida[ordem].tolist()))
+
+# Mesmo plano em Python puro (sem NumPy, ou para comparação)
+def plano_da_linha(posicao, periodo_atual, prazo, ciclo):
+    """(id, consumo diário, dias de cobertura, ponto de pedido, quantidade sugerida ou 0) de uma linha"""
+    taxa = float(colunas['taxa'][posicao])
+    dias = periodo_atual - int(colunas['periodo'][posicao])
+    if dias > 0:
+        taxa = taxa_fechada(taxa, int(colunas['consumo'][posicao]), dias)
+    quantidade = int(colunas['quantidade'][posicao])
+    minimo = int(colunas['estoque_minimo'][posicao])
+    ponto = minimo + taxa * prazo
+    sugerida = math.ceil(minimo + taxa * (prazo + ciclo) - quantidade - FOLGA) if quantidade + FOLGA < ponto else 0
+    cobertura = quantidade / taxa if taxa > 0 else math.inf
+    return int(colunas['id'][posicao]), taxa, cobertura, ponto, sugerida
+
+def planejar_python(periodo_atual, prazo, ciclo):
+    planos = [plano for plano in (plano_da_linha(posicao, periodo_atual, prazo, ciclo) for posicao in range(tamanho))
+              if plano[4] > 0]
+    return sorted(planos, key=lambda plano: (plano[2], plano[0]))
+
+# Consultas usadas pelo sistema
+def preparar(produtos, agora):
+    """Monta as colunas na primeira consulta, se ainda não foram montadas"""
+    if not montado:
+        montar(produtos, agora)
+
+def planejar(produtos, agora, prazo_entrega=None, dias_entre_pedidos=None):
+    """
+    [(id, consumo diário, dias de cobertura, ponto de pedido, quantidade sugerida)] dos produtos abaixo do
+    ponto de pedido no momento 'agora', do menor para o maior número de dias de cobertura (empate: menor ID)
+    """
+    preparar(produtos, agora)
+    prazo, ciclo = parametros(prazo_entrega, dias_entre_pedidos)
+    if ATIVO:
+        return planejar_colunar(periodo_do_momento(agora), prazo, ciclo)
+    return planejar_python(periodo_do_momento(agora), prazo, ciclo)
+
+def previsao(produtos, id_produto, agora, prazo_entrega=None, dias_entre_pedidos=None):
+    """Plano de um produto (mesma tupla de planejar(), com quantidade sugerida 0 se não é hora de pedir) ou None"""
+    preparar(produtos, agora)
+    posicao = posicao_por_id.get(id_produto)
+    if posicao is None:
+        return None
+    return plano_da_linha(posicao, periodo_do_momento(agora), *parametros(prazo_entrega, dias_entre_pedidos))
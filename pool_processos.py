@@ -0,0 +1,38 @@
+"""
+Pools de processos do Sistema de Gerenciamento de Estoque
+
+Usados pelos relatórios do estoque particionado (estoque_particionado.py) e pela validação da importação
+em lote (catalogo_lote.py). Cada pool é criado no primeiro uso e mantido para os próximos (os processos
+ficam prontos), e é recriado se a quantidade de processos mudar.
+
+Os processos são iniciados com 'forkserver' (não herdam as travas e threads do programa principal)
+ou, onde ele não existe (Windows), com 'spawn'. Nos dois casos as funções enviadas aos processos
+precisam ser funções de módulo, e o programa principal precisa do "if __name__ == '__main__'".
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+pools = {} # nome -> (ProcessPoolExecutor, quantidade de processos)
+
+def contexto():
+    """Contexto do multiprocessing: 'forkserver' se a plataforma tem, senão 'spawn'"""
+    metodo = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(metodo)
+
+def obter(nome, processos):
+    """Pool 'nome' com 'processos' processos (recriado se a quantidade mudou)"""
+    atual = pools.get(nome)
+    if atual is not None:
+        if atual[1] == processos:
+            return atual[0]
+        atual[0].shutdown()
+    executor = ProcessPoolExecutor(max_workers=processos, mp_context=contexto())
+    pools[nome] = (executor, processos)
+    return executor
+
+def encerrar(nome):
+    """Encerra o pool 'nome' (se existir); o próximo obter() cria outro"""
+    atual = pools.pop(nome, None)
+    if atual is not None:
+        atual[0].shutdown()
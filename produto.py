@@ -0,0 +1,73 @@
+"""
+Representação compacta de um produto para o Sistema de Gerenciamento de Estoque
+
+Um dicionário com 6 chaves ocupa várias centenas de bytes; com milhões de produtos isso pesa.
+A classe Produto guarda os mesmos 6 campos em __slots__ (sem dicionário por objeto)
+e reaproveita a mesma string para categorias repetidas (sys.intern).
+
+Ela continua se comportando como o dicionário de antes:
+    produto['quantidade'] -= 1
+    produto.get('nome')
+    dict(produto)            -> {'id': 1, 'nome': ..., ...}
+    produto == {'id': 1, ...} -> compara campo a campo
+"""
+
+import sys
+from collections.abc import MutableMapping
+
+CAMPOS = ('id', 'nome', 'categoria', 'quantidade', 'preco', 'estoque_minimo')
+CONJUNTO_CAMPOS = frozenset(CAMPOS)
+
+class Produto(MutableMapping):
+    """Produto com os campos em __slots__, acessível como dicionário"""
+    __slots__ = CAMPOS
+
+    def __init__(self, id, nome, categoria, quantidade, preco, estoque_minimo):
+        self.id = id
+        self.nome = nome
+        self.categoria = sys.intern(categoria) # Categorias se repetem muito: uma string só para cada uma
+        self.quantidade = quantidade
+        self.preco = preco
+        self.estoque_minimo = estoque_minimo
+
+    @classmethod
+    def de_dict(cls, dados):
+        """Cria um Produto a partir do dicionário (ex.: lido do JSON)"""
+        return cls(dados['id'], dados['nome'], dados['categoria'],
+                   dados['quantidade'], dados['preco'], dados['estoque_minimo'])
+
+    def para_dict(self):
+        """Dicionário comum com os mesmos campos (para gravar em JSON)"""
+        return {'id': self.id, 'nome': self.nome, 'categoria': self.categoria,
+                'quantidade': self.quantidade, 'preco': self.preco, 'estoque_minimo': self.estoque_minimo}
+
+    # Interface de dicionário
+    def __getitem__(self, campo):
+        if campo not in CONJUNTO_CAMPOS:
+            raise KeyError(campo)
+        return getattr(self, campo)
+
+    def __setitem__(self, campo, valor):
+        if campo not in CONJUNTO_CAMPOS:
+            raise KeyError(campo) # Um produto só tem os campos fixos
+        if campo == 'categoria':
+            valor = sys.intern(valor)
+        setattr(self, campo, valor)
+
+    def __delitem__(self, campo):
+        raise TypeError("Campos de um produto não podem ser removidos.")
+
+    def __iter__(self):
+        return iter(CAMPOS)
+
+    def __len__(self):
+        return len(CAMPOS)
+
+    def __repr__(self):
+        return f"Produto({self.para_dict()!r})"
+
+def para_json(objeto):
+    """Função 'default' para json.dump/json.dumps: converte Produto em dicionário"""
+    if isinstance(objeto, Produto):
+        return objeto.para_dict()
+    raise TypeError(f"Objeto do tipo {type(objeto).__name__} não pode ser convertido para JSON")
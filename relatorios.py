@@ -0,0 +1,300 @@
+"""
+Relatórios paginados e exportação em fluxo para o Sistema de Gerenciamento de Estoque
+
+Antes, cada relatório montava a tabela inteira e fazia um print() por produto: com catálogos
+grandes a saída (terminal ou pipe) virava o gargalo e a tela era inundada.
+Agora cada relatório é uma sequência de geradores:
+
+    produtos -> linhas (tuplas com as colunas do relatório) -> página ou exportação -> blocos de texto
+
+- Páginas: 'limite' linhas a partir de um cursor, na ordem pedida (qualquer coluna, inclusive 'valor').
+  Só as linhas da página ficam na memória (heapq.nsmallest), nunca a tabela ordenada inteira.
+- Cursor estável: guarda a chave de ordenação e o ID da última linha da página ("keyset"), não uma posição.
+  A próxima página começa logo depois dessa chave, então cadastros e remoções feitos entre uma página
+  e outra não fazem nenhum produto aparecer duas vezes nem ser pulado.
+- Saída em blocos: as linhas são formatadas em grupos de LINHAS_POR_BLOCO e cada grupo é gravado
+  com um único write() (texto, CSV ou JSONL), no stdout ou num arquivo.
+  As linhas são tuplas e cada formato usa um único modelo com '%' por linha (sem dicionário nem
+  print() por linha), o que deixa a formatação mais barata que a escrita.
+
+Uso (os produtos vêm do serviço; ver servico_estoque.pagina_relatorio e exportar_relatorio):
+    linhas, proximo_cursor = pagina('estoque', produtos, ordem='valor', decrescente=True, limite=20)
+    escrever('estoque', linhas, sys.stdout, 'csv')
+"""
+
+import base64
+import binascii
+import csv
+import heapq
+import io
+import json
+from decimal import Decimal
+from itertools import islice
+from json.encoder import encode_basestring # Texto entre aspas com escapes do JSON (implementação em C)
+from operator import attrgetter, itemgetter, mul, neg, sub
+
+from produto import Produto
+
+LINHAS_POR_BLOCO = 5000 # Linhas formatadas por write(): poucas chamadas, pouco texto na memória
+FORMATOS = ('texto', 'csv', 'jsonl')
+
+# Colunas de cada relatório (na ordem em que aparecem no CSV e no JSONL)
+COLUNAS = {
+    'produtos': ('id', 'nome', 'categoria', 'quantidade'),
+    'estoque': ('id', 'nome', 'categoria', 'quantidade', 'preco', 'valor'),
+    'baixo-estoque': ('id', 'nome', 'quantidade', 'estoque_minimo', 'necessario_repor'),
+}
+
+# Ordem usada quando nenhuma é pedida: (coluna, decrescente)
+ORDEM_PADRAO = {
+    'produtos': ('id', False),
+    'estoque': ('id', False),
+    'baixo-estoque': ('necessario_repor', True), # Do maior para o menor déficit, como antes
+}
+
+# Formato de texto: (cabeçalho, largura do separador, modelo de cada linha)
+# O ".25" no modelo corta o texto como o [:25] dos relatórios do menu
+TABELAS = {
+    'produtos': (f"{'ID':<5} {'Nome':<30} {'Categoria':<15} {'Quantidade':<10}", 65,
+                 "%-5d %-30.30s %-15.15s %-10d"),
+    'estoque': (f"{'ID':<5} {'Nome':<25} {'Categoria':<15} {'Qtd':<8} {'Preço':<12} {'Total':<12}", 80,
+                "%-5d %-25.25s %-15.15s %-8d R$ %-8.2f R$ %-8.2f"),
+    'baixo-estoque': (f"{'ID':<5} {'Nome':<25} {'Atual':<8} {'Mínimo':<8} {'Necessário':<10}", 65,
+                      "%-5d %-25.25s %-8d %-8d %-10d"),
+}
+
+# Colunas de texto (escapadas no JSONL) e em Decimal (gravadas entre aspas no JSONL, sem perder casas)
+COLUNAS_TEXTO = ('nome', 'categoria')
+COLUNAS_DECIMAIS = ('valor',)
+
+# Colunas calculadas: (campos do produto, como combinar). As demais colunas são campos do próprio produto.
+# 'valor' ordena pelo produto em float: é só a ordem (a coluna exportada continua em Decimal) e o cursor
+# guarda o mesmo float, então a paginação continua consistente.
+COLUNAS_CALCULADAS = {
+    'valor': (('quantidade', 'preco'), mul),
+    'necessario_repor': (('estoque_minimo', 'quantidade'), sub),
+}
+
+class ChaveInvertida:
+    """Inverte a comparação de um valor (ordem decrescente de textos, que não podem ser negados)"""
+    __slots__ = ('valor',)
+
+    def __init__(self, valor):
+        self.valor = valor
+
+    def __lt__(self, outra):
+        return outra.valor < self.valor
+
+    def __gt__(self, outra):
+        return outra.valor > self.valor
+
+    def __eq__(self, outra):
+        return self.valor == outra.valor
+
+# --- Linhas ---
+# Cada linha é uma tupla na ordem de COLUNAS[relatorio]. Os campos de um Produto são lidos
+# direto dos atributos (attrgetter, sem passar pelo __getitem__ em Python); o dicionário
+# do modo sqlite é lido pelas chaves (itemgetter).
+
+def leitor_de_campos(*campos):
+    """Função produto -> tupla com os campos pedidos, para Produto ou dicionário"""
+    por_atributo = attrgetter(*campos)
+    por_chave = itemgetter(*campos)
+    return lambda produto_dict: (por_atributo if type(produto_dict) is Produto else por_chave)(produto_dict)
+
+def linhas_produtos(produtos):
+    return map(leitor_de_campos(*COLUNAS['produtos']), produtos)
+
+def linhas_estoque(produtos):
+    ler_campos = leitor_de_campos('id', 'nome', 'categoria', 'quantidade', 'preco')
+    for produto_dict in produtos:
+        id_produto, nome, categoria, quantidade, preco = ler_campos(produto_dict)
+        # Mesmo cálculo exato dos totais (agregados_estoque.valor_decimal)
+        yield (id_produto, nome, categoria, quantidade, preco, Decimal(repr(preco)) * quantidade)
+
+def linhas_baixo_estoque(produtos):
+    ler_campos = leitor_de_campos('id', 'nome', 'quantidade', 'estoque_minimo')
+    for produto_dict in produtos:
+        id_produto, nome, quantidade, estoque_minimo = ler_campos(produto_dict)
+        yield (id_produto, nome, quantidade, estoque_minimo, estoque_minimo - quantidade)
+
+GERADORES_DE_LINHAS = {'produtos': linhas_produtos, 'estoque': linhas_estoque, 'baixo-estoque': linhas_baixo_estoque}
+
+def gerar_linhas(relatorio, produtos):
+    """Gerador: uma linha por produto, na ordem em que os produtos chegam"""
+    return GERADORES_DE_LINHAS[relatorio](produtos)
+
+# --- Ordenação e cursor ---
+
+def validar_ordem(relatorio, ordem, decrescente):
+    """Retorna (coluna, decrescente) já conferidos; ordem None = ordem padrão do relatório"""
+    if relatorio not in COLUNAS:
+        raise ValueError(f"Relatório desconhecido: {relatorio}")
+    if ordem is None:
+        return ORDEM_PADRAO[relatorio]
+    if ordem not in COLUNAS[relatorio]:
+        raise ValueError(f"O relatório '{relatorio}' não pode ser ordenado por '{ordem}' "
+                         f"(colunas: {', '.join(COLUNAS[relatorio])}).")
+    return ordem, decrescente
+
+def funcao_chave(ordem, decrescente):
+    """
+    Chave (valor da coluna, id) já no sentido pedido; o ID desempata sempre em ordem crescente.
+    Os campos são lidos de uma vez (leitor_de_campos); em ordem crescente de um campo do produto
+    a própria leitura já é a chave.
+    """
+    if ordem in COLUNAS_CALCULADAS:
+        campos, combinar = COLUNAS_CALCULADAS[ordem]
+        ler_campos = leitor_de_campos(*campos, 'id')
+        def chave(produto_dict):
+            primeiro, segundo, id_produto = ler_campos(produto_dict)
+            valor = combinar(primeiro, segundo)
+            return (-valor if decrescente else valor, id_produto)
+        return chave
+    ler_campos = leitor_de_campos(ordem, 'id')
+    if not decrescente:
+        return ler_campos
+    inverter = ChaveInvertida if ordem in COLUNAS_TEXTO else neg # Textos não podem ser negados
+    def chave(produto_dict):
+        valor, id_produto = ler_campos(produto_dict)
+        return (inverter(valor), id_produto)
+    return chave
+
+def codificar_cursor(relatorio, ordem, decrescente, produto_dict):
+    """Texto opaco que aponta para logo depois deste produto (nesta ordenação)"""
+    valor, id_produto = funcao_chave(ordem, False)(produto_dict) # Valor da coluna, sem inverter
+    conteudo = json.dumps([relatorio, ordem, decrescente, valor, id_produto], ensure_ascii=False)
+    return base64.urlsafe_b64encode(conteudo.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decodificar_cursor(cursor, relatorio, ordem, decrescente):
+    """Chave (já no sentido pedido) do último produto da página anterior"""
+    try:
+        conteudo = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        relatorio_cursor, ordem_cursor, decrescente_cursor, valor, id_produto = json.loads(conteudo)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise ValueError("Cursor inválido.")
+    if (relatorio_cursor, ordem_cursor, decrescente_cursor) != (relatorio, ordem, decrescente):
+        raise ValueError("O cursor é de outro relatório ou de outra ordenação.")
+    if isinstance(valor, str) != (ordem in COLUNAS_TEXTO) or not isinstance(id_produto, int):
+        raise ValueError("Cursor inválido.")
+    if not decrescente:
+        return (valor, id_produto)
+    if ordem in COLUNAS_TEXTO:
+        return (ChaveInvertida(valor), id_produto)
+    return (-valor, id_produto)
+
+# --- Páginas ---
+
+def pagina(relatorio, produtos, ordem=None, decrescente=False, limite=50, cursor=None, numero_pagina=1):
+    """
+    Uma página do relatório: retorna (linhas, cursor da próxima página ou None se esta for a última).
+    - produtos: qualquer iterável de produtos (é percorrido uma vez)
+    - cursor: o retornado pela página anterior (mesmo relatório e mesma ordenação)
+    - numero_pagina: pula (numero_pagina - 1) * limite linhas depois do cursor (páginas numeradas)
+    Custo O(n log k) com k = numero_pagina * limite: só as k primeiras linhas ficam guardadas.
+    """
+    ordem, decrescente = validar_ordem(relatorio, ordem, decrescente)
+    if limite < 1 or numero_pagina < 1:
+        raise ValueError("O limite e o número da página precisam ser maiores que zero.")
+    chave = funcao_chave(ordem, decrescente)
+    # Pares (chave, produto): a chave é calculada uma vez só e, como termina no ID (único),
+    # a comparação entre pares nunca chega a comparar os produtos
+    if cursor is None:
+        pares = ((chave(produto_dict), produto_dict) for produto_dict in produtos)
+    else:
+        depois_de = decodificar_cursor(cursor, relatorio, ordem, decrescente)
+        pares = ((valor, produto_dict) for produto_dict in produtos if (valor := chave(produto_dict)) > depois_de)
+
+    pular = (numero_pagina - 1) * limite
+    # Um a mais que o necessário: se ele existir, há uma próxima página
+    primeiros = heapq.nsmallest(pular + limite + 1, pares)
+    selecionados = [produto_dict for _, produto_dict in primeiros[pular:pular + limite]]
+    proximo_cursor = None
+    if len(primeiros) > pular + limite:
+        proximo_cursor = codificar_cursor(relatorio, ordem, decrescente, selecionados[-1])
+    return list(gerar_linhas(relatorio, selecionados)), proximo_cursor
+
+def todas_as_linhas(relatorio, produtos, ordem=None, decrescente=False):
+    """
+    Gerador com o relatório inteiro (exportação).
+    Sem 'ordem', as linhas saem na ordem em que os produtos chegam, sem guardar nada;
+    com 'ordem', a lista de produtos é ordenada antes (só referências aos produtos, não as linhas).
+    """
+    if ordem is not None:
+        ordem, decrescente = validar_ordem(relatorio, ordem, decrescente)
+        produtos = sorted(produtos, key=funcao_chave(ordem, decrescente))
+    elif relatorio not in COLUNAS:
+        raise ValueError(f"Relatório desconhecido: {relatorio}")
+    return gerar_linhas(relatorio, produtos)
+
+# --- Saída em blocos ---
+
+def dividir_em_blocos(linhas, tamanho=LINHAS_POR_BLOCO):
+    """Gerador de listas com até 'tamanho' linhas"""
+    iterador = iter(linhas)
+    while True:
+        bloco = list(islice(iterador, tamanho))
+        if not bloco:
+            return
+        yield bloco
+
+def modelo_jsonl(relatorio):
+    """
+    Modelo '%' de uma linha JSONL e a função que prepara a tupla para ele
+    (textos já escapados com encode_basestring; números com repr; Decimal como texto entre aspas).
+    """
+    partes = []
+    posicoes_texto = []
+    for posicao, coluna in enumerate(COLUNAS[relatorio]):
+        if coluna in COLUNAS_TEXTO:
+            partes.append(f'"{coluna}": %s')
+            posicoes_texto.append(posicao)
+        elif coluna in COLUNAS_DECIMAIS:
+            partes.append(f'"{coluna}": "%s"')
+        else:
+            partes.append(f'"{coluna}": %r')
+    def preparar(linha):
+        linha = list(linha)
+        for posicao in posicoes_texto:
+            linha[posicao] = encode_basestring(linha[posicao])
+        return tuple(linha)
+    return '{' + ', '.join(partes) + '}', preparar
+
+def escrever(relatorio, linhas, arquivo, formato='texto', cabecalho=True):
+    """
+    Grava as linhas no arquivo (ou sys.stdout) no formato 'texto', 'csv' ou 'jsonl'
+    com um write() por bloco de linhas. Retorna a quantidade de linhas gravadas.
+    Valores Decimal saem como texto (ex.: "59.7"), sem perder casas decimais.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconhecido: {formato} (use {', '.join(FORMATOS)}).")
+    if formato == 'csv':
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer, lineterminator='\n')
+        if cabecalho:
+            escritor.writerow(COLUNAS[relatorio])
+        def formatar(bloco):
+            buffer.seek(0)
+            buffer.truncate()
+            escritor.writerows(bloco)
+            return buffer.getvalue()
+        pendente = buffer.getvalue() # O cabeçalho vai junto com o primeiro bloco
+    elif formato == 'jsonl':
+        modelo, preparar = modelo_jsonl(relatorio)
+        def formatar(bloco):
+            return '\n'.join([modelo % preparar(linha) for linha in bloco]) + '\n'
+        pendente = ''
+    else:
+        titulo, largura, modelo = TABELAS[relatorio]
+        def formatar(bloco):
+            return '\n'.join([modelo % linha for linha in bloco]) + '\n'
+        pendente = f"{titulo}\n{'-' * largura}\n" if cabecalho else ''
+
+    quantidade = 0
+    for bloco in dividir_em_blocos(linhas):
+        arquivo.write(pendente + formatar(bloco))
+        pendente = ''
+        quantidade += len(bloco)
+    if pendente:
+        arquivo.write(pendente) # Relatório vazio: só o cabeçalho
+    return quantidade
@@ -0,0 +1,1085 @@
+"""
+Camada de serviço do Sistema de Gerenciamento de Estoque
+
+Contém o estado do sistema (dicionário 'produtos', próximo ID, persistência) e as operações
+sem nenhum input() ou print(): cada função recebe argumentos e retorna o resultado
+ou lança uma exceção de ErroEstoque. O menu interativo (atividade_final_dict.py),
+a linha de comando (cli_estoque.py) e os scripts de benchmark usam estas funções.
+
+Exemplo:
+    import servico_estoque as servico
+    servico.carregar_dados()
+    produto = servico.cadastrar_produto("ps5", "games", 10, 3999.90, 2)
+    servico.registrar_saida(produto['id'], 3)
+    servico.salvar_dados()
+
+As operações podem ser chamadas de várias threads ao mesmo tempo:
+- cada produto é protegido por uma trava (travas "listradas": NUMERO_TRAVAS travas divididas entre os IDs),
+  então o teste de estoque e a alteração da quantidade acontecem sem interrupção;
+- trava_global protege o que é compartilhado por todos os produtos (inserção/remoção no dicionário,
+  índices, totais e alterações pendentes). Ordem para evitar deadlock: trava do produto -> trava_global;
+- os IDs novos vêm de alocar_id(), que nunca entrega o mesmo ID duas vezes.
+"""
+
+import atexit
+import gc
+import json
+import os
+import sys
+import threading
+import time
+
+import indice_busca # Índice de trigramas para as buscas por nome e categoria
+import baixo_estoque # Conjunto de produtos abaixo do estoque mínimo
+import agregados_estoque # Totais acumulados (valor em estoque, por categoria)
+import armazenamento_sqlite # Armazenamento alternativo em banco SQLite
+import movimentos_lote # Leitura e validação de movimentações em lote (CSV/JSONL)
+import catalogo_lote # Importação (upsert) do catálogo de fornecedores, com validação em paralelo
+import leitor_json # Leitura do produtos.json em blocos, sem carregar o arquivo inteiro
+import snapshot_binario # Snapshot em formato binário (alternativa ao produtos.json)
+import gravacao_atomica # Arquivo temporário + fsync + rename (nenhum salvamento deixa arquivo pela metade)
+import analise_colunar # Colunas NumPy (opcional) para análises sobre o catálogo inteiro
+import historico_movimentos # Histórico de movimentações em segmentos, com índices por produto e por dia
+import planejamento_reposicao # Consumo diário (suavização exponencial das saídas), cobertura e sugestão de pedido
+import relatorios # Relatórios paginados (cursor estável) e exportação em blocos (texto/CSV/JSONL)
+import estoque_particionado # Catálogo dividido em partições (por ID ou por depósito), relatórios em paralelo
+import instrumentacao # Contadores e histogramas de latência por operação (desligada por padrão)
+from produto import Produto, para_json # Registro compacto de produto (acessado como dicionário)
+
+# Configuração da persistência
+# - 'completo': reescreve o produtos.json inteiro a cada salvamento (custo cresce com o catálogo)
+# - 'journal': anexa uma linha compacta por alteração no arquivo de journal (custo constante)
+#   e, quando o journal passa de LIMITE_JOURNAL_BYTES, compacta em segundo plano gerando um novo produtos.json
+# - 'sqlite': guarda os produtos no banco ARQUIVO_BANCO, lendo só as linhas usadas; cada salvamento é uma transação
+#   (para importar o produtos.json: python armazenamento_sqlite.py migrar)
+# - 'particionado': catálogo dividido em partições em PASTA_PARTICOES, um arquivo por partição; cada salvamento
+#   regrava só as partições alteradas e os relatórios rodam em paralelo, um processo por partição
+#   (para dividir o produtos.json: python estoque_particionado.py dividir)
+MODO_PERSISTENCIA = 'journal'
+ARQUIVO_DADOS = 'produtos.json'
+ARQUIVO_JOURNAL = 'produtos.journal'
+ARQUIVO_BANCO = 'produtos.db'
+ARQUIVO_META = 'produtos.meta.json' # Próximo ID livre, gravado junto com cada snapshot (evita max() sobre todas as chaves)
+LIMITE_JOURNAL_BYTES = 1024 * 1024 # 1 MB
+# Formato do snapshot (catálogo completo gravado pelo modo 'completo' e pela compactação do journal):
+# - 'json': ARQUIVO_DADOS com indent=4, legível em qualquer editor
+# - 'binario': ARQUIVO_BINARIO (ver snapshot_binario.py), menor e mais rápido de gravar e ler
+# Ao carregar, vale o snapshot mais recente dos dois, então dá para trocar de formato a qualquer momento.
+FORMATO_SNAPSHOT = 'json'
+ARQUIVO_BINARIO = 'produtos.bin'
+conexao_banco = None # Conexão com o banco (apenas no modo 'sqlite')
+# Modo 'particionado': se PASTA_PARTICOES ainda não existe, é criada com NUMERO_PARTICOES partições por ID
+# ou, com DEPOSITOS = ['centro', 'norte', ...], uma partição por depósito (o cadastro escolhe o depósito)
+PASTA_PARTICOES = 'particoes'
+NUMERO_PARTICOES = 4
+DEPOSITOS = None
+# Alterações em lote (importar_catalogo): a partir desta fração do catálogo, os índices são reconstruídos
+# do zero (montagem em bloco) em vez de atualizados produto a produto
+FRACAO_RECONSTRUCAO = 0.5
+# Histórico de movimentações (entradas, saídas, ajustes...): gravado em PASTA_HISTORICO a cada salvamento
+REGISTRAR_HISTORICO = True
+PASTA_HISTORICO = 'historico'
+# Instrumentação (ver instrumentacao.py): com INSTRUMENTAR = True, o menu chama ativar_instrumentacao() ao iniciar
+# e as operações de OPERACOES_MEDIDAS passam a ser medidas; as métricas vão para ARQUIVO_METRICAS ao sair
+# (JSON, ou texto do Prometheus se o nome terminar em .prom). Na linha de comando: --metricas arquivo.
+INSTRUMENTAR = False
+ARQUIVO_METRICAS = 'metricas.json'
+# Carregamento em segundo plano: carregar_dados() retorna na hora e as operações esperam a carga terminar
+CARREGAMENTO_EM_SEGUNDO_PLANO = False
+carga_concluida = threading.Event()
+carga_concluida.set() # Sem carga em andamento
+
+# Alterações feitas desde o último salvamento, na ordem em que aconteceram.
+# Cada item é um registro do journal: {"op": "upsert", "produto": {...}} ou {"op": "remover", "id": 3}
+alteracoes_pendentes = []
+thread_compactacao = None # Thread da compactação em andamento (se houver)
+erro_compactacao = None # Erro da última compactação em segundo plano (lançado no próximo salvamento)
+
+# Salvamento agrupado (group commit): agendar_salvamento() não grava na hora; espera INTERVALO_AGRUPAMENTO
+# segundos e faz um único salvar_dados() para todas as alterações que chegaram nesse intervalo.
+# 0 = cada agendar_salvamento() grava imediatamente. Ao sair, chame descarregar_salvamentos().
+INTERVALO_AGRUPAMENTO = 0.5
+pedido_salvamento = threading.Event()
+thread_agendador = None
+erro_salvamento_agendado = None # Erro do último salvamento em segundo plano (lançado no próximo pedido)
+
+# Estrutura principal: dicionário de produtos
+# - Chave externa: ID do produto (inteiro)
+# - Valor: Produto com os dados (usado como dicionário: produto['quantidade'], produto.get('nome'), ...)
+# Exemplo de acesso: produtos.get(1) retorna o produto com ID 1
+produtos = {}
+proximo_id_disponivel = 1 # Atualizado por carregar_dados(); use alocar_id() para obter um ID novo
+
+# Travas para uso com várias threads (ver explicação no início do arquivo)
+NUMERO_TRAVAS = 64
+travas_produtos = [threading.Lock() for _ in range(NUMERO_TRAVAS)]
+trava_global = threading.RLock() # Reentrante: salvar_dados() -> compactar_journal() usam a mesma trava
+trava_ids = threading.Lock()
+
+def trava_do_produto(id_produto):
+    """Trava responsável pelo produto (vários produtos compartilham a mesma trava)"""
+    return travas_produtos[hash(id_produto) % NUMERO_TRAVAS]
+
+class TodasAsTravas:
+    """Bloco 'with' que segura todas as travas de produto (em ordem) e a trava global - usado por operações em lote"""
+    def __enter__(self):
+        for trava in travas_produtos:
+            trava.acquire()
+        trava_global.acquire()
+
+    def __exit__(self, *excecao):
+        trava_global.release()
+        for trava in reversed(travas_produtos):
+            trava.release()
+
+def alocar_id(deposito=None):
+    """
+    Entrega o próximo ID livre (seguro entre threads: dois cadastros nunca recebem o mesmo ID).
+    No modo 'particionado' cada partição tem a sua sequência (deposito: partição do depósito escolhido).
+    """
+    global proximo_id_disponivel
+    aguardar_carga()
+    with trava_ids:
+        if MODO_PERSISTENCIA == 'particionado':
+            try:
+                return produtos.alocar_id(deposito)
+            except ValueError as e:
+                raise ValorInvalido(str(e))
+        if deposito is not None:
+            raise ValorInvalido("Depósitos só existem no modo 'particionado'.")
+        # Proteção contra um produtos.meta.json desatualizado (ex.: produtos.json copiado de outro lugar)
+        while proximo_id_disponivel in produtos:
+            proximo_id_disponivel += 1
+        novo_id = proximo_id_disponivel
+        proximo_id_disponivel += 1
+    return novo_id
+
+def alocar_ids(quantidade, depositos=None):
+    """
+    Reserva 'quantidade' IDs novos de uma vez (uma passagem só pela trava de IDs), em ordem crescente.
+    depositos: no modo 'particionado', o depósito de cada ID (None = escolha automática, como em alocar_id).
+    """
+    global proximo_id_disponivel
+    aguardar_carga()
+    with trava_ids:
+        if MODO_PERSISTENCIA == 'particionado':
+            try:
+                return produtos.alocar_ids(depositos or [None] * quantidade)
+            except ValueError as e:
+                raise ValorInvalido(str(e))
+        if depositos is not None and any(deposito is not None for deposito in depositos):
+            raise ValorInvalido("Depósitos só existem no modo 'particionado'.")
+        if MODO_PERSISTENCIA == 'sqlite':
+            # O maior ID vem da chave primária: uma consulta só, em vez de uma por ID
+            proximo_id_disponivel = max(proximo_id_disponivel, armazenamento_sqlite.obter_maior_id(conexao_banco) + 1)
+            ids = list(range(proximo_id_disponivel, proximo_id_disponivel + quantidade))
+            proximo_id_disponivel += quantidade
+            return ids
+        ids = []
+        while len(ids) < quantidade:
+            if proximo_id_disponivel not in produtos: # Mesma proteção de alocar_id()
+                ids.append(proximo_id_disponivel)
+            proximo_id_disponivel += 1
+    return ids
+
+# Exceções das operações
+class ErroEstoque(Exception):
+    """Erro de regra de negócio do estoque (a mensagem pode ser mostrada ao usuário)"""
+
+class ProdutoNaoEncontrado(ErroEstoque):
+    """Nenhum produto com o ID informado"""
+    def __init__(self, id_produto):
+        super().__init__(f"Produto com ID {id_produto} não encontrado.")
+        self.id_produto = id_produto
+
+class EstoqueInsuficiente(ErroEstoque):
+    """Saída maior do que a quantidade disponível"""
+    def __init__(self, disponivel):
+        super().__init__(f"Quantidade insuficiente em estoque. Disponível: {disponivel}")
+        self.disponivel = disponivel
+
+class ValorInvalido(ErroEstoque, ValueError):
+    """Valor fora das regras (negativo, zero onde não pode, tipo errado)"""
+
+class CatalogoNaoDividido(ErroEstoque):
+    """Modo 'particionado' sem partições, mas com o catálogo de outro modo: ele precisa ser dividido antes"""
+    def __init__(self, caminho):
+        super().__init__(f"Não há partições em '{PASTA_PARTICOES}', mas existe o catálogo '{caminho}'. Divida-o antes "
+                         f"de usar o modo particionado: python estoque_particionado.py dividir {ARQUIVO_DADOS} "
+                         f"{PASTA_PARTICOES} {NUMERO_PARTICOES}")
+        self.caminho = caminho
+
+# Funções para manter as estruturas auxiliares (índices) em dia com o dicionário 'produtos'
+# (nos modos 'sqlite' e 'particionado' os índices não são usados: as consultas vão ao banco ou às partições;
+# as colunas da análise valem em todos os modos, e só são atualizadas depois de montadas na primeira análise)
+def atualizar_estruturas_auxiliares(produto_dict):
+    """Atualiza os índices depois que um produto foi criado ou modificado"""
+    analise_colunar.atualizar_produto(produto_dict)
+    if MODO_PERSISTENCIA in ('sqlite', 'particionado'):
+        return
+    indice_busca.indexar_produto(produto_dict)
+    baixo_estoque.atualizar_produto(produto_dict)
+    agregados_estoque.atualizar_produto(produto_dict)
+
+def remover_das_estruturas_auxiliares(id_produto):
+    """Retira um produto removido dos índices"""
+    analise_colunar.remover_produto(id_produto)
+    if MODO_PERSISTENCIA in ('sqlite', 'particionado'):
+        return
+    indice_busca.remover_do_indice(id_produto)
+    baixo_estoque.remover_produto(id_produto)
+    agregados_estoque.remover_produto(id_produto)
+
+def reconstruir_estruturas_auxiliares():
+    """Reconstrói todos os índices a partir do dicionário 'produtos' (usado ao carregar)"""
+    analise_colunar.reconstruir(produtos)
+    if MODO_PERSISTENCIA in ('sqlite', 'particionado'):
+        return
+    indice_busca.reconstruir_indice(produtos)
+    baixo_estoque.reconstruir(produtos)
+    agregados_estoque.reconstruir(produtos)
+
+# Consultas que dependem de onde os dados estão (estruturas em memória ou banco SQLite)
+def buscar_ids_por_texto(campo, consulta):
+    """IDs (em ordem crescente) cujo 'nome' ou 'categoria' contém a consulta"""
+    aguardar_carga()
+    with trava_global: # Os índices não podem mudar durante a leitura
+        if MODO_PERSISTENCIA == 'sqlite':
+            return armazenamento_sqlite.buscar_ids_por_texto(conexao_banco, campo, consulta)
+        if MODO_PERSISTENCIA == 'particionado':
+            return estoque_particionado.buscar_ids_por_texto(produtos, campo, consulta)
+        return indice_busca.buscar_substring(campo, consulta)
+
+def buscar_ids_aproximados(campo, consulta, limite=10):
+    """[(id, semelhança)] dos produtos cujo 'nome' ou 'categoria' mais se parece com a consulta (tolera erros de digitação)"""
+    aguardar_carga()
+    with trava_global:
+        if MODO_PERSISTENCIA not in ('sqlite', 'particionado'):
+            return indice_busca.buscar_aproximado(campo, consulta, limite)
+        # Sem o índice em memória, os mesmos passos de indice_busca.buscar_aproximado (mesmos candidatos e resultados)
+        normalizada = indice_busca.normalizar(consulta)
+        trigramas = indice_busca.gerar_trigramas(normalizada)
+        if not trigramas:
+            return [(id_produto, 1.0) for id_produto in buscar_ids_por_texto(campo, consulta)[:limite]]
+        if MODO_PERSISTENCIA == 'sqlite':
+            candidatos = armazenamento_sqlite.candidatos_aproximados(conexao_banco, campo, trigramas)
+        else:
+            candidatos = estoque_particionado.candidatos_aproximados(produtos, campo, trigramas)
+        return indice_busca.ordenar_por_semelhanca(normalizada, candidatos, limite)
+
+def listar_ids_baixo_estoque():
+    """IDs abaixo do estoque mínimo, do maior para o menor déficit"""
+    aguardar_carga()
+    with trava_global:
+        if MODO_PERSISTENCIA == 'sqlite':
+            return armazenamento_sqlite.listar_ids_baixo_estoque(conexao_banco)
+        if MODO_PERSISTENCIA == 'particionado':
+            return estoque_particionado.listar_ids_baixo_estoque(produtos)
+        return baixo_estoque.listar_por_falta()
+
+def produto_abaixo_do_minimo(id_produto):
+    """Retorna True se o produto está abaixo do estoque mínimo"""
+    aguardar_carga()
+    with trava_global:
+        if MODO_PERSISTENCIA == 'sqlite':
+            return armazenamento_sqlite.produto_abaixo_do_minimo(conexao_banco, id_produto)
+        if MODO_PERSISTENCIA == 'particionado':
+            produto_dict = produtos.get(id_produto)
+            return produto_dict is not None and produto_dict['quantidade'] < produto_dict['estoque_minimo']
+        return baixo_estoque.esta_abaixo_do_minimo(id_produto)
+
+def obter_totais():
+    """Valor total em estoque, quantidade de itens e de produtos"""
+    aguardar_carga()
+    with trava_global:
+        if MODO_PERSISTENCIA == 'sqlite':
+            return armazenamento_sqlite.obter_totais(conexao_banco)
+        if MODO_PERSISTENCIA == 'particionado':
+            return estoque_particionado.obter_totais(produtos)
+        return agregados_estoque.obter_totais(produtos)
+
+def analisar_estoque(quantidade_maiores=10):
+    """
+    Análise do catálogo inteiro (com NumPy, se instalado; ver analise_colunar.py):
+        {'valor_total': Decimal, 'por_categoria': {categoria: {...}},
+         'maiores_valores': [(produto, valor)], 'baixo_estoque': {'produtos': int, 'falta_total': int}}
+    """
+    aguardar_carga()
+    with trava_global:
+        abaixo = analise_colunar.baixo_estoque(produtos)
+        return {
+            'valor_total': analise_colunar.valor_total(produtos),
+            'por_categoria': analise_colunar.totais_por_categoria(produtos),
+            'maiores_valores': [(produtos[id_produto], valor)
+                                for id_produto, valor in analise_colunar.maiores_valores(produtos, quantidade_maiores)],
+            'baixo_estoque': {'produtos': len(abaixo), 'falta_total': sum(falta for _, falta in abaixo)},
+        }
+
+# Funções para persistência
+def registrar_alteracao(produto_dict):
+    """
+    Anota que um produto foi criado ou modificado (atualiza os índices e grava no próximo salvamento).
+    Deve ser chamada com a trava do produto, para que os registros saiam na mesma ordem das alterações.
+    """
+    with trava_global:
+        atualizar_estruturas_auxiliares(produto_dict)
+        planejamento_reposicao.atualizar_produto(produto_dict) # Em todos os modos (depois de montado: ver planejar_reposicao)
+        if MODO_PERSISTENCIA == 'sqlite':
+            # Grava na transação aberta; o commit acontece em salvar_dados()
+            armazenamento_sqlite.salvar_produto(conexao_banco, produto_dict)
+            return
+        if MODO_PERSISTENCIA == 'particionado':
+            produtos.marcar_alterado(produto_dict['id']) # A partição é regravada no próximo salvamento
+            return
+        # Guarda uma cópia: o dicionário original pode mudar de novo antes de ser salvo
+        alteracoes_pendentes.append({'op': 'upsert', 'produto': dict(produto_dict)})
+
+def registrar_alteracoes(produtos_alterados):
+    """
+    registrar_alteracao() para muitos produtos de uma vez (importações em lote): os índices são atualizados
+    numa passagem só, ou reconstruídos se o lote altera FRACAO_RECONSTRUCAO do catálogo ou mais.
+    Deve ser chamada com todas as travas (TodasAsTravas).
+    """
+    with trava_global:
+        for produto_dict in produtos_alterados:
+            planejamento_reposicao.atualizar_produto(produto_dict)
+        if MODO_PERSISTENCIA == 'sqlite':
+            for produto_dict in produtos_alterados:
+                analise_colunar.atualizar_produto(produto_dict)
+            armazenamento_sqlite.salvar_produtos(conexao_banco, produtos_alterados) # Um executemany na transação aberta
+            return
+        if MODO_PERSISTENCIA == 'particionado':
+            for produto_dict in produtos_alterados:
+                analise_colunar.atualizar_produto(produto_dict)
+                produtos.marcar_alterado(produto_dict['id'])
+            return
+        if len(produtos_alterados) >= FRACAO_RECONSTRUCAO * len(produtos):
+            reconstruir_estruturas_auxiliares()
+        else:
+            for produto_dict in produtos_alterados:
+                atualizar_estruturas_auxiliares(produto_dict)
+        alteracoes_pendentes.extend({'op': 'upsert', 'produto': dict(produto_dict)} for produto_dict in produtos_alterados)
+
+def registrar_movimento(produto_dict, tipo, delta, saldo=None):
+    """
+    Acrescenta um movimento ao histórico (gravado no próximo salvamento, depois das alterações do produto)
+    e ao consumo do planejamento de reposição.
+    saldo: quantidade resultante (padrão: a quantidade atual do produto). Chamar com a trava do produto.
+    """
+    with trava_global:
+        momento = time.time()
+        if REGISTRAR_HISTORICO:
+            momento = historico_movimentos.registrar(produto_dict['id'], delta, tipo,
+                                                     produto_dict['quantidade'] if saldo is None else saldo,
+                                                     produto_dict['categoria'], momento)
+        planejamento_reposicao.registrar_movimento(produto_dict['id'], tipo, delta, momento)
+
+def registrar_remocao(id_produto):
+    """Anota que um produto foi removido (atualiza os índices e grava no próximo salvamento)"""
+    with trava_global:
+        remover_das_estruturas_auxiliares(id_produto)
+        planejamento_reposicao.remover_produto(id_produto)
+        if MODO_PERSISTENCIA == 'sqlite':
+            armazenamento_sqlite.remover_produto(conexao_banco, id_produto)
+            return
+        if MODO_PERSISTENCIA == 'particionado':
+            return # 'del produtos[id]' já marcou a partição
+        alteracoes_pendentes.append({'op': 'remover', 'id': id_produto})
+
+def aplicar_registro_journal(registro):
+    """Aplica um registro do journal sobre o dicionário 'produtos'; retorna o maior ID afetado"""
+    if registro['op'] == 'upsert':
+        produto_dict = registro['produto']
+        produtos[produto_dict['id']] = Produto.de_dict(produto_dict)
+        return produto_dict['id']
+    elif registro['op'] == 'remover':
+        produtos.pop(registro['id'], None)
+        return registro['id']
+    elif registro['op'] == 'lote':
+        # Todas as alterações de um salvamento, gravadas numa única linha (ou entram todas, ou nenhuma)
+        return max((aplicar_registro_journal(item) or 0 for item in registro['registros']), default=0)
+
+def reproduzir_journal(caminho):
+    """Reaplica as alterações gravadas em um arquivo de journal; retorna o maior ID que aparece nele (0 se nenhum)"""
+    maior_id = 0
+    with open(caminho, 'r', encoding='utf-8') as arquivo:
+        for linha in arquivo:
+            try:
+                registro = json.loads(linha)
+            except json.JSONDecodeError:
+                # Linha incompleta: o programa foi interrompido no meio da escrita.
+                # Tudo o que veio antes dela é válido, então paramos aqui.
+                break
+            maior_id = max(maior_id, aplicar_registro_journal(registro) or 0)
+    return maior_id
+
+def escrever_snapshot(caminho, dados):
+    """Grava o catálogo completo em JSON usando arquivo temporário + fsync + rename"""
+    with gravacao_atomica.arquivo_atomico(caminho) as arquivo:
+        json.dump(dados, arquivo, indent=4, ensure_ascii=False, default=para_json)
+
+def escrever_meta(proximo_id):
+    """
+    Grava o próximo ID livre em ARQUIVO_META. Deve ser chamada ANTES de gravar o snapshot:
+    se o programa parar entre os dois, o meta fica à frente do snapshot (só pula IDs, nunca repete).
+    """
+    escrever_snapshot(ARQUIVO_META, {'proximo_id': proximo_id})
+
+def ler_meta():
+    """Próximo ID gravado em ARQUIVO_META, ou None se o arquivo não existir ou estiver inválido"""
+    try:
+        with open(ARQUIVO_META, 'r', encoding='utf-8') as arquivo:
+            proximo_id = json.load(arquivo).get('proximo_id')
+    except (FileNotFoundError, json.JSONDecodeError, AttributeError):
+        return None
+    return proximo_id if isinstance(proximo_id, int) else None
+
+def gravar_snapshot_produtos(dados, proximo_id):
+    """Grava o catálogo completo no formato FORMATO_SNAPSHOT"""
+    if FORMATO_SNAPSHOT == 'binario':
+        snapshot_binario.gravar(ARQUIVO_BINARIO, dados, proximo_id) # O próximo ID vai no cabeçalho
+    else:
+        escrever_meta(proximo_id)
+        escrever_snapshot(ARQUIVO_DADOS, dados)
+
+def caminho_snapshot_mais_recente():
+    """ARQUIVO_DADOS ou ARQUIVO_BINARIO, o que foi gravado por último (None se nenhum existe)"""
+    existentes = [caminho for caminho in (ARQUIVO_DADOS, ARQUIVO_BINARIO) if os.path.exists(caminho)]
+    if not existentes:
+        return None
+    formato_atual = ARQUIVO_BINARIO if FORMATO_SNAPSHOT == 'binario' else ARQUIVO_DADOS
+    # Em caso de empate na data, fica o formato configurado
+    return max(existentes, key=lambda caminho: (os.path.getmtime(caminho), caminho == formato_atual))
+
+def compactar_journal(em_segundo_plano=True):
+    """
+    Incorpora o journal em um novo snapshot (produtos.json ou produtos.bin, conforme FORMATO_SNAPSHOT).
+    O journal atual é renomeado (as próximas alterações vão para um journal novo),
+    e o snapshot é gravado a partir de uma cópia do estado atual.
+    Um erro na compactação em segundo plano é lançado no próximo salvar_dados().
+    Chamar com trava_global.
+    """
+    global thread_compactacao
+    if thread_compactacao is not None and thread_compactacao.is_alive():
+        return # Já existe uma compactação em andamento
+
+    caminho_compactando = ARQUIVO_JOURNAL + '.compactando'
+    if os.path.exists(caminho_compactando):
+        # Sobrou de uma compactação interrompida ou que falhou. O conteúdo dele e o do journal atual já estão
+        # em 'produtos' (a carga reaplica os dois): um snapshot do estado atual incorpora ambos.
+        # Gravado aqui mesmo, sob a trava, para que nenhuma alteração entre no journal antes de ele ser apagado.
+        gravar_snapshot_produtos(produtos, proximo_id_disponivel)
+        for caminho in (caminho_compactando, ARQUIVO_JOURNAL):
+            os.remove(caminho)
+            gravacao_atomica.sincronizar_diretorio(caminho)
+        return
+    os.replace(ARQUIVO_JOURNAL, caminho_compactando)
+    gravacao_atomica.sincronizar_diretorio(caminho_compactando)
+    # Cópia de cada produto: o menu continua alterando os originais
+    copia_produtos = {id_produto: Produto.de_dict(produto_dict) for id_produto, produto_dict in produtos.items()}
+    proximo_id_copia = proximo_id_disponivel
+
+    def compactar():
+        gravar_snapshot_produtos(copia_produtos, proximo_id_copia)
+        os.remove(caminho_compactando) # Só apaga depois que o snapshot está no disco
+        gravacao_atomica.sincronizar_diretorio(caminho_compactando)
+
+    def compactar_em_segundo_plano():
+        global erro_compactacao
+        try:
+            compactar()
+        except Exception as e:
+            erro_compactacao = e # O journal renomeado continua no disco e entra na próxima compactação
+
+    if em_segundo_plano:
+        thread_compactacao = threading.Thread(target=compactar_em_segundo_plano, daemon=False)
+        thread_compactacao.start()
+    else:
+        compactar()
+
+def lancar_erro_compactacao():
+    """Lança (uma vez) o erro da última compactação em segundo plano, se houve"""
+    global erro_compactacao
+    erro, erro_compactacao = erro_compactacao, None
+    if erro is not None:
+        raise erro
+
+def salvar_dados():
+    """Grava as alterações pendentes conforme MODO_PERSISTENCIA (lança a exceção original se falhar)"""
+    aguardar_carga()
+    with trava_global: # Nenhuma alteração entra na lista enquanto ela é gravada
+        if MODO_PERSISTENCIA == 'sqlite':
+            # O próximo ID vai na mesma transação: um ID removido não volta a ser usado depois de reabrir o banco
+            armazenamento_sqlite.gravar_proximo_id(conexao_banco, proximo_id_disponivel)
+            conexao_banco.commit() # Confirma a transação com as alterações desde o último salvamento
+        elif MODO_PERSISTENCIA == 'particionado':
+            produtos.salvar() # Regrava só as partições alteradas (cada uma de forma atômica)
+        elif MODO_PERSISTENCIA == 'journal':
+            lancar_erro_compactacao() # As alterações continuam pendentes e são gravadas no próximo salvamento
+            if alteracoes_pendentes:
+                # Uma linha JSON compacta por salvamento, sem reescrever o catálogo. Com várias alterações,
+                # elas vão juntas num registro 'lote': se o programa parar no meio da linha, nenhuma delas é aplicada.
+                if len(alteracoes_pendentes) == 1:
+                    registro = alteracoes_pendentes[0]
+                else:
+                    registro = {'op': 'lote', 'registros': alteracoes_pendentes}
+                journal_novo = not os.path.exists(ARQUIVO_JOURNAL)
+                with open(ARQUIVO_JOURNAL, 'a', encoding='utf-8') as arquivo:
+                    arquivo.write(json.dumps(registro, ensure_ascii=False, separators=(',', ':')) + '\n')
+                    gravacao_atomica.sincronizar_arquivo(arquivo) # Só retorna depois que a linha está no disco
+                if journal_novo:
+                    gravacao_atomica.sincronizar_diretorio(ARQUIVO_JOURNAL)
+                alteracoes_pendentes.clear()
+                if os.path.getsize(ARQUIVO_JOURNAL) > LIMITE_JOURNAL_BYTES:
+                    compactar_journal()
+        else:
+            if thread_compactacao is not None:
+                thread_compactacao.join() # Evita que uma compactação antiga sobrescreva este snapshot
+            gravar_snapshot_produtos(produtos, proximo_id_disponivel)
+            alteracoes_pendentes.clear()
+            # O snapshot já contém tudo o que estava nos journals
+            for caminho in (ARQUIVO_JOURNAL + '.compactando', ARQUIVO_JOURNAL):
+                if os.path.exists(caminho):
+                    os.remove(caminho)
+                    gravacao_atomica.sincronizar_diretorio(caminho)
+        # O histórico vai depois do estado: ele nunca mostra um movimento cujo resultado não foi salvo
+        if REGISTRAR_HISTORICO:
+            historico_movimentos.gravar_pendentes()
+
+def agendar_salvamento():
+    """
+    Pede um salvamento. Com INTERVALO_AGRUPAMENTO > 0 a gravação acontece em segundo plano,
+    junto com as outras alterações do intervalo; um erro nela é lançado no próximo pedido (ou em descarregar_salvamentos).
+    """
+    global thread_agendador
+    lancar_erro_agendado()
+    if INTERVALO_AGRUPAMENTO <= 0:
+        salvar_dados()
+        return
+    if thread_agendador is None:
+        thread_agendador = threading.Thread(target=executar_agendador, daemon=True)
+        thread_agendador.start()
+        atexit.register(descarregar_salvamentos) # Rede de segurança se o programa sair sem descarregar
+    pedido_salvamento.set()
+
+def executar_agendador():
+    """Thread do salvamento agrupado: espera um pedido, junta os próximos durante o intervalo e grava uma vez"""
+    global erro_salvamento_agendado
+    while True:
+        pedido_salvamento.wait()
+        time.sleep(INTERVALO_AGRUPAMENTO)
+        pedido_salvamento.clear() # Pedidos feitos daqui em diante ficam para a próxima gravação
+        try:
+            salvar_dados()
+        except Exception as e:
+            erro_salvamento_agendado = e
+
+def lancar_erro_agendado():
+    """Lança (uma vez) o erro do último salvamento em segundo plano, se houve"""
+    global erro_salvamento_agendado
+    erro, erro_salvamento_agendado = erro_salvamento_agendado, None
+    if erro is not None:
+        raise erro
+
+def descarregar_salvamentos():
+    """Grava agora tudo o que estiver pendente (usar ao sair do programa)"""
+    pedido_salvamento.clear()
+    lancar_erro_agendado()
+    salvar_dados() # Sob a trava global: não conflita com uma gravação do agendador em andamento
+
+def carregar_produtos_dos_arquivos():
+    """
+    Lê o snapshot mais recente (produtos.json em streaming, sem cópia intermediária, ou produtos.bin)
+    direto para o dicionário 'produtos', reaplica os journals e define o próximo ID.
+    Retorna False se não havia nenhum dado salvo.
+    Não monta os índices (ver carregar_dados).
+    """
+    global produtos, proximo_id_disponivel
+    novos_produtos = {}
+    proximo_id_snapshot = None
+    caminho_snapshot = caminho_snapshot_mais_recente()
+    arquivo_encontrado = caminho_snapshot is not None
+    # Milhões de objetos novos (e nenhum ciclo entre eles) disparam o coletor de ciclos várias vezes à toa
+    coletor_ligado = gc.isenabled()
+    gc.disable()
+    try:
+        # 1. Cada produto é convertido assim que é lido do arquivo
+        if caminho_snapshot == ARQUIVO_BINARIO:
+            novos_produtos, proximo_id_snapshot = snapshot_binario.carregar(ARQUIVO_BINARIO)
+        elif caminho_snapshot is not None:
+            for chave, produto_dict in leitor_json.ler_itens_objeto(ARQUIVO_DADOS):
+                novos_produtos[int(chave)] = Produto.de_dict(produto_dict)
+            proximo_id_snapshot = ler_meta()
+    finally:
+        if coletor_ligado:
+            gc.enable()
+    produtos = novos_produtos # Só troca depois de ler o arquivo inteiro (com erro, 'produtos' fica como estava)
+
+    # 2. Reaplica as alterações gravadas depois do último snapshot.
+    # Primeiro o journal de uma compactação que não terminou, depois o journal atual.
+    maior_id_journal = 0
+    for caminho in (ARQUIVO_JOURNAL + '.compactando', ARQUIVO_JOURNAL):
+        if os.path.exists(caminho):
+            maior_id_journal = max(maior_id_journal, reproduzir_journal(caminho))
+            arquivo_encontrado = True
+
+    # Próximo ID: o gravado junto com o snapshot, ou (arquivos antigos, sem meta) o maior ID + 1
+    if proximo_id_snapshot is None:
+        proximo_id_snapshot = max(produtos.keys(), default=0) + 1
+    proximo_id_disponivel = max(proximo_id_snapshot, maior_id_journal + 1)
+    return arquivo_encontrado
+
+def carregar_dados(em_segundo_plano=None, ao_concluir=None):
+    """
+    Carrega os dados do arquivo JSON (e do journal, se existir) para o dicionário,
+    ou abre o banco no modo 'sqlite' ou as partições no modo 'particionado'. Retorna False se não havia nenhum dado salvo.
+
+    Em segundo plano (em_segundo_plano=True, ou CARREGAMENTO_EM_SEGUNDO_PLANO), retorna None
+    imediatamente; as operações esperam a carga terminar, e ao_concluir(arquivo_encontrado, erro)
+    é chamada pela thread de carga no final (erro é None se deu tudo certo).
+    """
+    global produtos, proximo_id_disponivel, conexao_banco
+    if MODO_PERSISTENCIA == 'sqlite':
+        # Nada é lido agora: 'produtos' busca cada linha no banco quando ela for usada
+        conexao_banco = armazenamento_sqlite.abrir_banco(ARQUIVO_BANCO)
+        produtos = armazenamento_sqlite.ProdutosSQLite(conexao_banco)
+        proximo_id_disponivel = armazenamento_sqlite.ler_proximo_id(conexao_banco)
+        reconstruir_estruturas_auxiliares() # Neste modo, só descarta as colunas da análise
+        abrir_historico()
+        return True
+    if MODO_PERSISTENCIA == 'particionado':
+        arquivo_encontrado = estoque_particionado.existe(PASTA_PARTICOES)
+        if not arquivo_encontrado:
+            # Partições vazias deixariam de lado o catálogo gravado nos outros modos (sem nenhum aviso)
+            for caminho in (ARQUIVO_DADOS, ARQUIVO_BINARIO, ARQUIVO_JOURNAL, ARQUIVO_JOURNAL + '.compactando'):
+                if os.path.exists(caminho):
+                    raise CatalogoNaoDividido(caminho)
+            estoque_particionado.criar(PASTA_PARTICOES, NUMERO_PARTICOES, DEPOSITOS)
+        produtos = estoque_particionado.ProdutosParticionados(PASTA_PARTICOES)
+        reconstruir_estruturas_auxiliares() # Neste modo, só descarta as colunas da análise
+        abrir_historico()
+        return arquivo_encontrado
+
+    def carregar():
+        arquivo_encontrado = carregar_produtos_dos_arquivos()
+        # 3. Monta os índices uma única vez; depois disso eles são atualizados a cada alteração
+        reconstruir_estruturas_auxiliares()
+        abrir_historico()
+        # O planejamento também (na thread de carga, se houver): a primeira saída não espera por ele
+        planejamento_reposicao.montar(produtos, time.time())
+        return arquivo_encontrado
+
+    if em_segundo_plano is None:
+        em_segundo_plano = CARREGAMENTO_EM_SEGUNDO_PLANO
+    if not em_segundo_plano:
+        return carregar()
+
+    def carregar_em_segundo_plano():
+        arquivo_encontrado, erro = False, None
+        try:
+            arquivo_encontrado = carregar()
+        except Exception as e:
+            erro = e # Como na carga normal com erro, 'produtos' fica como estava
+        try:
+            if ao_concluir is not None:
+                ao_concluir(arquivo_encontrado, erro) # Antes de liberar as operações: a mensagem sai primeiro
+        finally:
+            carga_concluida.set()
+
+    carga_concluida.clear()
+    threading.Thread(target=carregar_em_segundo_plano, daemon=True).start()
+    return None
+
+def abrir_historico():
+    """
+    Carrega o histórico de PASTA_HISTORICO (o catálogo atual só dá a categoria dos movimentos
+    sem totais gravados, ver historico_movimentos.abrir)
+    """
+    planejamento_reposicao.reconstruir() # Montado de novo na carga (ou, nos modos 'sqlite' e 'particionado', na primeira consulta)
+    if not REGISTRAR_HISTORICO:
+        return
+    def categoria_do_produto(id_produto):
+        produto_dict = produtos.get(id_produto)
+        return produto_dict['categoria'] if produto_dict is not None else ''
+    historico_movimentos.abrir(PASTA_HISTORICO, categoria_do_produto)
+
+def aguardar_carga():
+    """Espera o carregamento em segundo plano (se houver) terminar"""
+    carga_concluida.wait()
+
+# Validações (mesmas regras do menu)
+def validar_inteiro_nao_negativo(valor, descricao):
+    """Retorna o valor como int ou lança ValorInvalido"""
+    if isinstance(valor, bool) or not isinstance(valor, int):
+        raise ValorInvalido(f"{descricao} deve ser um número inteiro.")
+    if valor < 0:
+        raise ValorInvalido(f"{descricao} não pode ser negativo.")
+    return valor
+
+def validar_preco(preco):
+    """Retorna o preço como float ou lança ValorInvalido"""
+    if isinstance(preco, bool) or not isinstance(preco, (int, float)):
+        raise ValorInvalido("Preço deve ser um número.")
+    if preco < 0:
+        raise ValorInvalido("Preço não pode ser negativo.")
+    return float(preco)
+
+def validar_quantidade_positiva(quantidade):
+    """Quantidade de uma entrada/saída: inteiro maior que zero"""
+    if isinstance(quantidade, bool) or not isinstance(quantidade, int) or quantidade <= 0:
+        raise ValorInvalido("Digite uma quantidade positiva.")
+    return quantidade
+
+# Operações
+def buscar_produto_por_id(id_produto_procurado):
+    """Retorna o dicionário do produto ou None"""
+    aguardar_carga()
+    # O método .get() do dicionário retorna None se a chave não existir, evitando um KeyError
+    return produtos.get(id_produto_procurado)
+
+def obter_produto(id_produto):
+    """Retorna o dicionário do produto ou lança ProdutoNaoEncontrado"""
+    aguardar_carga()
+    produto_dict = produtos.get(id_produto)
+    if produto_dict is None:
+        raise ProdutoNaoEncontrado(id_produto)
+    return produto_dict
+
+def cadastrar_produto(nome, categoria, quantidade, preco, estoque_minimo, deposito=None):
+    """Cadastra um novo produto e retorna o produto criado (deposito: só no modo 'particionado' por depósito)"""
+    novo_produto_dados = Produto(
+        id=None,
+        nome=str(nome),
+        categoria=str(categoria),
+        quantidade=validar_inteiro_nao_negativo(quantidade, "Quantidade"),
+        preco=validar_preco(preco),
+        estoque_minimo=validar_inteiro_nao_negativo(estoque_minimo, "Estoque mínimo"),
+    )
+    novo_id = alocar_id(deposito) # Só consome um ID depois que os dados foram validados
+    novo_produto_dados['id'] = novo_id
+    with trava_do_produto(novo_id):
+        with trava_global: # Inserir no dicionário enquanto outra thread o percorre causaria erro
+            if MODO_PERSISTENCIA != 'sqlite': # No banco, a linha é gravada uma vez só, por registrar_alteracao()
+                produtos[novo_id] = novo_produto_dados
+            registrar_alteracao(novo_produto_dados)
+        registrar_movimento(novo_produto_dados, 'cadastro', novo_produto_dados['quantidade'])
+    return novo_produto_dados
+
+def remover_produto(id_produto):
+    """Remove o produto e retorna o dicionário removido"""
+    with trava_do_produto(id_produto):
+        produto_dict = obter_produto(id_produto)
+        with trava_global:
+            del produtos[id_produto]
+            registrar_remocao(id_produto)
+        registrar_movimento(produto_dict, 'remocao', -produto_dict['quantidade'], saldo=0)
+    return produto_dict
+
+def editar_produto(id_produto, nome=None, categoria=None, quantidade=None, preco=None, estoque_minimo=None):
+    """Altera os campos informados (None mantém o valor atual) e retorna o produto"""
+    # Valida tudo antes de alterar qualquer campo
+    if quantidade is not None:
+        validar_inteiro_nao_negativo(quantidade, "Quantidade")
+    if preco is not None:
+        preco = validar_preco(preco)
+    if estoque_minimo is not None:
+        validar_inteiro_nao_negativo(estoque_minimo, "Estoque mínimo")
+
+    with trava_do_produto(id_produto):
+        produto_dict = obter_produto(id_produto)
+        quantidade_anterior = produto_dict['quantidade']
+        if nome:
+            produto_dict['nome'] = str(nome)
+        if categoria:
+            produto_dict['categoria'] = str(categoria)
+        if quantidade is not None:
+            produto_dict['quantidade'] = quantidade
+        if preco is not None:
+            produto_dict['preco'] = preco
+        if estoque_minimo is not None:
+            produto_dict['estoque_minimo'] = estoque_minimo
+        registrar_alteracao(produto_dict)
+        if produto_dict['quantidade'] != quantidade_anterior:
+            registrar_movimento(produto_dict, 'ajuste', produto_dict['quantidade'] - quantidade_anterior)
+    return produto_dict
+
+def registrar_entrada(id_produto, quantidade_adicionar):
+    """Soma a quantidade ao estoque e retorna o produto"""
+    validar_quantidade_positiva(quantidade_adicionar)
+    with trava_do_produto(id_produto): # "+=" lê e depois escreve: sem a trava, duas entradas podem se perder
+        produto_dict = obter_produto(id_produto)
+        produto_dict['quantidade'] += quantidade_adicionar
+        registrar_alteracao(produto_dict)
+        registrar_movimento(produto_dict, 'entrada', quantidade_adicionar)
+    return produto_dict
+
+def registrar_saida(id_produto, quantidade_retirar):
+    """
+    Retira a quantidade do estoque e retorna o produto.
+    Lança EstoqueInsuficiente se a quantidade for maior que a disponível.
+    Use produto_abaixo_do_minimo(id) para saber se é preciso emitir o alerta.
+
+    O teste e a subtração acontecem com a trava do produto (comparar-e-decrementar):
+    nenhuma outra saída pode acontecer entre os dois, então o estoque nunca fica negativo.
+    """
+    validar_quantidade_positiva(quantidade_retirar)
+    with trava_do_produto(id_produto):
+        produto_dict = obter_produto(id_produto)
+        if quantidade_retirar > produto_dict['quantidade']:
+            raise EstoqueInsuficiente(produto_dict['quantidade'])
+        produto_dict['quantidade'] -= quantidade_retirar
+        registrar_alteracao(produto_dict)
+        registrar_movimento(produto_dict, 'saida', -quantidade_retirar)
+    return produto_dict
+
+def consultar_movimentos(id_produto, inicio=None, fim=None):
+    """Movimentos do produto (também de produtos já removidos) entre os momentos inicio e fim, em ordem de tempo"""
+    aguardar_carga()
+    with trava_global:
+        return historico_movimentos.movimentos_do_produto(id_produto, inicio, fim)
+
+def totais_diarios_por_categoria(inicio=None, fim=None):
+    """Entradas/saídas por dia e categoria (ver historico_movimentos.totais_diarios_por_categoria)"""
+    aguardar_carga()
+    with trava_global:
+        return historico_movimentos.totais_diarios_por_categoria(inicio, fim)
+
+def planejar_reposicao(limite=None, prazo_entrega=None, dias_entre_pedidos=None):
+    """
+    Plano de reposição (ver planejamento_reposicao.py): [(produto, plano)] dos produtos abaixo do ponto de pedido,
+    do menor para o maior número de dias de cobertura, com
+        plano = {'consumo_diario': float, 'dias_cobertura': float (None: sem consumo),
+                 'ponto_pedido': float, 'quantidade_sugerida': int}
+    O consumo é montado a partir do histórico ao carregar os dados (nos modos 'sqlite' e 'particionado',
+    na primeira consulta); depois ele é atualizado a cada saída.
+    prazo_entrega e dias_entre_pedidos: None usa os padrões do módulo.
+    """
+    aguardar_carga()
+    with trava_global:
+        planos = planejamento_reposicao.planejar(produtos, time.time(), prazo_entrega, dias_entre_pedidos)
+        if limite is not None:
+            planos = planos[:limite]
+        return [(produtos[plano[0]], plano_para_dict(plano)) for plano in planos]
+
+def previsao_reposicao(id_produto, prazo_entrega=None, dias_entre_pedidos=None, somente_montado=False):
+    """
+    Plano de um produto (mesmo formato de planejar_reposicao; quantidade_sugerida 0 se não é hora de pedir).
+    somente_montado=True retorna None em vez de montar o planejamento (nos modos 'sqlite' e 'particionado',
+    ele só é montado na primeira consulta: um aviso depois de cada saída não deve esperar por isso).
+    """
+    aguardar_carga()
+    with trava_global:
+        if somente_montado and not planejamento_reposicao.montado:
+            return None
+        plano = planejamento_reposicao.previsao(produtos, id_produto, time.time(), prazo_entrega, dias_entre_pedidos)
+    if plano is None:
+        raise ProdutoNaoEncontrado(id_produto)
+    return plano_para_dict(plano)
+
+def plano_para_dict(plano):
+    _, consumo_diario, dias_cobertura, ponto_pedido, quantidade_sugerida = plano
+    return {'consumo_diario': consumo_diario, 'dias_cobertura': dias_cobertura if dias_cobertura != float('inf') else None,
+            'ponto_pedido': ponto_pedido, 'quantidade_sugerida': quantidade_sugerida}
+
+def buscar_produtos_por_ids(ids):
+    """Dicionários dos produtos, ignorando os que foram removidos por outra thread depois da consulta"""
+    encontrados = (produtos.get(id_produto) for id_produto in ids)
+    return [produto_dict for produto_dict in encontrados if produto_dict is not None]
+
+def buscar_por_nome(texto):
+    """Produtos cujo nome contém o texto (sem diferenciar maiúsculas e acentos)"""
+    return buscar_produtos_por_ids(buscar_ids_por_texto('nome', texto))
+
+def buscar_por_categoria(texto):
+    """Produtos cuja categoria contém o texto (sem diferenciar maiúsculas e acentos)"""
+    return buscar_produtos_por_ids(buscar_ids_por_texto('categoria', texto))
+
+def buscar_aproximado(campo, texto, limite=10):
+    """[(produto, semelhança de 0 a 1)] dos produtos mais parecidos com o texto, do mais para o menos parecido"""
+    semelhancas = dict(buscar_ids_aproximados(campo, texto, limite))
+    return [(produto_dict, semelhancas[produto_dict['id']]) for produto_dict in buscar_produtos_por_ids(semelhancas)]
+
+def listar_produtos():
+    """Todos os produtos (em ordem de cadastro)"""
+    aguardar_carga()
+    with trava_global:
+        return list(produtos.values())
+
+def relatorio_baixo_estoque():
+    """Lista de (produto, quantidade necessária para repor), do maior para o menor déficit"""
+    relatorio = []
+    for produto_dict in buscar_produtos_por_ids(listar_ids_baixo_estoque()):
+        relatorio.append((produto_dict, produto_dict['estoque_minimo'] - produto_dict['quantidade']))
+    return relatorio
+
+def produtos_do_relatorio(relatorio):
+    """
+    Produtos que entram no relatório ('produtos', 'estoque' ou 'baixo-estoque').
+    É uma lista de referências (copiada sob a trava), não das linhas: a formatação acontece
+    depois, fora da trava. No baixo estoque só entram os produtos sinalizados, já do maior para o menor déficit.
+    """
+    if relatorio == 'baixo-estoque':
+        return buscar_produtos_por_ids(listar_ids_baixo_estoque())
+    return listar_produtos()
+
+def pagina_relatorio(relatorio, ordem=None, decrescente=False, limite=50, cursor=None, numero_pagina=1):
+    """Uma página do relatório: (linhas, cursor da próxima página ou None); ver relatorios.pagina"""
+    return relatorios.pagina(relatorio, produtos_do_relatorio(relatorio), ordem, decrescente, limite, cursor, numero_pagina)
+
+def exportar_relatorio(relatorio, arquivo, formato='csv', ordem=None, decrescente=False):
+    """Grava o relatório inteiro em blocos no arquivo aberto (ou sys.stdout); retorna a quantidade de linhas"""
+    linhas = relatorios.todas_as_linhas(relatorio, produtos_do_relatorio(relatorio), ordem, decrescente)
+    return relatorios.escrever(relatorio, linhas, arquivo, formato)
+
+def aplicar_movimentacoes_lote(caminho, atomico=False):
+    """
+    Aplica um arquivo de movimentações (ver movimentos_lote.py) e retorna o resumo.
+    Cada produto alterado é registrado uma única vez, com a quantidade final
+    (no histórico entra cada linha aplicada, com o saldo daquele momento);
+    quem chama faz um único salvar_dados() para o lote inteiro.
+    """
+    aguardar_carga()
+    with TodasAsTravas(): # O lote valida e altera vários produtos: nenhuma outra operação no meio
+        resumo = movimentos_lote.aplicar_movimentos(produtos, movimentos_lote.ler_movimentos(caminho), atomico)
+        # Os objetos que o lote alterou (no modo 'sqlite', ler produtos[id] de novo pode trazer a linha do banco)
+        for produto_dict in resumo.pop('produtos_alterados'):
+            registrar_alteracao(produto_dict)
+        momento = time.time()
+        if REGISTRAR_HISTORICO:
+            momento = historico_movimentos.registrar_varios(
+                'lote', ((id_produto, delta, saldo, produtos[id_produto]['categoria'])
+                         for id_produto, delta, saldo in resumo['movimentos']), momento)
+        planejamento_reposicao.registrar_movimentos('lote', resumo['movimentos'], momento)
+    return resumo
+
+def chaves_naturais():
+    """
+    Chave natural (nome, categoria) normalizada -> ID de cada produto do catálogo
+    (se o catálogo já tem produtos repetidos, fica um deles). Chamar com trava_global.
+    """
+    if MODO_PERSISTENCIA == 'sqlite':
+        return armazenamento_sqlite.chaves_naturais(conexao_banco)
+    if MODO_PERSISTENCIA == 'particionado':
+        normalizar = indice_busca.normalizar
+        return {(normalizar(produto_dict['nome']), normalizar(produto_dict['categoria'])): id_produto
+                for id_produto, produto_dict in produtos.items()}
+    # Os textos normalizados já estão guardados no índice de busca
+    categorias = indice_busca.textos_indexados['categoria']
+    return {(nome, categorias[id_produto]): id_produto for id_produto, nome in indice_busca.textos_indexados['nome'].items()}
+
+def importar_catalogo(caminho, atomico=False):
+    """
+    Importa (upsert) um catálogo de fornecedor (ver catalogo_lote.py): cada linha válida atualiza quantidade,
+    preço e estoque mínimo do produto com o mesmo nome + categoria (o nome cadastrado é mantido)
+    ou cadastra um produto novo. Atômico: se alguma linha for rejeitada, nada é aplicado.
+    A validação roda em paralelo, antes de pegar as travas; depois os IDs novos são reservados de uma vez
+    e os índices atualizados em lote. Quem chama faz um único salvar_dados() para o arquivo inteiro.
+    Retorna o resumo:
+        {'linhas', 'cadastrados', 'atualizados', 'inalterados', 'repetidas', 'rejeitadas': [(linha, motivo), ...],
+         'ids_cadastrados': [...], 'segundos', 'linhas_por_segundo'}
+    """
+    inicio = time.perf_counter()
+    validacao = catalogo_lote.validar_arquivo(caminho)
+    rejeitadas = validacao['rejeitadas']
+    resumo = {'linhas': validacao['linhas'], 'cadastrados': 0, 'atualizados': 0, 'inalterados': 0,
+              'repetidas': validacao['repetidas'], 'rejeitadas': rejeitadas, 'ids_cadastrados': []}
+    aguardar_carga()
+    with TodasAsTravas(): # Nenhuma outra operação no meio da importação
+        ids_por_chave = chaves_naturais()
+        novas, atualizacoes = [], []
+        for chave, linha in validacao['por_chave'].items():
+            id_produto = ids_por_chave.get(chave)
+            if id_produto is None:
+                novas.append(linha)
+            else:
+                atualizacoes.append((id_produto, linha))
+
+        # Depósitos (só nos produtos novos) conferidos antes de reservar qualquer ID
+        if any(linha[7] is not None for linha in novas):
+            criterio = produtos.criterio if MODO_PERSISTENCIA == 'particionado' else None
+            nomes = produtos.nomes if criterio == 'deposito' else ()
+            aceitas = []
+            for linha in novas:
+                if linha[7] is None or linha[7] in nomes:
+                    aceitas.append(linha)
+                elif criterio == 'deposito':
+                    rejeitadas.append((linha[0], f"Depósito desconhecido: {linha[7]} (depósitos: {', '.join(nomes)})."))
+                else:
+                    rejeitadas.append((linha[0], "Depósitos só existem no modo 'particionado' por depósito."))
+            novas = aceitas
+            rejeitadas.sort()
+        if atomico and rejeitadas:
+            return finalizar_resumo_importacao(resumo, inicio) # Tudo ou nada: nenhuma alteração
+
+        alterados = []
+        movimentos = {'cadastro': [], 'ajuste': []}
+        for id_produto, (_, _, _, _, quantidade, preco, estoque_minimo, _) in atualizacoes:
+            produto_dict = produtos[id_produto]
+            quantidade_anterior = produto_dict['quantidade']
+            if (quantidade_anterior, produto_dict['preco'], produto_dict['estoque_minimo']) == (quantidade, preco, estoque_minimo):
+                resumo['inalterados'] += 1
+                continue
+            produto_dict['quantidade'] = quantidade
+            produto_dict['preco'] = preco
+            produto_dict['estoque_minimo'] = estoque_minimo
+            alterados.append(produto_dict)
+            if quantidade != quantidade_anterior:
+                movimentos['ajuste'].append((id_produto, quantidade - quantidade_anterior, quantidade, produto_dict['categoria']))
+        resumo['atualizados'] = len(alterados)
+
+        novos_ids = alocar_ids(len(novas), [linha[7] for linha in novas] if MODO_PERSISTENCIA == 'particionado' else None)
+        for novo_id, (_, _, nome, categoria, quantidade, preco, estoque_minimo, _) in zip(novos_ids, novas):
+            produto_dict = Produto(novo_id, nome, categoria, quantidade, preco, estoque_minimo)
+            if MODO_PERSISTENCIA != 'sqlite': # No banco, registrar_alteracoes() grava todas as linhas num executemany só
+                produtos[novo_id] = produto_dict
+            alterados.append(produto_dict)
+            movimentos['cadastro'].append((novo_id, quantidade, quantidade, produto_dict['categoria']))
+        resumo['cadastrados'] = len(novos_ids)
+        resumo['ids_cadastrados'] = novos_ids
+
+        registrar_alteracoes(alterados)
+        if REGISTRAR_HISTORICO:
+            for tipo, lista in movimentos.items():
+                historico_movimentos.registrar_varios(tipo, lista)
+    return finalizar_resumo_importacao(resumo, inicio)
+
+def finalizar_resumo_importacao(resumo, inicio):
+    """Acrescenta o tempo gasto e a vazão (linhas lidas por segundo) ao resumo da importação"""
+    resumo['segundos'] = time.perf_counter() - inicio
+    resumo['linhas_por_segundo'] = resumo['linhas'] / resumo['segundos'] if resumo['segundos'] else 0.0
+    return resumo
+
+# Funções medidas pela instrumentação -> nome da operação nas métricas.
+# Cada chamada conta, inclusive as feitas por outra operação (ex.: listar_produtos dentro de pagina_relatorio).
+# obter_produto fica de fora: toda entrada, saída e edição passa por ela, e medir duas vezes cada movimento
+# dobraria o custo da instrumentação; as consultas por ID de fora do serviço usam buscar_produto_por_id.
+OPERACOES_MEDIDAS = {
+    'carregar_dados': 'carregar',
+    'salvar_dados': 'salvar',
+    'buscar_produto_por_id': 'consulta_id',
+    'buscar_por_nome': 'busca_nome',
+    'buscar_por_categoria': 'busca_categoria',
+    'buscar_aproximado': 'busca_aproximada',
+    'cadastrar_produto': 'cadastro',
+    'remover_produto': 'remocao',
+    'editar_produto': 'edicao',
+    'registrar_entrada': 'entrada',
+    'registrar_saida': 'saida',
+    'aplicar_movimentacoes_lote': 'lote',
+    'importar_catalogo': 'importacao_catalogo',
+    'obter_totais': 'relatorio_estoque',
+    'relatorio_baixo_estoque': 'relatorio_baixo_estoque',
+    'listar_produtos': 'relatorio_listagem',
+    'pagina_relatorio': 'relatorio_pagina',
+    'exportar_relatorio': 'relatorio_exportacao',
+    'analisar_estoque': 'analise',
+    'planejar_reposicao': 'planejamento_reposicao',
+    'consultar_movimentos': 'historico',
+    'totais_diarios_por_categoria': 'totais_diarios',
+}
+
+def ativar_instrumentacao(arquivo_metricas=None):
+    """Passa a medir as operações de OPERACOES_MEDIDAS; com arquivo_metricas, grava as métricas nele ao sair"""
+    instrumentacao.ativar(sys.modules[__name__], OPERACOES_MEDIDAS)
+    if arquivo_metricas is not None:
+        atexit.register(instrumentacao.exportar, arquivo_metricas)
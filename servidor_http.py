@@ -0,0 +1,295 @@
+"""
+Servidor HTTP/JSON do Sistema de Gerenciamento de Estoque (asyncio, só biblioteca padrão)
+
+Permite que vários operadores/scripts usem o mesmo estoque ao mesmo tempo:
+    python servidor_http.py [--host 127.0.0.1] [--porta 8080] [--modo journal|completo|sqlite|particionado]
+
+Endpoints (respostas em JSON):
+    GET  /produtos/{id}                     detalhes de um produto
+    GET  /produtos?nome=texto               busca por nome (ou ?categoria=texto), sem diferenciar maiúsculas e acentos
+    GET  /produtos?nome=texto&aproximado=1  busca tolerante a erros de digitação, do mais para o menos parecido
+    POST /produtos/{id}/entrada             corpo: {"quantidade": 5}
+    POST /produtos/{id}/saida               corpo: {"quantidade": 3}
+    GET  /relatorios/estoque                valor total, quantidade de itens e de produtos
+    GET  /relatorios/baixo-estoque          produtos abaixo do mínimo, do maior para o menor déficit
+    GET  /relatorios/reposicao?limite=20    produtos a pedir (consumo diário, dias de cobertura, quantidade sugerida)
+    GET  /metricas                          chamadas, erros e latências (p50/p95/p99) de cada operação
+                                            (com --metricas arquivo; ?formato=prometheus para o texto do Prometheus)
+
+Concorrência:
+- As alterações usam as travas do serviço (uma por grupo de produtos, ver servico_estoque.py),
+  então o teste "quantidade a retirar > quantidade em estoque" nunca concorre com outra saída.
+- As gravações são agrupadas: a resposta de uma alteração só é enviada depois do salvamento,
+  mas um único salvar_dados() atende todas as alterações que chegaram no mesmo intervalo.
+- O salvamento e toda rota que chama o serviço (consultas, buscas, alterações, relatórios e métricas)
+  rodam em outra thread (asyncio.to_thread): elas podem esperar a trava global durante um salvamento
+  (ou, no modo 'particionado', os processos das partições), e enquanto isso o loop continua atendendo
+  as outras conexões. No loop ficam só a leitura e a escrita das conexões.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from urllib.parse import urlsplit, parse_qs
+
+import instrumentacao
+import servico_estoque as servico
+from produto import para_json
+
+INTERVALO_SALVAMENTO = 0.01 # Segundos de espera para juntar alterações em um único salvamento
+TAMANHO_MAXIMO_CORPO = 1024 * 1024
+
+MENSAGENS_STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                    409: 'Conflict', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+# Alterações esperando o próximo salvamento: cada uma é um Future resolvido após salvar_dados()
+aguardando_salvamento = []
+evento_alteracao = None # asyncio.Event avisando a tarefa de salvamento (criado com o loop)
+tarefa_de_salvamento = None # Referência à tarefa, para ela não ser descartada pelo coletor de lixo
+
+class ErroHTTP(Exception):
+    """Erro que vira uma resposta com o status informado"""
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+async def aguardar_salvamento():
+    """Espera até que as alterações feitas até agora estejam gravadas"""
+    futuro = asyncio.get_running_loop().create_future()
+    aguardando_salvamento.append(futuro)
+    evento_alteracao.set()
+    await futuro
+
+async def tarefa_salvamento():
+    """Salva em lote: espera a primeira alteração, junta as que chegarem em INTERVALO_SALVAMENTO e grava uma vez"""
+    while True:
+        await evento_alteracao.wait()
+        await asyncio.sleep(INTERVALO_SALVAMENTO)
+        evento_alteracao.clear()
+        futuros = aguardando_salvamento[:]
+        aguardando_salvamento.clear()
+        try:
+            # Em outra thread: o fsync (e, no modo 'completo', a regravação do catálogo) não para o loop
+            await asyncio.to_thread(servico.salvar_dados)
+            erro = None
+        except Exception as e:
+            erro = e
+        for futuro in futuros:
+            if futuro.done():
+                continue # Cliente desconectou
+            if erro is None:
+                futuro.set_result(None)
+            else:
+                futuro.set_exception(erro)
+
+def ler_quantidade(corpo):
+    """Extrai {"quantidade": n} do corpo da requisição"""
+    try:
+        dados = json.loads(corpo or b'{}')
+        return dados['quantidade']
+    except (json.JSONDecodeError, KeyError, TypeError):
+        raise ErroHTTP(400, 'Envie um JSON com o campo "quantidade".')
+
+def ler_id(texto):
+    """Converte o ID da URL para inteiro"""
+    try:
+        return int(texto)
+    except ValueError:
+        raise ErroHTTP(400, "ID inválido. Digite um número.")
+
+def ler_limite(texto):
+    """Converte o ?limite= da URL para inteiro"""
+    try:
+        return int(texto)
+    except ValueError:
+        raise ErroHTTP(400, "Limite inválido. Digite um número.")
+
+def aplicar_movimento(id_produto, quantidade, tipo):
+    """Entrada ou saída de estoque; retorna o produto com o aviso de estoque abaixo do mínimo"""
+    if tipo == 'entrada':
+        produto_dict = servico.registrar_entrada(id_produto, quantidade)
+    else:
+        produto_dict = servico.registrar_saida(id_produto, quantidade)
+    return dict(produto_dict, abaixo_do_minimo=servico.produto_abaixo_do_minimo(id_produto))
+
+async def movimentar(id_produto, corpo, tipo):
+    """Entrada ou saída de estoque, esperando o salvamento"""
+    quantidade = ler_quantidade(corpo)
+    # Em outra thread: durante um salvamento a trava global está ocupada, e esperar por ela no loop pararia tudo
+    resposta = await asyncio.to_thread(aplicar_movimento, id_produto, quantidade, tipo)
+    await aguardar_salvamento()
+    return resposta
+
+def buscar(campo, texto, aproximado):
+    """Busca por nome ou categoria (exata ou aproximada), no formato da resposta"""
+    if aproximado:
+        return [dict(produto_dict, semelhanca=round(semelhanca, 3))
+                for produto_dict, semelhanca in servico.buscar_aproximado(campo, texto)]
+    return servico.buscar_por_nome(texto) if campo == 'nome' else servico.buscar_por_categoria(texto)
+
+def metricas(formato):
+    """Métricas das operações (texto do Prometheus ou resumo em JSON)"""
+    if not instrumentacao.ativa():
+        raise ErroHTTP(404, "Instrumentação desligada (inicie o servidor com --metricas arquivo).")
+    if formato == ['prometheus']:
+        return instrumentacao.texto_prometheus()
+    return instrumentacao.resumo()
+
+async def rotear(metodo, caminho, parametros, corpo):
+    """
+    Chama a operação correspondente à URL e retorna o objeto a ser enviado em JSON.
+    Toda chamada ao serviço vai para outra thread (asyncio.to_thread): ver "Concorrência" no início do módulo.
+    """
+    partes = [parte for parte in caminho.split('/') if parte]
+
+    if partes == ['produtos'] and metodo == 'GET':
+        campo = 'nome' if 'nome' in parametros else 'categoria' if 'categoria' in parametros else None
+        if campo is None:
+            raise ErroHTTP(400, "Informe ?nome= ou ?categoria= na busca.")
+        aproximado = parametros.get('aproximado', ['0'])[0] not in ('', '0')
+        return await asyncio.to_thread(buscar, campo, parametros[campo][0], aproximado)
+    if len(partes) == 2 and partes[0] == 'produtos' and metodo == 'GET':
+        id_produto = ler_id(partes[1])
+        produto_dict = await asyncio.to_thread(servico.buscar_produto_por_id, id_produto)
+        if produto_dict is None:
+            raise servico.ProdutoNaoEncontrado(id_produto)
+        return produto_dict
+    if len(partes) == 3 and partes[0] == 'produtos' and partes[2] in ('entrada', 'saida'):
+        if metodo != 'POST':
+            raise ErroHTTP(405, "Use POST.")
+        return await movimentar(ler_id(partes[1]), corpo, partes[2])
+    if partes == ['relatorios', 'estoque'] and metodo == 'GET':
+        totais = await asyncio.to_thread(servico.obter_totais)
+        totais['valor_total'] = str(totais['valor_total']) # Decimal -> texto, sem perder casas decimais
+        return totais
+    if partes == ['relatorios', 'baixo-estoque'] and metodo == 'GET':
+        return [dict(produto_dict, necessario_repor=necessario)
+                for produto_dict, necessario in await asyncio.to_thread(servico.relatorio_baixo_estoque)]
+    if partes == ['relatorios', 'reposicao'] and metodo == 'GET':
+        limite = ler_limite(parametros['limite'][0]) if 'limite' in parametros else None
+        return [dict(produto_dict, **plano)
+                for produto_dict, plano in await asyncio.to_thread(servico.planejar_reposicao, limite)]
+    if partes == ['metricas'] and metodo == 'GET':
+        return await asyncio.to_thread(metricas, parametros.get('formato'))
+    raise ErroHTTP(404, "Endereço não encontrado.")
+
+async def processar_requisicao(metodo, alvo, corpo):
+    """Retorna (status, objeto JSON) para uma requisição"""
+    url = urlsplit(alvo)
+    try:
+        return 200, await rotear(metodo, url.path, parse_qs(url.query), corpo)
+    except ErroHTTP as e:
+        return e.status, {'erro': str(e)}
+    except servico.ProdutoNaoEncontrado as e:
+        return 404, {'erro': str(e)}
+    except servico.EstoqueInsuficiente as e:
+        return 409, {'erro': str(e), 'disponivel': e.disponivel}
+    except servico.ErroEstoque as e:
+        return 400, {'erro': str(e)}
+    except Exception as e:
+        return 500, {'erro': f"Erro interno: {str(e)}"}
+
+def montar_resposta(status, objeto, manter_conexao):
+    """Monta os bytes da resposta HTTP/1.1 (texto puro quando o objeto já é um texto, como as métricas do Prometheus)"""
+    if isinstance(objeto, str):
+        corpo = objeto.encode('utf-8')
+        tipo = 'text/plain; version=0.0.4; charset=utf-8'
+    else:
+        corpo = json.dumps(objeto, ensure_ascii=False, default=para_json).encode('utf-8')
+        tipo = 'application/json; charset=utf-8'
+    cabecalho = (f"HTTP/1.1 {status} {MENSAGENS_STATUS.get(status, '')}\r\n"
+                 f"Content-Type: {tipo}\r\n"
+                 f"Content-Length: {len(corpo)}\r\n"
+                 f"Connection: {'keep-alive' if manter_conexao else 'close'}\r\n\r\n")
+    return cabecalho.encode('ascii') + corpo
+
+def ler_tamanho_corpo(texto):
+    """Tamanho do corpo pelo cabeçalho Content-Length (0 se ausente), ou None se não for um inteiro >= 0"""
+    if not texto:
+        return 0
+    if not texto.isdigit() or not texto.isascii(): # int() aceitaria '-5', '+5', ' 5' e '1_000'
+        return None
+    return int(texto)
+
+async def atender_cliente(leitor, escritor):
+    """Atende as requisições de uma conexão (com keep-alive) até o cliente fechar"""
+    try:
+        while True:
+            linha_inicial = await leitor.readline()
+            if not linha_inicial:
+                break # Cliente fechou a conexão
+            try:
+                metodo, alvo, versao = linha_inicial.decode('latin-1').split()
+            except ValueError:
+                escritor.write(montar_resposta(400, {'erro': "Requisição inválida."}, False))
+                break
+
+            cabecalhos = {}
+            while True:
+                linha = await leitor.readline()
+                if linha in (b'\r\n', b'\n', b''):
+                    break
+                nome, _, valor = linha.decode('latin-1').partition(':')
+                cabecalhos[nome.strip().lower()] = valor.strip()
+
+            tamanho = ler_tamanho_corpo(cabecalhos.get('content-length', ''))
+            if tamanho is None:
+                escritor.write(montar_resposta(400, {'erro': "Content-Length inválido."}, False))
+                break
+            if tamanho > TAMANHO_MAXIMO_CORPO:
+                escritor.write(montar_resposta(413, {'erro': "Corpo muito grande."}, False))
+                break
+            corpo = await leitor.readexactly(tamanho) if tamanho else b''
+
+            conexao = cabecalhos.get('connection', '').lower()
+            manter_conexao = conexao != 'close' and (versao == 'HTTP/1.1' or conexao == 'keep-alive')
+            status, objeto = await processar_requisicao(metodo.upper(), alvo, corpo)
+            escritor.write(montar_resposta(status, objeto, manter_conexao))
+            await escritor.drain()
+            if not manter_conexao:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass # Cliente desconectou no meio da requisição
+    finally:
+        escritor.close()
+
+async def iniciar_servidor(host='127.0.0.1', porta=8080):
+    """Carrega os dados, inicia a tarefa de salvamento e começa a aceitar conexões"""
+    global evento_alteracao, tarefa_de_salvamento
+    servico.carregar_dados()
+    evento_alteracao = asyncio.Event()
+    tarefa_de_salvamento = asyncio.create_task(tarefa_salvamento())
+    return await asyncio.start_server(atender_cliente, host, porta, backlog=1024)
+
+async def executar_servidor(host, porta):
+    servidor = await iniciar_servidor(host, porta)
+    enderecos = ", ".join(str(socket.getsockname()) for socket in servidor.sockets)
+    print(f"Servidor de estoque ouvindo em {enderecos} (Ctrl+C para encerrar)")
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        servico.salvar_dados() # Grava o que estiver pendente antes de sair
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor HTTP/JSON do Sistema de Gerenciamento de Estoque")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8080)
+    parser.add_argument('--modo', choices=('completo', 'journal', 'sqlite', 'particionado'), help="modo de persistência")
+    parser.add_argument('--metricas', help="mede as operações (GET /metricas) e grava as métricas no arquivo ao sair")
+    argumentos = parser.parse_args()
+    if argumentos.modo:
+        servico.MODO_PERSISTENCIA = argumentos.modo
+    if argumentos.metricas:
+        servico.ativar_instrumentacao(argumentos.metricas)
+    try:
+        asyncio.run(executar_servidor(argumentos.host, argumentos.porta))
+    except KeyboardInterrupt:
+        print("\nServidor encerrado.")
+    except servico.ErroEstoque as e: # Ex.: modo 'particionado' com um catálogo que ainda não foi dividido
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
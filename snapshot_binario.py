@@ -0,0 +1,269 @@
+"""
+Snapshot binário do catálogo para o Sistema de Gerenciamento de Estoque
+
+Alternativa ao produtos.json com indent=4: menor, mais rápido de gravar e de ler,
+e permite consultar um produto pelo ID direto do arquivo (mmap), sem ler o resto.
+
+Formato (números em little-endian):
+    cabeçalho   CABECALHO: 'ESTQ', versão, quantidade de produtos, próximo ID livre,
+                início dos registros, início e tamanho da área de textos, CRC32 do conteúdo
+    registros   um por produto, em ordem crescente de ID, todos com REGISTRO.size bytes:
+                id, quantidade, preço, estoque mínimo, (início, tamanho) do nome e da categoria
+    chaves      só na versão 2: um por produto, na ordem dos registros, com CHAVES.size bytes:
+                (início, tamanho) das chaves de busca (indice_busca.normalizar) do nome e da categoria
+    textos      nomes, categorias e chaves em UTF-8; cada categoria aparece uma única vez,
+                e uma chave igual ao próprio texto ("teclado") aponta para ele, sem outra cópia
+A versão 1 (sem chaves) continua sendo gravada quando não há chave_de_busca e lida normalmente.
+
+Exportar/importar JSON (mesmo formato do produtos.json, com o próximo ID no produtos.meta.json ao lado):
+    python snapshot_binario.py exportar [produtos.bin] [produtos.json]
+    python snapshot_binario.py importar [produtos.json] [produtos.bin]
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+
+import gravacao_atomica
+import leitor_json
+from produto import Produto, para_json
+
+ASSINATURA = b'ESTQ'
+VERSAO = 2
+VERSAO_SEM_CHAVES = 1
+# assinatura, versão, reservado, quantidade, próximo ID, início dos registros, início dos textos, tamanho dos textos, CRC32
+CABECALHO = struct.Struct('<4sHHqqQQQI')
+# id, quantidade, preço, estoque mínimo, início do nome, tamanho do nome, início da categoria, tamanho da categoria
+REGISTRO = struct.Struct('<qqdqQIQI')
+# início e tamanho da chave de busca do nome, início e tamanho da chave de busca da categoria
+CHAVES = struct.Struct('<QIQI')
+
+def codificar(produtos, proximo_id, chave_de_busca=None):
+    """
+    Conteúdo do snapshot binário (bytes), sem gravar nada.
+    Com chave_de_busca (texto -> chave, ex.: indice_busca.normalizar), inclui as chaves de busca (versão 2).
+    """
+    registros = bytearray()
+    chaves = bytearray()
+    textos = bytearray()
+    posicoes_categorias = {} # categoria -> ((início, tamanho) da categoria, (início, tamanho) da sua chave)
+
+    def acrescentar(texto, posicao_original=None):
+        """(início, tamanho) do texto na área de textos; igual ao texto original, reaproveita a posição dele"""
+        if posicao_original is not None:
+            return posicao_original
+        codificado = texto.encode('utf-8')
+        posicao = (len(textos), len(codificado))
+        textos.extend(codificado)
+        return posicao
+
+    try:
+        for id_produto in sorted(produtos):
+            produto_dict = produtos[id_produto]
+            nome, categoria = produto_dict['nome'], produto_dict['categoria']
+            posicao_nome = acrescentar(nome)
+            posicoes = posicoes_categorias.get(categoria)
+            if posicoes is None:
+                posicao_categoria = acrescentar(categoria)
+                posicao_chave_categoria = None
+                if chave_de_busca is not None:
+                    chave = chave_de_busca(categoria)
+                    posicao_chave_categoria = acrescentar(chave, posicao_categoria if chave == categoria else None)
+                posicoes = posicoes_categorias[categoria] = (posicao_categoria, posicao_chave_categoria)
+            registros += REGISTRO.pack(id_produto, produto_dict['quantidade'], produto_dict['preco'],
+                                       produto_dict['estoque_minimo'], *posicao_nome, *posicoes[0])
+            if chave_de_busca is not None:
+                chave = chave_de_busca(nome)
+                chaves += CHAVES.pack(*acrescentar(chave, posicao_nome if chave == nome else None), *posicoes[1])
+    except struct.error as e:
+        raise ValueError(f"Produto com ID {id_produto} não cabe no snapshot binário: {str(e)}")
+
+    inicio_registros = CABECALHO.size
+    inicio_textos = inicio_registros + len(registros) + len(chaves)
+    crc = zlib.crc32(textos, zlib.crc32(chaves, zlib.crc32(registros)))
+    cabecalho = CABECALHO.pack(ASSINATURA, VERSAO if chave_de_busca is not None else VERSAO_SEM_CHAVES, 0,
+                               len(produtos), proximo_id, inicio_registros, inicio_textos, len(textos), crc)
+
+    return b''.join((cabecalho, registros, chaves, textos))
+
+def gravar(caminho, produtos, proximo_id, chave_de_busca=None):
+    """Grava o snapshot binário (arquivo temporário + fsync + rename, como o produtos.json); ver codificar()"""
+    dados = codificar(produtos, proximo_id, chave_de_busca)
+    with gravacao_atomica.arquivo_atomico(caminho, 'wb') as arquivo:
+        arquivo.write(dados)
+
+def ler_cabecalho(dados):
+    """
+    Confere assinatura/versão/tamanho e retorna os campos do cabeçalho em um dicionário
+    (inicio_chaves é None nos arquivos sem chaves de busca, da versão 1)
+    """
+    if len(dados) < CABECALHO.size:
+        raise ValueError("Snapshot binário inválido: arquivo menor que o cabeçalho.")
+    assinatura, versao, _, quantidade, proximo_id, inicio_registros, inicio_textos, tamanho_textos, crc = \
+        CABECALHO.unpack_from(dados, 0)
+    if assinatura != ASSINATURA:
+        raise ValueError("Arquivo não é um snapshot binário do estoque.")
+    if versao > VERSAO:
+        raise ValueError(f"Snapshot binário na versão {versao}; esta versão do sistema lê até a {VERSAO}.")
+    fim_registros = inicio_registros + quantidade * REGISTRO.size
+    fim_chaves = fim_registros + (quantidade * CHAVES.size if versao > VERSAO_SEM_CHAVES else 0)
+    if fim_chaves != inicio_textos or inicio_textos + tamanho_textos > len(dados):
+        raise ValueError("Snapshot binário inválido: arquivo incompleto.")
+    return {'quantidade': quantidade, 'proximo_id': proximo_id, 'inicio_registros': inicio_registros,
+            'fim_registros': fim_registros, 'inicio_chaves': fim_registros if versao > VERSAO_SEM_CHAVES else None,
+            'inicio_textos': inicio_textos, 'tamanho_textos': tamanho_textos, 'crc': crc}
+
+def ler_areas(dados, descricao='Snapshot binário'):
+    """(registros, chaves, textos) do snapshot já lido, conferindo cabeçalho e CRC (chaves: None na versão 1)"""
+    cabecalho = ler_cabecalho(dados)
+    visao = memoryview(dados)
+    fim_textos = cabecalho['inicio_textos'] + cabecalho['tamanho_textos']
+    # O CRC cobre registros, chaves e textos (que estão em sequência no arquivo)
+    if zlib.crc32(visao[cabecalho['inicio_registros']:fim_textos]) != cabecalho['crc']:
+        raise ValueError(f"{descricao} corrompido (CRC não confere).")
+    registros = visao[cabecalho['inicio_registros']:cabecalho['fim_registros']]
+    chaves = visao[cabecalho['inicio_chaves']:cabecalho['inicio_textos']] if cabecalho['inicio_chaves'] is not None else None
+    return registros, chaves, visao[cabecalho['inicio_textos']:fim_textos]
+
+def carregar(caminho):
+    """Lê o snapshot inteiro e retorna (dicionário {id: Produto}, próximo ID livre)"""
+    with open(caminho, 'rb') as arquivo:
+        dados = arquivo.read()
+    registros, _, textos = ler_areas(dados)
+
+    produtos = {}
+    categorias = {} # início -> texto já decodificado (as categorias se repetem)
+    for id_produto, quantidade, preco, estoque_minimo, inicio_nome, tamanho_nome, inicio_categoria, tamanho_categoria \
+            in REGISTRO.iter_unpack(registros):
+        categoria = categorias.get(inicio_categoria)
+        if categoria is None:
+            categoria = categorias[inicio_categoria] = str(textos[inicio_categoria:inicio_categoria + tamanho_categoria], 'utf-8')
+        nome = str(textos[inicio_nome:inicio_nome + tamanho_nome], 'utf-8')
+        produtos[id_produto] = Produto(id_produto, nome, categoria, quantidade, preco, estoque_minimo)
+    return produtos, ler_cabecalho(dados)['proximo_id']
+
+class SnapshotMapeado:
+    """
+    Consulta produtos direto do arquivo mapeado em memória (mmap), sem carregar o catálogo:
+        with SnapshotMapeado('produtos.bin') as snapshot:
+            produto = snapshot.buscar(42)   # busca binária pelo ID: lê só alguns registros
+    """
+    def __init__(self, caminho):
+        with open(caminho, 'rb') as arquivo:
+            self.mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            cabecalho = ler_cabecalho(self.mapa)
+        except ValueError:
+            self.mapa.close()
+            raise
+        self.quantidade = cabecalho['quantidade']
+        self.proximo_id = cabecalho['proximo_id']
+        self.inicio_registros = cabecalho['inicio_registros']
+        self.inicio_textos = cabecalho['inicio_textos']
+
+    def id_na_posicao(self, posicao):
+        return struct.unpack_from('<q', self.mapa, self.inicio_registros + posicao * REGISTRO.size)[0]
+
+    def ler_texto(self, inicio, tamanho):
+        inicio += self.inicio_textos
+        return self.mapa[inicio:inicio + tamanho].decode('utf-8')
+
+    def produto_na_posicao(self, posicao):
+        id_produto, quantidade, preco, estoque_minimo, inicio_nome, tamanho_nome, inicio_categoria, tamanho_categoria = \
+            REGISTRO.unpack_from(self.mapa, self.inicio_registros + posicao * REGISTRO.size)
+        return Produto(id_produto, self.ler_texto(inicio_nome, tamanho_nome),
+                       self.ler_texto(inicio_categoria, tamanho_categoria), quantidade, preco, estoque_minimo)
+
+    def buscar(self, id_produto):
+        """Produto com o ID informado, ou None (busca binária nos registros ordenados)"""
+        inicio, fim = 0, self.quantidade
+        while inicio < fim:
+            meio = (inicio + fim) // 2
+            id_meio = self.id_na_posicao(meio)
+            if id_meio == id_produto:
+                return self.produto_na_posicao(meio)
+            if id_meio < id_produto:
+                inicio = meio + 1
+            else:
+                fim = meio
+        return None
+
+    def __len__(self):
+        return self.quantidade
+
+    def __iter__(self):
+        """Percorre os produtos em ordem de ID"""
+        for posicao in range(self.quantidade):
+            yield self.produto_na_posicao(posicao)
+
+    def fechar(self):
+        self.mapa.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.fechar()
+
+def caminho_meta(caminho_json):
+    """Arquivo com o próximo ID livre ao lado do JSON (produtos.json -> produtos.meta.json), como no servico_estoque"""
+    return os.path.splitext(caminho_json)[0] + '.meta.json'
+
+def ler_meta(caminho_json):
+    """Próximo ID gravado em caminho_meta(caminho_json), ou None se o arquivo não existir ou estiver inválido"""
+    try:
+        with open(caminho_meta(caminho_json), 'r', encoding='utf-8') as arquivo:
+            proximo_id = json.load(arquivo).get('proximo_id')
+    except (FileNotFoundError, json.JSONDecodeError, AttributeError):
+        return None
+    return proximo_id if isinstance(proximo_id, int) else None
+
+def exportar_json(caminho_binario, caminho_json):
+    """
+    Grava o conteúdo do snapshot binário como produtos.json e o próximo ID do cabeçalho no meta ao lado;
+    retorna o número de produtos. O meta vai antes do JSON (se parar no meio, só pula IDs, nunca repete).
+    """
+    produtos, proximo_id = carregar(caminho_binario)
+    with gravacao_atomica.arquivo_atomico(caminho_meta(caminho_json)) as arquivo:
+        json.dump({'proximo_id': proximo_id}, arquivo, indent=4)
+    with gravacao_atomica.arquivo_atomico(caminho_json) as arquivo:
+        json.dump(produtos, arquivo, indent=4, ensure_ascii=False, default=para_json)
+    return len(produtos)
+
+def importar_json(caminho_json, caminho_binario, proximo_id=None):
+    """
+    Grava o produtos.json como snapshot binário; retorna o número de produtos.
+    Próximo ID: o informado, o do meta ao lado do JSON ou, sem meta, o maior ID + 1 (nunca abaixo disso).
+    """
+    produtos = {int(chave): Produto.de_dict(produto_dict) for chave, produto_dict in leitor_json.ler_itens_objeto(caminho_json)}
+    if proximo_id is None:
+        proximo_id = ler_meta(caminho_json)
+    proximo_id = max(proximo_id or 0, max(produtos.keys(), default=0) + 1)
+    gravar(caminho_binario, produtos, proximo_id)
+    return len(produtos)
+
+def main():
+    """Linha de comando: exportar/importar entre o snapshot binário e JSON"""
+    argumentos = sys.argv[1:]
+    if not argumentos or argumentos[0] not in ('exportar', 'importar'):
+        print(__doc__)
+        return
+    try:
+        if argumentos[0] == 'exportar':
+            caminho_binario = argumentos[1] if len(argumentos) > 1 else 'produtos.bin'
+            caminho_json = argumentos[2] if len(argumentos) > 2 else 'produtos.json'
+            total = exportar_json(caminho_binario, caminho_json)
+            print(f"Exportação concluída: {total} produtos em '{caminho_json}'.")
+        else:
+            caminho_json = argumentos[1] if len(argumentos) > 1 else 'produtos.json'
+            caminho_binario = argumentos[2] if len(argumentos) > 2 else 'produtos.bin'
+            total = importar_json(caminho_json, caminho_binario)
+            print(f"Importação concluída: {total} produtos em '{caminho_binario}'.")
+    except Exception as e:
+        print(f"Erro: {str(e)}")
+
+if __name__ == "__main__":
+    main()